@@ -19,8 +19,8 @@ import os
 import uuid
 import base64
 import mimetypes
-import tempfile
 import requests
+import httpx
 from pathlib import Path
 from .models import Recipe, Ingredient, Order, BlogPost, Tag, Category, RecipeStep, RecipeIngredient
 from .serializers import (
@@ -799,10 +799,12 @@ class AiAgentView(APIView):
         def generate():
             """流式生成器"""
             from openai import OpenAI
+            from common.utils.http_client import get_client
             
             client = OpenAI(
                 api_key=settings.DEEPSEEK_API_KEY,
-                base_url=settings.DEEPSEEK_BASE_URL
+                base_url=settings.DEEPSEEK_BASE_URL,
+                http_client=get_client(settings.DEEPSEEK_BASE_URL),
             )
             
             actions = []
@@ -1023,27 +1025,16 @@ class DeepSeekOCRView(APIView):
             
             headers = {
                 "Authorization": f"Bearer {siliconflow_api_key}",
-                "Content-Type": "application/json"
             }
             
-            # 使用 urllib 替代 requests
-            import urllib.request
-            import urllib.error
-            
-            req = urllib.request.Request(
-                url,
-                data=json.dumps(payload).encode('utf-8'),
-                headers=headers,
-                method='POST'
-            )
+            # 复用连接池（keep-alive），避免每次请求重新握手
+            from common.utils.http_client import post_json
             
             try:
-                with urllib.request.urlopen(req, timeout=60) as resp:
-                    result = json.loads(resp.read().decode('utf-8'))
-            except urllib.error.HTTPError as e:
-                error_body = e.read().decode('utf-8')
+                result = post_json(url, payload, headers=headers, timeout=60)
+            except httpx.HTTPStatusError as e:
                 try:
-                    error_data = json.loads(error_body)
+                    error_data = e.response.json()
                     error_msg = error_data.get('error', {}).get('message', '请求失败')
                 except:
                     error_msg = '请求失败'
@@ -1064,12 +1055,10 @@ class DeepSeekOCRView(APIView):
                 'usage': result.get('usage', {})
             })
             
-        except urllib.error.URLError as e:
-            if 'timed out' in str(e):
-                return Response({
-                    'error': 'OCR 服务响应超时，请稍后重试'
-                }, status=status.HTTP_504_GATEWAY_TIMEOUT)
-            raise
+        except httpx.TimeoutException:
+            return Response({
+                'error': 'OCR 服务响应超时，请稍后重试'
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -1137,6 +1126,8 @@ class WhisperTranscribeView(APIView):
     def post(self, request):
         """处理语音转录请求"""
         from openai import OpenAI
+        from common.utils.audio_buffer import AudioUpload
+        from common.utils.http_client import get_client
         
         # 获取音频文件
         audio_file = request.FILES.get('audio')
@@ -1152,7 +1143,7 @@ class WhisperTranscribeView(APIView):
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
         try:
-            # 将上传的文件保存为临时文件
+            # 根据类型确定文件名后缀（Groq 按文件名识别格式）
             suffix = '.webm'  # 默认 webm 格式
             content_type = audio_file.content_type or ''
             if 'mp3' in content_type:
@@ -1162,14 +1153,12 @@ class WhisperTranscribeView(APIView):
             elif 'm4a' in content_type:
                 suffix = '.m4a'
             
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-                for chunk in audio_file.chunks():
-                    tmp_file.write(chunk)
-                tmp_file_path = tmp_file.name
+            # 小文件直接在内存中上传，大文件沿用 Django 已落盘的临时文件
+            audio = AudioUpload.from_django_file(audio_file, name=f'audio{suffix}')
             
             try:
                 # 检测音频文件大小，过小可能是空录音
-                file_size = os.path.getsize(tmp_file_path)
+                file_size = audio.size
                 if file_size < 2000:  # 小于 2KB 认为是空录音
                     return Response({
                         'success': True,
@@ -1180,15 +1169,17 @@ class WhisperTranscribeView(APIView):
                 duration = float(request.data.get('duration', 0))
                 
                 # 使用 OpenAI SDK 调用 Groq API（Groq 兼容 OpenAI API）
+                groq_base_url = "https://api.groq.com/openai/v1"
                 groq_client = OpenAI(
                     api_key=groq_api_key,
-                    base_url="https://api.groq.com/openai/v1"
+                    base_url=groq_base_url,
+                    http_client=get_client(groq_base_url),
                 )
                 
                 # 调用 Whisper API
-                with open(tmp_file_path, 'rb') as f:
+                with audio.open() as f:
                     transcription = groq_client.audio.transcriptions.create(
-                        file=f,
+                        file=(audio.name, f),
                         model="whisper-large-v3",
                         response_format="text",
                         language="zh",
@@ -1204,7 +1195,8 @@ class WhisperTranscribeView(APIView):
                     try:
                         deepseek_client = OpenAI(
                             api_key=settings.DEEPSEEK_API_KEY,
-                            base_url=settings.DEEPSEEK_BASE_URL
+                            base_url=settings.DEEPSEEK_BASE_URL,
+                            http_client=get_client(settings.DEEPSEEK_BASE_URL),
                         )
                         
                         completion = deepseek_client.chat.completions.create(
@@ -1237,9 +1229,7 @@ class WhisperTranscribeView(APIView):
                 })
                 
             finally:
-                # 清理临时文件
-                if os.path.exists(tmp_file_path):
-                    os.unlink(tmp_file_path)
+                audio.close()
         
         except Exception as e:
             import traceback
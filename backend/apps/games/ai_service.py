@@ -0,0 +1,341 @@
+"""
+Executor service for Gomoku AI hints.
+
+The search is pure-Python CPU work. Run through ``asyncio.to_thread`` it holds
+the GIL for the whole search and stalls the event loop, including chat and
+move broadcasts of every other room. This service runs searches either in
+worker processes (``GOMOKU_AI_EXECUTOR=process``, default) or in a thread pool
+(``thread``).
+
+In process mode every room is pinned to one of ``GOMOKU_AI_WORKERS``
+single-process shards, so the room's ``GomokuEngine`` (board, transposition
+table, ponder thread) stays warm inside that worker between hints. In thread
+mode the engines live in this process.
+
+Admission control:
+- at most ``GOMOKU_AI_MAX_PENDING`` searches queued or running;
+- one search per room and position; repeated requests share it;
+- a room may start a new search at most once per ``GOMOKU_AI_HINT_INTERVAL``;
+- ``position_changed`` cancels the room's outstanding search.
+
+Service methods are called from the event loop only and need no locking.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+from .gomoku_ai import GomokuEngine
+
+logger = logging.getLogger(__name__)
+
+MAX_ENGINES_PER_WORKER = 64
+
+
+class HintUnavailable(Exception):
+    """A hint was refused or dropped; ``message`` is shown to the player."""
+
+    message = "AI 提示暂不可用。"
+
+
+class HintBusy(HintUnavailable):
+    message = "AI 提示繁忙，请稍后再试。"
+
+
+class HintRateLimited(HintUnavailable):
+    message = "提示请求过于频繁，请稍后再试。"
+
+
+class HintCancelled(HintUnavailable):
+    message = "局面已变化，提示已取消。"
+
+
+# ---------------------------------------------------------------------------
+# Engine registry (lives in whichever process runs the search)
+# ---------------------------------------------------------------------------
+
+
+class _EngineRegistry:
+    """Bounded LRU of per-room engines."""
+
+    def __init__(self, tt_size_mb, ponder, search_workers=1, max_engines=MAX_ENGINES_PER_WORKER):
+        self.tt_size_mb = tt_size_mb
+        self.ponder = ponder
+        self.search_workers = search_workers
+        self.max_engines = max_engines
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, room_id, create=True):
+        with self._lock:
+            engine = self._engines.get(room_id)
+            if engine is not None:
+                self._engines.move_to_end(room_id)
+                return engine
+            if not create:
+                return None
+            engine = GomokuEngine(
+                tt_size_mb=self.tt_size_mb,
+                ponder=self.ponder,
+                search_workers=self.search_workers,
+            )
+            self._engines[room_id] = engine
+            while len(self._engines) > self.max_engines:
+                _, evicted = self._engines.popitem(last=False)
+                evicted.close()
+            return engine
+
+    def discard(self, room_id):
+        with self._lock:
+            engine = self._engines.pop(room_id, None)
+        if engine is not None:
+            engine.close()
+
+    def stop_pondering_except(self, room_id):
+        with self._lock:
+            others = [e for rid, e in self._engines.items() if rid != room_id]
+        for engine in others:
+            engine.stop_pondering()
+
+
+class _TicketStop:
+    """``threading.Event``-like view of a shard's shared cancel slot."""
+
+    __slots__ = ("_slot", "_ticket")
+
+    def __init__(self, slot, ticket):
+        self._slot = slot
+        self._ticket = ticket
+
+    def is_set(self):
+        return self._slot.value == self._ticket
+
+
+_worker_registry = None
+_worker_cancel_slot = None
+
+
+def _init_worker(cancel_slot, tt_size_mb, ponder, search_workers):
+    global _worker_registry, _worker_cancel_slot
+    _worker_registry = _EngineRegistry(tt_size_mb, ponder, search_workers)
+    _worker_cancel_slot = cancel_slot
+
+
+def _worker_best_move(room_id, board, color, ticket):
+    engine = _worker_registry.get(room_id)
+    # Pondering of other rooms pinned to this worker would steal the GIL.
+    _worker_registry.stop_pondering_except(room_id)
+    return engine.best_move(board, color, stop_event=_TicketStop(_worker_cancel_slot, ticket))
+
+
+def _worker_ponder(room_id, board, color):
+    engine = _worker_registry.get(room_id, create=False)
+    if engine is not None:
+        engine.ponder(board, color)
+
+
+def _worker_discard(room_id):
+    _worker_registry.discard(room_id)
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+
+class _Shard:
+    def __init__(self, mp_context, tt_size_mb, ponder, search_workers):
+        self.cancel_slot = mp_context.RawValue("q", 0)
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(self.cancel_slot, tt_size_mb, ponder, search_workers),
+        )
+
+
+class _RoomSearch:
+    __slots__ = ("key", "future", "cancel", "cancelled")
+
+    def __init__(self, key, future, cancel):
+        self.key = key
+        self.future = future
+        self.cancel = cancel
+        self.cancelled = False
+
+
+class GomokuAIService:
+    def __init__(
+        self,
+        mode="process",
+        workers=2,
+        max_pending=16,
+        hint_interval=1.0,
+        tt_size_mb=8,
+        ponder=False,
+        search_workers=1,
+    ):
+        self.mode = mode
+        self.max_pending = max_pending
+        self.hint_interval = hint_interval
+        self.ponder = ponder
+        self._pending = 0
+        self._searches = {}
+        self._last_started = {}
+        self._hinted_rooms = set()
+        self._tickets = itertools.count(1)
+
+        workers = max(1, int(workers))
+        if mode == "process":
+            mp_context = multiprocessing.get_context("spawn")
+            self._shards = [
+                _Shard(mp_context, tt_size_mb, ponder, search_workers) for _ in range(workers)
+            ]
+            self._threads = None
+            self._registry = None
+        elif mode == "thread":
+            self._shards = None
+            self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gomoku-ai")
+            self._registry = _EngineRegistry(tt_size_mb, ponder, search_workers)
+        else:
+            raise ValueError(f"unknown GOMOKU_AI_EXECUTOR: {mode}")
+
+    @property
+    def pending(self):
+        return self._pending
+
+    async def best_move(self, room_id, board, color, version):
+        """
+        Search ``board`` for ``color``; ``version`` identifies the position.
+
+        Raises a :class:`HintUnavailable` subclass when the request is refused
+        or the position changes before the search finishes.
+        """
+        key = (version, color)
+        search = self._searches.get(room_id)
+        if search is None or search.key != key:
+            search = self._start(room_id, board, color, key)
+
+        try:
+            move = await asyncio.shield(search.future)
+        except asyncio.CancelledError:
+            if search.future.cancelled():
+                raise HintCancelled() from None
+            raise  # the awaiting consumer itself is being cancelled
+        except Exception as exc:
+            raise HintUnavailable() from exc
+        if search.cancelled:
+            raise HintCancelled()
+        return move
+
+    def position_changed(self, room_id, board=None, turn=None):
+        """Cancel the room's outstanding search; optionally ponder the new position."""
+        search = self._searches.pop(room_id, None)
+        if search is not None:
+            search.cancelled = True
+            search.cancel()
+
+        if board is None or not self.ponder or room_id not in self._hinted_rooms:
+            return
+        if self._shards is not None:
+            self._shard_for(room_id).executor.submit(_worker_ponder, room_id, board, turn)
+        else:
+            engine = self._registry.get(room_id, create=False)
+            if engine is not None:
+                engine.ponder(board, turn)
+
+    def discard_room(self, room_id):
+        """Forget a room that no longer exists."""
+        self.position_changed(room_id)
+        self._last_started.pop(room_id, None)
+        if room_id not in self._hinted_rooms:
+            return
+        self._hinted_rooms.discard(room_id)
+        if self._shards is not None:
+            self._shard_for(room_id).executor.submit(_worker_discard, room_id)
+        else:
+            self._registry.discard(room_id)
+
+    def shutdown(self):
+        if self._shards is not None:
+            for shard in self._shards:
+                shard.executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, room_id, board, color, key):
+        now = time.monotonic()
+        last = self._last_started.get(room_id)
+        if last is not None and now - last < self.hint_interval:
+            raise HintRateLimited()
+        if self._pending >= self.max_pending:
+            raise HintBusy()
+
+        previous = self._searches.pop(room_id, None)
+        if previous is not None:
+            previous.cancelled = True
+            previous.cancel()
+
+        if self._shards is not None:
+            shard = self._shard_for(room_id)
+            ticket = next(self._tickets)
+            cf = shard.executor.submit(_worker_best_move, room_id, board, color, ticket)
+
+            def cancel(cf=cf, shard=shard, ticket=ticket):
+                if not cf.cancel():
+                    shard.cancel_slot.value = ticket
+        else:
+            engine = self._registry.get(room_id)
+            stop = threading.Event()
+            cf = self._threads.submit(engine.best_move, board, color, stop_event=stop)
+
+            def cancel(cf=cf, stop=stop):
+                if not cf.cancel():
+                    stop.set()
+
+        future = asyncio.wrap_future(cf)
+        search = _RoomSearch(key, future, cancel)
+        self._searches[room_id] = search
+        self._last_started[room_id] = now
+        self._hinted_rooms.add(room_id)
+        self._pending += 1
+        future.add_done_callback(lambda _f: self._finish(room_id, search))
+        return search
+
+    def _finish(self, room_id, search):
+        self._pending -= 1
+        if self._searches.get(room_id) is search:
+            del self._searches[room_id]
+        if search.future.cancelled():
+            search.cancelled = True
+        elif search.future.exception() is not None:
+            logger.error("Gomoku AI search failed: %s", search.future.exception())
+
+    def _shard_for(self, room_id):
+        return self._shards[zlib.crc32(room_id.encode("utf-8")) % len(self._shards)]
+
+
+_service = None
+
+
+def get_ai_service():
+    global _service
+    if _service is None:
+        _service = GomokuAIService(
+            mode=getattr(settings, "GOMOKU_AI_EXECUTOR", "process"),
+            workers=getattr(settings, "GOMOKU_AI_WORKERS", 2),
+            max_pending=getattr(settings, "GOMOKU_AI_MAX_PENDING", 16),
+            hint_interval=getattr(settings, "GOMOKU_AI_HINT_INTERVAL", 1.0),
+            tt_size_mb=getattr(settings, "GOMOKU_AI_TT_MB", 8),
+            ponder=getattr(settings, "GOMOKU_AI_PONDER", False),
+            search_workers=getattr(settings, "GOMOKU_AI_SEARCH_WORKERS", 1),
+        )
+    return _service
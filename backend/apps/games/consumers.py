@@ -6,25 +6,29 @@ Supports:
 - Unlimited spectators
 - Realtime room/global online statistics
 
-State is kept in process memory. For multi-instance deployments, move room
-state and counters to Redis or a database-backed design.
+Room state and online counters live in a pluggable store (see
+``room_store``): process memory by default, or Redis so that several ASGI
+processes can serve the same rooms.
 """
 
 import asyncio
 import json
+import logging
 import re
-import threading
 from urllib.parse import parse_qs
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 
-from .gomoku_ai import find_best_move
+from .ai_service import HintCancelled, HintUnavailable, get_ai_service
+from .room_store import get_room_store
 
 BOARD_SIZE = 15
 ROOM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{3,20}$")
 MAX_NICKNAME_LENGTH = 20
 MAX_CHAT_LENGTH = 200
 
+logger = logging.getLogger(__name__)
+
 
 def _create_empty_board():
     return [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
@@ -48,20 +52,24 @@ class GomokuConsumer(AsyncWebsocketConsumer):
     - {"type":"restart"}
     - {"type":"chat","text":"hello"}
     - {"type":"hint"}
+    - {"type":"resync"} (request a fresh room_state snapshot)
     - {"type":"ping"}
 
     Server messages:
     - joined
-    - room_state
+    - room_state (full snapshot; sent to one client on join or resync)
+    - room_delta (broadcast; ``event`` is move / restart / player_joined /
+      player_left / spectator_joined / spectator_left)
     - chat_message
     - hint_result
+    - hint_cancelled (position changed before the hint finished)
     - error
     - pong
-    """
 
-    rooms = {}
-    rooms_lock = threading.Lock()
-    active_connections = set()
+    Every room_state and room_delta carries the room's ``seq``; each delta
+    is ``seq + 1`` of the previous one. A client that sees a gap sends
+    ``resync``; deltas with a ``seq`` it already has are stale.
+    """
 
     async def send_json(self, payload):
         """
@@ -84,19 +92,38 @@ class GomokuConsumer(AsyncWebsocketConsumer):
         self.player_color = None
         self.role = "spectator"
 
-        with self.rooms_lock:
-            room = self.rooms.setdefault(self.room_id, self._create_room())
-            self.active_connections.add(self.channel_name)
-            assigned_color = self._assign_player(room, self.channel_name, self.nickname)
-
-            if assigned_color:
-                self.role = "player"
-                self.player_color = assigned_color
+        def join(room):
+            """Return ``(color, delta)``."""
+            color = self._assign_player(room, self.channel_name, self.nickname)
+            if color:
+                delta = self._next_delta(
+                    room,
+                    "player_joined",
+                    color=color,
+                    player=self._public_player(room["players"][color]),
+                    status=room["status"],
+                    turn=room["turn"],
+                    # Seating the second player starts a fresh game.
+                    reset=room["status"] == "playing",
+                )
             else:
                 room["spectators"][self.channel_name] = {
                     "channel_name": self.channel_name,
                     "nickname": self.nickname,
                 }
+                delta = self._next_delta(room, "spectator_joined", nickname=self.nickname)
+            delta["online"] = {"room": self._room_counts(room)}
+            return color, delta
+
+        store = get_room_store()
+        await store.add_connection(self.channel_name)
+        self._heartbeat = None
+        if store.heartbeat_interval:
+            self._heartbeat = asyncio.create_task(self._keep_connection(store))
+        assigned_color, delta = await store.update(self.room_id, join, factory=self._create_room)
+        if assigned_color:
+            self.role = "player"
+            self.player_color = assigned_color
 
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
@@ -110,40 +137,75 @@ class GomokuConsumer(AsyncWebsocketConsumer):
                 "nickname": self.nickname,
             }
         )
-        await self._broadcast_room_state(reason="join")
+        # Joined the group first, so every delta after this snapshot arrives.
+        await self._send_room_state(reason="join")
+        await self._broadcast_delta(delta)
 
     async def disconnect(self, close_code):
         if not getattr(self, "room_id", None):
             return
 
-        should_broadcast = False
-        with self.rooms_lock:
-            self.active_connections.discard(self.channel_name)
+        def leave(room):
+            """Return ``(delta, room_removed)``; ``delta`` is None if nothing changed."""
+            if not room:
+                return None, False
+            removed_color = self._remove_player(room, self.channel_name)
+            spectator = room["spectators"].pop(self.channel_name, None)
 
-            room = self.rooms.get(self.room_id)
-            if room:
-                removed_player = self._remove_player(room, self.channel_name)
-                removed_spectator = room["spectators"].pop(self.channel_name, None) is not None
+            if removed_color:
+                self._reset_board(room)
+                room["status"] = "waiting"
+
+            room_is_empty = (
+                room["players"]["black"] is None
+                and room["players"]["white"] is None
+                and not room["spectators"]
+            )
+            if room_is_empty:
+                room.clear()
+                return None, True
+
+            if removed_color:
+                delta = self._next_delta(
+                    room,
+                    "player_left",
+                    color=removed_color,
+                    status=room["status"],
+                    turn=room["turn"],
+                    reset=True,
+                )
+            elif spectator:
+                delta = self._next_delta(room, "spectator_left", nickname=spectator["nickname"])
+            else:
+                return None, False
+            delta["online"] = {"room": self._room_counts(room)}
+            return delta, False
 
-                if removed_player:
-                    self._reset_board(room)
-                    room["status"] = "waiting"
+        if getattr(self, "_heartbeat", None):
+            self._heartbeat.cancel()
+        store = get_room_store()
+        await store.remove_connection(self.channel_name)
+        delta, room_removed = await store.update(self.room_id, leave)
 
-                room_is_empty = (
-                    room["players"]["black"] is None
-                    and room["players"]["white"] is None
-                    and not room["spectators"]
-                )
-                if room_is_empty:
-                    self.rooms.pop(self.room_id, None)
-                else:
-                    should_broadcast = removed_player or removed_spectator
+        if room_removed:
+            get_ai_service().discard_room(self.room_id)
+        elif delta and delta["event"] == "player_left":
+            get_ai_service().position_changed(self.room_id)
 
         if getattr(self, "group_name", None):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
-        if should_broadcast:
-            await self._broadcast_room_state(reason="leave")
+        if delta:
+            await self._broadcast_delta(delta)
+
+    async def _keep_connection(self, store):
+        """Renew this connection's lease in the online counters until disconnect."""
+        while True:
+            await asyncio.sleep(store.heartbeat_interval)
+            try:
+                await store.touch_connection(self.channel_name)
+            except Exception as e:
+                logger.warning("Gomoku connection heartbeat failed for %s: %s", self.channel_name, e)
 
     async def receive(self, text_data=None, bytes_data=None):
         if not text_data:
@@ -164,6 +226,8 @@ class GomokuConsumer(AsyncWebsocketConsumer):
             await self._handle_chat(payload)
         elif msg_type == "hint":
             await self._handle_hint()
+        elif msg_type == "resync":
+            await self._send_room_state(reason="resync")
         elif msg_type == "ping":
             await self.send_json({"type": "pong"})
         else:
@@ -177,87 +241,112 @@ class GomokuConsumer(AsyncWebsocketConsumer):
             await self.send_json({"type": "error", "message": "坐标格式错误。"})
             return
 
-        error_message = None
-        reason = None
-        with self.rooms_lock:
-            room = self.rooms.get(self.room_id)
+        def apply_move(room):
+            """Return ``(error_message, next_position, delta)``."""
             if not room:
-                error_message = "房间不存在。"
-            elif self.role != "player":
-                error_message = "观战模式下不能落子。"
-            elif not self._is_current_player(room):
-                error_message = "你不是当前房间玩家。"
-            elif room["status"] != "playing":
-                error_message = "当前不是进行中的对局。"
-            elif room["turn"] != self.player_color:
-                error_message = "还没轮到你落子。"
-            elif not (0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE):
-                error_message = "坐标超出棋盘范围。"
-            elif room["board"][y][x] != 0:
-                error_message = "该位置已有棋子。"
+                return "房间不存在。", None, None
+            if self.role != "player":
+                return "观战模式下不能落子。", None, None
+            if not self._is_current_player(room):
+                return "你不是当前房间玩家。", None, None
+            if room["status"] != "playing":
+                return "当前不是进行中的对局。", None, None
+            if room["turn"] != self.player_color:
+                return "还没轮到你落子。", None, None
+            if not (0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE):
+                return "坐标超出棋盘范围。", None, None
+            if room["board"][y][x] != 0:
+                return "该位置已有棋子。", None, None
+
+            stone_value = 1 if self.player_color == "black" else 2
+            room["board"][y][x] = stone_value
+            room["move_count"] += 1
+            room["last_move"] = {"x": x, "y": y, "color": self.player_color}
+
+            if self._check_winner(room["board"], x, y, stone_value):
+                room["status"] = "finished"
+                room["winner"] = self.player_color
+            elif room["move_count"] >= BOARD_SIZE * BOARD_SIZE:
+                room["status"] = "finished"
+                room["winner"] = "draw"
             else:
-                stone_value = 1 if self.player_color == "black" else 2
-                room["board"][y][x] = stone_value
-                room["move_count"] += 1
-                room["last_move"] = {"x": x, "y": y, "color": self.player_color}
-
-                if self._check_winner(room["board"], x, y, stone_value):
-                    room["status"] = "finished"
-                    room["winner"] = self.player_color
-                elif room["move_count"] >= BOARD_SIZE * BOARD_SIZE:
-                    room["status"] = "finished"
-                    room["winner"] = "draw"
-                else:
-                    room["turn"] = "white" if self.player_color == "black" else "black"
-
-                reason = "move"
-
+                room["turn"] = "white" if self.player_color == "black" else "black"
+
+            room["version"] += 1
+            delta = self._next_delta(
+                room,
+                "move",
+                x=x,
+                y=y,
+                color=self.player_color,
+                status=room["status"],
+                turn=room["turn"],
+                winner=room["winner"],
+            )
+            if room["status"] == "playing":
+                return None, ([row[:] for row in room["board"]], room["turn"]), delta
+            return None, None, delta
+
+        error_message, next_position, delta = await get_room_store().update(self.room_id, apply_move)
         if error_message:
             await self.send_json({"type": "error", "message": error_message})
             return
 
-        if reason:
-            await self._broadcast_room_state(reason=reason)
+        # Cancels a running hint; rooms that use hints keep pondering.
+        board_copy, turn = next_position or (None, None)
+        get_ai_service().position_changed(self.room_id, board_copy, turn)
+
+        await self._broadcast_delta(delta)
 
     async def _handle_restart(self):
-        error_message = None
-        should_restart = False
-        with self.rooms_lock:
-            room = self.rooms.get(self.room_id)
+        def restart(room):
+            """Return ``(error_message, delta)``."""
             if not room:
-                error_message = "房间不存在。"
-            elif self.role != "player":
-                error_message = "仅玩家可重开对局。"
-            elif not self._is_current_player(room):
-                error_message = "仅玩家可重开对局。"
-            elif not self._both_players_ready(room):
-                error_message = "需要两位玩家都在房间中。"
-            else:
-                self._reset_board(room)
-                room["status"] = "playing"
-                should_restart = True
+                return "房间不存在。", None
+            if self.role != "player":
+                return "仅玩家可重开对局。", None
+            if not self._is_current_player(room):
+                return "仅玩家可重开对局。", None
+            if not self._both_players_ready(room):
+                return "需要两位玩家都在房间中。", None
+            self._reset_board(room)
+            room["status"] = "playing"
+            return None, self._next_delta(room, "restart", status=room["status"], turn=room["turn"])
 
+        error_message, delta = await get_room_store().update(self.room_id, restart)
         if error_message:
             await self.send_json({"type": "error", "message": error_message})
             return
 
-        if should_restart:
-            await self._broadcast_room_state(reason="restart")
+        get_ai_service().position_changed(self.room_id)
+        await self._broadcast_delta(delta)
 
     async def _handle_hint(self):
-        with self.rooms_lock:
-            room = self.rooms.get(self.room_id)
-            if not room:
-                await self.send_json({"type": "error", "message": "房间不存在。"})
-                return
-            if room["status"] != "playing":
-                await self.send_json({"type": "error", "message": "当前不是进行中的对局。"})
-                return
-            board_copy = [row[:] for row in room["board"]]
-            current_turn = room["turn"]
+        room = await get_room_store().get(self.room_id)
+        if not room:
+            await self.send_json({"type": "error", "message": "房间不存在。"})
+            return
+        if room["status"] != "playing":
+            await self.send_json({"type": "error", "message": "当前不是进行中的对局。"})
+            return
+        board_copy = room["board"]
+        current_turn = room["turn"]
+        version = room["version"]
 
         stone_color = current_turn
-        x, y = await asyncio.to_thread(find_best_move, board_copy, stone_color)
+        try:
+            x, y = await get_ai_service().best_move(self.room_id, board_copy, stone_color, version)
+        except HintCancelled:
+            await self.send_json({"type": "hint_cancelled"})
+            return
+        except HintUnavailable as exc:
+            await self.send_json({"type": "error", "message": exc.message})
+            return
+
+        room = await get_room_store().get(self.room_id)
+        if not room or room["version"] != version:
+            await self.send_json({"type": "hint_cancelled"})
+            return
         await self.send_json({"type": "hint_result", "x": x, "y": y})
 
     async def _handle_chat(self, payload):
@@ -292,48 +381,59 @@ class GomokuConsumer(AsyncWebsocketConsumer):
             }
         )
 
-    async def _broadcast_room_state(self, reason):
-        payload = self._build_room_payload(reason=reason)
-        if not payload:
-            return
+    async def _send_room_state(self, reason):
+        payload = await self._build_room_payload(reason=reason)
+        if payload:
+            await self.send_json(payload)
+
+    async def _broadcast_delta(self, delta):
+        """Send one ``room_delta``; presence deltas also get the global counters."""
+        if "online" in delta:
+            total_connections, active_rooms = await get_room_store().online_counts()
+            delta["online"]["global"] = {"totalConnections": total_connections, "rooms": active_rooms}
         await self.channel_layer.group_send(
             self.group_name,
             {
-                "type": "room_state_message",
-                "payload": payload,
+                "type": "room_delta_message",
+                "payload": delta,
             },
         )
 
-    async def room_state_message(self, event):
+    async def room_delta_message(self, event):
         await self.send_json(event["payload"])
 
-    def _build_room_payload(self, reason):
-        with self.rooms_lock:
-            room = self.rooms.get(self.room_id)
-            if not room:
-                return None
+    async def _build_room_payload(self, reason):
+        store = get_room_store()
+        room = await store.get(self.room_id)
+        if not room:
+            return None
+        total_connections, active_rooms = await store.online_counts()
 
-            spectators = [
-                {"nickname": spectator["nickname"]}
-                for spectator in room["spectators"].values()
-            ]
+        spectators = [
+            {"nickname": spectator["nickname"]}
+            for spectator in room["spectators"].values()
+        ]
 
-            return {
-                "type": "room_state",
-                "roomId": self.room_id,
-                "reason": reason,
-                "status": room["status"],
-                "turn": room["turn"],
-                "winner": room["winner"],
-                "board": [row[:] for row in room["board"]],
-                "lastMove": dict(room["last_move"]) if room["last_move"] else None,
-                "players": {
-                    "black": self._public_player(room["players"]["black"]),
-                    "white": self._public_player(room["players"]["white"]),
-                },
-                "spectators": spectators,
-                "online": self._build_online_summary_locked(room),
-            }
+        return {
+            "type": "room_state",
+            "roomId": self.room_id,
+            "reason": reason,
+            "seq": room["seq"],
+            "status": room["status"],
+            "turn": room["turn"],
+            "winner": room["winner"],
+            "board": room["board"],
+            "lastMove": room["last_move"],
+            "players": {
+                "black": self._public_player(room["players"]["black"]),
+                "white": self._public_player(room["players"]["white"]),
+            },
+            "spectators": spectators,
+            "online": {
+                "room": self._room_counts(room),
+                "global": {"totalConnections": total_connections, "rooms": active_rooms},
+            },
+        }
 
     @staticmethod
     def _public_player(player):
@@ -352,6 +452,10 @@ class GomokuConsumer(AsyncWebsocketConsumer):
             "winner": None,
             "move_count": 0,
             "last_move": None,
+            # Bumped on every board change; hints for older versions are stale.
+            "version": 0,
+            # Bumped on every broadcast change; orders room_delta messages.
+            "seq": 0,
         }
 
     @staticmethod
@@ -374,12 +478,13 @@ class GomokuConsumer(AsyncWebsocketConsumer):
 
     @staticmethod
     def _remove_player(room, channel_name):
-        removed = False
+        """Unseat *channel_name*; return the colour it played, or None."""
+        removed = None
         for color in ("black", "white"):
             player = room["players"][color]
             if player and player["channel_name"] == channel_name:
                 room["players"][color] = None
-                removed = True
+                removed = color
         return removed
 
     @staticmethod
@@ -400,29 +505,26 @@ class GomokuConsumer(AsyncWebsocketConsumer):
     def _count_players(room):
         return int(room["players"]["black"] is not None) + int(room["players"]["white"] is not None)
 
-    def _build_online_summary_locked(self, room):
-        room_players = self._count_players(room)
+    @staticmethod
+    def _room_counts(room):
+        room_players = GomokuConsumer._count_players(room)
         room_spectators = len(room["spectators"])
-        active_rooms = 0
-        for item in self.rooms.values():
-            if self._count_players(item) > 0 or len(item["spectators"]) > 0:
-                active_rooms += 1
-
         return {
-            "room": {
-                "players": room_players,
-                "spectators": room_spectators,
-                "total": room_players + room_spectators,
-            },
-            "global": {
-                "totalConnections": len(self.active_connections),
-                "rooms": active_rooms,
-            },
+            "players": room_players,
+            "spectators": room_spectators,
+            "total": room_players + room_spectators,
         }
 
+    @staticmethod
+    def _next_delta(room, event, **fields):
+        """Bump the room's ``seq`` and build the ``room_delta`` message for *event*."""
+        room["seq"] += 1
+        return {"type": "room_delta", "seq": room["seq"], "event": event, **fields}
+
     @staticmethod
     def _reset_board(room):
         room["board"] = _create_empty_board()
+        room["version"] += 1
         room["turn"] = "black"
         room["winner"] = None
         room["move_count"] = 0
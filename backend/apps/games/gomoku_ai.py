@@ -3,20 +3,38 @@ Gomoku AI engine with stronger tactical and search capability.
 
 Key upgrades over the previous version:
 1. Iterative-deepening alpha-beta search (soft time limit).
-2. Transposition table for deeper practical lookahead.
+2. Bounded two-tier transposition table for deeper practical lookahead,
+   reusable across searches.
 3. Tactical pre-checks: instant win/block + double-threat detection.
 4. Better position evaluation for open four / double-three pressure.
 5. Symmetry-aware opening book for early game.
-
-Pure functions, no shared mutable global state. Safe for ``asyncio.to_thread``.
+6. Compact flat board (``array('b')``) with per-line 2-bit codes, so a
+   make/unmake only re-scores the four lines through the changed cell.
+7. Startup-built threat table over encoded 9-cell windows, shared by move
+   ordering, leaf evaluation and fork detection (recognises split shapes).
+8. ``GomokuEngine``: per-room board + transposition table, optional pondering.
+9. Optional root-splitting parallel search over worker processes
+   (``workers=N``), with node counts reported in :class:`SearchResult`.
+10. Threat-space (VCF / VCT) solver over forcing moves only, run before
+    alpha-beta with its own small table and node budget.
+
+Module-level functions keep no shared mutable global state; long-lived state
+lives in ``GomokuEngine``, which serialises its own searches. Safe for
+``asyncio.to_thread``.
 """
 
 from __future__ import annotations
 
-import time
+import itertools
+import multiprocessing
 import random
+import threading
+import time
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Sequence, Tuple
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 BOARD_SIZE = 15
 WIN_LENGTH = 5
@@ -25,20 +43,29 @@ WIN_SCORE = 10_000_000
 NEG_INF = -10**18
 POS_INF = 10**18
 
-# (consecutive, open_ends) -> score
-_SCORE_TABLE = {
-    (5, 0): WIN_SCORE,
-    (5, 1): WIN_SCORE,
-    (5, 2): WIN_SCORE,
-    (4, 2): 450_000,   # open four
-    (4, 1): 45_000,    # closed four
-    (3, 2): 10_000,    # open three
-    (3, 1): 900,       # closed three
-    (2, 2): 160,       # open two
-    (2, 1): 20,        # closed two
-    (1, 2): 4,
-    (1, 1): 0,
-}
+# Threat classes of the shape through one stone (see ``_classify_window``).
+_T_NONE = 0
+_T_ONE = 1
+_T_CLOSED_TWO = 2
+_T_OPEN_TWO = 3
+_T_CLOSED_THREE = 4
+_T_OPEN_THREE = 5
+_T_FOUR = 6          # exactly one completion point, contiguous or split (XX_XX)
+_T_OPEN_FOUR = 7     # two or more completion points
+_T_FIVE = 8
+
+# threat class -> score
+_THREAT_SCORES = (
+    0,
+    4,
+    20,          # closed two
+    160,         # open two
+    900,         # closed three
+    10_000,      # open three (incl. split _XX_X_)
+    45_000,      # four
+    450_000,     # open four
+    WIN_SCORE,
+)
 
 _DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
 
@@ -65,24 +92,483 @@ _ZOBRIST = [
     [[_RNG.getrandbits(64) for _ in range(3)] for _x in range(BOARD_SIZE)]
     for _y in range(BOARD_SIZE)
 ]
+# Side-to-move keys, mixed into transposition-table keys.
+_SIDE_KEYS = (0, _RNG.getrandbits(64), _RNG.getrandbits(64))
+# Mixed into threat-solver keys: VCF (index 0) and VCT (index 1).
+_THREAT_KEYS = (_RNG.getrandbits(64), _RNG.getrandbits(64))
 
+_DEFAULT_TT_MB = 4
+_PONDER_MAX_DEPTH = 12
 
-@dataclass
-class _TTEntry:
-    depth: int
-    score: int
-    flag: int
-    move: Optional[Tuple[int, int]]
+# Threat-space solver limits; depths count attacking moves (plies / 2).
+_VCF_MAX_DEPTH = 10
+_VCT_MAX_DEPTH = 5
+_VCF_NODE_BUDGET = 1000
+_VCT_NODE_BUDGET = 300
+_THREAT_TT_MB = 0.25
 
+# ---------------------------------------------------------------------------
+# Flat board geometry (precomputed once at import)
+# ---------------------------------------------------------------------------
+
+_CELL_COUNT = BOARD_SIZE * BOARD_SIZE
+_CENTER_INDEX = (BOARD_SIZE // 2) * BOARD_SIZE + BOARD_SIZE // 2
+
+# Every line is padded with this many wall cells on both ends, so that a
+# 9-cell window centred on any real cell can be cut out with one shift+mask.
+_LINE_PAD = 4
+_WALL = 3
 
-class _SearchTimeout(Exception):
-    pass
+
+def _index(x: int, y: int) -> int:
+    return y * BOARD_SIZE + x
+
+
+def _xy(idx: int) -> Tuple[int, int]:
+    return idx % BOARD_SIZE, idx // BOARD_SIZE
 
 
 def _in_bounds(x: int, y: int) -> bool:
     return 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE
 
 
+def _build_lines():
+    """
+    Split the board into lines along the four directions.
+
+    Returns ``(lengths, empty_codes, cell_lines)`` where ``cell_lines[idx]``
+    holds ``(line_id, bit_shift)`` for the four lines through ``idx`` in
+    ``_DIRECTIONS`` order. A line code stores 2 bits per cell:
+    0 empty, 1 black, 2 white, 3 wall.
+    """
+    lengths: List[int] = []
+    empty_codes: List[int] = []
+    cell_lines: List[List[Tuple[int, int]]] = [[] for _ in range(_CELL_COUNT)]
+
+    for dx, dy in _DIRECTIONS:
+        for y in range(BOARD_SIZE):
+            for x in range(BOARD_SIZE):
+                if _in_bounds(x - dx, y - dy):
+                    continue  # not the start of a line
+                cells = []
+                cx, cy = x, y
+                while _in_bounds(cx, cy):
+                    cells.append(_index(cx, cy))
+                    cx += dx
+                    cy += dy
+
+                line_id = len(lengths)
+                length = len(cells)
+                code = 0
+                for k in range(_LINE_PAD):
+                    code |= _WALL << (2 * k)
+                    code |= _WALL << (2 * (length + _LINE_PAD + k))
+                lengths.append(length)
+                empty_codes.append(code)
+                for k, idx in enumerate(cells):
+                    cell_lines[idx].append((line_id, 2 * (k + _LINE_PAD)))
+
+    return (
+        tuple(lengths),
+        tuple(empty_codes),
+        tuple(tuple(entries) for entries in cell_lines),
+    )
+
+
+def _build_neighbourhood(distance: int = 2):
+    result = []
+    for idx in range(_CELL_COUNT):
+        x, y = _xy(idx)
+        result.append(
+            tuple(
+                _index(x + dx, y + dy)
+                for dy in range(-distance, distance + 1)
+                for dx in range(-distance, distance + 1)
+                if (dx or dy) and _in_bounds(x + dx, y + dy)
+            )
+        )
+    return tuple(result)
+
+
+_LINE_LENGTHS, _LINE_EMPTY_CODES, _CELL_LINES = _build_lines()
+_NEIGHBOURHOOD = _build_neighbourhood(distance=2)
+_ZOBRIST_FLAT = tuple(tuple(_ZOBRIST[y][x]) for y in range(BOARD_SIZE) for x in range(BOARD_SIZE))
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Threat pattern table (built once at import)
+# ---------------------------------------------------------------------------
+
+# A window is the 9 cells centred on one cell of a line, encoded 2 bits per
+# cell (cell k at bits 2k, the centre at bits 8-9), exactly as stored in the
+# padded line codes. ``_THREAT_TABLE[stone][window]`` is the threat class of
+# the shape through the centre when the centre holds *stone*.
+_WINDOW = 9
+_WINDOW_CENTER = _WINDOW // 2
+_WINDOW_MASK = (1 << (2 * _WINDOW)) - 1
+_WINDOW_SHIFT = 2 * _WINDOW_CENTER
+
+_EMPTY = 0
+_OWN = 1
+_BLOCKED = 2
+
+
+def _has_five_through_center(window: Tuple[int, ...]) -> bool:
+    count = 1
+    k = _WINDOW_CENTER + 1
+    while k < _WINDOW and window[k] == _OWN:
+        count += 1
+        k += 1
+    k = _WINDOW_CENTER - 1
+    while k >= 0 and window[k] == _OWN:
+        count += 1
+        k -= 1
+    return count >= WIN_LENGTH
+
+
+def _classify_window(window: Tuple[int, ...], memo: Dict[Tuple[int, ...], int]) -> int:
+    """
+    Classify the shape through the centre of a ternary window.
+
+    Defined recursively on "one more stone": a four has one completion point
+    to five, an open four two or more, an open three can become an open four,
+    and so on. Split shapes (``XX_X``, ``X_XXX``) fall out naturally.
+    """
+    cached = memo.get(window)
+    if cached is not None:
+        return cached
+
+    if _has_five_through_center(window):
+        memo[window] = _T_FIVE
+        return _T_FIVE
+
+    children = []
+    completions = 0
+    for k in range(_WINDOW):
+        if window[k] != _EMPTY:
+            continue
+        child = window[:k] + (_OWN,) + window[k + 1:]
+        if _has_five_through_center(child):
+            completions += 1
+        else:
+            children.append(child)
+
+    if completions >= 2:
+        result = _T_OPEN_FOUR
+    elif completions == 1:
+        result = _T_FOUR
+    else:
+        best = max((_classify_window(child, memo) for child in children), default=_T_NONE)
+        if best == _T_OPEN_FOUR:
+            result = _T_OPEN_THREE
+        elif best == _T_FOUR:
+            result = _T_CLOSED_THREE
+        elif best == _T_OPEN_THREE:
+            result = _T_OPEN_TWO
+        elif best == _T_CLOSED_THREE:
+            result = _T_CLOSED_TWO
+        elif best in (_T_OPEN_TWO, _T_CLOSED_TWO):
+            result = _T_ONE
+        else:
+            result = _T_NONE
+
+    memo[window] = result
+    return result
+
+
+def _build_threat_tables() -> Tuple[bytes, bytes, bytes]:
+    """Return per-stone tables indexed by window code (index 0 unused)."""
+    memo: Dict[Tuple[int, ...], int] = {}
+    neighbours = _WINDOW - 1
+    by_ternary = bytearray(3 ** neighbours)
+    for t in range(3 ** neighbours):
+        digits = []
+        rest = t
+        for _ in range(neighbours):
+            rest, digit = divmod(rest, 3)
+            digits.append(digit)
+        window = tuple(digits[:_WINDOW_CENTER]) + (_OWN,) + tuple(digits[_WINDOW_CENTER:])
+        by_ternary[t] = _classify_window(window, memo)
+
+    def expand(stone: int) -> bytes:
+        def ternary(cell: int) -> int:
+            if cell == 0:
+                return _EMPTY
+            return _OWN if cell == stone else _BLOCKED
+
+        half = _WINDOW_CENTER
+        low = [
+            sum(ternary((code >> (2 * k)) & 3) * 3 ** k for k in range(half))
+            for code in range(4 ** half)
+        ]
+        high = [
+            sum(ternary((code >> (2 * k)) & 3) * 3 ** (half + k) for k in range(half))
+            for code in range(4 ** half)
+        ]
+        return bytes(
+            by_ternary[lo + hi]
+            for hi in high
+            for _center in range(4)
+            for lo in low
+        )
+
+    return b"", expand(1), expand(2)
+
+
+_THREAT_TABLE = _build_threat_tables()
+
+
+# Per-direction threats packed into one int so the four directions of a move
+# can simply be summed: fives in bits 0-3, fours in bits 4-7 (an open four
+# counts twice), open threes in bits 8-11, shape score from bit 12 upwards.
+_PACK_FOUR_SHIFT = 4
+_PACK_THREE_SHIFT = 8
+_PACK_SCORE_SHIFT = 12
+_PACKED_THREATS = tuple(
+    (1 if threat == _T_FIVE else 0)
+    + ((2 if threat == _T_OPEN_FOUR else 1 if threat == _T_FOUR else 0) << _PACK_FOUR_SHIFT)
+    + ((1 if threat == _T_OPEN_THREE else 0) << _PACK_THREE_SHIFT)
+    + ((0 if threat == _T_FIVE else _THREAT_SCORES[threat]) << _PACK_SCORE_SHIFT)
+    for threat in range(len(_THREAT_SCORES))
+)
+
+
+def _threats_at(position: "GomokuBoard", idx: int, stone: int) -> int:
+    """Packed threats in all four directions if *stone* were placed at *idx*."""
+    table = _THREAT_TABLE[stone]
+    codes = position.line_codes
+    packed = 0
+    for line_id, shift in _CELL_LINES[idx]:
+        packed += _PACKED_THREATS[table[(codes[line_id] >> (shift - _WINDOW_SHIFT)) & _WINDOW_MASK]]
+    return packed
+
+
+def _packed_fives(packed: int) -> int:
+    return packed & 0xF
+
+
+def _packed_fours(packed: int) -> int:
+    return (packed >> _PACK_FOUR_SHIFT) & 0xF
+
+
+def _packed_value(packed: int) -> int:
+    """Shape score plus a bonus for four-four, four-three and double three."""
+    fours = (packed >> _PACK_FOUR_SHIFT) & 0xF
+    open_threes = (packed >> _PACK_THREE_SHIFT) & 0xF
+    value = packed >> _PACK_SCORE_SHIFT
+    if fours >= 2 or (fours and open_threes):
+        value += 200_000   # wins next turn or the one after
+    elif open_threes >= 2:
+        value += 40_000
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Line evaluation
+# ---------------------------------------------------------------------------
+
+# Per-line value layout: (score, open_fours, open_threes, fives) for black,
+# followed by the same four fields for white.
+_LINE_VALUE_FIELDS = 8
+_ZERO_LINE_VALUE = (0,) * _LINE_VALUE_FIELDS
+
+
+@lru_cache(maxsize=1 << 16)
+def _line_value(code: int, length: int) -> Tuple[int, ...]:
+    """
+    Score every shape in one encoded line, for both sides.
+
+    Stones of one colour separated by at most one empty cell form a group;
+    each group is scored once, by the strongest threat class any of its
+    stones sees in the pattern table.
+    """
+    cells = [(code >> (2 * (k + _LINE_PAD))) & 3 for k in range(length)]
+    value = [0] * _LINE_VALUE_FIELDS
+
+    k = 0
+    while k < length:
+        stone = cells[k]
+        if stone == 0:
+            k += 1
+            continue
+
+        table = _THREAT_TABLE[stone]
+        best = _T_NONE
+        end = k
+        while end < length:
+            if cells[end] == stone:
+                best = max(best, table[(code >> (2 * end)) & _WINDOW_MASK])
+                end += 1
+            elif cells[end] == 0 and end + 1 < length and cells[end + 1] == stone:
+                end += 1
+            else:
+                break
+        k = end
+
+        base = 0 if stone == 1 else 4
+        if best == _T_FIVE:
+            value[base + 3] += 1
+            continue
+        value[base] += _THREAT_SCORES[best]
+        if best == _T_OPEN_FOUR:
+            value[base + 1] += 1
+        elif best == _T_OPEN_THREE:
+            value[base + 2] += 1
+
+    return tuple(value)
+
+
+def _side_score(score: int, open_fours: int, open_threes: int, fives: int) -> int:
+    if fives:
+        return WIN_SCORE
+    score += open_fours * 130_000
+    if open_threes >= 2:
+        score += 60_000 + (open_threes - 2) * 18_000
+    elif open_threes == 1:
+        score += 8_000
+    return score
+
+
+class GomokuBoard:
+    """
+    Flat 15x15 board with incremental evaluation and move generation.
+
+    ``cells`` is an ``array('b')`` indexed by ``y * BOARD_SIZE + x``. Each of
+    the 88 lines (rows, columns, both diagonals) keeps a 2-bit-per-cell code
+    and its cached value, so :meth:`place` / :meth:`remove` only re-score the
+    four lines through the touched cell and adjust the running totals.
+
+    ``near[idx]`` counts the stones within Chebyshev distance 2 of ``idx``;
+    ``candidates`` is the set of empty cells with a non-zero count, kept up
+    to date on every make/unmake instead of being rebuilt per node.
+
+    A board may be kept alive between searches and brought up to date with
+    :meth:`sync`. It is not thread-safe: callers serialise searches on it.
+    """
+
+    __slots__ = (
+        "cells",
+        "line_codes",
+        "line_values",
+        "totals",
+        "zobrist",
+        "stone_count",
+        "near",
+        "candidates",
+    )
+
+    def __init__(self, rows: Optional[Sequence[Sequence[int]]] = None):
+        self.cells = array("b", bytes(_CELL_COUNT))
+        self.line_codes = list(_LINE_EMPTY_CODES)
+        self.line_values = [_ZERO_LINE_VALUE] * len(_LINE_EMPTY_CODES)
+        self.totals = [0] * _LINE_VALUE_FIELDS
+        self.zobrist = 0
+        self.stone_count = 0
+        self.near = array("B", bytes(_CELL_COUNT))
+        self.candidates = set()
+        if rows is not None:
+            self.sync(rows)
+
+    def sync(self, rows: Sequence[Sequence[int]]) -> None:
+        """Bring the board in line with *rows*, touching only changed cells."""
+        cells = self.cells
+        for y in range(BOARD_SIZE):
+            row = rows[y]
+            for x in range(BOARD_SIZE):
+                idx = y * BOARD_SIZE + x
+                value = row[x]
+                if cells[idx] != value:
+                    if cells[idx]:
+                        self.remove(idx)
+                    if value:
+                        self.place(idx, value)
+
+    def place(self, idx: int, stone: int) -> None:
+        cells = self.cells
+        cells[idx] = stone
+        self.zobrist ^= _ZOBRIST_FLAT[idx][stone]
+        self.stone_count += 1
+        self._toggle_lines(idx, stone)
+
+        near = self.near
+        candidates = self.candidates
+        candidates.discard(idx)
+        for n in _NEIGHBOURHOOD[idx]:
+            near[n] += 1
+            if not cells[n]:
+                candidates.add(n)
+
+    def remove(self, idx: int) -> None:
+        cells = self.cells
+        stone = cells[idx]
+        cells[idx] = 0
+        self.zobrist ^= _ZOBRIST_FLAT[idx][stone]
+        self.stone_count -= 1
+        self._toggle_lines(idx, stone)
+
+        near = self.near
+        candidates = self.candidates
+        for n in _NEIGHBOURHOOD[idx]:
+            near[n] -= 1
+            if not near[n]:
+                candidates.discard(n)
+        if near[idx]:
+            candidates.add(idx)
+
+    def _toggle_lines(self, idx: int, stone: int) -> None:
+        codes = self.line_codes
+        values = self.line_values
+        totals = self.totals
+        for line_id, shift in _CELL_LINES[idx]:
+            code = codes[line_id] ^ (stone << shift)
+            codes[line_id] = code
+            new_value = _line_value(code, _LINE_LENGTHS[line_id])
+            old_value = values[line_id]
+            values[line_id] = new_value
+            for k in range(_LINE_VALUE_FIELDS):
+                totals[k] += new_value[k] - old_value[k]
+
+    def evaluate(self, perspective_stone: int) -> int:
+        """Heuristic evaluation from *perspective_stone*'s perspective."""
+        t = self.totals
+        if perspective_stone == 1:
+            own, opp = t[0:4], t[4:8]
+        else:
+            own, opp = t[4:8], t[0:4]
+
+        own_score = _side_score(*own)
+        opp_score = _side_score(*opp)
+        if own_score >= WIN_SCORE:
+            return WIN_SCORE
+        if opp_score >= WIN_SCORE:
+            return -WIN_SCORE
+
+        score = own_score - int(opp_score * 1.08)
+
+        if own[1] and own[2]:
+            score += 120_000
+        if opp[1] and opp[2]:
+            score -= 140_000
+
+        return int(score)
+
+    def to_rows(self) -> List[List[int]]:
+        cells = self.cells
+        return [
+            [cells[y * BOARD_SIZE + x] for x in range(BOARD_SIZE)]
+            for y in range(BOARD_SIZE)
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Opening book
+# ---------------------------------------------------------------------------
+
+
 def _transform_xy(x: int, y: int, transform_id: int) -> Tuple[int, int]:
     n = BOARD_SIZE - 1
     if transform_id == 0:   # identity
@@ -169,6 +655,9 @@ def _center_bias(x: int, y: int) -> int:
     return BOARD_SIZE - (abs(x - c) + abs(y - c))
 
 
+_CENTER_BIAS_FLAT = tuple(_center_bias(*_xy(idx)) for idx in range(_CELL_COUNT))
+
+
 def _opening_book_move(board: List[List[int]], side_to_move: int) -> Optional[Tuple[int, int]]:
     stones = [
         (x, y, board[y][x])
@@ -192,330 +681,297 @@ def _opening_book_move(board: List[List[int]], side_to_move: int) -> Optional[Tu
     return None
 
 
-def _board_hash(board: Sequence[Sequence[int]]) -> int:
-    h = 0
-    for y in range(BOARD_SIZE):
-        for x in range(BOARD_SIZE):
-            stone = board[y][x]
-            if stone:
-                h ^= _ZOBRIST[y][x][stone]
-    return h
+# ---------------------------------------------------------------------------
+# Move generation and tactics (flat indices)
+# ---------------------------------------------------------------------------
 
 
-def _get_candidates(board: Sequence[Sequence[int]], distance: int = 2) -> List[Tuple[int, int]]:
-    """Return empty positions within Chebyshev *distance* of existing stones."""
-    occupied = []
-    for y in range(BOARD_SIZE):
-        for x in range(BOARD_SIZE):
-            if board[y][x] != 0:
-                occupied.append((x, y))
+def _get_candidates(position: GomokuBoard) -> List[int]:
+    """Return empty cells within Chebyshev distance 2 of existing stones."""
+    if position.stone_count == 0:
+        return [_CENTER_INDEX]
+    return list(position.candidates)
 
-    if not occupied:
-        c = BOARD_SIZE // 2
-        return [(c, c)]
 
-    candidates = set()
-    for ox, oy in occupied:
-        for dy in range(-distance, distance + 1):
-            for dx in range(-distance, distance + 1):
-                nx, ny = ox + dx, oy + dy
-                if _in_bounds(nx, ny) and board[ny][nx] == 0:
-                    candidates.add((nx, ny))
-
-    return list(candidates)
-
-
-def _evaluate_line(
-    board: Sequence[Sequence[int]], x: int, y: int, dx: int, dy: int, stone: int
-) -> Tuple[int, int]:
-    """Count consecutive stones from (x,y) and number of open ends."""
-    count = 0
-    cx, cy = x, y
-    while _in_bounds(cx, cy) and board[cy][cx] == stone:
-        count += 1
-        cx += dx
-        cy += dy
-
-    open_ends = 0
-    if _in_bounds(cx, cy) and board[cy][cx] == 0:
-        open_ends += 1
-    bx, by = x - dx, y - dy
-    if _in_bounds(bx, by) and board[by][bx] == 0:
-        open_ends += 1
-    return count, open_ends
-
-
-def _evaluate_for_stone(board: Sequence[Sequence[int]], stone: int) -> Tuple[int, int, int]:
-    """Return (score, open_fours, open_threes) for one side."""
-    score = 0
-    open_fours = 0
-    open_threes = 0
-
-    for y in range(BOARD_SIZE):
-        for x in range(BOARD_SIZE):
-            if board[y][x] != stone:
-                continue
-            for dx, dy in _DIRECTIONS:
-                px, py = x - dx, y - dy
-                # only evaluate line starts to avoid duplicate counting
-                if _in_bounds(px, py) and board[py][px] == stone:
-                    continue
-
-                count, open_ends = _evaluate_line(board, x, y, dx, dy, stone)
-                if count >= WIN_LENGTH:
-                    return WIN_SCORE, open_fours, open_threes
-
-                score += _SCORE_TABLE.get((count, open_ends), 0)
-                if count == 4 and open_ends == 2:
-                    open_fours += 1
-                elif count == 3 and open_ends == 2:
-                    open_threes += 1
-
-    score += open_fours * 130_000
-    if open_threes >= 2:
-        score += 60_000 + (open_threes - 2) * 18_000
-    elif open_threes == 1:
-        score += 8_000
-
-    return score, open_fours, open_threes
-
-
-def _evaluate_board(board: List[List[int]], perspective_stone: int) -> int:
-    """Heuristic board evaluation from *perspective_stone*'s perspective."""
-    opp = 3 - perspective_stone
-    own_score, own_open_four, own_open_three = _evaluate_for_stone(board, perspective_stone)
-    opp_score, opp_open_four, opp_open_three = _evaluate_for_stone(board, opp)
-
-    if own_score >= WIN_SCORE:
-        return WIN_SCORE
-    if opp_score >= WIN_SCORE:
-        return -WIN_SCORE
-
-    score = own_score - int(opp_score * 1.08)
-
-    if own_open_four and own_open_three:
-        score += 120_000
-    if opp_open_four and opp_open_three:
-        score -= 140_000
-
-    return int(score)
+def _check_five(position: GomokuBoard, idx: int, stone: int) -> bool:
+    """Return True if placing *stone* at *idx* creates five-in-a-row."""
+    if position.cells[idx] != 0:
+        return False
+    return _packed_fives(_threats_at(position, idx, stone)) > 0
 
 
-def _quick_score(board: List[List[int]], x: int, y: int, stone: int) -> int:
-    """Fast local heuristic for move ordering."""
-    if board[y][x] != 0:
+def _quick_score(position: GomokuBoard, idx: int, stone: int) -> int:
+    """Fast local heuristic for move ordering (attack plus half the defence)."""
+    if position.cells[idx] != 0:
         return NEG_INF
 
-    opp = 3 - stone
-    score = _center_bias(x, y) * 12
-
-    # Instant tactical priorities
-    if _check_five(board, x, y, stone):
+    score = _CENTER_BIAS_FLAT[idx] * 12
+    own = _threats_at(position, idx, stone)
+    if _packed_fives(own):
         return WIN_SCORE // 2 + score
-    if _check_five(board, x, y, opp):
-        score += WIN_SCORE // 3
-
-    board[y][x] = stone
-    for dx, dy in _DIRECTIONS:
-        sx, sy = x, y
-        while _in_bounds(sx - dx, sy - dy) and board[sy - dy][sx - dx] == stone:
-            sx -= dx
-            sy -= dy
-        count, open_ends = _evaluate_line(board, sx, sy, dx, dy, stone)
-        score += _SCORE_TABLE.get((count, open_ends), 0)
-    board[y][x] = 0
-
-    return int(score)
 
+    opp = _threats_at(position, idx, 3 - stone)
+    if _packed_fives(opp):
+        score += WIN_SCORE // 3
 
-def _check_five(board: List[List[int]], x: int, y: int, stone: int) -> bool:
-    """Return True if placing *stone* at (x,y) creates five-in-a-row."""
-    if board[y][x] != 0:
-        return False
-
-    board[y][x] = stone
-    won = False
-    for dx, dy in _DIRECTIONS:
-        count = 1
-        for sign in (1, -1):
-            cx, cy = x + dx * sign, y + dy * sign
-            while _in_bounds(cx, cy) and board[cy][cx] == stone:
-                count += 1
-                cx += dx * sign
-                cy += dy * sign
-        if count >= WIN_LENGTH:
-            won = True
-            break
-    board[y][x] = 0
-    return won
+    return score + _packed_value(own) + _packed_value(opp) // 2
 
 
 def _pick_best_by_quick(
-    board: List[List[int]], candidates: Sequence[Tuple[int, int]], stone: int
-) -> Tuple[int, int]:
+    position: GomokuBoard, candidates: Sequence[int], stone: int
+) -> int:
     best = candidates[0]
     best_score = NEG_INF
-    for x, y in candidates:
-        s = _quick_score(board, x, y, stone)
+    for idx in candidates:
+        s = _quick_score(position, idx, stone)
         if s > best_score:
             best_score = s
-            best = (x, y)
+            best = idx
     return best
 
 
 def _ordered_candidates(
-    board: List[List[int]],
+    position: GomokuBoard,
     stone: int,
-    limit: int,
-    preferred: Optional[Tuple[int, int]] = None,
+    candidates: Sequence[int],
 ) -> List[Tuple[int, int]]:
-    candidates = _get_candidates(board, distance=2)
-    if not candidates:
-        return []
-
-    scored = [((x, y), _quick_score(board, x, y, stone)) for x, y in candidates]
-    scored.sort(key=lambda item: item[1], reverse=True)
-    ordered = [move for move, _ in scored]
-
-    if preferred and preferred in ordered:
-        ordered.remove(preferred)
-        ordered.insert(0, preferred)
-
-    return ordered[: max(1, min(limit, len(ordered)))]
+    """Return ``(quick_score, idx)`` pairs, best first."""
+    scored = [(_quick_score(position, idx, stone), idx) for idx in candidates]
+    scored.sort(reverse=True)
+    return scored
 
 
 def _find_immediate_wins(
-    board: List[List[int]], stone: int, candidates: Sequence[Tuple[int, int]]
-) -> List[Tuple[int, int]]:
-    return [(x, y) for x, y in candidates if _check_five(board, x, y, stone)]
+    position: GomokuBoard, stone: int, candidates: Sequence[int]
+) -> List[int]:
+    return [idx for idx in candidates if _check_five(position, idx, stone)]
 
 
 def _find_double_win_moves(
-    board: List[List[int]],
+    position: GomokuBoard,
     stone: int,
-    candidates: Sequence[Tuple[int, int]],
-    probe_limit: int = 12,
-) -> List[Tuple[int, int]]:
+    candidates: Sequence[int],
+) -> List[int]:
     """
     Find moves that create >=2 immediate winning continuations next turn.
-    This catches many practical "double threat" (fork) patterns.
+    This catches many practical "double threat" (fork) patterns: an open
+    four, or two fours (contiguous or split) in different directions.
     """
-    if not candidates:
-        return []
+    return [
+        idx
+        for idx in candidates
+        if position.cells[idx] == 0 and _packed_fours(_threats_at(position, idx, stone)) >= 2
+    ]
 
-    scored = [((x, y), _quick_score(board, x, y, stone)) for x, y in candidates]
-    scored.sort(key=lambda item: item[1], reverse=True)
-    probe_moves = [move for move, _ in scored[: min(probe_limit, len(scored))]]
 
-    forks = []
-    for x, y in probe_moves:
-        if board[y][x] != 0:
-            continue
-        board[y][x] = stone
-        next_candidates = _get_candidates(board, distance=2)
-        wins = 0
-        for nx, ny in next_candidates:
-            if _check_five(board, nx, ny, stone):
-                wins += 1
-                if wins >= 2:
-                    forks.append((x, y))
-                    break
-        board[y][x] = 0
-    return forks
-
-
-def _check_timeout(start_time: float, time_limit: Optional[float]) -> None:
-    if time_limit is None or time_limit <= 0:
+# ---------------------------------------------------------------------------
+# Transposition table
+# ---------------------------------------------------------------------------
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table with two-tier buckets.
+
+    Storage is a handful of flat typed arrays sized from ``size_mb`` (rounded
+    down to a power-of-two bucket count), so memory stays bounded however
+    long the table lives. Each bucket has a depth-preferred slot and an
+    always-replace slot; entries left over from earlier searches (older
+    :attr:`generation`) lose their depth priority, which lets one table be
+    kept per room and carried from hint to hint.
+    """
+
+    # key(8) + score(8) + move(2) + depth(1) + flag(1) + generation(1)
+    ENTRY_BYTES = 21
+
+    def __init__(self, size_mb: float = 8):
+        buckets = max(1, int(size_mb * 1024 * 1024) // (2 * self.ENTRY_BYTES))
+        buckets = 1 << (buckets.bit_length() - 1)
+        slots = 2 * buckets
+        self._mask = buckets - 1
+        self._keys = array("Q", bytes(8 * slots))
+        self._scores = array("q", bytes(8 * slots))
+        self._moves = array("h", [-1]) * slots
+        self._depths = array("b", bytes(slots))
+        self._flags = array("b", bytes(slots))
+        self._generations = array("B", bytes(slots))
+        self.generation = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._keys)
+
+    @property
+    def size_bytes(self) -> int:
+        return self.capacity * self.ENTRY_BYTES
+
+    def new_search(self) -> None:
+        """Age existing entries so a new root search may overwrite them."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self) -> None:
+        slots = self.capacity
+        self._keys = array("Q", bytes(8 * slots))
+        self._moves = array("h", [-1]) * slots
+        self._depths = array("b", bytes(slots))
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, Optional[int]]]:
+        """Return ``(depth, score, flag, move)`` for *key*, or ``None``."""
+        slot = (key & self._mask) << 1
+        keys = self._keys
+        if keys[slot] != key:
+            slot += 1
+            if keys[slot] != key:
+                return None
+        move = self._moves[slot]
+        return (
+            self._depths[slot],
+            self._scores[slot],
+            self._flags[slot],
+            None if move < 0 else move,
+        )
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: Optional[int]) -> None:
+        slot = (key & self._mask) << 1
+        keys = self._keys
+        depths = self._depths
+        generations = self._generations
+        if keys[slot] == key or depth >= depths[slot] or generations[slot] != self.generation:
+            if keys[slot] != key and keys[slot]:
+                # Demote the displaced depth-preferred entry to the second tier.
+                self._write(slot + 1, keys[slot], depths[slot], self._scores[slot],
+                            self._flags[slot], self._moves[slot], generations[slot])
+        else:
+            slot += 1
+        self._write(slot, key, depth, score, flag, -1 if move is None else move, self.generation)
+
+    def _write(self, slot, key, depth, score, flag, move, generation) -> None:
+        self._keys[slot] = key
+        self._depths[slot] = depth
+        self._scores[slot] = score
+        self._flags[slot] = flag
+        self._moves[slot] = move
+        self._generations[slot] = generation
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+
+class _SearchContext:
+    """Per-search constants threaded through :func:`_negamax`."""
+
+    __slots__ = (
+        "position",
+        "max_candidates",
+        "start_time",
+        "time_limit",
+        "transposition",
+        "stop_event",
+        "nodes",
+    )
+
+    def __init__(self, position, max_candidates, time_limit, transposition, stop_event=None):
+        self.position = position
+        self.max_candidates = max_candidates
+        self.start_time = time.perf_counter()
+        self.time_limit = time_limit
+        self.transposition = transposition
+        self.stop_event = stop_event
+        self.nodes = 0
+
+
+def _check_timeout(ctx: _SearchContext) -> None:
+    if ctx.stop_event is not None and ctx.stop_event.is_set():
+        raise _SearchTimeout
+    if ctx.time_limit is None or ctx.time_limit <= 0:
         return
-    if (time.perf_counter() - start_time) >= time_limit:
+    if (time.perf_counter() - ctx.start_time) >= ctx.time_limit:
         raise _SearchTimeout
 
 
 def _negamax(
-    board: List[List[int]],
+    ctx: _SearchContext,
     depth: int,
     alpha: int,
     beta: int,
     stone: int,
-    zobrist_key: int,
-    max_candidates: int,
     root_depth: int,
-    start_time: float,
-    time_limit: Optional[float],
-    transposition: Dict[Tuple[int, int], _TTEntry],
-) -> Tuple[int, Optional[Tuple[int, int]]]:
-    _check_timeout(start_time, time_limit)
+) -> Tuple[int, Optional[int]]:
+    _check_timeout(ctx)
+    ctx.nodes += 1
+    position = ctx.position
 
     if depth == 0:
-        return _evaluate_board(board, stone), None
+        return position.evaluate(stone), None
 
-    all_candidates = _get_candidates(board, distance=2)
+    all_candidates = _get_candidates(position)
     if not all_candidates:
         return 0, None
 
-    # Tactical shortcut: if current side can win now, no need to search deeper.
-    for x, y in all_candidates:
-        if _check_five(board, x, y, stone):
-            return WIN_SCORE - (root_depth - depth), (x, y)
+    # One pattern-table pass both orders the moves and finds an immediate five.
+    scored = _ordered_candidates(position, stone, all_candidates)
+    if scored[0][0] >= WIN_SCORE // 2:
+        # Tactical shortcut: if current side can win now, no need to search deeper.
+        return WIN_SCORE - (root_depth - depth), scored[0][1]
 
     original_alpha = alpha
     original_beta = beta
-    tt_key = (stone, zobrist_key)
-    entry = transposition.get(tt_key)
+    tt_key = position.zobrist ^ _SIDE_KEYS[stone]
+    entry = ctx.transposition.probe(tt_key)
     preferred_move = None
 
-    if entry and entry.depth >= depth:
-        preferred_move = entry.move
-        if entry.flag == _TT_EXACT:
-            return entry.score, entry.move
-        if entry.flag == _TT_LOWER:
-            alpha = max(alpha, entry.score)
-        elif entry.flag == _TT_UPPER:
-            beta = min(beta, entry.score)
-        if alpha >= beta:
-            return entry.score, entry.move
-    elif entry:
-        preferred_move = entry.move
+    if entry is not None:
+        entry_depth, entry_score, entry_flag, preferred_move = entry
+        if entry_depth >= depth:
+            if entry_flag == _TT_EXACT:
+                return entry_score, preferred_move
+            if entry_flag == _TT_LOWER:
+                alpha = max(alpha, entry_score)
+            elif entry_flag == _TT_UPPER:
+                beta = min(beta, entry_score)
+            if alpha >= beta:
+                return entry_score, preferred_move
 
     ply = root_depth - depth
-    candidate_limit = max(6, max_candidates - ply * 2)
-    moves = _ordered_candidates(board, stone, candidate_limit, preferred=preferred_move)
-    if not moves:
-        return _evaluate_board(board, stone), None
+    candidate_limit = max(6, ctx.max_candidates - ply * 2)
+    moves = [idx for _, idx in scored[:candidate_limit]]
+    if preferred_move is not None and preferred_move in all_candidates:
+        if preferred_move in moves:
+            moves.remove(preferred_move)
+        else:
+            moves.pop()
+        moves.insert(0, preferred_move)
 
     best_score = NEG_INF
     best_move = moves[0]
     opp = 3 - stone
+    cells = position.cells
 
-    for x, y in moves:
-        _check_timeout(start_time, time_limit)
-        if board[y][x] != 0:
+    for idx in moves:
+        _check_timeout(ctx)
+        if cells[idx] != 0:
             continue
 
-        board[y][x] = stone
+        position.place(idx, stone)
         try:
-            child_hash = zobrist_key ^ _ZOBRIST[y][x][stone]
             child_score, _ = _negamax(
-                board,
+                ctx,
                 depth=depth - 1,
                 alpha=-beta,
                 beta=-alpha,
                 stone=opp,
-                zobrist_key=child_hash,
-                max_candidates=max_candidates,
                 root_depth=root_depth,
-                start_time=start_time,
-                time_limit=time_limit,
-                transposition=transposition,
             )
         finally:
             # Timeout or recursion errors must not leave residual stones on board.
-            board[y][x] = 0
+            position.remove(idx)
 
         score = -child_score
         if score > best_score:
             best_score = score
-            best_move = (x, y)
+            best_move = idx
         if score > alpha:
             alpha = score
         if alpha >= beta:
@@ -528,85 +984,747 @@ def _negamax(
     else:
         flag = _TT_EXACT
 
-    transposition[tt_key] = _TTEntry(depth=depth, score=best_score, flag=flag, move=best_move)
+    ctx.transposition.store(tt_key, depth, best_score, flag, best_move)
     return best_score, best_move
 
 
-def find_best_move(
-    board: List[List[int]],
-    color: str,
-    max_depth: int = 7,
-    max_candidates: int = 16,
-    time_limit: Optional[float] = 2.4,
-) -> Tuple[int, int]:
-    """
-    Find best move for ``color`` (``"black"`` or ``"white"``).
+# ---------------------------------------------------------------------------
+# Threat-space search (VCF / VCT)
+# ---------------------------------------------------------------------------
+#
+# Only forcing moves are searched, so the branching factor stays tiny and
+# forced wins far beyond the alpha-beta horizon are found quickly:
+#
+# - VCF: every attacking move makes a four; the defender's only reply is the
+#   five point.
+# - VCT: attacking moves may also make an open three; the defender may then
+#   take any point on the three's lines where the attacker would make a
+#   four, or counter with a four of its own.
+#
+# Whenever the defender holds a five point the attacker must take it, and
+# only does so if that move is itself a threat. Results are cached in a
+# small private transposition table (score 1 = win, 0 = no win within the
+# stored depth); exceeding the node budget abandons the whole solve.
+
+
+def _build_rays(reach: int = WIN_LENGTH - 1):
+    """Cells within *reach* of each cell along the four line directions."""
+    rays = []
+    for idx in range(_CELL_COUNT):
+        x, y = _xy(idx)
+        cells = []
+        for dx, dy in _DIRECTIONS:
+            for step in range(-reach, reach + 1):
+                nx, ny = x + dx * step, y + dy * step
+                if step and _in_bounds(nx, ny):
+                    cells.append(_index(nx, ny))
+        rays.append(tuple(cells))
+    return tuple(rays)
+
+
+_RAYS = _build_rays()
+
+
+class _ThreatSolver:
+    __slots__ = ("position", "table", "nodes", "node_budget")
+
+    def __init__(self, position: GomokuBoard, table: Optional[TranspositionTable] = None):
+        self.position = position
+        self.table = table if table is not None else TranspositionTable(_THREAT_TT_MB)
+        self.nodes = 0
+        self.node_budget = 0
+
+    def solve(
+        self, stone: int, threes: bool, max_depth: int, node_budget: int
+    ) -> Optional[int]:
+        """First move of a forced win for *stone* (``threes``: VCT), or ``None``."""
+        position = self.position
+        opp_fives = [
+            idx
+            for idx in position.candidates
+            if _packed_fives(_threats_at(position, idx, 3 - stone))
+        ]
+        self.nodes = 0
+        self.node_budget = node_budget
+        try:
+            return self._attack(stone, threes, max_depth, opp_fives)
+        except _SearchTimeout:
+            return None
+
+    def _five_points_through(self, idx: int, stone: int) -> List[int]:
+        position = self.position
+        cells = position.cells
+        return [
+            n
+            for n in _RAYS[idx]
+            if not cells[n] and _packed_fives(_threats_at(position, n, stone))
+        ]
+
+    def _attack(
+        self, stone: int, threes: bool, depth: int, opp_fives: List[int]
+    ) -> Optional[int]:
+        self.nodes += 1
+        if self.nodes > self.node_budget:
+            raise _SearchTimeout
+
+        position = self.position
+        threats = []
+        for idx in position.candidates:
+            packed = _threats_at(position, idx, stone)
+            if _packed_fives(packed):
+                return idx
+            if _packed_fours(packed) or (threes and packed >> _PACK_THREE_SHIFT & 0xF):
+                threats.append((_packed_value(packed), idx))
+        if depth <= 0 or not threats or len(opp_fives) > 1:
+            return None
+        if opp_fives:
+            threats = [item for item in threats if item[1] == opp_fives[0]]
+
+        key = position.zobrist ^ _SIDE_KEYS[stone] ^ _THREAT_KEYS[threes]
+        entry = self.table.probe(key)
+        if entry is not None:
+            entry_depth, won, _, move = entry
+            if won:
+                return move
+            if entry_depth >= depth:
+                return None
+
+        threats.sort(reverse=True)
+        for _, idx in threats:
+            position.place(idx, stone)
+            try:
+                won = self._defend(stone, threes, depth, idx)
+            finally:
+                position.remove(idx)
+            if won:
+                self.table.store(key, depth, 1, _TT_EXACT, idx)
+                return idx
+
+        self.table.store(key, depth, 0, _TT_EXACT, None)
+        return None
 
-    Defaults are tuned for stronger practical play while keeping hint response
-    reasonably fast in online matches.
-    """
-    ai_stone = 1 if color == "black" else 2
+    def _defend(self, stone: int, threes: bool, depth: int, move: int) -> bool:
+        """True if every reply to the threat *stone* made at *move* still loses."""
+        position = self.position
+        cells = position.cells
+        opp = 3 - stone
+        # The attacker had no five point before *move*, so any now lie on its lines.
+        five_points = self._five_points_through(move, stone)
+        if len(five_points) >= 2:
+            return True
+        if five_points:
+            replies = five_points
+        elif threes:
+            replies = [
+                n
+                for n in _RAYS[move]
+                if not cells[n] and _packed_fours(_threats_at(position, n, stone))
+            ]
+            replies.extend(
+                n
+                for n in position.candidates
+                if n not in replies and _packed_fours(_threats_at(position, n, opp))
+            )
+        else:
+            return False
+        if not replies:
+            return False
+
+        for reply in replies:
+            counters_four = _packed_fours(_threats_at(position, reply, opp))
+            position.place(reply, opp)
+            try:
+                opp_fives = self._five_points_through(reply, opp) if counters_four else []
+                won = self._attack(stone, threes, depth - 1, opp_fives) is not None
+            finally:
+                position.remove(reply)
+            if not won:
+                return False
+        return True
+
+
+def _tactical_move(
+    position: GomokuBoard,
+    board: List[List[int]],
+    ai_stone: int,
+    candidates: Sequence[int],
+) -> Optional[int]:
+    """Steps before alpha-beta: win, block, book, forks, threat-space search."""
     opp_stone = 3 - ai_stone
 
-    candidates = _get_candidates(board, distance=2)
-    if not candidates:
-        c = BOARD_SIZE // 2
-        return (c, c)
-
     # 1) Instant win
-    winning_moves = _find_immediate_wins(board, ai_stone, candidates)
+    winning_moves = _find_immediate_wins(position, ai_stone, candidates)
     if winning_moves:
-        return _pick_best_by_quick(board, winning_moves, ai_stone)
+        return _pick_best_by_quick(position, winning_moves, ai_stone)
 
     # 2) Instant block
-    block_moves = _find_immediate_wins(board, opp_stone, candidates)
+    block_moves = _find_immediate_wins(position, opp_stone, candidates)
     if block_moves:
-        return _pick_best_by_quick(board, block_moves, ai_stone)
+        return _pick_best_by_quick(position, block_moves, ai_stone)
 
     # 3) Opening book (first several plies, symmetry-aware).
     book_move = _opening_book_move(board, ai_stone)
     if book_move is not None:
-        return book_move
+        return _index(*book_move)
 
     # 4) Create own double threat if available
-    fork_moves = _find_double_win_moves(board, ai_stone, candidates)
+    fork_moves = _find_double_win_moves(position, ai_stone, candidates)
     if fork_moves:
-        return _pick_best_by_quick(board, fork_moves, ai_stone)
+        return _pick_best_by_quick(position, fork_moves, ai_stone)
+
+    # 5) Forced win by continuous fours
+    solver = _ThreatSolver(position)
+    vcf_move = solver.solve(ai_stone, False, _VCF_MAX_DEPTH, _VCF_NODE_BUDGET)
+    if vcf_move is not None:
+        return vcf_move
 
-    # 5) Block opponent double threat if detected
-    opp_fork_moves = _find_double_win_moves(board, opp_stone, candidates)
+    # 6) Block opponent double threat if detected
+    opp_fork_moves = _find_double_win_moves(position, opp_stone, candidates)
     if opp_fork_moves:
-        return _pick_best_by_quick(board, opp_fork_moves, ai_stone)
+        return _pick_best_by_quick(position, opp_fork_moves, ai_stone)
 
-    # 6) Iterative deepening search with transposition table
-    fallback = _pick_best_by_quick(board, candidates, ai_stone)
-    best_move = fallback
-    transposition: Dict[Tuple[int, int], _TTEntry] = {}
-    root_hash = _board_hash(board)
+    # 7) Forced win by continuous threes, unless a three would hand the
+    #    opponent the tempo for a VCF of its own.
+    if solver.solve(opp_stone, False, _VCF_MAX_DEPTH, _VCF_NODE_BUDGET) is None:
+        vct_move = solver.solve(ai_stone, True, _VCT_MAX_DEPTH, _VCT_NODE_BUDGET)
+        if vct_move is not None:
+            return vct_move
+
+    return None
 
+
+@dataclass
+class SearchResult:
+    """Outcome of one move search, with counters for measuring its speed."""
+
+    move: Tuple[int, int]
+    score: int = 0
+    depth: int = 0          # deepest completed iteration; 0 for tactical moves
+    nodes: int = 0
+    elapsed: float = 0.0
+    workers: int = 1
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _search(
+    board: List[List[int]],
+    ai_stone: int,
+    max_depth: int,
+    max_candidates: int,
+    time_limit: Optional[float],
+    position: GomokuBoard,
+    transposition: TranspositionTable,
+    stop_event: Optional[threading.Event] = None,
+    on_iteration: Optional[Callable[[int, int], None]] = None,
+) -> SearchResult:
+    """Run the full move-selection pipeline on a single thread."""
     start_time = time.perf_counter()
+    candidates = _get_candidates(position)
+    if not candidates:
+        return SearchResult(_xy(_CENTER_INDEX))
+
+    tactical = _tactical_move(position, board, ai_stone, candidates)
+    if tactical is not None:
+        if on_iteration is not None:
+            on_iteration(0, tactical)
+        return SearchResult(_xy(tactical), elapsed=time.perf_counter() - start_time)
+
+    # 8) Iterative deepening search with transposition table
+    best_move = _pick_best_by_quick(position, candidates, ai_stone)
+    best_score = 0
+    completed = 0
+    transposition.new_search()
+    ctx = _SearchContext(position, max_candidates, time_limit, transposition, stop_event)
+
     for depth in range(1, max_depth + 1):
         try:
             score, move = _negamax(
-                board,
+                ctx,
                 depth=depth,
                 alpha=NEG_INF,
                 beta=POS_INF,
                 stone=ai_stone,
-                zobrist_key=root_hash,
-                max_candidates=max_candidates,
                 root_depth=depth,
-                start_time=start_time,
-                time_limit=time_limit,
-                transposition=transposition,
             )
         except _SearchTimeout:
             break
 
+        completed = depth
+        best_score = score
         if move is not None:
             best_move = move
+            if on_iteration is not None:
+                on_iteration(depth, move)
 
         if score >= WIN_SCORE // 2:
             break
 
-    return best_move
+    return SearchResult(
+        _xy(best_move),
+        score=best_score,
+        depth=completed,
+        nodes=ctx.nodes,
+        elapsed=time.perf_counter() - start_time,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Parallel search (root splitting over worker processes)
+# ---------------------------------------------------------------------------
+#
+# The search is pure Python, so threads cannot run it in parallel. Instead
+# each iteration deals the root moves round-robin to single-process shards.
+# A shard keeps its own board and transposition table between iterations
+# and calls, searches its slice with a local alpha and returns one score per
+# move; the caller merges the slices and re-orders the root for the next
+# depth. Shards are spawned on first use and shared by all callers.
+
+
+class _SharedStop:
+    """``threading.Event``-like view of a shard's shared stop slot."""
+
+    __slots__ = ("_slot", "_ticket")
+
+    def __init__(self, slot, ticket):
+        self._slot = slot
+        self._ticket = ticket
+
+    def is_set(self):
+        return self._slot.value == self._ticket
+
+
+class _RootShard:
+    def __init__(self, mp_context, tt_size_mb: float):
+        self.stop_slot = mp_context.RawValue("q", 0)
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=mp_context,
+            initializer=_init_root_worker,
+            initargs=(self.stop_slot, tt_size_mb),
+        )
+
+
+_root_shards: List[_RootShard] = []
+_root_shards_lock = threading.Lock()
+_root_tickets = itertools.count(1)
+_root_worker = None
+
+
+def _get_root_shards(workers: int) -> List[_RootShard]:
+    with _root_shards_lock:
+        if len(_root_shards) < workers:
+            mp_context = multiprocessing.get_context("spawn")
+            while len(_root_shards) < workers:
+                _root_shards.append(_RootShard(mp_context, _DEFAULT_TT_MB))
+        return _root_shards[:workers]
+
+
+def _init_root_worker(stop_slot, tt_size_mb: float) -> None:
+    global _root_worker
+    _root_worker = (GomokuBoard(), TranspositionTable(tt_size_mb), stop_slot)
+
+
+def _search_root_slice(
+    board: List[List[int]],
+    stone: int,
+    moves: List[int],
+    depth: int,
+    max_candidates: int,
+    time_limit: Optional[float],
+    ticket: int,
+    clear_table: bool,
+) -> Tuple[Optional[List[int]], int]:
+    """Worker side: score each root move of *moves*; ``None`` if stopped."""
+    position, transposition, stop_slot = _root_worker
+    position.sync(board)
+    if clear_table:
+        transposition.clear()
+    transposition.new_search()
+    ctx = _SearchContext(
+        position, max_candidates, time_limit, transposition, _SharedStop(stop_slot, ticket)
+    )
+
+    scores = []
+    alpha = NEG_INF
+    opp = 3 - stone
+    try:
+        for idx in moves:
+            position.place(idx, stone)
+            try:
+                child_score, _ = _negamax(
+                    ctx,
+                    depth=depth - 1,
+                    alpha=NEG_INF,
+                    beta=-alpha,
+                    stone=opp,
+                    root_depth=depth,
+                )
+            finally:
+                position.remove(idx)
+            score = -child_score
+            scores.append(score)
+            alpha = max(alpha, score)
+    except _SearchTimeout:
+        return None, ctx.nodes
+    return scores, ctx.nodes
+
+
+def _gather_slices(futures, shards, ticket, stop_event) -> List[Tuple[Optional[List[int]], int]]:
+    pending = set(futures)
+    stopped = False
+    while pending:
+        _, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+        if not stopped and stop_event is not None and stop_event.is_set():
+            stopped = True
+            for shard in shards:
+                shard.stop_slot.value = ticket
+    return [future.result() for future in futures]
+
+
+def _parallel_search(
+    board: List[List[int]],
+    ai_stone: int,
+    max_depth: int,
+    max_candidates: int,
+    time_limit: Optional[float],
+    position: GomokuBoard,
+    stop_event: Optional[threading.Event],
+    workers: int,
+    seed: Optional[int],
+    on_iteration: Optional[Callable[[int, int], None]] = None,
+) -> SearchResult:
+    start_time = time.perf_counter()
+    candidates = _get_candidates(position)
+    if not candidates:
+        return SearchResult(_xy(_CENTER_INDEX), workers=workers)
+
+    tactical = _tactical_move(position, board, ai_stone, candidates)
+    if tactical is not None:
+        if on_iteration is not None:
+            on_iteration(0, tactical)
+        return SearchResult(
+            _xy(tactical), elapsed=time.perf_counter() - start_time, workers=workers
+        )
+
+    # Ties in move ordering decide which shard sees a move first and which
+    # of equally scored moves is played; ``seed`` makes both reproducible.
+    rng = random.Random(seed)
+    scored = _ordered_candidates(position, ai_stone, candidates)
+    scored.sort(key=lambda item: (item[0], rng.random()), reverse=True)
+    root = [idx for _, idx in scored[: max(6, max_candidates)]]
+
+    shards = _get_root_shards(workers)
+    ticket = next(_root_tickets)
+    best_move = root[0]
+    best_score = 0
+    completed = 0
+    nodes = 0
+
+    for depth in range(1, max_depth + 1):
+        remaining = None
+        if time_limit is not None and time_limit > 0:
+            remaining = time_limit - (time.perf_counter() - start_time)
+            if remaining <= 0:
+                break
+
+        slices = [root[i::len(shards)] for i in range(len(shards))]
+        jobs = [(shard, moves) for shard, moves in zip(shards, slices) if moves]
+        futures = [
+            shard.executor.submit(
+                _search_root_slice,
+                board,
+                ai_stone,
+                moves,
+                depth,
+                max_candidates,
+                remaining,
+                ticket,
+                seed is not None and depth == 1,
+            )
+            for shard, moves in jobs
+        ]
+        results = _gather_slices(futures, shards, ticket, stop_event)
+        nodes += sum(slice_nodes for _, slice_nodes in results)
+        if any(scores is None for scores, _ in results):
+            break
+
+        score_of = {}
+        for (_, moves), (scores, _) in zip(jobs, results):
+            score_of.update(zip(moves, scores))
+        root.sort(key=lambda idx: score_of[idx], reverse=True)  # stable: keeps tie order
+        completed = depth
+        best_move = root[0]
+        best_score = score_of[best_move]
+        if on_iteration is not None:
+            on_iteration(depth, best_move)
+
+        if best_score >= WIN_SCORE // 2:
+            break
+
+    return SearchResult(
+        _xy(best_move),
+        score=best_score,
+        depth=completed,
+        nodes=nodes,
+        elapsed=time.perf_counter() - start_time,
+        workers=workers,
+    )
+
+
+def search_best_move(
+    board: List[List[int]],
+    color: str,
+    max_depth: int = 7,
+    max_candidates: int = 16,
+    time_limit: Optional[float] = 2.4,
+    position: Optional[GomokuBoard] = None,
+    transposition: Optional[TranspositionTable] = None,
+    stop_event: Optional[threading.Event] = None,
+    workers: int = 1,
+    seed: Optional[int] = None,
+    on_iteration: Optional[Callable[[int, int], None]] = None,
+) -> SearchResult:
+    """
+    Like :func:`find_best_move`, but return the full :class:`SearchResult`.
+
+    With ``workers > 1`` the root moves are split over that many worker
+    processes; ``transposition`` is then unused (each worker keeps its own).
+    Passing ``seed`` fixes move-ordering tie-breaks and starts the workers
+    from empty tables, so with ``time_limit=None`` repeated runs search the
+    same trees and return the same move. ``on_iteration(depth, idx)`` is
+    called with each completed iteration's best move (depth 0: tactical).
+    """
+    ai_stone = 1 if color == "black" else 2
+
+    if position is None:
+        position = GomokuBoard(board)
+    else:
+        position.sync(board)
+
+    if workers > 1:
+        return _parallel_search(
+            board,
+            ai_stone,
+            max_depth=max_depth,
+            max_candidates=max_candidates,
+            time_limit=time_limit,
+            position=position,
+            stop_event=stop_event,
+            workers=workers,
+            seed=seed,
+            on_iteration=on_iteration,
+        )
+
+    if transposition is None:
+        transposition = TranspositionTable(_DEFAULT_TT_MB)
+    return _search(
+        board,
+        ai_stone,
+        max_depth=max_depth,
+        max_candidates=max_candidates,
+        time_limit=time_limit,
+        position=position,
+        transposition=transposition,
+        stop_event=stop_event,
+        on_iteration=on_iteration,
+    )
+
+
+def find_best_move(
+    board: List[List[int]],
+    color: str,
+    max_depth: int = 7,
+    max_candidates: int = 16,
+    time_limit: Optional[float] = 2.4,
+    position: Optional[GomokuBoard] = None,
+    transposition: Optional[TranspositionTable] = None,
+    stop_event: Optional[threading.Event] = None,
+    workers: int = 1,
+    seed: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Find best move for ``color`` (``"black"`` or ``"white"``).
+
+    Defaults are tuned for stronger practical play while keeping hint response
+    reasonably fast in online matches. ``board`` is never modified; the search
+    runs on a :class:`GomokuBoard`. Pass the same ``position`` on consecutive
+    calls (e.g. one per room) to reuse its line codes and candidate set: it is
+    synced to ``board`` first and left equal to it afterwards. Likewise a
+    long-lived ``transposition`` table keeps earlier work across calls.
+    Setting ``stop_event`` ends the search early with the best move so far.
+    ``workers`` and ``seed`` select the parallel search, see
+    :func:`search_best_move`.
+    """
+    return search_best_move(
+        board,
+        color,
+        max_depth=max_depth,
+        max_candidates=max_candidates,
+        time_limit=time_limit,
+        position=position,
+        transposition=transposition,
+        stop_event=stop_event,
+        workers=workers,
+        seed=seed,
+    ).move
+
+
+# ---------------------------------------------------------------------------
+# Per-room engine with pondering
+# ---------------------------------------------------------------------------
+
+
+def _position_key(board: Sequence[Sequence[int]], color: str) -> Tuple:
+    return color, tuple(tuple(row) for row in board)
+
+
+class _PonderJob:
+    __slots__ = ("key", "board", "color", "stop", "done", "best_move", "started_at")
+
+    def __init__(self, board: List[List[int]], color: str):
+        self.key = _position_key(board, color)
+        self.board = board
+        self.color = color
+        self.stop = threading.Event()
+        self.done = threading.Event()
+        self.best_move: Optional[Tuple[int, int]] = None
+        self.started_at: Optional[float] = None
+
+    def record(self, _depth: int, move: int) -> None:
+        self.best_move = _xy(move)
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return time.perf_counter() - self.started_at
+
+
+class GomokuEngine:
+    """
+    Long-lived search state for one room.
+
+    Holds the reusable :class:`GomokuBoard` and a bounded
+    :class:`TranspositionTable`, so consecutive hints build on each other.
+    With ``ponder=True`` the engine keeps searching in a background thread
+    after answering: first the position after the suggested move (the
+    predicted reply), or whatever position :meth:`ponder` is pointed at. A
+    later :meth:`best_move` for that exact position returns the pondered
+    result as soon as it has had ``time_limit`` seconds of search.
+    ``search_workers > 1`` runs hints through the parallel search (pondering
+    stays on one thread).
+    """
+
+    def __init__(
+        self,
+        tt_size_mb: float = 8,
+        ponder: bool = False,
+        ponder_time_limit: float = 30.0,
+        search_workers: int = 1,
+    ):
+        self.position = GomokuBoard()
+        self.transposition = TranspositionTable(tt_size_mb)
+        self.ponder_enabled = ponder
+        self.ponder_time_limit = ponder_time_limit
+        self.search_workers = search_workers
+        self._search_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._ponder_job: Optional[_PonderJob] = None
+
+    def best_move(
+        self,
+        board: List[List[int]],
+        color: str,
+        max_depth: int = 7,
+        max_candidates: int = 16,
+        time_limit: Optional[float] = 2.4,
+        stop_event: Optional[threading.Event] = None,
+    ) -> Tuple[int, int]:
+        move = self._take_ponder_result(board, color, time_limit)
+        if move is None:
+            with self._search_lock:
+                move = find_best_move(
+                    board,
+                    color,
+                    max_depth=max_depth,
+                    max_candidates=max_candidates,
+                    time_limit=time_limit,
+                    position=self.position,
+                    transposition=self.transposition,
+                    stop_event=stop_event,
+                    workers=self.search_workers,
+                )
+
+        # A stopped search means the position moved on; pondering its
+        # predicted reply would only displace pondering of the real one.
+        if self.ponder_enabled and not (stop_event is not None and stop_event.is_set()):
+            x, y = move
+            predicted = [row[:] for row in board]
+            predicted[y][x] = 1 if color == "black" else 2
+            self.ponder(predicted, "white" if color == "black" else "black")
+        return move
+
+    def ponder(self, board: List[List[int]], color: str) -> None:
+        """Start searching *board* for *color* in the background (non-blocking)."""
+        if not self.ponder_enabled:
+            return
+        job = _PonderJob([row[:] for row in board], color)
+        with self._state_lock:
+            current = self._ponder_job
+            if current is not None:
+                if current.key == job.key and not current.stop.is_set():
+                    return
+                current.stop.set()
+            self._ponder_job = job
+        threading.Thread(target=self._run_ponder, args=(job,), daemon=True).start()
+
+    def stop_pondering(self) -> None:
+        with self._state_lock:
+            job, self._ponder_job = self._ponder_job, None
+        if job is not None:
+            job.stop.set()
+
+    close = stop_pondering
+
+    def _run_ponder(self, job: _PonderJob) -> None:
+        try:
+            with self._search_lock:
+                if job.stop.is_set():
+                    return
+                job.started_at = time.perf_counter()
+                ai_stone = 1 if job.color == "black" else 2
+                self.position.sync(job.board)
+                _search(
+                    job.board,
+                    ai_stone,
+                    max_depth=_PONDER_MAX_DEPTH,
+                    max_candidates=16,
+                    time_limit=self.ponder_time_limit,
+                    position=self.position,
+                    transposition=self.transposition,
+                    stop_event=job.stop,
+                    on_iteration=job.record,
+                )
+        finally:
+            job.done.set()
+
+    def _take_ponder_result(
+        self, board: List[List[int]], color: str, time_limit: Optional[float]
+    ) -> Optional[Tuple[int, int]]:
+        with self._state_lock:
+            job, self._ponder_job = self._ponder_job, None
+        if job is None:
+            return None
+        if job.key != _position_key(board, color):
+            job.stop.set()
+            return None
+
+        # Prediction hit: give the ponder search whatever is left of the
+        # normal budget, then take its deepest completed answer.
+        if not job.done.is_set() and time_limit:
+            job.done.wait(max(0.0, time_limit - job.elapsed()))
+        job.stop.set()
+        job.done.wait()
+        return job.best_move
@@ -0,0 +1,299 @@
+"""
+Benchmark corpus, harness and self-play runner for ``gomoku_ai``.
+
+``run_benchmark`` searches every corpus position once and reports depth,
+nodes, nodes/sec and time-to-solution; ``play_match`` pits two
+``find_best_move`` configurations against each other from the corpus
+openings, each opening played once with either side as black.
+
+Both are plain functions so they can be driven from tests; the
+``gomoku_benchmark`` and ``gomoku_selfplay`` management commands wrap them.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from .gomoku_ai import BOARD_SIZE, search_best_move
+
+Stones = Tuple[Tuple[int, int], ...]
+
+CATEGORIES = ("opening", "tactical", "puzzle", "midgame")
+
+
+@dataclass(frozen=True)
+class BenchPosition:
+    name: str
+    category: str
+    black: Stones
+    white: Stones
+    # Moves accepted as correct; empty for positions that are only timed.
+    solutions: FrozenSet[Tuple[int, int]] = frozenset()
+    color: str = "black"  # side to move
+
+    def rows(self) -> List[List[int]]:
+        board = [[0] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+        for x, y in self.black:
+            board[y][x] = 1
+        for x, y in self.white:
+            board[y][x] = 2
+        return board
+
+
+# Puzzle solutions list every winning first move found by the threat solver
+# with a generous node budget; mid-game positions come from engine self-play.
+CORPUS = (
+    BenchPosition("empty-board", "opening", (), (), frozenset({(7, 7)})),
+    BenchPosition("center-reply", "opening", ((7, 7),), (), color="white"),
+    BenchPosition(
+        "diagonal-opening",
+        "opening",
+        ((7, 7), (8, 6)),
+        ((8, 8), (6, 8)),
+    ),
+    BenchPosition(
+        "block-four",
+        "tactical",
+        ((2, 7), (8, 8), (9, 8)),
+        ((2, 3), (2, 4), (2, 5), (2, 6)),
+        frozenset({(2, 2)}),
+    ),
+    BenchPosition(
+        "split-four-fork",
+        "tactical",
+        ((4, 7), (5, 7), (8, 7), (7, 4), (7, 5), (7, 6)),
+        ((0, 0), (14, 0), (0, 14), (14, 14), (7, 8), (7, 2)),
+        frozenset({(7, 7)}),
+    ),
+    BenchPosition(
+        "midgame-16",
+        "midgame",
+        ((11, 5), (6, 6), (7, 6), (7, 7), (8, 7), (7, 8), (8, 9), (6, 10)),
+        ((6, 5), (7, 5), (10, 6), (6, 7), (9, 7), (8, 8), (6, 9), (7, 9)),
+    ),
+    BenchPosition(
+        "midgame-22",
+        "midgame",
+        ((7, 5), (8, 6), (7, 7), (11, 7), (7, 8), (9, 8), (7, 9), (10, 9),
+         (9, 10), (7, 11), (8, 11)),
+        ((9, 5), (7, 6), (8, 7), (9, 7), (10, 7), (8, 8), (11, 8), (8, 9),
+         (7, 10), (8, 10), (6, 11)),
+    ),
+    BenchPosition(
+        "vcf-11-ply",
+        "puzzle",
+        ((2, 2), (2, 4), (9, 4), (10, 6), (5, 7), (6, 8), (7, 8), (10, 9),
+         (5, 10), (10, 10)),
+        ((9, 2), (7, 5), (8, 5), (12, 5), (5, 9), (9, 9), (6, 11), (11, 12)),
+        frozenset({(4, 6), (10, 8)}),
+    ),
+    BenchPosition(
+        "vcf-13-ply",
+        "puzzle",
+        ((4, 2), (6, 2), (7, 3), (6, 4), (10, 4), (3, 6), (10, 6), (2, 9),
+         (5, 10), (6, 11)),
+        ((11, 4), (9, 6), (2, 8), (12, 8), (6, 9), (12, 9), (2, 12), (8, 12)),
+        frozenset({(8, 4)}),
+    ),
+    BenchPosition(
+        "vcf-15-ply",
+        "puzzle",
+        ((5, 2), (10, 2), (6, 3), (4, 4), (6, 6), (3, 8), (8, 8), (10, 8),
+         (6, 9), (6, 10)),
+        ((2, 2), (7, 2), (5, 3), (3, 5), (2, 8), (3, 9), (9, 10), (12, 12)),
+        frozenset({(7, 7), (6, 8)}),
+    ),
+    BenchPosition(
+        "vct",
+        "puzzle",
+        ((2, 3), (12, 3), (6, 6), (4, 7), (5, 8), (11, 10), (12, 10), (12, 11),
+         (10, 12)),
+        ((2, 6), (9, 6), (2, 7), (7, 7), (10, 10), (4, 12), (11, 12)),
+        frozenset({(9, 8), (10, 9), (12, 9), (11, 11), (13, 12)}),
+    ),
+)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class BenchResult:
+    name: str
+    category: str
+    move: Tuple[int, int]
+    depth: int
+    nodes: int
+    elapsed: float
+    nodes_per_second: float
+    solved: Optional[bool]                # None: position has no solution set
+    time_to_solution: Optional[float]     # when the final, correct answer first appeared
+
+
+def bench_position(position: BenchPosition, **search_options) -> BenchResult:
+    """Search one corpus position with ``search_best_move(**search_options)``."""
+    rows = position.rows()
+    changes = []  # (seconds, move) whenever the best move changes
+
+    def record(_depth, idx):
+        move = (idx % BOARD_SIZE, idx // BOARD_SIZE)
+        if not changes or changes[-1][1] != move:
+            changes.append((time.perf_counter() - start, move))
+
+    start = time.perf_counter()
+    result = search_best_move(rows, position.color, on_iteration=record, **search_options)
+    elapsed = time.perf_counter() - start
+
+    solved = None
+    time_to_solution = None
+    if position.solutions:
+        solved = result.move in position.solutions
+        if solved:
+            time_to_solution = elapsed
+            for seconds, move in reversed(changes):
+                if move not in position.solutions:
+                    break
+                time_to_solution = seconds
+
+    return BenchResult(
+        name=position.name,
+        category=position.category,
+        move=result.move,
+        depth=result.depth,
+        nodes=result.nodes,
+        elapsed=elapsed,
+        nodes_per_second=result.nodes / elapsed if elapsed > 0 else 0.0,
+        solved=solved,
+        time_to_solution=time_to_solution,
+    )
+
+
+def run_benchmark(
+    positions: Iterable[BenchPosition] = CORPUS, **search_options
+) -> List[BenchResult]:
+    return [bench_position(position, **search_options) for position in positions]
+
+
+# ---------------------------------------------------------------------------
+# Self-play
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class SideStats:
+    moves: int = 0
+    seconds: float = 0.0
+    nodes: int = 0
+
+    @property
+    def seconds_per_move(self) -> float:
+        return self.seconds / self.moves if self.moves else 0.0
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class GameRecord:
+    opening: str
+    black: str                    # "a" or "b"
+    winner: Optional[str]         # "a", "b" or None for a draw
+    moves: List[Tuple[int, int]]
+
+
+@dataclass
+class MatchResult:
+    a_wins: int = 0
+    b_wins: int = 0
+    draws: int = 0
+    a: SideStats = field(default_factory=SideStats)
+    b: SideStats = field(default_factory=SideStats)
+    games: List[GameRecord] = field(default_factory=list)
+
+    @property
+    def score(self) -> float:
+        """Points of configuration ``a`` (win 1, draw 0.5) per game."""
+        total = self.a_wins + self.b_wins + self.draws
+        return (self.a_wins + 0.5 * self.draws) / total if total else 0.0
+
+
+def _makes_five(board: Sequence[Sequence[int]], x: int, y: int, stone: int) -> bool:
+    for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            cx, cy = x + sign * dx, y + sign * dy
+            while 0 <= cx < BOARD_SIZE and 0 <= cy < BOARD_SIZE and board[cy][cx] == stone:
+                count += 1
+                cx += sign * dx
+                cy += sign * dy
+        if count >= 5:
+            return True
+    return False
+
+
+def play_game(
+    opening: BenchPosition,
+    black_options: Dict,
+    white_options: Dict,
+    black_stats: Optional[SideStats] = None,
+    white_stats: Optional[SideStats] = None,
+    max_moves: int = BOARD_SIZE * BOARD_SIZE,
+) -> Tuple[Optional[str], List[Tuple[int, int]]]:
+    """Play *opening* out; return the winning colour (or ``None``) and the moves."""
+    board = opening.rows()
+    color = opening.color
+    options = {"black": black_options, "white": white_options}
+    stats = {"black": black_stats or SideStats(), "white": white_stats or SideStats()}
+    moves = []
+    empty = sum(row.count(0) for row in board)
+
+    while len(moves) < min(max_moves, empty):
+        result = search_best_move(board, color, **options[color])
+        x, y = result.move
+        stone = 1 if color == "black" else 2
+        board[y][x] = stone
+        moves.append((x, y))
+
+        side = stats[color]
+        side.moves += 1
+        side.seconds += result.elapsed
+        side.nodes += result.nodes
+
+        if _makes_five(board, x, y, stone):
+            return color, moves
+        color = "white" if color == "black" else "black"
+    return None, moves
+
+
+def play_match(
+    a_options: Dict,
+    b_options: Dict,
+    openings: Optional[Iterable[BenchPosition]] = None,
+    max_moves: int = BOARD_SIZE * BOARD_SIZE,
+) -> MatchResult:
+    """Play every opening twice, swapping colours, between configurations a and b."""
+    if openings is None:
+        openings = [p for p in CORPUS if p.category in ("opening", "midgame")]
+
+    match = MatchResult()
+    for opening in openings:
+        for a_is_black in (True, False):
+            if a_is_black:
+                winner, moves = play_game(opening, a_options, b_options, match.a, match.b, max_moves)
+            else:
+                winner, moves = play_game(opening, b_options, a_options, match.b, match.a, max_moves)
+
+            label = None
+            if winner is not None:
+                label = "a" if (winner == "black") == a_is_black else "b"
+            if label == "a":
+                match.a_wins += 1
+            elif label == "b":
+                match.b_wins += 1
+            else:
+                match.draws += 1
+            match.games.append(GameRecord(opening.name, "a" if a_is_black else "b", label, moves))
+    return match
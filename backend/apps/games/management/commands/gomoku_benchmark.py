@@ -0,0 +1,75 @@
+"""Run the Gomoku AI benchmark corpus and print per-position search statistics.
+
+Usage:
+    python manage.py gomoku_benchmark
+    python manage.py gomoku_benchmark --category puzzle --time-limit 1
+    python manage.py gomoku_benchmark --workers 4 --seed 1 --json
+"""
+import json
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.games.gomoku_bench import CATEGORIES, CORPUS, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark gomoku_ai on a fixed corpus: depth, nodes, nodes/sec, time-to-solution."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--category", choices=CATEGORIES, help="Only run positions of this category.")
+        parser.add_argument("--position", action="append", help="Only run the named position (repeatable).")
+        parser.add_argument("--time-limit", type=float, default=2.4, help="Seconds per position (default 2.4).")
+        parser.add_argument("--max-depth", type=int, default=7)
+        parser.add_argument("--max-candidates", type=int, default=16)
+        parser.add_argument("--workers", type=int, default=1, help="Parallel search processes.")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        positions = [
+            p
+            for p in CORPUS
+            if (options["category"] is None or p.category == options["category"])
+            and (not options["position"] or p.name in options["position"])
+        ]
+        if not positions:
+            raise CommandError("No benchmark positions match the given filters.")
+
+        results = run_benchmark(
+            positions,
+            time_limit=options["time_limit"],
+            max_depth=options["max_depth"],
+            max_candidates=options["max_candidates"],
+            workers=options["workers"],
+            seed=options["seed"],
+        )
+
+        if options["json"]:
+            self.stdout.write(json.dumps([asdict(r) for r in results], indent=2))
+            return
+
+        self.stdout.write(
+            f"{'position':<18} {'category':<9} {'move':<8} {'depth':>5} {'nodes':>8} "
+            f"{'nodes/s':>8} {'time':>7} {'solved':>7} {'tts':>7}"
+        )
+        for r in results:
+            solved = "-" if r.solved is None else ("yes" if r.solved else "NO")
+            tts = "-" if r.time_to_solution is None else f"{r.time_to_solution:.3f}"
+            self.stdout.write(
+                f"{r.name:<18} {r.category:<9} {str(r.move):<8} {r.depth:>5} {r.nodes:>8} "
+                f"{r.nodes_per_second:>8.0f} {r.elapsed:>7.3f} {solved:>7} {tts:>7}"
+            )
+
+        total_nodes = sum(r.nodes for r in results)
+        total_time = sum(r.elapsed for r in results)
+        graded = [r for r in results if r.solved is not None]
+        summary = (
+            f"{len(results)} positions, {total_nodes} nodes in {total_time:.2f}s "
+            f"({total_nodes / total_time if total_time else 0:.0f} nodes/s), "
+            f"solved {sum(r.solved for r in graded)}/{len(graded)}"
+        )
+        if all(r.solved for r in graded):
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.WARNING(summary))
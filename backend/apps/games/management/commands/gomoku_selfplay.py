@@ -0,0 +1,64 @@
+"""Play two gomoku_ai configurations against each other from the corpus openings.
+
+Each configuration is a list of ``find_best_move`` keyword arguments, values
+parsed as Python literals. Every opening is played twice with colours swapped.
+
+Usage:
+    python manage.py gomoku_selfplay --a time_limit=1.0 --b time_limit=1.0 workers=2
+    python manage.py gomoku_selfplay --a max_depth=3 time_limit=None --b max_depth=5 time_limit=None
+"""
+import ast
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.games.gomoku_bench import CORPUS, play_match
+
+
+def _parse_options(pairs):
+    options = {}
+    for pair in pairs or ():
+        key, sep, value = pair.partition("=")
+        if not sep or not key:
+            raise CommandError(f"Expected key=value, got '{pair}'.")
+        try:
+            options[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            raise CommandError(f"Invalid value for '{key}': {value}")
+    return options
+
+
+class Command(BaseCommand):
+    help = "Engine-vs-engine match between two find_best_move configurations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--a", nargs="*", default=[], metavar="KEY=VALUE", help="Configuration A.")
+        parser.add_argument("--b", nargs="*", default=[], metavar="KEY=VALUE", help="Configuration B.")
+        parser.add_argument("--opening", action="append", help="Only play from the named corpus position (repeatable).")
+        parser.add_argument("--max-moves", type=int, default=120, help="Moves per game before it is scored a draw.")
+
+    def handle(self, *args, **options):
+        a_options = _parse_options(options["a"])
+        b_options = _parse_options(options["b"])
+
+        openings = None
+        if options["opening"]:
+            openings = [p for p in CORPUS if p.name in options["opening"]]
+            if not openings:
+                raise CommandError("No corpus position matches --opening.")
+
+        match = play_match(a_options, b_options, openings=openings, max_moves=options["max_moves"])
+
+        for game in match.games:
+            result = "draw" if game.winner is None else f"{game.winner.upper()} wins"
+            self.stdout.write(
+                f"{game.opening:<18} A plays {'black' if game.black == 'a' else 'white'}: "
+                f"{result} in {len(game.moves)} moves"
+            )
+        for label, side, config in (("A", match.a, a_options), ("B", match.b, b_options)):
+            self.stdout.write(
+                f"{label} {config}: {side.moves} moves, {side.seconds_per_move:.3f}s/move, "
+                f"{side.nodes_per_second:.0f} nodes/s"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"A {match.a_wins} - B {match.b_wins} - draws {match.draws} (A score {match.score:.2f})"
+        ))
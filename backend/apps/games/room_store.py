@@ -0,0 +1,194 @@
+"""
+Room-state backends for :class:`~apps.games.consumers.GomokuConsumer`.
+
+A room is a JSON-serialisable dict owned by the consumer; the store only
+persists it and applies updates atomically:
+
+    result = await store.update(room_id, fn, factory=_create_room)
+
+``fn(room)`` mutates the room in place and returns whatever the caller needs.
+It receives ``None`` for a missing room when no ``factory`` is given. An
+update that leaves the room empty (``room.clear()``) deletes it. ``fn`` must
+have no side effects besides the room: the Redis store re-runs it when
+another process changed the room concurrently.
+
+Backends (``GOMOKU_ROOM_STORE``):
+- ``memory`` (default): process-local dicts behind a ``threading.Lock``.
+  Only correct with a single ASGI process.
+- ``redis``: one key per room, updated with WATCH/MULTI, plus shared sorted
+  sets for the global online counters, so several Daphne processes can serve
+  the same rooms through the ``channels_redis`` layer. Members are scored by
+  their expiry time and pruned before counting, so rooms and connections of
+  a crashed process stop being counted once they expire.
+
+A Redis connection is counted for ``GOMOKU_CONNECTION_TTL`` seconds after its
+last ``touch_connection``; consumers touch every ``heartbeat_interval``
+seconds (``None`` when the store needs no heartbeat), so idle spectators
+stay counted and a crashed process's connections drop out within minutes.
+"""
+
+import copy
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import WatchError
+except ImportError:
+    aioredis = None
+    WatchError = None
+
+logger = logging.getLogger(__name__)
+
+
+class RoomStoreConfigError(Exception):
+    """The configured room store cannot be used."""
+
+
+class MemoryRoomStore:
+    """Rooms and counters in process memory."""
+
+    heartbeat_interval = None
+
+    def __init__(self):
+        self._rooms = {}
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    async def get(self, room_id):
+        with self._lock:
+            room = self._rooms.get(room_id)
+            return copy.deepcopy(room) if room is not None else None
+
+    async def update(self, room_id, fn, factory=None):
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None and factory is not None:
+                room = factory()
+            result = fn(room)
+            if room is not None:
+                if room:
+                    self._rooms[room_id] = room
+                else:
+                    self._rooms.pop(room_id, None)
+            return result
+
+    async def add_connection(self, channel_name):
+        with self._lock:
+            self._connections.add(channel_name)
+
+    async def remove_connection(self, channel_name):
+        with self._lock:
+            self._connections.discard(channel_name)
+
+    async def touch_connection(self, channel_name):
+        pass
+
+    async def online_counts(self):
+        """Return ``(total_connections, active_rooms)`` across the deployment."""
+        with self._lock:
+            return len(self._connections), len(self._rooms)
+
+
+class RedisRoomStore:
+    """Rooms as JSON strings in Redis, updated optimistically with WATCH/MULTI."""
+
+    def __init__(self, client, prefix="gomoku", room_ttl=24 * 3600, connection_ttl=180):
+        self._redis = client
+        self._prefix = prefix
+        # Rooms and connections of crashed processes are never removed; let them expire.
+        self._room_ttl = room_ttl
+        self._connection_ttl = connection_ttl
+        # Several refreshes per lease, so one slow or failed touch does not drop a connection
+        self.heartbeat_interval = connection_ttl / 3
+        # Sorted sets (the plain sets used before lived at ``:rooms`` / ``:connections``)
+        self._rooms_key = f"{prefix}:room_expiry"
+        self._connections_key = f"{prefix}:connection_expiry"
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        if aioredis is None:
+            raise RoomStoreConfigError("GOMOKU_ROOM_STORE=redis requires the 'redis' package.")
+        return cls(aioredis.from_url(url), **kwargs)
+
+    def _room_key(self, room_id):
+        return f"{self._prefix}:room:{room_id}"
+
+    async def get(self, room_id):
+        raw = await self._redis.get(self._room_key(room_id))
+        return json.loads(raw) if raw is not None else None
+
+    async def update(self, room_id, fn, factory=None):
+        key = self._room_key(room_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    if raw is not None:
+                        room = json.loads(raw)
+                    else:
+                        room = factory() if factory is not None else None
+                    result = fn(room)
+                    if room is None:
+                        return result
+
+                    pipe.multi()
+                    if room:
+                        pipe.set(key, json.dumps(room, ensure_ascii=False), ex=self._room_ttl)
+                        pipe.zadd(self._rooms_key, {room_id: time.time() + self._room_ttl})
+                    else:
+                        pipe.delete(key)
+                        pipe.zrem(self._rooms_key, room_id)
+                    await pipe.execute()
+                    return result
+                except WatchError:
+                    logger.debug("Gomoku room %s changed concurrently, retrying", room_id)
+                    continue
+
+    async def add_connection(self, channel_name):
+        await self._redis.zadd(self._connections_key, {channel_name: time.time() + self._connection_ttl})
+
+    async def remove_connection(self, channel_name):
+        await self._redis.zrem(self._connections_key, channel_name)
+
+    async def touch_connection(self, channel_name):
+        # XX: never resurrect a connection that was removed or pruned
+        await self._redis.zadd(
+            self._connections_key, {channel_name: time.time() + self._connection_ttl}, xx=True
+        )
+
+    async def online_counts(self):
+        now = time.time()
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(self._connections_key, "-inf", now)
+            pipe.zremrangebyscore(self._rooms_key, "-inf", now)
+            pipe.zcard(self._connections_key)
+            pipe.zcard(self._rooms_key)
+            _, _, connections, rooms = await pipe.execute()
+        return connections, rooms
+
+
+_store = None
+
+
+def get_room_store():
+    global _store
+    if _store is None:
+        backend = getattr(settings, "GOMOKU_ROOM_STORE", "memory")
+        if backend == "memory":
+            _store = MemoryRoomStore()
+        elif backend == "redis":
+            url = getattr(settings, "GOMOKU_REDIS_URL", "") or getattr(settings, "REDIS_URL", "")
+            if not url:
+                raise RoomStoreConfigError("GOMOKU_ROOM_STORE=redis requires GOMOKU_REDIS_URL or REDIS_URL.")
+            _store = RedisRoomStore.from_url(
+                url, connection_ttl=getattr(settings, "GOMOKU_CONNECTION_TTL", 180)
+            )
+        else:
+            raise RoomStoreConfigError(f"Unknown GOMOKU_ROOM_STORE: {backend}")
+    return _store
@@ -0,0 +1,451 @@
+import asyncio
+import random
+import time
+from unittest import mock, skipUnless
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from . import room_store
+from .ai_service import GomokuAIService, HintBusy, HintCancelled, HintRateLimited
+from .gomoku_bench import CORPUS, play_match, run_benchmark
+from .room_store import MemoryRoomStore, RedisRoomStore
+from .routing import websocket_urlpatterns
+from .gomoku_ai import (
+    BOARD_SIZE,
+    WIN_SCORE,
+    GomokuBoard,
+    GomokuEngine,
+    TranspositionTable,
+    find_best_move,
+    search_best_move,
+)
+
+
+def _empty_rows():
+    return [[0] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+
+
+def _random_rows(rng, stones):
+    rows = _empty_rows()
+    for k, idx in enumerate(rng.sample(range(BOARD_SIZE * BOARD_SIZE), stones)):
+        rows[idx // BOARD_SIZE][idx % BOARD_SIZE] = 1 + k % 2
+    return rows
+
+
+class GomokuBoardTests(SimpleTestCase):
+    def test_incremental_evaluation_matches_fresh_board(self):
+        rng = random.Random(7)
+        position = GomokuBoard()
+        placed = []
+        for step in range(120):
+            if placed and rng.random() < 0.3:
+                position.remove(placed.pop(rng.randrange(len(placed))))
+            else:
+                empty = [i for i in range(BOARD_SIZE * BOARD_SIZE) if not position.cells[i]]
+                idx = rng.choice(empty)
+                position.place(idx, 1 + step % 2)
+                placed.append(idx)
+
+            fresh = GomokuBoard(position.to_rows())
+            self.assertEqual(position.totals, fresh.totals)
+            self.assertEqual(position.zobrist, fresh.zobrist)
+            self.assertEqual(position.evaluate(1), fresh.evaluate(1))
+            self.assertEqual(position.evaluate(2), fresh.evaluate(2))
+            self.assertEqual(position.candidates, fresh.candidates)
+
+    def test_sync_applies_only_the_difference(self):
+        rng = random.Random(11)
+        rows = _random_rows(rng, 20)
+        position = GomokuBoard(rows)
+        rows[0][0] = 0 if rows[0][0] else 1
+        rows[7][7] = 2
+        position.sync(rows)
+        self.assertEqual(position.to_rows(), rows)
+        self.assertEqual(position.candidates, GomokuBoard(rows).candidates)
+
+    def test_evaluation_detects_five(self):
+        rows = _empty_rows()
+        for x in range(3, 8):
+            rows[7][x] = 2
+        position = GomokuBoard(rows)
+        self.assertEqual(position.evaluate(2), -position.evaluate(1))
+        self.assertGreater(position.evaluate(2), 0)
+
+
+class FindBestMoveTests(SimpleTestCase):
+    def test_empty_board_plays_center(self):
+        self.assertEqual(find_best_move(_empty_rows(), "black"), (7, 7))
+
+    def test_takes_immediate_win(self):
+        rows = _empty_rows()
+        for x in range(4, 8):
+            rows[5][x] = 1
+        rows[6][4] = rows[6][5] = rows[6][6] = 2
+        self.assertIn(find_best_move(rows, "black"), {(3, 5), (8, 5)})
+
+    def test_blocks_immediate_loss(self):
+        rows = _empty_rows()
+        for y in range(3, 7):
+            rows[y][2] = 2
+        rows[7][2] = 1
+        rows[8][8] = rows[8][9] = 1
+        self.assertEqual(find_best_move(rows, "black"), (2, 2))
+
+    def test_plays_split_four_fork(self):
+        rows = _empty_rows()
+        for x, y in ((4, 7), (5, 7), (8, 7), (7, 4), (7, 5), (7, 6)):
+            rows[y][x] = 1
+        for x, y in ((0, 0), (14, 0), (0, 14), (14, 14), (7, 8), (7, 2)):
+            rows[y][x] = 2
+        self.assertEqual(find_best_move(rows, "black"), (7, 7))
+
+    def test_plays_out_deep_forced_win(self):
+        rows = _empty_rows()
+        for x, y in ((5, 2), (10, 2), (6, 3), (4, 4), (6, 6), (3, 8), (8, 8), (10, 8), (6, 9), (6, 10)):
+            rows[y][x] = 1
+        for x, y in ((2, 2), (7, 2), (5, 3), (3, 5), (2, 8), (3, 9), (9, 10), (12, 12)):
+            rows[y][x] = 2
+        # Black wins with a five after eight consecutive fours; white can only block.
+        for _ in range(9):
+            x, y = find_best_move(rows, "black")
+            rows[y][x] = 1
+            if GomokuBoard(rows).evaluate(1) == WIN_SCORE:
+                break
+            x, y = find_best_move(rows, "white")
+            rows[y][x] = 2
+        self.assertEqual(GomokuBoard(rows).evaluate(1), WIN_SCORE)
+
+    def test_reused_position_matches_fresh_search(self):
+        rng = random.Random(5)
+        rows = _random_rows(rng, 12)
+        position = GomokuBoard()
+        for color in ("black", "white"):
+            reused = find_best_move(rows, color, max_depth=3, time_limit=None, position=position)
+            fresh = find_best_move(rows, color, max_depth=3, time_limit=None)
+            self.assertEqual(reused, fresh)
+            self.assertEqual(position.to_rows(), rows)
+
+    def test_input_board_is_not_modified(self):
+        rows = _random_rows(random.Random(3), 16)
+        snapshot = [row[:] for row in rows]
+        find_best_move(rows, "white", max_depth=3, time_limit=None)
+        self.assertEqual(rows, snapshot)
+
+
+class ParallelSearchTests(SimpleTestCase):
+    def test_result_reports_nodes(self):
+        rows = _random_rows(random.Random(5), 12)
+        result = search_best_move(rows, "black", max_depth=3, time_limit=None)
+        self.assertEqual(result.depth, 3)
+        self.assertGreater(result.nodes, 0)
+        self.assertGreater(result.nodes_per_second, 0)
+        self.assertEqual(result.move, find_best_move(rows, "black", max_depth=3, time_limit=None))
+
+    def test_seeded_parallel_search_is_reproducible(self):
+        rows = _random_rows(random.Random(5), 12)
+        first = search_best_move(rows, "black", max_depth=3, time_limit=None, workers=2, seed=1)
+        second = search_best_move(rows, "black", max_depth=3, time_limit=None, workers=2, seed=1)
+        self.assertEqual(
+            (first.move, first.score, first.depth, first.nodes),
+            (second.move, second.score, second.depth, second.nodes),
+        )
+        self.assertEqual(first.workers, 2)
+        x, y = first.move
+        self.assertEqual(rows[y][x], 0)
+
+    def test_parallel_search_keeps_tactical_answers(self):
+        rows = _empty_rows()
+        for y in range(3, 7):
+            rows[y][2] = 2
+        rows[7][2] = 1
+        rows[8][8] = rows[8][9] = 1
+        self.assertEqual(find_best_move(rows, "black", workers=2), (2, 2))
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_corpus_puzzles_are_solved(self):
+        positions = [p for p in CORPUS if p.category in ("tactical", "puzzle")]
+        for result in run_benchmark(positions, time_limit=0.5):
+            self.assertTrue(result.solved, result.name)
+            self.assertIsNotNone(result.time_to_solution)
+
+    def test_match_scores_forced_win_for_black(self):
+        puzzle = next(p for p in CORPUS if p.name == "vcf-11-ply")
+        match = play_match({"time_limit": 0.2}, {"time_limit": 0.2}, openings=[puzzle], max_moves=20)
+        self.assertEqual((match.a_wins, match.b_wins, match.draws), (1, 1, 0))
+        self.assertEqual([game.winner for game in match.games], ["a", "b"])
+        self.assertGreater(match.a.moves, 0)
+
+
+class TranspositionTableTests(SimpleTestCase):
+    def test_size_is_bounded_by_megabytes(self):
+        table = TranspositionTable(size_mb=1)
+        self.assertLessEqual(table.size_bytes, 1024 * 1024)
+        self.assertGreater(table.capacity, 0)
+
+    def test_deeper_entry_survives_shallow_collision(self):
+        table = TranspositionTable(size_mb=0.001)
+        slots = table.capacity // 2
+        deep_key, shallow_key, other_key = 1, 1 + slots, 1 + 2 * slots
+        table.store(deep_key, 6, 100, 0, 3)
+        table.store(shallow_key, 1, 5, 0, 4)
+        table.store(other_key, 2, 7, 0, 5)
+        self.assertEqual(table.probe(deep_key), (6, 100, 0, 3))
+        self.assertIsNone(table.probe(shallow_key))
+        self.assertEqual(table.probe(other_key), (2, 7, 0, 5))
+
+    def test_old_generation_loses_depth_priority(self):
+        table = TranspositionTable(size_mb=0.001)
+        slots = table.capacity // 2
+        table.store(1, 6, 100, 0, 3)
+        table.new_search()
+        table.store(1 + slots, 1, 5, 0, 4)
+        self.assertEqual(table.probe(1 + slots), (1, 5, 0, 4))
+        self.assertEqual(table.probe(1), (6, 100, 0, 3))
+
+
+class GomokuEngineTests(SimpleTestCase):
+    def test_repeated_hint_matches_plain_search(self):
+        rows = _random_rows(random.Random(9), 14)
+        engine = GomokuEngine(tt_size_mb=1)
+        expected = find_best_move(rows, "white", max_depth=3, time_limit=None)
+        self.assertEqual(engine.best_move(rows, "white", max_depth=3, time_limit=None), expected)
+        self.assertEqual(engine.best_move(rows, "white", max_depth=3, time_limit=None), expected)
+
+    def test_ponder_hit_returns_pondered_move(self):
+        rows = _random_rows(random.Random(13), 10)
+        engine = GomokuEngine(tt_size_mb=1, ponder=True, ponder_time_limit=0.3)
+        try:
+            engine.ponder(rows, "black")
+            move = engine.best_move(rows, "black", time_limit=0.3)
+            x, y = move
+            self.assertEqual(rows[y][x], 0)
+        finally:
+            engine.close()
+
+
+class GomokuAIServiceTests(SimpleTestCase):
+    def _service(self, **kwargs):
+        options = {"mode": "thread", "workers": 2, "hint_interval": 0, "tt_size_mb": 1}
+        options.update(kwargs)
+        service = GomokuAIService(**options)
+        self.addCleanup(service.shutdown)
+        return service
+
+    async def test_hint_in_thread_mode(self):
+        service = self._service()
+        x, y = await service.best_move("ROOM1", _empty_rows(), "black", version=0)
+        self.assertEqual((x, y), (7, 7))
+        self.assertEqual(service.pending, 0)
+
+    async def test_same_position_shares_one_search(self):
+        service = self._service()
+        rows = _random_rows(random.Random(21), 12)
+        first = service.best_move("ROOM1", rows, "black", version=3)
+        second = service.best_move("ROOM1", rows, "black", version=3)
+        results = await asyncio.gather(first, second)
+        self.assertEqual(results[0], results[1])
+
+    async def test_rate_limit_per_room(self):
+        service = self._service(hint_interval=60)
+        await service.best_move("ROOM1", _empty_rows(), "black", version=0)
+        with self.assertRaises(HintRateLimited):
+            await service.best_move("ROOM1", _empty_rows(), "black", version=1)
+        await service.best_move("ROOM2", _empty_rows(), "black", version=0)
+
+    async def test_queue_is_bounded(self):
+        service = self._service(max_pending=1)
+        rows = _random_rows(random.Random(22), 14)
+        running = asyncio.ensure_future(service.best_move("ROOM1", rows, "black", version=0))
+        await asyncio.sleep(0)
+        with self.assertRaises(HintBusy):
+            await service.best_move("ROOM2", rows, "black", version=0)
+        service.position_changed("ROOM1")
+        with self.assertRaises(HintCancelled):
+            await running
+
+    async def test_position_change_cancels_search(self):
+        service = self._service()
+        rows = _random_rows(random.Random(23), 14)
+        pending = asyncio.ensure_future(service.best_move("ROOM1", rows, "white", version=0))
+        await asyncio.sleep(0.05)
+        service.position_changed("ROOM1")
+        with self.assertRaises(HintCancelled):
+            await asyncio.wait_for(pending, timeout=2)
+
+    async def test_hint_in_process_mode(self):
+        service = self._service(mode="process", workers=1)
+        x, y = await asyncio.wait_for(
+            service.best_move("ROOM1", _empty_rows(), "white", version=0), timeout=60
+        )
+        self.assertEqual((x, y), (7, 7))
+
+
+def _counter_room():
+    return {"count": 0}
+
+
+def _increment(room):
+    room["count"] += 1
+    return room["count"]
+
+
+class RoomStoreContract:
+    def make_stores(self):
+        """Return two stores sharing one backend (as two processes would)."""
+        raise NotImplementedError
+
+    async def test_update_creates_reads_and_deletes(self):
+        store, _ = self.make_stores()
+        self.assertIsNone(await store.update("ROOM1", lambda room: room))
+        self.assertEqual(await store.update("ROOM1", _increment, factory=_counter_room), 1)
+        self.assertEqual(await store.get("ROOM1"), {"count": 1})
+        self.assertEqual((await store.online_counts())[1], 1)
+
+        await store.update("ROOM1", lambda room: room.clear())
+        self.assertIsNone(await store.get("ROOM1"))
+        self.assertEqual((await store.online_counts())[1], 0)
+
+    async def test_concurrent_updates_are_not_lost(self):
+        first, second = self.make_stores()
+        await asyncio.gather(*(
+            store.update("ROOM1", _increment, factory=_counter_room)
+            for _ in range(20)
+            for store in (first, second)
+        ))
+        self.assertEqual(await first.get("ROOM1"), {"count": 40})
+
+    async def test_connections_are_shared(self):
+        first, second = self.make_stores()
+        await first.add_connection("a")
+        await second.add_connection("b")
+        await second.remove_connection("a")
+        self.assertEqual((await first.online_counts())[0], 1)
+
+
+class MemoryRoomStoreTests(RoomStoreContract, SimpleTestCase):
+    def make_stores(self):
+        store = MemoryRoomStore()
+        return store, store
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class RedisRoomStoreTests(RoomStoreContract, SimpleTestCase):
+    def make_stores(self):
+        server = fakeredis.FakeServer()
+        return (
+            RedisRoomStore(fakeredis.FakeAsyncRedis(server=server)),
+            RedisRoomStore(fakeredis.FakeAsyncRedis(server=server)),
+        )
+
+    async def test_expired_rooms_and_connections_are_not_counted(self):
+        server = fakeredis.FakeServer()
+        crashed = RedisRoomStore(fakeredis.FakeAsyncRedis(server=server), room_ttl=60, connection_ttl=60)
+        live = RedisRoomStore(fakeredis.FakeAsyncRedis(server=server), room_ttl=3600)
+        await crashed.add_connection("gone")
+        await crashed.update("OLD", _increment, factory=_counter_room)
+        await live.add_connection("here")
+        await live.update("NEW", _increment, factory=_counter_room)
+        self.assertEqual(await live.online_counts(), (2, 2))
+
+        with mock.patch.object(room_store.time, "time", return_value=time.time() + 120):
+            await live.touch_connection("here")
+            await live.touch_connection("never-added")
+            self.assertEqual(await live.online_counts(), (1, 1))
+
+    async def test_connection_lease_defaults_to_minutes(self):
+        store = RedisRoomStore(fakeredis.FakeAsyncRedis())
+        await store.add_connection("idle")
+        with mock.patch.object(room_store.time, "time", return_value=time.time() + 3600):
+            self.assertEqual(await store.online_counts(), (0, 0))
+
+
+class GomokuConsumerTests(SimpleTestCase):
+    def setUp(self):
+        room_store._store = self.make_store()
+        self.addCleanup(setattr, room_store, "_store", None)
+
+    def make_store(self):
+        return MemoryRoomStore()
+
+    async def _join(self, room_id, name):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f"/ws/games/gomoku/{room_id}/?name={name}"
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        joined = await communicator.receive_json_from()
+        return communicator, joined
+
+    async def _receive(self, communicator, msg_type, event=None):
+        while True:
+            message = await communicator.receive_json_from()
+            if message["type"] == msg_type and (event is None or message["event"] == event):
+                return message
+
+    async def test_two_players_move_and_see_shared_state(self):
+        black, joined_black = await self._join("room1", "Ann")
+        white, joined_white = await self._join("room1", "Bo")
+        try:
+            self.assertEqual((joined_black["playerColor"], joined_white["playerColor"]), ("black", "white"))
+            snapshot = await self._receive(white, "room_state")
+            self.assertEqual(snapshot["status"], "playing")
+            self.assertEqual(snapshot["online"]["room"]["players"], 2)
+
+            delta = await self._receive(black, "room_delta", "player_joined")
+            delta = await self._receive(black, "room_delta", "player_joined")
+            self.assertEqual(delta["color"], "white")
+            self.assertEqual(delta["seq"], snapshot["seq"])
+            self.assertTrue(delta["reset"])
+            self.assertEqual(delta["online"]["room"]["players"], 2)
+            self.assertEqual(delta["online"]["global"], {"totalConnections": 2, "rooms": 1})
+
+            await black.send_json_to({"type": "move", "x": 7, "y": 7})
+            delta = await self._receive(white, "room_delta", "move")
+            self.assertEqual(delta["seq"], snapshot["seq"] + 1)
+            self.assertEqual((delta["x"], delta["y"], delta["color"]), (7, 7, "black"))
+            self.assertEqual(delta["turn"], "white")
+            self.assertNotIn("board", delta)
+
+            await white.send_json_to({"type": "move", "x": 7, "y": 7})
+            message = await self._receive(white, "error")
+            self.assertEqual(message["message"], "该位置已有棋子。")
+
+            await white.send_json_to({"type": "resync"})
+            snapshot = await self._receive(white, "room_state")
+            self.assertEqual(snapshot["reason"], "resync")
+            self.assertEqual(snapshot["seq"], delta["seq"])
+            self.assertEqual(snapshot["board"][7][7], 1)
+        finally:
+            await black.disconnect()
+        try:
+            delta = await self._receive(white, "room_delta", "player_left")
+            self.assertEqual(delta["color"], "black")
+            self.assertEqual(delta["status"], "waiting")
+        finally:
+            await white.disconnect()
+        self.assertIsNone(await room_store.get_room_store().get("ROOM1"))
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class GomokuConsumerRedisTests(GomokuConsumerTests):
+    def make_store(self):
+        return RedisRoomStore(fakeredis.FakeAsyncRedis())
+
+    async def test_idle_connection_is_kept_counted_by_the_heartbeat(self):
+        room_store._store = RedisRoomStore(fakeredis.FakeAsyncRedis(), connection_ttl=0.3)
+        spectator, _ = await self._join("room1", "Ann")
+        try:
+            # Several leases pass without a client message
+            await asyncio.sleep(1.0)
+            self.assertEqual((await room_store.get_room_store().online_counts())[0], 1)
+        finally:
+            await spectator.disconnect()
+        self.assertEqual(await room_store.get_room_store().online_counts(), (0, 0))
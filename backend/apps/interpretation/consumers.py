@@ -1,7 +1,8 @@
 """
 WebSocket Consumer for ASR and Translation
 
-Uses thread-safe queue polling to receive events from the ASR service.
+ASR SDK callbacks hand events to the consumer's event loop through an
+ASREventBridge; the consumer awaits them instead of polling.
 Supports both DashScope (default) and Groq (high-speed) providers.
 """
 
@@ -9,6 +10,8 @@ import asyncio
 import base64
 import json
 import logging
+import time
+from collections import deque
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 
@@ -18,6 +21,8 @@ from .services.translation_service import TranslationService
 from .services.tts_service import TTSService, TTSConfig
 from .services.groq_realtime_service import GroqRealtimeASRService, GroqTranslationService
 from .services.tingwu_service import TingwuTaskManager, TingwuRealtimeService
+from .services.pipeline import BatchPolicy, StagePipeline
+from .services.speculative import SpeculativeTranslator
 
 # Use common config
 from common.config import get_settings
@@ -31,7 +36,7 @@ class ASRConsumer(AsyncWebsocketConsumer):
     
     Flow:
     1. Client sends audio data
-    2. ASR service transcribes to text (via queue polling)
+    2. ASR service transcribes to text (events awaited via ASREventBridge)
     3. Translation service translates to target language
     4. TTS service synthesizes speech (optional)
     5. Results sent back to client
@@ -58,6 +63,9 @@ class ASRConsumer(AsyncWebsocketConsumer):
         self.provider = 'dashscope'  # 'dashscope', 'groq', or 'tingwu'
         self._running = False
         self._poll_task = None
+        self._pipeline = None  # Groq ASR -> translation -> TTS stages
+        self._speculator = None  # DashScope: translates interim text ahead of the final
+        self._event_latencies = deque(maxlen=5000)  # seconds from SDK callback to dispatch
 
     async def connect(self):
         """Handle WebSocket connection"""
@@ -72,7 +80,8 @@ class ASRConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
         logger.info(f"WebSocket disconnected: {self.channel_name}, code: {close_code}")
-        await self.stop_services()
+        # Nobody is left to receive results, so queued segments are dropped
+        await self.stop_services(drain=False)
 
     async def receive(self, text_data=None, bytes_data=None):
         """Handle incoming WebSocket messages"""
@@ -170,8 +179,10 @@ class ASRConsumer(AsyncWebsocketConsumer):
 
                 self._running = True
 
-                # Start event polling (same pattern as DashScope)
-                self._poll_task = asyncio.create_task(self._poll_tingwu_events())
+                # Forward events as they arrive (same pattern as DashScope)
+                self._poll_task = asyncio.create_task(
+                    self._forward_events(self.tingwu_service.events, 'Tingwu')
+                )
 
                 await self.send_json({
                     'type': 'started',
@@ -196,7 +207,7 @@ class ASRConsumer(AsyncWebsocketConsumer):
                 self.groq_asr_service = GroqRealtimeASRService(
                     language=self.source_lang,
                     model="whisper-large-v3",
-                    chunk_duration_s=4.0,  # Process every 4 seconds for better sentence detection
+                    chunk_duration_s=4.0,  # Fixed window if VAD chunking is off
                 )
                 
                 # Initialize Groq Translation service
@@ -208,6 +219,21 @@ class ASRConsumer(AsyncWebsocketConsumer):
                 
                 self._running = True
                 
+                # Transcription of chunk N+1 overlaps translation/TTS of chunk N;
+                # segments that pile up before translation go out as one request
+                translation = settings.translation
+                self._pipeline = StagePipeline([
+                    ('asr', self._groq_asr_stage),
+                    ('translate', self._groq_translate_stage, BatchPolicy(
+                        window_s=translation.batch_window_ms / 1000,
+                        max_items=max(1, translation.batch_max_segments),
+                        max_cost=translation.batch_max_tokens,
+                        cost=lambda text: len(text.encode()) / 4,  # rough token estimate
+                    )),
+                    ('tts', self._groq_tts_stage),
+                ], maxsize=4, name='groq')
+                self._pipeline.start()
+                
                 await self.send_json({
                     'type': 'started',
                     'message': 'Groq high-speed services started',
@@ -229,6 +255,16 @@ class ASRConsumer(AsyncWebsocketConsumer):
                     target_lang=self.target_lang
                 )
                 
+                # Opt-in: translate the stable part of interim text before the final arrives
+                speculative = config.get('speculative_translation', settings.asr.speculative_translation)
+                if speculative and self.translation_enabled:
+                    self._speculator = SpeculativeTranslator(
+                        self._translate_text,
+                        on_speculation=self._send_speculation,
+                        interval_s=settings.asr.speculative_interval_ms / 1000,
+                        min_chars=settings.asr.speculative_min_chars,
+                    )
+                
                 # Initialize TTS service if enabled
                 if self.tts_enabled:
                     tts_config = TTSConfig(
@@ -246,13 +282,13 @@ class ASRConsumer(AsyncWebsocketConsumer):
                     vad_silence_ms=settings.asr.vad_silence_ms,
                 )
                 
-                # Connect ASR (returns the event queue)
-                self.asr_service.connect()
+                # Connect ASR (returns the event bridge)
+                events = self.asr_service.connect()
                 
                 self._running = True
                 
-                # Start the event polling task
-                self._poll_task = asyncio.create_task(self._poll_asr_events())
+                # Start the event forwarding task
+                self._poll_task = asyncio.create_task(self._forward_events(events, 'ASR'))
                 
                 await self.send_json({
                     'type': 'started',
@@ -264,6 +300,7 @@ class ASRConsumer(AsyncWebsocketConsumer):
                         'tts_enabled': self.tts_enabled,
                         'tts_voice': self.tts_voice,
                         'provider': 'dashscope',
+                        'speculative_translation': self._speculator is not None,
                     }
                 })
                 
@@ -276,8 +313,12 @@ class ASRConsumer(AsyncWebsocketConsumer):
                 'message': f'Failed to start services: {str(e)}'
             })
 
-    async def stop_services(self):
-        """Stop ASR, translation, and TTS services"""
+    async def stop_services(self, drain=True):
+        """Stop ASR, translation, and TTS services
+
+        With ``drain``, segments already in the Groq pipeline are still
+        transcribed, translated and sent (for at most GROQ_STOP_DRAIN_S).
+        """
         self._running = False
         
         # Cancel the polling task
@@ -288,6 +329,22 @@ class ASRConsumer(AsyncWebsocketConsumer):
             except asyncio.CancelledError:
                 pass
             self._poll_task = None
+        self._log_event_latency()
+        
+        # Stop the Groq stage pipeline
+        if self._pipeline:
+            if drain and self.groq_asr_service:
+                # Speech the VAD has not closed yet (the speaker stopped mid-utterance)
+                for segment in self.groq_asr_service.flush_segments():
+                    await self._pipeline.submit(segment)
+            await self._pipeline.stop(drain=drain, timeout=get_settings().groq_chunking.stop_drain_s)
+            logger.info(f"Groq pipeline stats: {self._pipeline.stats()}")
+            self._pipeline = None
+        
+        if self._speculator:
+            logger.info(f"Speculative translation stats: {self._speculator.stats}")
+            self._speculator.close()
+            self._speculator = None
         
         # Disconnect DashScope ASR
         if self.asr_service:
@@ -376,83 +433,115 @@ class ASRConsumer(AsyncWebsocketConsumer):
 
         if self.provider == 'groq' and self.groq_asr_service:
             # === GROQ MODE: Chunk-based processing ===
-            result = await self.groq_asr_service.add_audio_async(audio_bytes)
-            
-            if result and result.text:
-                # Send transcription immediately
-                await self.send_json({
-                    'type': 'transcription',
-                    'text': result.text,
-                    'is_final': True,
-                })
-                
-                # Translate if enabled
-                if self.translation_enabled and self.groq_translation_service:
-                    trans_result = await self.groq_translation_service.translate_async(
-                        result.text,
-                        source_lang=self.source_lang,
-                        target_lang=self.target_lang
-                    )
-                    
-                    if trans_result.get("success"):
-                        await self.send_json({
-                            'type': 'translation',
-                            'original': trans_result['original_text'],
-                            'translated': trans_result['translated_text'],
-                            'target_lang': trans_result['target_lang'],
-                        })
-                    else:
-                        logger.error(f"Groq translation error: {trans_result.get('error')}")
+            # Only buffering happens here; the pipeline stages do the slow work.
+            # submit() waits while the ASR stage is backed up (backpressure).
+            for segment in self.groq_asr_service.take_segments(audio_bytes):
+                if self._pipeline:
+                    await self._pipeline.submit(segment)
                         
         elif self.asr_service:
             # === DASHSCOPE MODE: Stream-based processing ===
             loop = asyncio.get_running_loop()
             await loop.run_in_executor(None, self.asr_service.send_audio, audio_bytes)
 
-    async def _poll_asr_events(self):
-        """Poll the ASR event queue and process events"""
-        logger.info("Started ASR event polling")
+    async def _groq_asr_stage(self, segment):
+        """Pipeline stage: transcribe a segment and send it; returns text to translate"""
+        result = await self.groq_asr_service.transcribe_segment_async(segment)
+        if not result or not result.text:
+            return None
+        
+        await self.send_json({
+            'type': 'transcription',
+            'text': result.text,
+            'is_final': True,
+        })
+        
+        if self.translation_enabled and self.groq_translation_service:
+            return result.text
+        return None
+
+    async def _groq_translate_stage(self, texts):
+        """Pipeline stage (batched): translate transcribed texts, in order"""
+        if len(texts) == 1:
+            trans_results = [await self.groq_translation_service.translate_async(
+                texts[0],
+                source_lang=self.source_lang,
+                target_lang=self.target_lang
+            )]
+        else:
+            trans_results = await self.groq_translation_service.translate_batch_async(
+                texts,
+                source_lang=self.source_lang,
+                target_lang=self.target_lang
+            )
+        for i, trans_result in enumerate(trans_results):
+            if not trans_result.get("success"):
+                logger.error(f"Groq translation error: {trans_result.get('error')}")
+                trans_results[i] = None
+        return trans_results
+
+    async def _groq_tts_stage(self, trans_result):
+        """Pipeline stage: optionally synthesize speech, then send the translation"""
+        translation_msg = {
+            'type': 'translation',
+            'original': trans_result['original_text'],
+            'translated': trans_result['translated_text'],
+            'target_lang': trans_result['target_lang'],
+        }
         
-        while self._running:
+        if self.tts_enabled and self.tts_service and trans_result['translated_text'].strip():
             try:
-                # Get all pending events (non-blocking)
-                if self.asr_service:
-                    events = self.asr_service.get_all_events()
-                    
-                    for event in events:
-                        await self._handle_asr_event(event)
-                
-                # Small sleep to prevent busy-waiting
-                await asyncio.sleep(0.05)
-                
-            except asyncio.CancelledError:
-                logger.info("ASR event polling cancelled")
-                break
-            except Exception as e:
-                logger.error(f"Error in ASR event polling: {e}")
-                await asyncio.sleep(0.1)
+                tts_result = await self.tts_service.synthesize(
+                    text=trans_result['translated_text'],
+                    voice=self.tts_voice,
+                    language=self.target_lang,
+                )
+                if tts_result.get("success"):
+                    translation_msg['audio_url'] = tts_result.get("audio_url")
+                    translation_msg['audio_expires_at'] = tts_result.get("expires_at")
+                else:
+                    logger.warning(f"TTS synthesis failed: {tts_result.get('error')}")
+            except Exception as tts_error:
+                logger.error(f"TTS error (non-fatal): {tts_error}", exc_info=True)
         
-        logger.info("ASR event polling stopped")
-
-    async def _poll_tingwu_events(self):
-        """Poll the Tingwu event queue and process events."""
-        logger.info("Started Tingwu event polling")
+        await self.send_json(translation_msg)
+        return True
 
-        while self._running:
-            try:
-                if self.tingwu_service:
-                    events = self.tingwu_service.get_all_events()
-                    for event in events:
-                        await self._handle_asr_event(event)
-                await asyncio.sleep(0.05)
-            except asyncio.CancelledError:
-                logger.info("Tingwu event polling cancelled")
-                break
-            except Exception as e:
-                logger.error(f"Error in Tingwu event polling: {e}")
-                await asyncio.sleep(0.1)
+    async def _forward_events(self, events, name):
+        """Await events from an ASREventBridge and process them as they arrive"""
+        events.attach()
+        logger.info(f"Started {name} event forwarding")
+        
+        try:
+            while self._running:
+                event = await events.get()
+                if event is None:
+                    break  # the ASR service closed the stream
+                self._event_latencies.append(time.monotonic() - event.created_at)
+                try:
+                    await self._handle_asr_event(event)
+                except Exception as e:
+                    logger.error(f"Error in {name} event forwarding: {e}")
+        except asyncio.CancelledError:
+            logger.info(f"{name} event forwarding cancelled")
+        finally:
+            events.detach()
+        
+        logger.info(f"{name} event forwarding stopped")
 
-        logger.info("Tingwu event polling stopped")
+    def _log_event_latency(self):
+        """Log callback-to-dispatch latency of the session's ASR events"""
+        latencies = sorted(self._event_latencies)
+        self._event_latencies.clear()
+        if not latencies:
+            return
+        n = len(latencies)
+        logger.info(
+            f"ASR event latency over {n} events: "
+            f"p50={latencies[n // 2] * 1000:.2f}ms "
+            f"p95={latencies[min(n - 1, int(n * 0.95))] * 1000:.2f}ms "
+            f"max={latencies[-1] * 1000:.2f}ms"
+        )
 
     async def _handle_asr_event(self, event: ASREvent):
         """Handle an ASR event"""
@@ -484,10 +573,15 @@ class ASRConsumer(AsyncWebsocketConsumer):
                 'is_final': result.is_final,
             })
 
+            if self._speculator and not result.is_final:
+                self._speculator.on_partial(result.utterance or result.text)
+
             # Translate if enabled and is final result
             # Skip for Tingwu — it sends translation via separate TRANSLATION events
             if self.provider != 'tingwu' and self.translation_enabled and result.is_final and result.text.strip():
                 await self.translate_and_send(result.text)
+            elif self._speculator and result.is_final:
+                self._speculator.close()
 
         except Exception as e:
             logger.error(f"Error in on_transcription: {e}")
@@ -504,35 +598,53 @@ class ASRConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.error(f"Error in on_translation: {e}")
 
+    async def _translate_text(self, text):
+        """Translate with the session's TranslationService; returns the translated text"""
+        result = await self.translation_service.translate_async(
+            text,
+            source_lang='auto',
+            target_lang=self.target_lang
+        )
+        return result.translated_text
+
+    async def _send_speculation(self, original, translated):
+        """Send a provisional translation of the stable part of interim text"""
+        await self.send_json({
+            'type': 'translation_partial',
+            'original': original,
+            'translated': translated,
+            'target_lang': self.target_lang,
+        })
+
     async def translate_and_send(self, text):
         """Translate text, synthesize speech, and send results"""
         if not self.translation_service:
             return
         
         try:
-            result = await self.translation_service.translate_async(
-                text,
-                source_lang='auto',
-                target_lang=self.target_lang
-            )
+            if self._speculator:
+                # Reuses or extends the speculative translation when the text allows
+                translated = await self._speculator.finalize(text)
+            else:
+                translated = await self._translate_text(text)
             
             # Base translation message
             translation_msg = {
                 'type': 'translation',
-                'original': result.original_text,
-                'translated': result.translated_text,
-                'target_lang': result.target_lang,
+                'original': text,
+                'translated': translated,
+                'target_lang': self.target_lang,
             }
             
             # Log TTS status
-            logger.info(f"TTS check: enabled={self.tts_enabled}, service={self.tts_service is not None}, text='{result.translated_text[:50] if result.translated_text else ''}'")
+            logger.info(f"TTS check: enabled={self.tts_enabled}, service={self.tts_service is not None}, text='{translated[:50] if translated else ''}'")
             
             # Synthesize speech if TTS is enabled
-            if self.tts_enabled and self.tts_service and result.translated_text.strip():
+            if self.tts_enabled and self.tts_service and translated.strip():
                 try:
                     logger.info(f"Calling TTS with voice={self.tts_voice}, language={self.target_lang}")
                     tts_result = await self.tts_service.synthesize(
-                        text=result.translated_text,
+                        text=translated,
                         voice=self.tts_voice,
                         language=self.target_lang,
                     )
@@ -0,0 +1,90 @@
+"""Measure the local I/O cost of preparing ASR audio for upload.
+
+Compares the removed temp-file paths with the in-memory ones from
+common.utils.audio_buffer, stopping where the bytes would be handed to the
+provider client (no network):
+
+- realtime chunk: PCM → NamedTemporaryFile WAV → reopen → read, vs.
+  ``pcm_to_wav`` in memory;
+- upload: spool the request file to a directory → read it back, vs.
+  ``AudioUpload.from_django_file`` on an in-memory upload.
+
+Usage:
+    python manage.py audio_upload_benchmark
+    python manage.py audio_upload_benchmark --seconds 10 --iterations 500 --dir /path/on/media/disk
+"""
+import os
+import tempfile
+import time
+import uuid
+import wave
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+
+from common.utils.audio_buffer import AudioUpload, pcm_to_wav
+
+
+def _wav_tempfile(pcm, directory):
+    """The removed realtime path: write a WAV file, reopen it for the upload."""
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False, dir=directory) as tmp:
+        tmp_path = tmp.name
+        with wave.open(tmp, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(pcm)
+    with open(tmp_path, "rb") as f:
+        data = f.read()
+    os.unlink(tmp_path)
+    return data
+
+
+def _spooled_upload(upload, directory):
+    """The removed view path: copy the upload to disk, read it back for the client."""
+    upload.seek(0)
+    file_path = os.path.join(directory, f"{uuid.uuid4().hex}.wav")
+    with open(file_path, "wb+") as dest:
+        for chunk in upload.chunks():
+            dest.write(chunk)
+    with open(file_path, "rb") as f:
+        data = f.read()
+    os.unlink(file_path)
+    return data
+
+
+def _in_memory_upload(upload):
+    with AudioUpload.from_django_file(upload) as audio:
+        return audio.read()
+
+
+class Command(BaseCommand):
+    help = "Benchmark temp-file vs in-memory preparation of ASR uploads (µs per request)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=4.0, help="Audio length (default 4 s of 16 kHz PCM).")
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument("--dir", default=None, help="Directory for the temp-file cases (default: system temp).")
+
+    def handle(self, *args, **options):
+        pcm = os.urandom(int(16000 * 2 * options["seconds"]))
+        upload = SimpleUploadedFile("clip.wav", pcm_to_wav(pcm), content_type="audio/wav")
+        iterations = options["iterations"]
+        directory = options["dir"] or tempfile.gettempdir()
+
+        cases = {
+            "chunk: temp WAV (before)": lambda: _wav_tempfile(pcm, directory),
+            "chunk: pcm_to_wav": lambda: pcm_to_wav(pcm),
+            "upload: spool (before)": lambda: _spooled_upload(upload, directory),
+            "upload: AudioUpload": lambda: _in_memory_upload(upload),
+        }
+
+        self.stdout.write(f"{options['seconds']:.1f}s audio ({len(pcm) // 1024} KiB), {iterations} requests, dir={directory}")
+        self.stdout.write(f"{'case':<26} {'µs/request':>11}")
+        for name, prepare in cases.items():
+            prepare()  # warm caches
+            start = time.perf_counter()
+            for _ in range(iterations):
+                prepare()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{name:<26} {elapsed / iterations * 1e6:>11.1f}")
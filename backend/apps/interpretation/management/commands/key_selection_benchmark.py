@@ -0,0 +1,80 @@
+"""Measure the per-request cost of filtering the API key pool by cooldown.
+
+Compares the old one-file-per-key cooldowns with the cooldown stores used
+by common.utils.rate_scheduler, plus a full budget ``acquire`` for scale.
+
+Usage:
+    python manage.py key_selection_benchmark
+    python manage.py key_selection_benchmark --keys 100 --cooling 10 --iterations 5000
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from common.utils.cooldown_store import MemoryCooldownStore, MmapCooldownStore
+from common.utils.rate_scheduler import RateScheduler
+
+
+def _file_cooldowns(directory, keys, cooling):
+    """The removed implementation: exists + open + read per key per request."""
+    def path(key):
+        return os.path.join(directory, hashlib.sha256(key.encode()).hexdigest()[:12])
+
+    for key in cooling:
+        with open(path(key), "w") as f:
+            f.write(str(time.time() + 600))
+
+    def select():
+        available = []
+        for key in keys:
+            p = path(key)
+            if os.path.exists(p) and time.time() < float(open(p).read().strip()):
+                continue
+            available.append(key)
+        return available
+
+    return select
+
+
+class Command(BaseCommand):
+    help = "Benchmark cooldown filtering of the Groq/Cerebras key pools (µs per request)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keys", type=int, default=50, help="Pooled keys (default 50).")
+        parser.add_argument("--cooling", type=int, default=5, help="Keys in cooldown (default 5).")
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        keys = [f"gsk_benchmark_{i:04d}" for i in range(options["keys"])]
+        cooling = keys[: options["cooling"]]
+        iterations = options["iterations"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            schedulers = {
+                "memory store": RateScheduler(os.path.join(tmp, "m.sqlite3"), cooldowns=MemoryCooldownStore()),
+                "mmap store": RateScheduler(
+                    os.path.join(tmp, "s.sqlite3"), cooldowns=MmapCooldownStore(os.path.join(tmp, "cooldowns.bin")),
+                ),
+            }
+            cases = {"files (before)": _file_cooldowns(tmp, keys, cooling)}
+            for name, scheduler in schedulers.items():
+                for key in cooling:
+                    scheduler.mark_rate_limited("groq", key, 600)
+                cases[name] = lambda s=scheduler: s.cooling_down("groq", keys)
+            scheduler = schedulers["mmap store"]
+            cases["acquire (mmap + buckets)"] = lambda: scheduler.acquire(
+                "groq", "whisper-large-v3", keys, {"rpm": 10 ** 9}, max_wait=0,
+            )
+
+            self.stdout.write(f"{options['keys']} keys, {options['cooling']} cooling, {iterations} requests")
+            self.stdout.write(f"{'case':<26} {'µs/request':>11}")
+            for name, select in cases.items():
+                select()  # warm caches
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    select()
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{name:<26} {elapsed / iterations * 1e6:>11.1f}")
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileASRJob',
+            fields=[
+                ('task_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('task_type', models.CharField(choices=[('transcription', 'Transcription'), ('translation', 'Translation')], max_length=20)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('priority', models.SmallIntegerField(default=0, help_text='Lower runs first')),
+                ('file_path', models.CharField(max_length=500)),
+                ('model', models.CharField(max_length=100)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('progress', models.JSONField(blank=True, default=dict)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='interpretat_status_80a388_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class FileASRJob(models.Model):
+    """State of a file transcription/translation job run by services.file_asr_jobs."""
+
+    class TaskType(models.TextChoices):
+        TRANSCRIPTION = "transcription", "Transcription"
+        TRANSLATION = "translation", "Translation"
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        SUCCEEDED = "SUCCEEDED", "Succeeded"
+        FAILED = "FAILED", "Failed"
+
+    task_id = models.CharField(max_length=64, primary_key=True)
+    task_type = models.CharField(max_length=20, choices=TaskType.choices)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    priority = models.SmallIntegerField(default=0, help_text="Lower runs first")
+    file_path = models.CharField(max_length=500)
+    model = models.CharField(max_length=100)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error_message = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "updated_at"])]
+
+    def __str__(self):
+        return f"{self.task_id} {self.task_type} {self.status}"
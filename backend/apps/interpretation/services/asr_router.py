@@ -0,0 +1,311 @@
+"""
+Latency-aware routing between free-tier ASR providers.
+
+``_transcribe`` used to pick Groq Whisper or Qwen3-ASR statically
+(ASR_PROVIDER) and fell back only after the primary had failed outright,
+which for a hung Qwen3 server meant waiting out its 10 s timeout. The router
+keeps, per provider:
+
+- an EWMA of latency and of the error rate, plus a window of recent
+  latencies for the p95;
+- a circuit breaker: ASR_BREAKER_FAILURES consecutive failures open it for
+  ASR_BREAKER_COOLDOWN_S, after which one probe request is let through
+  (half-open) and its outcome closes or re-opens it.
+
+For each request the providers whose breaker admits it are ordered by
+preference (ASR_PROVIDER first), except that a provider whose expected time
+to a good answer (EWMA latency / success rate) is ASR_ROUTER_SWITCH_RATIO
+times worse than another's is moved behind it. With hedging on (ASR_HEDGE;
+off by default since every hedge also spends the secondary's quota), the
+secondary is fired when the primary has not answered by its p95 (clamped
+to ASR_HEDGE_MIN_S..ASR_HEDGE_MAX_S) and the first good result wins; the
+loser runs to completion in the background and its outcome is still recorded
+(so a hung provider still trips its breaker). The calls must therefore not
+depend on anything the caller tears down after the first result. Without
+hedging the providers are tried in order.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings as django_settings
+
+logger = logging.getLogger(__name__)
+
+# Samples a provider needs before its p95 / EWMA are trusted
+_MIN_SAMPLES = 5
+
+
+class AllProvidersFailed(Exception):
+    """Every ASR provider tried for a request raised; ``errors`` maps name → exception."""
+
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        detail = "; ".join(f"{name}: {error}" for name, error in errors.items())
+        super().__init__(f"All ASR providers failed ({detail})")
+
+
+class ProviderStats:
+    """Latency / error EWMAs, a p95 window and the circuit breaker of one provider."""
+
+    def __init__(self, name: str, alpha: float = 0.2, window: int = 100,
+                 breaker_failures: int = 3, breaker_cooldown: float = 30.0):
+        self.name = name
+        self.alpha = alpha
+        self.breaker_failures = max(1, breaker_failures)
+        self.breaker_cooldown = breaker_cooldown
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.samples = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.opened_until = 0.0  # breaker open while now < opened_until
+        self.probing = False  # a half-open probe is in flight
+        self._latencies: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def _observe_latency(self, elapsed: float) -> None:
+        self._latencies.append(elapsed)
+        self.samples += 1
+        if self.latency_ewma is None:
+            self.latency_ewma = elapsed
+        else:
+            self.latency_ewma += self.alpha * (elapsed - self.latency_ewma)
+
+    def record_success(self, elapsed: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self._observe_latency(elapsed)
+            self.error_ewma *= 1 - self.alpha
+            self.consecutive_failures = 0
+            if self.opened_until or self.probing:
+                logger.info(f"ASR breaker for {self.name} closed after a good probe")
+            self.opened_until = 0.0
+            self.probing = False
+
+    def record_failure(self, elapsed: float) -> None:
+        with self._lock:
+            self.requests += 1
+            # A failure took this long to find out, which is what a caller waits for
+            self._observe_latency(elapsed)
+            self.error_ewma += self.alpha * (1.0 - self.error_ewma)
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.probing or self.consecutive_failures >= self.breaker_failures:
+                self.opened_until = time.monotonic() + self.breaker_cooldown
+                logger.warning(
+                    f"ASR breaker for {self.name} open for {self.breaker_cooldown:.0f}s "
+                    f"after {self.consecutive_failures} consecutive failures"
+                )
+            self.probing = False
+
+    def admit(self) -> bool:
+        """Whether a request may go to this provider (claims the probe when half-open)."""
+        with self._lock:
+            if not self.opened_until:
+                return True
+            if time.monotonic() < self.opened_until or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def release(self) -> None:
+        """Give back a probe claimed by ``admit`` that was never sent."""
+        with self._lock:
+            self.probing = False
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < _MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def expected_latency(self) -> Optional[float]:
+        """EWMA latency divided by the success rate: expected time to a good answer."""
+        if self.samples < _MIN_SAMPLES or self.latency_ewma is None:
+            return None
+        return self.latency_ewma / max(0.05, 1.0 - self.error_ewma)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "latency_p95": round(p95, 3) if p95 is not None else None,
+            "error_rate": round(self.error_ewma, 4),
+            "breaker": "open" if self.opened_until > time.monotonic() else
+                       "half-open" if self.opened_until else "closed",
+        }
+
+
+class ASRRouter:
+    """Route a transcription across providers by preference, health and latency."""
+
+    def __init__(self, alpha: float = 0.2, window: int = 100, breaker_failures: int = 3,
+                 breaker_cooldown: float = 30.0, hedge: bool = True, hedge_min: float = 1.0,
+                 hedge_max: float = 4.0, switch_ratio: float = 2.0, workers: int = 16):
+        self.hedge = hedge
+        self.hedge_min = hedge_min
+        self.hedge_max = max(hedge_min, hedge_max)
+        self.switch_ratio = switch_ratio
+        self._stats_args = dict(alpha=alpha, window=window, breaker_failures=breaker_failures,
+                                breaker_cooldown=breaker_cooldown)
+        self._providers: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(2, workers), thread_name_prefix="asr-router")
+        self._counts = {"hedged": 0, "hedge_wins": 0, "fallbacks": 0}
+
+    def provider(self, name: str) -> ProviderStats:
+        with self._lock:
+            stats = self._providers.get(name)
+            if stats is None:
+                stats = self._providers[name] = ProviderStats(name, **self._stats_args)
+            return stats
+
+    def order(self, preference: Sequence[str]) -> List[str]:
+        """Admitted providers, best first; all of them if every breaker is open."""
+        admitted = [name for name in preference if self.provider(name).admit()]
+        if not admitted:
+            # Failing without trying anything is worse than a likely failure
+            return list(preference)
+        for i in range(len(admitted) - 1):
+            first, second = self.provider(admitted[i]), self.provider(admitted[i + 1])
+            slow, fast = first.expected_latency(), second.expected_latency()
+            if slow is not None and fast is not None and slow > self.switch_ratio * fast:
+                admitted[i], admitted[i + 1] = admitted[i + 1], admitted[i]
+        return admitted
+
+    def hedge_delay(self, name: str) -> float:
+        p95 = self.provider(name).p95()
+        if p95 is None:
+            return self.hedge_max
+        return min(self.hedge_max, max(self.hedge_min, p95))
+
+    def _call(self, name: str, fn: Callable[[], Any]) -> Any:
+        stats = self.provider(name)
+        t0 = time.monotonic()
+        try:
+            result = fn()
+        except Exception:
+            stats.record_failure(time.monotonic() - t0)
+            raise
+        stats.record_success(time.monotonic() - t0)
+        return result
+
+    def run(self, calls: Dict[str, Callable[[], Any]], preference: Sequence[str]) -> Tuple[str, Any]:
+        """Run ``calls[name]()`` on the routed providers; return ``(name, result)``.
+
+        Raises ``AllProvidersFailed`` when every provider tried has failed.
+        """
+        order = self.order([name for name in preference if name in calls])
+        if not order:
+            raise ValueError("No ASR provider to route to")
+        if self.hedge and len(order) > 1:
+            return self._run_hedged(calls, order)
+
+        errors: Dict[str, Exception] = {}
+        for i, name in enumerate(order):
+            try:
+                result = self._call(name, calls[name])
+            except Exception as e:
+                logger.warning(f"ASR provider {name} failed: {e}")
+                errors[name] = e
+                continue
+            if i:
+                self._count("fallbacks")
+            self._release(order[i + 1:])
+            return name, result
+        raise AllProvidersFailed(errors)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _release(self, names: Sequence[str]) -> None:
+        for name in names:
+            self.provider(name).release()
+
+    def _run_hedged(self, calls: Dict[str, Callable[[], Any]], order: List[str]) -> Tuple[str, Any]:
+        errors: Dict[str, Exception] = {}
+        pending: Dict[Future, str] = {}
+        queue = list(order)
+
+        def launch() -> None:
+            name = queue.pop(0)
+            pending[self._executor.submit(self._call, name, calls[name])] = name
+
+        launch()
+        hedge_at = time.monotonic() + self.hedge_delay(order[0])
+        try:
+            while pending:
+                timeout = max(0.0, hedge_at - time.monotonic()) if queue else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # The primary is past its p95: race the next provider against it
+                    self._count("hedged")
+                    logger.info(f"ASR hedge: {pending[next(iter(pending))]} slow, starting {queue[0]}")
+                    launch()
+                    hedge_at = float("inf")
+                    continue
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"ASR provider {name} failed: {e}")
+                        errors[name] = e
+                        continue
+                    if name != order[0]:
+                        self._count("fallbacks" if order[0] in errors else "hedge_wins")
+                    return name, result
+                if queue and not pending:
+                    # Everything started so far failed: move on without waiting for a hedge
+                    launch()
+            raise AllProvidersFailed(errors)
+        finally:
+            self._release(queue)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = dict(self._providers)
+            counts = dict(self._counts)
+        return {
+            **counts,
+            "hedge": self.hedge,
+            "providers": {name: stats.snapshot() for name, stats in providers.items()},
+        }
+
+
+_router: Optional[ASRRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_asr_router() -> ASRRouter:
+    """Process-wide router, configured from Django settings on first use."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ASRRouter(
+                    alpha=getattr(django_settings, "ASR_ROUTER_EWMA_ALPHA", 0.2),
+                    breaker_failures=getattr(django_settings, "ASR_BREAKER_FAILURES", 3),
+                    breaker_cooldown=getattr(django_settings, "ASR_BREAKER_COOLDOWN_S", 30.0),
+                    hedge=getattr(django_settings, "ASR_HEDGE", False),
+                    hedge_min=getattr(django_settings, "ASR_HEDGE_MIN_S", 1.0),
+                    hedge_max=getattr(django_settings, "ASR_HEDGE_MAX_S", 4.0),
+                    switch_ratio=getattr(django_settings, "ASR_ROUTER_SWITCH_RATIO", 2.0),
+                    workers=getattr(django_settings, "ASR_ROUTER_WORKERS", 16),
+                )
+    return _router
+
+
+def started_asr_router() -> Optional[ASRRouter]:
+    """The process-wide router if a request has already started it, else None."""
+    return _router
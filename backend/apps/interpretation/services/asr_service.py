@@ -1,17 +1,16 @@
 """
 Real-time ASR Service using DashScope Qwen-ASR-Realtime API
 
-This module uses a thread-safe queue to communicate between the DashScope SDK's
-synchronous callback thread and Django Channels' async consumer.
+This module hands events from the DashScope SDK's synchronous callback
+thread to Django Channels' async consumer through an ASREventBridge.
 """
 
-import asyncio
 import base64
 import logging
-import queue
 import threading
+import time
 from typing import Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 from dashscope.audio.qwen_omni import (
@@ -23,6 +22,8 @@ from dashscope.audio.qwen_omni.omni_realtime import TranscriptionParams
 
 from common.config import get_settings
 
+from .event_bridge import ASREventBridge
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -43,6 +44,8 @@ class ASREvent:
     """Event from ASR service"""
     event_type: ASREventType
     data: Any = None
+    # time.monotonic() when the SDK produced it, for event→socket latency
+    created_at: float = field(default_factory=time.monotonic)
 
 
 @dataclass
@@ -52,6 +55,8 @@ class TranscriptionResult:
     is_final: bool
     language: Optional[str] = None
     timestamp: Optional[float] = None
+    # Interim results: confirmed text + stash, i.e. the whole utterance so far
+    utterance: Optional[str] = None
 
 
 @dataclass
@@ -69,11 +74,11 @@ class ASRCallback(OmniRealtimeCallback):
     Callback handler for real-time ASR events.
     
     This callback is invoked from the SDK's websocket thread.
-    We use a thread-safe queue to pass events to the async consumer.
+    Events are handed to the async consumer through an ASREventBridge.
     """
 
-    def __init__(self, event_queue: queue.Queue):
-        self.event_queue = event_queue
+    def __init__(self, events: ASREventBridge):
+        self.events = events
         self.conversation: Optional[OmniRealtimeConversation] = None
 
         # Event handlers mapping
@@ -89,11 +94,8 @@ class ASRCallback(OmniRealtimeCallback):
         }
 
     def _put_event(self, event: ASREvent):
-        """Thread-safe method to put events in the queue"""
-        try:
-            self.event_queue.put_nowait(event)
-        except queue.Full:
-            logger.warning("Event queue full, dropping event")
+        """Thread-safe hand-off to the consumer"""
+        self.events.put(event)
 
     def on_open(self):
         """WebSocket connection opened"""
@@ -140,7 +142,9 @@ class ASRCallback(OmniRealtimeCallback):
         stash = response.get('stash', '')
         logger.debug(f"Intermediate transcription: {stash}")
         if stash:
-            result = TranscriptionResult(text=stash, is_final=False)
+            result = TranscriptionResult(
+                text=stash, is_final=False, utterance=response.get('text', '') + stash,
+            )
             self._put_event(ASREvent(ASREventType.TRANSCRIPTION, result))
 
     def _handle_speech_start(self, response: dict):
@@ -166,10 +170,10 @@ class ASRCallback(OmniRealtimeCallback):
 
 class RealtimeASRService:
     """
-    Real-time ASR Service wrapper with thread-safe event queue.
+    Real-time ASR Service wrapper with a thread-safe event bridge.
     
     This service runs the DashScope SDK in a separate thread and uses
-    a queue to communicate events back to the async consumer.
+    an ASREventBridge to deliver events to the async consumer.
     """
 
     def __init__(
@@ -200,17 +204,17 @@ class RealtimeASRService:
         self._is_connected = False
         self._lock = threading.Lock()
         
-        # Thread-safe queue for events (max 1000 events)
-        self.event_queue: queue.Queue = queue.Queue(maxsize=1000)
+        # Thread → asyncio event hand-off (max 1000 pending events)
+        self.events = ASREventBridge(maxsize=1000)
 
     def connect(self):
         """
         Connect to the ASR service and start a session.
         
-        Returns the event queue that consumers should poll for events.
+        Returns the event bridge; consumers attach to it and await events.
         """
-        # Create callback handler with queue
-        self.callback = ASRCallback(self.event_queue)
+        # Create callback handler with the bridge
+        self.callback = ASRCallback(self.events)
 
         # Create conversation instance
         self.conversation = OmniRealtimeConversation(
@@ -244,7 +248,7 @@ class RealtimeASRService:
         self._is_connected = True
         logger.info("ASR service connected and configured")
         
-        return self.event_queue
+        return self.events
 
     def send_audio(self, audio_data: bytes):
         """
@@ -264,7 +268,7 @@ class RealtimeASRService:
                 self.conversation.append_audio(audio_b64)
             except Exception as e:
                 logger.error(f"Error sending audio: {e}")
-                self.event_queue.put_nowait(ASREvent(ASREventType.ERROR, str(e)))
+                self.events.put(ASREvent(ASREventType.ERROR, str(e)))
 
     def commit_audio(self):
         """Manually commit audio buffer (only when VAD is disabled)"""
@@ -285,24 +289,15 @@ class RealtimeASRService:
                 self._is_connected = False
                 self.conversation = None
                 logger.info("ASR service disconnected")
+            self.events.close()
 
     def get_event(self, timeout: float = 0.1) -> Optional[ASREvent]:
-        """Get an event from the queue with timeout"""
-        try:
-            return self.event_queue.get(timeout=timeout)
-        except queue.Empty:
-            return None
+        """Get an event with timeout (when no loop is attached)"""
+        return self.events.get_event(timeout=timeout)
 
     def get_all_events(self) -> list:
-        """Get all pending events from the queue (non-blocking)"""
-        events = []
-        while True:
-            try:
-                event = self.event_queue.get_nowait()
-                events.append(event)
-            except queue.Empty:
-                break
-        return events
+        """Get all pending events (non-blocking)"""
+        return self.events.get_all_events()
 
     @property
     def is_connected(self) -> bool:
@@ -0,0 +1,139 @@
+"""
+Thread → asyncio hand-off for realtime ASR events.
+
+The DashScope and NLS SDKs call back on their own websocket threads. Those
+callbacks ``put()`` events here; once the consumer has attached its event
+loop, every event is scheduled onto an ``asyncio.Queue`` with
+``loop.call_soon_threadsafe`` and ``await bridge.get()`` wakes up as soon
+as it arrives — no polling interval. Events put before ``attach()`` (e.g.
+CONNECTED during ``connect()``) are buffered and handed over on attach.
+
+``close()`` ends the stream: events already handed over are still returned,
+then ``get()`` returns ``None`` (a pending ``get()`` wakes up), and later
+``put()`` calls are dropped.
+
+``get_all_events()`` keeps the old non-blocking drain for callers that
+never attach a loop.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_CLOSED = object()  # wakes a get() waiting when the bridge is closed
+
+
+class ASREventBridge:
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buffer: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._closed = False
+        self._close_pending = False  # close marker did not fit in the full queue
+        self._ended = False  # get() has returned everything before close()
+
+    def put(self, event: Any) -> None:
+        """Hand over an event; safe to call from any thread."""
+        with self._lock:
+            if self._closed:
+                logger.debug("ASR event after bridge closed, dropping")
+                return
+            loop, async_queue = self._loop, self._queue
+            if loop is None:
+                try:
+                    self._buffer.put_nowait(event)
+                except queue.Full:
+                    logger.warning("ASR event buffer full, dropping event")
+                return
+        try:
+            loop.call_soon_threadsafe(self._deliver, async_queue, event)
+        except RuntimeError:
+            # Loop already closed: the consumer is gone
+            logger.debug("ASR event after consumer loop closed, dropping")
+
+    def _deliver(self, async_queue: asyncio.Queue, event: Any) -> None:
+        try:
+            async_queue.put_nowait(event)
+        except asyncio.QueueFull:
+            if event is _CLOSED:
+                # No get() is waiting on a full queue; the last event ends the stream
+                self._close_pending = True
+            else:
+                logger.warning("ASR event queue full, dropping event")
+
+    def close(self) -> None:
+        """End the stream; safe to call from any thread, more than once."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, async_queue = self._loop, self._queue
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._deliver, async_queue, _CLOSED)
+        except RuntimeError:
+            pass
+
+    def attach(self) -> None:
+        """Deliver events to the running loop from now on (call from that loop)."""
+        async_queue: asyncio.Queue = asyncio.Queue(maxsize=self.maxsize)
+        with self._lock:
+            while True:
+                try:
+                    async_queue.put_nowait(self._buffer.get_nowait())
+                except (queue.Empty, asyncio.QueueFull):
+                    break
+            self._loop, self._queue = asyncio.get_running_loop(), async_queue
+            if self._closed:
+                self._deliver(async_queue, _CLOSED)
+
+    def detach(self) -> None:
+        """Go back to buffering; undelivered events stay readable via get_all_events."""
+        with self._lock:
+            async_queue, self._loop, self._queue = self._queue, None, None
+            while async_queue is not None and not async_queue.empty():
+                event = async_queue.get_nowait()
+                if event is _CLOSED:
+                    continue
+                try:
+                    self._buffer.put_nowait(event)
+                except queue.Full:
+                    break
+
+    async def get(self) -> Any:
+        """Wait for the next event (after ``attach()``); ``None`` once closed and drained."""
+        if self._ended:
+            return None
+        event = await self._queue.get()
+        if event is _CLOSED or (self._close_pending and self._queue.empty()):
+            self._ended = True
+        return None if event is _CLOSED else event
+
+    def get_event(self, timeout: float = 0.1) -> Optional[Any]:
+        """Blocking get for callers without a loop."""
+        try:
+            return self._buffer.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_all_events(self) -> List[Any]:
+        """Drain pending events without blocking (from the loop thread once attached)."""
+        events = []
+        while True:
+            try:
+                events.append(self._buffer.get_nowait())
+            except queue.Empty:
+                break
+        async_queue = self._queue
+        while async_queue is not None and not async_queue.empty():
+            event = async_queue.get_nowait()
+            if event is not _CLOSED:
+                events.append(event)
+        return events
@@ -0,0 +1,287 @@
+"""
+Bounded job runner for file ASR tasks.
+
+FileASRService.transcribe/translate record a ``FileASRJob`` row and hand the
+job to ``FileASRJobQueue``: a fixed set of worker threads (FILE_ASR_JOB_WORKERS)
+takes jobs from a priority queue, lowest ``priority`` first and FIFO within a
+priority, so a burst of uploads waits in line instead of starting one thread
+per file. At most FILE_ASR_JOB_QUEUE_MAX jobs wait; beyond that ``submit``
+raises ``QueueFull``.
+
+A failed run is retried up to FILE_ASR_JOB_MAX_ATTEMPTS times with a linear
+backoff, unless the error cannot get better by retrying (bad input, missing
+file or package, 4xx from the provider other than 408/429).
+
+The database row is the only state: status, attempts, progress and the final
+result, read by primary key in ``FileASRService.get_task_result``. While a
+process holds a job (queued, running or waiting for a retry) a heartbeat
+thread refreshes its ``updated_at`` every quarter of FILE_ASR_JOB_STALE_S,
+so only jobs left PENDING/RUNNING by a dead process go stale; those are
+marked FAILED, and rows finished more than FILE_ASR_JOB_RETENTION_HOURS ago
+are deleted. Both sweeps run at most every ``_CLEANUP_INTERVAL`` seconds
+from ``submit``. API keys are never stored, so jobs do not survive a
+restart.
+"""
+
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from django.conf import settings as django_settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ..models import FileASRJob
+
+logger = logging.getLogger(__name__)
+
+_CLEANUP_INTERVAL = 600.0
+
+# runner(task_id, file_path, api_key, model, task_type) -> result dict; raises on failure
+JobRunner = Callable[[str, str, str, str, str], Dict[str, Any]]
+
+
+class QueueFull(Exception):
+    """Raised by FileASRJobQueue.submit when too many jobs are already waiting."""
+
+
+@dataclass
+class _Job:
+    task_id: str
+    task_type: str
+    file_path: str
+    api_key: str
+    model: str
+    runner: JobRunner
+    priority: int = 0
+    attempts: int = 0
+
+
+def _update(task_id: str, **fields) -> None:
+    FileASRJob.objects.filter(pk=task_id).update(updated_at=timezone.now(), **fields)
+
+
+def update_progress(task_id: str, progress: Dict[str, int]) -> None:
+    """Record ``{completed, failed, total}`` for a RUNNING job."""
+    _update(task_id, progress=dict(progress))
+
+
+def discard_upload(file_path: str) -> None:
+    """Delete an uploaded file once no job needs it (only under MEDIA_ROOT/asr_uploads)."""
+    upload_dir = Path(django_settings.MEDIA_ROOT).resolve() / "asr_uploads"
+    path = Path(file_path).resolve()
+    if upload_dir not in path.parents:
+        return
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove upload {path}: {e}")
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (ImportError, FileNotFoundError, ValueError)):
+        return False
+    status_code = getattr(exc, "status_code", None)
+    if isinstance(status_code, int) and 400 <= status_code < 500:
+        return status_code in (408, 429)
+    return True
+
+
+def cleanup_jobs(retention_hours: Optional[float] = None, stale_s: Optional[float] = None) -> Dict[str, int]:
+    """Fail stale unfinished jobs and delete old finished ones."""
+    if retention_hours is None:
+        retention_hours = getattr(django_settings, "FILE_ASR_JOB_RETENTION_HOURS", 24.0)
+    if stale_s is None:
+        stale_s = getattr(django_settings, "FILE_ASR_JOB_STALE_S", 3600.0)
+    now = timezone.now()
+
+    stale = FileASRJob.objects.filter(
+        status__in=[FileASRJob.Status.PENDING, FileASRJob.Status.RUNNING],
+        updated_at__lt=now - timedelta(seconds=stale_s),
+    )
+    stale_paths: List[str] = list(stale.values_list("file_path", flat=True))
+    failed = stale.update(
+        status=FileASRJob.Status.FAILED,
+        error_message="Job interrupted (worker restarted)",
+        finished_at=now,
+        updated_at=now,
+    )
+    for path in stale_paths:
+        discard_upload(path)
+
+    deleted, _ = FileASRJob.objects.filter(finished_at__lt=now - timedelta(hours=retention_hours)).delete()
+    if failed or deleted:
+        logger.info(f"File ASR cleanup: {failed} stale jobs failed, {deleted} old jobs deleted")
+    return {"failed": failed, "deleted": deleted}
+
+
+class FileASRJobQueue:
+    """Fixed worker pool over a priority queue of file ASR jobs."""
+
+    def __init__(self, workers: int = 2, max_queued: int = 50, max_attempts: int = 3, retry_delay: float = 10.0,
+                 stale_s: float = 3600.0):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.heartbeat_interval = stale_s / 4
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._heartbeat: Optional[threading.Thread] = None
+        # task_ids this process still owns (queued, running or waiting to retry)
+        self._live: Set[str] = set()
+        self._last_cleanup = 0.0
+
+    def submit(self, task_id: str, task_type: str, file_path: str, api_key: str, model: str,
+               runner: JobRunner, priority: int = 0) -> None:
+        """Record the job as PENDING and queue it; raises QueueFull when the backlog is full."""
+        self._maybe_cleanup()
+        with self._lock:
+            if self._queue.qsize() >= self.max_queued:
+                raise QueueFull(f"{self._queue.qsize()} file ASR jobs already waiting, try again later")
+            self._start_workers()
+
+        FileASRJob.objects.create(
+            task_id=task_id,
+            task_type=task_type,
+            priority=priority,
+            file_path=file_path,
+            model=model,
+        )
+        with self._lock:
+            self._live.add(task_id)
+        self._put(_Job(task_id, task_type, file_path, api_key, model, runner, priority))
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def _put(self, job: _Job) -> None:
+        self._queue.put((job.priority, next(self._seq), job))
+
+    def _start_workers(self) -> None:
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, name=f"file-asr-job-{len(self._threads)}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        if self._heartbeat is None or not self._heartbeat.is_alive():
+            self._heartbeat = threading.Thread(target=self._beat, name="file-asr-job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def heartbeat(self) -> int:
+        """Mark every job this process still owns as alive; returns the rows touched."""
+        with self._lock:
+            live = list(self._live)
+        if not live:
+            return 0
+        return FileASRJob.objects.filter(
+            pk__in=live, status__in=[FileASRJob.Status.PENDING, FileASRJob.Status.RUNNING],
+        ).update(updated_at=timezone.now())
+
+    def _beat(self) -> None:
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"File ASR heartbeat failed: {e}")
+            finally:
+                close_old_connections()
+
+    def _finish(self, job: _Job) -> None:
+        with self._lock:
+            self._live.discard(job.task_id)
+        discard_upload(job.file_path)
+
+    def _maybe_cleanup(self) -> None:
+        now = time.monotonic()
+        if now - self._last_cleanup < _CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        try:
+            cleanup_jobs()
+        except Exception as e:
+            logger.error(f"File ASR cleanup failed: {e}")
+
+    def _work(self) -> None:
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                self._run(job)
+            except Exception:
+                logger.exception(f"File ASR job {job.task_id} crashed")
+                # No heartbeat from now on: the stale sweep fails the row
+                with self._lock:
+                    self._live.discard(job.task_id)
+            finally:
+                self._queue.task_done()
+                close_old_connections()
+
+    def _run(self, job: _Job) -> None:
+        job.attempts += 1
+        _update(job.task_id, status=FileASRJob.Status.RUNNING, attempts=job.attempts)
+        try:
+            result = job.runner(job.task_id, job.file_path, job.api_key, job.model, job.task_type)
+        except Exception as e:
+            if job.attempts < self.max_attempts and _is_retryable(e):
+                delay = self.retry_delay * job.attempts
+                logger.warning(
+                    f"File ASR job {job.task_id} attempt {job.attempts} failed ({e}); retrying in {delay:.0f}s"
+                )
+                _update(job.task_id, status=FileASRJob.Status.PENDING, error_message=str(e))
+                timer = threading.Timer(delay, self._put, args=(job,))
+                timer.daemon = True
+                timer.start()
+                return
+            logger.error(f"File ASR job {job.task_id} failed after {job.attempts} attempts: {e}")
+            _update(
+                job.task_id,
+                status=FileASRJob.Status.FAILED,
+                error_message=str(e),
+                finished_at=timezone.now(),
+            )
+            self._finish(job)
+            return
+
+        _update(
+            job.task_id,
+            status=FileASRJob.Status.SUCCEEDED,
+            result=result,
+            progress=result.get("progress") or {},
+            error_message="",
+            finished_at=timezone.now(),
+        )
+        self._finish(job)
+
+
+_job_queue: Optional[FileASRJobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> FileASRJobQueue:
+    """Process-wide job queue, configured from Django settings on first use."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = FileASRJobQueue(
+                    workers=getattr(django_settings, "FILE_ASR_JOB_WORKERS", 2),
+                    max_queued=getattr(django_settings, "FILE_ASR_JOB_QUEUE_MAX", 50),
+                    max_attempts=getattr(django_settings, "FILE_ASR_JOB_MAX_ATTEMPTS", 3),
+                    retry_delay=getattr(django_settings, "FILE_ASR_JOB_RETRY_DELAY_S", 10.0),
+                    stale_s=getattr(django_settings, "FILE_ASR_JOB_STALE_S", 3600.0),
+                )
+    return _job_queue
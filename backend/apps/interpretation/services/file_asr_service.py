@@ -1,137 +1,288 @@
 import os
 import logging
-import json
 import uuid
-import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
-from pathlib import Path
 from django.conf import settings as django_settings
 
+from common.utils.audio_buffer import decode_pcm, pcm_to_wav, probe_duration
+from common.utils.http_client import get_client
+
+from ..models import FileASRJob
+from .file_asr_jobs import QueueFull, discard_upload, get_job_queue, update_progress
+from .vad import merge_overlap_text, plan_segments
+
 try:
-    from groq import Groq
+    from groq import Groq, RateLimitError as GroqRateLimitError
 except ImportError:
     Groq = None
+    GroqRateLimitError = None
 
 logger = logging.getLogger(__name__)
 
+_GROQ_BASE_URL = "https://api.groq.com"
+# Long-audio mode: attempts per segment, and how long one may queue for key budget
+_SEGMENT_ATTEMPTS = 4
+_SEGMENT_MAX_WAIT = 60.0
+# Stands in for a long-audio segment that could not be transcribed
+_GAP_MARK = "[...]"
+# Queue priority grows by one per this many bytes (smaller files run first), capped at 9
+_PRIORITY_BYTES = 10 * 1024 * 1024
+
+
+def _is_cjk(char: str) -> bool:
+    return "\u3000" <= char <= "\u9fff" or "\uff00" <= char <= "\uffef"
+
+
+def _stitch_texts(texts: List[Optional[str]]) -> str:
+    """Join segment texts in order, dropping words repeated by the overlap.
+
+    A None text (a failed segment) leaves ``_GAP_MARK`` in its place, and the
+    segments either side of it are not merged.
+    """
+    merged = ""
+    for text in texts:
+        if text is None:
+            if not merged.endswith(_GAP_MARK):
+                merged += (" " if merged else "") + _GAP_MARK
+            continue
+        text = text.strip()
+        if not merged.endswith(_GAP_MARK):
+            text = merge_overlap_text(merged, text, max_words=8)
+        if not text:
+            continue
+        if merged and not (_is_cjk(merged[-1]) and _is_cjk(text[0])):
+            merged += " "
+        merged += text
+    return merged
+
+
 class FileASRService:
     """Service for handling File ASR/Translation tasks using Groq API."""
-    
+
     @staticmethod
-    def _run_groq_transcription(task_id: str, file_path: str, api_key: str, model: str):
-        """Background worker for Groq transcription"""
-        upload_dir = Path(django_settings.MEDIA_ROOT) / 'asr_results'
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        result_path = upload_dir / f"{task_id}.json"
-        
+    def _groq_audio_api(api_key: str, task_type: str):
+        client = Groq(api_key=api_key, http_client=get_client(_GROQ_BASE_URL))
+        return client.audio.transcriptions if task_type == "transcription" else client.audio.translations
+
+    @staticmethod
+    def _long_audio_duration(file_path: str) -> Optional[float]:
+        """Length in seconds if the file is long enough to split, else None (read from the header)."""
         try:
-            if not Groq:
-                raise ImportError("groq package not installed")
+            duration = probe_duration(file_path)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not probe {file_path} for long-audio mode: {e}")
+            return None
+        if duration is None or duration <= getattr(django_settings, 'FILE_ASR_LONG_AUDIO_S', 300.0):
+            return None
+        return duration
 
-            client = Groq(api_key=api_key)
-            
-            logger.info(f"Starting Groq transcription for task {task_id}, file: {file_path}")
-            
-            with open(file_path, "rb") as file:
-                # Call Groq API
-                transcription = client.audio.transcriptions.create(
-                  file=(os.path.basename(file_path), file.read()),
-                  model=model,
-                  response_format="json",
-                  temperature=0.0
+    @staticmethod
+    def _read_window(file_path: str, start: float, length: float) -> bytes:
+        """16 kHz PCM of one stretch of the file (empty if it cannot be decoded)."""
+        try:
+            decoded = decode_pcm(file_path, start=start, duration=length, timeout=60)
+        except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not decode {file_path} at {start:.0f}s: {e}")
+            return b""
+        return decoded[0] if decoded is not None and decoded[1] == 16000 else b""
+
+    @staticmethod
+    def _transcribe_segment(task_type: str, file_path: str, start: float, end: float, name: str,
+                            model: str, keys: List[str], preferred: Optional[str]) -> str:
+        """Decode one segment and send it on the pooled key with the most budget, retrying on 429."""
+        from .groq_key_pool import acquire_key, mark_key_rate_limited
+
+        decoded = decode_pcm(file_path, start=start, duration=end - start, timeout=120)
+        if decoded is None:
+            raise ValueError(f"{name}: cannot decode {file_path}")
+        audio = pcm_to_wav(*decoded)
+        del decoded
+
+        for attempt in range(_SEGMENT_ATTEMPTS):
+            key = acquire_key(model, keys, preferred_key=preferred, max_wait=_SEGMENT_MAX_WAIT)
+            try:
+                response = FileASRService._groq_audio_api(key, task_type).create(
+                    file=(name, audio),
+                    model=model,
+                    response_format="json",
+                    temperature=0.0
                 )
-            
-            text = transcription.text
-            logger.info(f"Groq transcription completed for {task_id}")
-            
-            result_data = {
-                "task_id": task_id,
-                "status": "SUCCEEDED",
-                "task_type": "transcription",
-                "full_text": text,
-                "results": [{
-                    "file_url": "local",
-                    "transcription_url": None,
-                    "text": text,
-                    "status": "SUCCEEDED"
-                }]
+                return response.text.strip()
+            except Exception as e:
+                if GroqRateLimitError and isinstance(e, GroqRateLimitError):
+                    logger.warning(f"{name}: key {key[:8]}… rate-limited (attempt {attempt + 1})")
+                    mark_key_rate_limited(key)
+                    continue
+                raise
+        raise RuntimeError(f"{name}: still rate-limited after {_SEGMENT_ATTEMPTS} attempts")
+
+    @staticmethod
+    def _run_long_audio(task_id: str, task_type: str, file_path: str, duration: float,
+                        api_key: str, model: str) -> Dict[str, Any]:
+        """Split on silence, transcribe segments in parallel across the key pool, stitch.
+
+        Only the search window around each cut and the segments in flight
+        are decoded, so memory stays bounded by the worker count. Failed
+        segments are marked in the text and listed in ``failed_ranges``; the
+        job only fails if every segment did.
+        """
+        from .groq_key_pool import get_available_keys
+
+        ranges = plan_segments(
+            duration,
+            lambda start, length: FileASRService._read_window(file_path, start, length),
+            target_s=getattr(django_settings, 'FILE_ASR_SEGMENT_S', 120.0),
+            overlap_s=getattr(django_settings, 'FILE_ASR_OVERLAP_S', 1.0),
+        )
+        keys = get_available_keys(preferred_key=api_key) or [api_key]
+        workers = max(1, min(len(keys), len(ranges), getattr(django_settings, 'FILE_ASR_MAX_WORKERS', 8)))
+        logger.info(
+            f"Long-audio {task_type} {task_id}: {duration:.0f}s in "
+            f"{len(ranges)} segments, {workers} workers over {len(keys)} keys"
+        )
+
+        progress = {"completed": 0, "failed": 0, "total": len(ranges)}
+        update_progress(task_id, progress)
+
+        texts: List[Optional[str]] = [None] * len(ranges)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"file-asr-{task_id[-6:]}") as pool:
+            futures = {
+                pool.submit(
+                    FileASRService._transcribe_segment,
+                    task_type,
+                    file_path,
+                    start,
+                    end,
+                    f"segment-{i:04d}.wav",
+                    model,
+                    keys,
+                    api_key,
+                ): i
+                for i, (start, end) in enumerate(ranges)
             }
-            
-            with open(result_path, "w") as f:
-                json.dump(result_data, f)
-                
-        except Exception as e:
-            logger.error(f"Groq transcription failed for {task_id}: {e}")
-            error_data = {
-                "task_id": task_id,
-                "status": "FAILED",
-                "task_type": "transcription",
-                "message": str(e),
-                "error_message": str(e)
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    texts[i] = future.result()
+                    progress["completed"] += 1
+                except Exception as e:
+                    logger.error(f"Long-audio {task_id} segment {i} failed: {e}")
+                    progress["failed"] += 1
+                update_progress(task_id, progress)
+
+        if progress["completed"] == 0:
+            raise RuntimeError(f"All {len(ranges)} segments failed")
+
+        segments = [
+            {
+                "start": round(start, 2),
+                "end": round(end, 2),
+                "text": text or "",
+                "status": "SUCCEEDED" if text is not None else "FAILED",
             }
-            with open(result_path, "w") as f:
-                json.dump(error_data, f)
+            for (start, end), text in zip(ranges, texts)
+        ]
+        failed_ranges = [[segment["start"], segment["end"]] for segment in segments if segment["status"] == "FAILED"]
+        if failed_ranges:
+            logger.warning(f"Long-audio {task_id}: no text for {failed_ranges} (seconds)")
+        return {
+            "full_text": _stitch_texts(texts),
+            "segments": segments,
+            "failed_ranges": failed_ranges,
+            "progress": progress,
+        }
 
     @staticmethod
-    def _run_groq_translation(task_id: str, file_path: str, api_key: str, model: str):
-        """Background worker for Groq translation (audio -> English)"""
-        upload_dir = Path(django_settings.MEDIA_ROOT) / 'asr_results'
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        result_path = upload_dir / f"{task_id}.json"
-        
-        try:
-            if not Groq:
-                raise ImportError("groq package not installed")
+    def _run_groq_task(task_id: str, file_path: str, api_key: str, model: str, task_type: str) -> Dict[str, Any]:
+        """Job runner for Groq transcription / translation (audio -> English).
+
+        Returns the SUCCEEDED result; exceptions propagate to the job queue,
+        which retries or marks the job FAILED.
+        """
+        url_field = "transcription_url" if task_type == "transcription" else "translation_url"
+        if not Groq:
+            raise ImportError("groq package not installed")
+
+        duration = FileASRService._long_audio_duration(file_path)
+        if duration is not None:
+            # Long recordings: parallel segments (also keeps each request under Groq's size limit)
+            outcome = FileASRService._run_long_audio(task_id, task_type, file_path, duration, api_key, model)
+            text = outcome["full_text"]
+            extra = {key: outcome[key] for key in ("segments", "failed_ranges", "progress")}
+            if outcome["failed_ranges"]:
+                extra["warning"] = (
+                    f"{len(outcome['failed_ranges'])} of {len(outcome['segments'])} segments could not be "
+                    f"transcribed and are marked {_GAP_MARK} in the text"
+                )
+        else:
+            logger.info(f"Starting Groq {task_type} for task {task_id}, file: {file_path}")
 
-            client = Groq(api_key=api_key)
-            
-            logger.info(f"Starting Groq translation for task {task_id}, file: {file_path}")
-            
             with open(file_path, "rb") as file:
-                # Call Groq Translation API (outputs English)
-                translation = client.audio.translations.create(
-                  file=(os.path.basename(file_path), file.read()),
+                response = FileASRService._groq_audio_api(api_key, task_type).create(
+                  file=(os.path.basename(file_path), file),
                   model=model,
                   response_format="json",
                   temperature=0.0
                 )
-            
-            text = translation.text
-            logger.info(f"Groq translation completed for {task_id}")
-            
-            result_data = {
-                "task_id": task_id,
-                "status": "SUCCEEDED",
-                "task_type": "translation",
-                "full_text": text,
-                "results": [{
-                    "file_url": "local",
-                    "translation_url": None,
-                    "text": text,
-                    "status": "SUCCEEDED"
-                }]
-            }
-            
-            with open(result_path, "w") as f:
-                json.dump(result_data, f)
-                
-        except Exception as e:
-            logger.error(f"Groq translation failed for {task_id}: {e}")
-            error_data = {
-                "task_id": task_id,
-                "status": "FAILED",
-                "task_type": "translation",
-                "message": str(e),
-                "error_message": str(e)
-            }
-            with open(result_path, "w") as f:
-                json.dump(error_data, f)
+            text = response.text
+            extra = {}
+
+        logger.info(f"Groq {task_type} completed for {task_id}")
+
+        return {
+            "task_id": task_id,
+            "status": "SUCCEEDED",
+            "task_type": task_type,
+            "full_text": text,
+            "results": [{
+                "file_url": "local",
+                url_field: None,
+                "text": text,
+                "status": "SUCCEEDED"
+            }],
+            **extra,
+        }
 
     @staticmethod
-    def transcribe(file_path: str, api_key: str = None, model: str = None) -> Dict[str, Any]:
+    def _submit(task_id: str, task_type: str, file_path: str, api_key: str, model: str,
+                priority: Optional[int]) -> Dict[str, Any]:
+        """Queue a job; smaller files get a lower (sooner) priority unless one is given."""
+        if priority is None:
+            try:
+                priority = min(9, os.path.getsize(file_path) // _PRIORITY_BYTES)
+            except OSError:
+                priority = 0
+        try:
+            get_job_queue().submit(
+                task_id, task_type, file_path, api_key, model,
+                runner=FileASRService._run_groq_task, priority=priority,
+            )
+        except QueueFull as e:
+            logger.warning(f"Rejected {task_type} upload {file_path}: {e}")
+            discard_upload(file_path)
+            return {"success": False, "busy": True, "error_message": str(e)}
+        return {
+            "success": True,
+            "task_id": task_id,
+            "task_type": task_type,
+            "status": "PENDING"
+        }
+
+    @staticmethod
+    def transcribe(file_path: str, api_key: str = None, model: str = None,
+                   priority: Optional[int] = None) -> Dict[str, Any]:
         """
-        Submit file for transcription using Groq API (Async via Thread).
+        Submit file for transcription using Groq API (Async via the job queue).
         Returns text in the original language.
+
+        Files longer than FILE_ASR_LONG_AUDIO_S are split on silence and
+        transcribed in parallel across the Groq key pool; progress is
+        reported by get_task_result while the task is RUNNING.
+
+        Returns ``busy: True`` (and removes the upload) when the job queue
+        is full; *priority* overrides the size-based default (lower first).
         """
         # Default to configured key or env
         from common.config import get_settings
@@ -147,26 +298,15 @@ class FileASRService:
         # Create Task ID
         task_id = f"groq-trans-{uuid.uuid4().hex}"
         
-        # Start background thread
-        thread = threading.Thread(
-            target=FileASRService._run_groq_transcription,
-            args=(task_id, file_path, api_key, model)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        return {
-            "success": True,
-            "task_id": task_id,
-            "task_type": "transcription",
-            "status": "PENDING"
-        }
+        # Queue on the bounded job runner (file_asr_jobs)
+        return FileASRService._submit(task_id, "transcription", file_path, api_key, model, priority)
 
     @staticmethod
-    def translate(file_path: str, api_key: str = None, model: str = None) -> Dict[str, Any]:
+    def translate(file_path: str, api_key: str = None, model: str = None,
+                  priority: Optional[int] = None) -> Dict[str, Any]:
         """
-        Submit file for translation using Groq API (Async via Thread).
-        Translates audio into English.
+        Submit file for translation using Groq API (Async via the job queue).
+        Translates audio into English. Long files are split like transcribe().
         """
         # Default to configured key or env
         from common.config import get_settings
@@ -182,45 +322,59 @@ class FileASRService:
         # Create Task ID
         task_id = f"groq-transl-{uuid.uuid4().hex}"
         
-        # Start background thread
-        thread = threading.Thread(
-            target=FileASRService._run_groq_translation,
-            args=(task_id, file_path, api_key, model)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        return {
-            "success": True,
-            "task_id": task_id,
-            "task_type": "translation",
-            "status": "PENDING"
-        }
+        # Queue on the bounded job runner (file_asr_jobs)
+        return FileASRService._submit(task_id, "translation", file_path, api_key, model, priority)
 
     @staticmethod
     def get_task_result(task_id: str, api_key: str = None) -> Dict[str, Any]:
         """
-        Check task status by reading the local result file.
+        Check task status from its FileASRJob row (primary-key lookup).
+
+        Status is PENDING, RUNNING (long-audio mode, with
+        ``progress: {completed, failed, total, percent}``), SUCCEEDED or FAILED.
         """
         try:
-            upload_dir = Path(django_settings.MEDIA_ROOT) / 'asr_results'
-            result_path = upload_dir / f"{task_id}.json"
-            
-            if not result_path.exists():
+            job = FileASRJob.objects.filter(pk=task_id).values(
+                "task_type", "status", "attempts", "progress", "result", "error_message"
+            ).first()
+
+            if job is None:
                 return {
-                    "success": True,
+                    "success": False,
                     "task_id": task_id,
-                    "status": "PENDING"
+                    "error_message": "Unknown or expired task_id"
                 }
-            
-            with open(result_path, "r") as f:
-                data = json.load(f)
-                
+
+            if job["status"] == FileASRJob.Status.SUCCEEDED:
+                data = dict(job["result"])
+            elif job["status"] == FileASRJob.Status.FAILED:
+                data = {
+                    "task_id": task_id,
+                    "status": job["status"],
+                    "task_type": job["task_type"],
+                    "message": job["error_message"],
+                    "error_message": job["error_message"]
+                }
+            else:
+                data = {
+                    "task_id": task_id,
+                    "status": job["status"],
+                    "task_type": job["task_type"],
+                    "attempts": job["attempts"]
+                }
+                if job["progress"]:
+                    data["progress"] = job["progress"]
+
+            progress = data.get("progress")
+            if progress and progress.get("total"):
+                done = progress["completed"] + progress["failed"]
+                progress["percent"] = round(100.0 * done / progress["total"], 1)
+
             return {
                 "success": True,
                 **data
             }
-                
+
         except Exception as e:
             logger.error(f"Task result fetch exception: {e}")
             return {"success": False, "error_message": str(e)}
@@ -1,29 +1,35 @@
-"""Groq API key pool with per-key cooldown and round-robin rotation.
+"""Groq API key pool with per-key budgets and cooldown.
 
 All user keys (decrypted via EncryptedCharField) + server env key are
-pooled together.  When a key gets 429'd, it enters a 60-second cooldown
-persisted as a temp file so all gunicorn workers see it.
+pooled together.  ``acquire_key`` picks the key with the most request
+headroom for a model (see common.utils.rate_scheduler); when a key still
+gets 429'd, it enters a 60-second cooldown.  Both are shared by all
+gunicorn workers through the scheduler's database.
 """
 
 from __future__ import annotations
 
-import hashlib
 import io
 import logging
-import os
-import tempfile
 import threading
 import time
 import wave
 
 from django.conf import settings as django_settings
 
+from common.utils.rate_scheduler import get_scheduler
+
 logger = logging.getLogger(__name__)
 
 # ── Pool config ──
 _POOL_CACHE_TTL = 300  # seconds between DB refreshes
 _KEY_COOLDOWN_SECS = 60
-_COOLDOWN_DIR = os.path.join(tempfile.gettempdir(), "groq_cooldown", "keys")
+
+# Per-key limits of the Groq free tier (tpm None: not token-metered)
+GROQ_MODEL_RATE_LIMITS = {
+    "whisper-large-v3": {"rpm": 20, "tpm": None},
+    "whisper-large-v3-turbo": {"rpm": 20, "tpm": None},
+}
 
 # ── Thread-safe cache ──
 _lock = threading.Lock()
@@ -71,36 +77,11 @@ def _refresh_pool() -> list[str]:
         return _pool_cache
 
 
-def _key_hash(key: str) -> str:
-    return hashlib.sha256(key.encode()).hexdigest()[:12]
-
-
-def _cooldown_path(key: str) -> str:
-    return os.path.join(_COOLDOWN_DIR, _key_hash(key))
-
-
-def _is_cooled_down(key: str) -> bool:
-    """Return True if this key is in cooldown (should be skipped)."""
-    try:
-        path = _cooldown_path(key)
-        if not os.path.exists(path):
-            return False
-        expiry = float(open(path).read().strip())
-        return time.time() < expiry
-    except (ValueError, OSError):
-        return False
-
-
 def mark_key_rate_limited(key: str) -> None:
-    """Record a cooldown timestamp for a rate-limited key."""
-    try:
-        os.makedirs(_COOLDOWN_DIR, exist_ok=True)
-        with open(_cooldown_path(key), "w") as f:
-            f.write(str(time.time() + _KEY_COOLDOWN_SECS))
-        logger.info("Groq key %s…%s marked rate-limited for %ds",
-                     key[:8], key[-4:], _KEY_COOLDOWN_SECS)
-    except OSError:
-        pass
+    """Put a rate-limited key into cooldown for every worker."""
+    get_scheduler().mark_rate_limited("groq", key, _KEY_COOLDOWN_SECS)
+    logger.info("Groq key %s…%s marked rate-limited for %ds",
+                key[:8], key[-4:], _KEY_COOLDOWN_SECS)
 
 
 def get_available_keys(preferred_key: str | None = None) -> list[str]:
@@ -109,13 +90,15 @@ def get_available_keys(preferred_key: str | None = None) -> list[str]:
     ``preferred_key`` (the user's own key) is placed first if available.
     """
     all_keys = _refresh_pool()
-    available = [k for k in all_keys if not _is_cooled_down(k)]
+    candidates = all_keys + [preferred_key] if preferred_key else all_keys
+    cooling = set(get_scheduler().cooling_down("groq", candidates))
+    available = [k for k in all_keys if k not in cooling]
 
     if preferred_key:
         # Ensure preferred key is first, even if not in pool (user just set it)
         if preferred_key in available:
             available.remove(preferred_key)
-        elif not _is_cooled_down(preferred_key):
+        elif preferred_key not in cooling:
             pass  # will be prepended below
         else:
             # preferred key is cooled down; don't prepend
@@ -132,6 +115,22 @@ def get_available_keys(preferred_key: str | None = None) -> list[str]:
     return available
 
 
+def acquire_key(
+    model: str,
+    keys: list[str],
+    preferred_key: str | None = None,
+    max_wait: float | None = None,
+) -> str:
+    """Reserve one ``model`` request on the key in ``keys`` with the most headroom.
+
+    Raises ``RateLimitExhausted`` when every key is out of budget.
+    """
+    limits = GROQ_MODEL_RATE_LIMITS.get(model, {})
+    return get_scheduler().acquire(
+        "groq", model, keys, limits, preferred=preferred_key, max_wait=max_wait,
+    )
+
+
 # ── Probe: send silent WAV to Whisper to detect rate limiting ──
 
 def _make_silent_wav() -> bytes:
@@ -193,7 +192,8 @@ def find_working_key(exclude_key: str | None = None, max_probes: int = 5) -> str
     Skips cooled-down keys, probes up to ``max_probes`` candidates.
     """
     all_keys = _refresh_pool()
-    candidates = [k for k in all_keys if k != exclude_key and not _is_cooled_down(k)]
+    cooling = set(get_scheduler().cooling_down("groq", all_keys))
+    candidates = [k for k in all_keys if k != exclude_key and k not in cooling]
 
     for key in candidates[:max_probes]:
         if probe_key(key):
@@ -2,15 +2,16 @@
 Groq-based Real-time ASR Service
 
 Uses Groq's Whisper API for high-speed transcription.
-Audio is collected in chunks and sent for processing.
+Audio is cut into segments on pauses (client-side VAD, see vad.py) or, as a
+fallback, fixed windows, and each segment is sent for processing.
 """
 
 import os
+import re
+import json
 import logging
-import tempfile
-import wave
 import asyncio
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 
 try:
@@ -19,9 +20,16 @@ except ImportError:
     openai = None
 
 from common.config import get_settings
+from common.utils.audio_buffer import pcm_to_wav
+from common.utils.http_client import get_client
+from common.utils.translation_cache import cached_translation, get_translation_cache
+
+from .vad import AudioSegment, EnergyVAD, VADSegmenter, merge_overlap_text, np
 
 logger = logging.getLogger(__name__)
 
+_GROQ_OPENAI_URL = "https://api.groq.com/openai/v1"
+
 
 @dataclass
 class GroqTranscriptionResult:
@@ -44,7 +52,8 @@ class GroqRealtimeASRService:
         language: str = "en",
         model: str = "whisper-large-v3",
         sample_rate: int = 16000,
-        chunk_duration_s: float = 4.0,  # Send audio every N seconds (longer = better sentence detection)
+        chunk_duration_s: float = 4.0,  # Fixed window when VAD chunking is off
+        vad_enabled: Optional[bool] = None,  # Default from settings.groq_chunking
     ):
         settings = get_settings()
         
@@ -60,12 +69,31 @@ class GroqRealtimeASRService:
         self._audio_buffer = bytearray()
         self._min_chunk_bytes = int(sample_rate * chunk_duration_s * self.sample_width)
         
+        # Pause-based segmentation (falls back to fixed windows without numpy)
+        chunking = settings.groq_chunking
+        if vad_enabled is None:
+            vad_enabled = chunking.vad_enabled
+        self._segmenter = None
+        if vad_enabled and np is not None:
+            self._segmenter = VADSegmenter(
+                EnergyVAD(sample_rate=sample_rate, energy_threshold=chunking.energy_threshold),
+                sample_rate=sample_rate,
+                silence_ms=chunking.silence_ms,
+                min_segment_s=chunking.min_segment_s,
+                max_segment_s=chunking.max_segment_s,
+                overlap_ms=chunking.overlap_ms,
+            )
+        elif vad_enabled:
+            logger.warning("numpy not installed, Groq ASR uses fixed %.1fs windows", chunk_duration_s)
+        self._last_text = ""
+        
         # OpenAI client for Groq
         self._client = None
         if openai and self.api_key:
             self._client = openai.OpenAI(
-                base_url="https://api.groq.com/openai/v1",
-                api_key=self.api_key
+                base_url=_GROQ_OPENAI_URL,
+                api_key=self.api_key,
+                http_client=get_client(_GROQ_OPENAI_URL),
             )
     
     def add_audio(self, audio_data: bytes) -> Optional[GroqTranscriptionResult]:
@@ -106,41 +134,73 @@ class GroqRealtimeASRService:
             return await loop.run_in_executor(None, self._process_buffer)
         return None
     
+    def take_segments(self, audio_data: bytes = b"") -> List[AudioSegment]:
+        """
+        Add audio data and return the segments that are ready for transcription.
+        
+        Unlike add_audio this does not transcribe, so callers can hand the
+        segments to a separate stage and keep accepting audio. Segments
+        without speech are dropped here and never uploaded.
+        """
+        if self._segmenter is not None:
+            return self._segmenter.push(audio_data)
+        
+        self._audio_buffer.extend(audio_data)
+        if len(self._audio_buffer) >= self._min_chunk_bytes:
+            return [self._buffer_segment()]
+        return []
+    
+    def flush_segments(self) -> List[AudioSegment]:
+        """Return the remaining buffered audio as a final segment, if any"""
+        if self._segmenter is not None:
+            segment = self._segmenter.flush()
+            return [segment] if segment else []
+        if len(self._audio_buffer) > 0:
+            return [self._buffer_segment()]
+        return []
+    
+    def _buffer_segment(self) -> AudioSegment:
+        audio, self._audio_buffer = bytes(self._audio_buffer), bytearray()
+        duration = len(audio) / (self.sample_rate * self.sample_width)
+        return AudioSegment(audio=audio, duration_s=duration, voiced_s=duration)
+    
+    async def transcribe_segment_async(self, segment: AudioSegment) -> Optional[GroqTranscriptionResult]:
+        """Transcribe a segment from take_segments in the thread pool"""
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, self.transcribe_chunk, segment.audio)
+        if result is None:
+            return None
+        if segment.overlap_s:
+            # The overlap was already heard at the end of the previous segment
+            result.text = merge_overlap_text(self._last_text, result.text)
+        self._last_text = result.text
+        return result if result.text else None
+    
     def _process_buffer(self) -> Optional[GroqTranscriptionResult]:
         """Process current audio buffer with Groq Whisper"""
+        # Hand over the buffer itself instead of copying it
+        audio_bytes, self._audio_buffer = self._audio_buffer, bytearray()
+        return self.transcribe_chunk(audio_bytes)
+    
+    def transcribe_chunk(self, audio_bytes: bytes) -> Optional[GroqTranscriptionResult]:
+        """Transcribe one chunk of PCM audio with Groq Whisper"""
         if not self._client:
             logger.error("Groq client not initialized (missing API key?)")
             return None
         
-        if len(self._audio_buffer) < 100:  # Too small to process
-            self._audio_buffer.clear()
+        if len(audio_bytes) < 100:  # Too small to process
             return None
         
         try:
-            # Save buffer to temp WAV file
-            audio_bytes = bytes(self._audio_buffer)
-            self._audio_buffer.clear()
-            
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                tmp_path = tmp.name
-                with wave.open(tmp, 'wb') as wav:
-                    wav.setnchannels(self.channels)
-                    wav.setsampwidth(self.sample_width)
-                    wav.setframerate(self.sample_rate)
-                    wav.writeframes(audio_bytes)
-            
-            # Send to Groq
-            with open(tmp_path, "rb") as audio_file:
-                response = self._client.audio.transcriptions.create(
-                    file=audio_file,
-                    model=self.model,
-                    language=self.language if self.language != "auto" else None,
-                    response_format="json",
-                    temperature=0.0
-                )
-            
-            # Clean up temp file
-            os.unlink(tmp_path)
+            # Wrap the PCM in a WAV header in memory and send to Groq
+            wav_bytes = pcm_to_wav(audio_bytes, self.sample_rate, self.channels, self.sample_width)
+            response = self._client.audio.transcriptions.create(
+                file=("chunk.wav", wav_bytes),
+                model=self.model,
+                language=self.language if self.language != "auto" else None,
+                response_format="json",
+                temperature=0.0
+            )
             
             text = response.text.strip()
             if text:
@@ -160,6 +220,30 @@ class GroqRealtimeASRService:
     def reset(self):
         """Clear audio buffer"""
         self._audio_buffer.clear()
+        if self._segmenter is not None:
+            segmenter = self._segmenter
+            if segmenter.received_s:
+                logger.info(
+                    f"Groq VAD: uploaded {segmenter.emitted_s:.1f}s of "
+                    f"{segmenter.received_s:.1f}s received audio"
+                )
+            segmenter.flush()
+            segmenter.received_s = segmenter.emitted_s = 0.0
+        self._last_text = ""
+
+
+def _cached_text(result: Dict[str, Any]) -> Optional[str]:
+    return result.get("translated_text") if result.get("success") else None
+
+
+def _from_cache(service, text: str, source_lang: str, target_lang: str, translated: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "original_text": text,
+        "translated_text": translated,
+        "source_lang": source_lang,
+        "target_lang": target_lang,
+    }
 
 
 class GroqTranslationService:
@@ -180,6 +264,14 @@ RULES:
 7. If the input is empty or just punctuation, output the same
 
 Target language: {target_lang}"""
+
+    # Appended to SYSTEM_PROMPT for micro-batches of numbered segments
+    BATCH_PROMPT = """
+
+The input is {count} numbered segments ("[1] ...", "[2] ...").
+Translate each segment on its own.
+Reply with a JSON object {{"translations": [...]}} holding exactly {count}
+strings, in segment order, without the numbers."""
     
     def __init__(
         self,
@@ -196,11 +288,17 @@ Target language: {target_lang}"""
         self._client = None
         if openai and self.api_key:
             self._client = openai.OpenAI(
-                base_url="https://api.groq.com/openai/v1",
-                api_key=self.api_key
+                base_url=_GROQ_OPENAI_URL,
+                api_key=self.api_key,
+                http_client=get_client(_GROQ_OPENAI_URL),
             )
     
+    @cached_translation(provider="groq", model=lambda self: self.model, unwrap=_cached_text, wrap=_from_cache)
     def translate(self, text: str, source_lang: str = "auto", target_lang: str = None) -> Dict[str, Any]:
+        """Synchronous translation (memoised, see common.utils.translation_cache)"""
+        return self._translate(text, source_lang, target_lang)
+
+    def _translate(self, text: str, source_lang: str = "auto", target_lang: str = None) -> Dict[str, Any]:
         """Synchronous translation"""
         target = target_lang or self.target_lang
         
@@ -238,7 +336,95 @@ Target language: {target_lang}"""
             logger.error(f"Groq translation error: {e}")
             return {"success": False, "error": str(e)}
     
+    @cached_translation(provider="groq", model=lambda self: self.model, unwrap=_cached_text, wrap=_from_cache)
     async def translate_async(self, text: str, source_lang: str = "auto", target_lang: str = None) -> Dict[str, Any]:
-        """Async translation"""
+        """Async translation; cache hits return without an executor hop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._translate, text, source_lang, target_lang)
+
+    def _translate_batch(self, texts: List[str], source_lang: str, target: str) -> Optional[List[str]]:
+        """One request for several segments; None if the reply does not parse."""
+        system_prompt = self.SYSTEM_PROMPT.format(target_lang=target) + self.BATCH_PROMPT.format(count=len(texts))
+        numbered = "\n".join(f"[{i}] {text}" for i, text in enumerate(texts, 1))
+        try:
+            response = self._client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": numbered}
+                ],
+                temperature=0.1,
+                max_tokens=min(4096, 256 + 2 * len(numbered)),
+                response_format={"type": "json_object"},
+            )
+            translations = json.loads(response.choices[0].message.content)["translations"]
+        except Exception as e:
+            logger.warning(f"Groq batch translation of {len(texts)} segments failed: {e}")
+            return None
+        if not isinstance(translations, list):
+            logger.warning(f"Groq batch translation returned {type(translations).__name__}, not a list")
+            return None
+        if len(translations) != len(texts):
+            logger.warning(f"Groq batch translation returned {len(translations)} items for {len(texts)} segments")
+            return None
+        if not all(isinstance(t, str) for t in translations):
+            logger.warning("Groq batch translation returned a non-string item")
+            return None
+        translations = [re.sub(r"^\[\d+\]\s*", "", t).strip() for t in translations]
+        if not all(translations):
+            logger.warning("Groq batch translation returned an empty item")
+            return None
+        return translations
+
+    async def translate_batch_async(self, texts: List[str], source_lang: str = "auto",
+                                    target_lang: str = None) -> List[Dict[str, Any]]:
+        """Translate several short segments in one request; results in input order.
+
+        Cached segments are answered from the translation cache; the rest go
+        out as numbered segments in a single JSON-mode request. If the reply
+        cannot be split back into one string per segment, they are translated
+        one by one instead.
+        """
+        target = target_lang or self.target_lang
+        source = source_lang or "auto"
+        if not self._client:
+            return [{"success": False, "error": "Groq client not initialized"} for _ in texts]
+
+        cache = get_translation_cache()
+        keys = [cache.key_for(text, source, target, self.model, "groq") for text in texts]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        for i, key in enumerate(keys):
+            cached = await cache.get_async(key) if key else None
+            if cached is not None:
+                results[i] = _from_cache(self, texts[i], source_lang, target, cached)
+
+        pending = [i for i, result in enumerate(results) if result is None and texts[i].strip()]
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.translate, text, source_lang, target_lang)
+        translations = None
+        if len(pending) > 1:
+            translations = await loop.run_in_executor(
+                None, self._translate_batch, [texts[i] for i in pending], source_lang, target
+            )
+        if translations is not None:
+            fresh = [
+                {
+                    "success": True,
+                    "original_text": texts[i],
+                    "translated_text": translated,
+                    "source_lang": source_lang,
+                    "target_lang": target,
+                }
+                for i, translated in zip(pending, translations)
+            ]
+        else:
+            fresh = await asyncio.gather(*(
+                loop.run_in_executor(None, self._translate, texts[i], source_lang, target_lang)
+                for i in pending
+            ))
+        for i, result in zip(pending, fresh):
+            results[i] = result
+            translated = _cached_text(result)
+            if keys[i] and translated:
+                await cache.set_async(keys[i], translated)
+
+        return [result or {"success": False, "error": "Empty text"} for result in results]
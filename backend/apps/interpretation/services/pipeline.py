@@ -0,0 +1,221 @@
+"""
+Staged realtime pipeline: ASR → translation → TTS as independent asyncio tasks.
+
+Each stage owns a bounded ``asyncio.Queue`` and processes its items one at a
+time, in submission order, then hands the result to the next stage. Stages
+run concurrently, so transcription of chunk N+1 overlaps with translation
+and TTS of chunk N while every stage still emits in sequence order.
+
+    pipeline = StagePipeline([
+        ("asr", transcribe),        # async fn(payload) -> next payload or None
+        ("translate", translate),
+        ("tts", speak),
+    ], maxsize=4)
+    pipeline.start()
+    await pipeline.submit(chunk)    # waits while the first queue is full
+    ...
+    await pipeline.stop()
+
+A stage returning ``None`` drops the item (e.g. silence, translation off).
+``submit`` blocks when the first stage is backed up, which in turn stops the
+consumer from reading more frames — backpressure rather than unbounded
+buffering. Queue wait and run time per stage are recorded for ``stats()``.
+
+A stage given a ``BatchPolicy`` as third element is called with a list of
+payloads and returns a list of results in the same order. It takes whatever
+is already queued, up to ``max_items`` / ``max_cost``; only when items are
+arriving in a burst (the previous one came less than ``window_s`` earlier)
+does it also wait, until ``window_s`` after the first item was queued.
+An isolated item is never delayed.
+
+    ("translate", translate_many, BatchPolicy(window_s=0.15, max_items=8))
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+StageFn = Callable[[Any], Awaitable[Any]]
+
+
+@dataclass
+class BatchPolicy:
+    """How many queued items a batched stage takes per call"""
+    window_s: float = 0.15
+    max_items: int = 8
+    max_cost: float = float("inf")
+    cost: Callable[[Any], float] = lambda payload: 1.0
+
+
+@dataclass
+class PipelineItem:
+    """One unit of work flowing through the stages"""
+    seq: int
+    payload: Any
+    created_at: float = field(default_factory=time.monotonic)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class StageTimings:
+    """Rolling per-stage wait/run durations in seconds"""
+    wait: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    run: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    dropped: int = 0
+    failed: int = 0
+    batches: Deque[int] = field(default_factory=lambda: deque(maxlen=1000))
+
+
+def _percentiles(values) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"n": 0}
+    n = len(ordered)
+    return {
+        "n": n,
+        "p50_ms": round(ordered[n // 2] * 1000, 1),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+class StagePipeline:
+    def __init__(self, stages: List[Tuple], maxsize: int = 4, name: str = "pipeline"):
+        if not stages:
+            raise ValueError("StagePipeline needs at least one stage")
+        self.name = name
+        self.stages = [(stage[0], stage[1]) for stage in stages]
+        self._policies: List[Optional[BatchPolicy]] = [stage[2] if len(stage) > 2 else None for stage in stages]
+        # Per stage: an item taken over a batch budget, first in line for the next call
+        self._carry: List[Optional[PipelineItem]] = [None] * len(stages)
+        self._last_enqueued: List[float] = [0.0] * len(stages)
+        self._queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=maxsize) for _ in stages]
+        self._timings: Dict[str, StageTimings] = {stage: StageTimings() for stage, _ in self.stages}
+        self._end_to_end: Deque[float] = deque(maxlen=1000)
+        self._tasks: List[asyncio.Task] = []
+        self._seq = 0
+
+    def start(self) -> None:
+        """Spawn one task per stage on the running loop."""
+        self._tasks = [
+            asyncio.create_task(self._run_stage(index), name=f"{self.name}:{stage}")
+            for index, (stage, _) in enumerate(self.stages)
+        ]
+
+    async def submit(self, payload: Any) -> int:
+        """Queue *payload* for the first stage and return its sequence number."""
+        self._seq += 1
+        await self._queues[0].put(PipelineItem(seq=self._seq, payload=payload))
+        return self._seq
+
+    async def _take_batch(self, index: int) -> List[PipelineItem]:
+        """The next item plus, for a batched stage, the ones that may join it."""
+        policy = self._policies[index]
+        inbox = self._queues[index]
+        first, self._carry[index] = self._carry[index], None
+        if first is None:
+            first = await inbox.get()
+        if policy is None:
+            return [first]
+
+        # Only wait for more while items are arriving in a burst
+        bursty = first.enqueued_at - self._last_enqueued[index] < policy.window_s
+        deadline = first.enqueued_at + policy.window_s
+        batch, cost = [first], policy.cost(first.payload)
+        while len(batch) < policy.max_items:
+            remaining = deadline - time.monotonic()
+            try:
+                if bursty and remaining > 0:
+                    item = await asyncio.wait_for(inbox.get(), remaining)
+                else:
+                    item = inbox.get_nowait()
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            item_cost = policy.cost(item.payload)
+            if cost + item_cost > policy.max_cost:
+                self._carry[index] = item
+                break
+            batch.append(item)
+            cost += item_cost
+        self._last_enqueued[index] = batch[-1].enqueued_at
+        return batch
+
+    async def _run_stage(self, index: int) -> None:
+        stage, fn = self.stages[index]
+        batched = self._policies[index] is not None
+        timings = self._timings[stage]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            items = await self._take_batch(index)
+            started = time.monotonic()
+            for item in items:
+                timings.wait.append(started - item.enqueued_at)
+            try:
+                if batched:
+                    timings.batches.append(len(items))
+                    results = await fn([item.payload for item in items])
+                    if len(results) != len(items):
+                        raise ValueError(f"{len(results)} results for {len(items)} items")
+                else:
+                    results = [await fn(items[0].payload)]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                timings.failed += len(items)
+                logger.error(f"[{self.name}] stage {stage} failed on #{items[0].seq}: {e}", exc_info=True)
+                results = [None] * len(items)
+            finally:
+                timings.run.append(time.monotonic() - started)
+                for _ in items:
+                    inbox.task_done()
+
+            for item, result in zip(items, results):
+                if result is None:
+                    if outbox is not None:
+                        timings.dropped += 1
+                    continue
+                if outbox is None:
+                    self._end_to_end.append(time.monotonic() - item.created_at)
+                    continue
+                item.payload = result
+                item.enqueued_at = time.monotonic()
+                # Waits while the next stage is backed up
+                await outbox.put(item)
+
+    async def join(self) -> None:
+        """Wait until every submitted item has left every stage."""
+        for q in self._queues:
+            await q.join()
+
+    async def stop(self, drain: bool = False, timeout: float = 5.0) -> None:
+        """Stop the stage tasks, optionally letting queued items finish first."""
+        if drain:
+            try:
+                await asyncio.wait_for(self.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"[{self.name}] drain timed out, dropping queued items")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage queue wait / run percentiles and end-to-end latency."""
+        stages = {}
+        for stage, timings in self._timings.items():
+            stages[stage] = {
+                "wait": _percentiles(timings.wait),
+                "run": _percentiles(timings.run),
+                "dropped": timings.dropped,
+                "failed": timings.failed,
+            }
+            if timings.batches:
+                stages[stage]["batch_size_avg"] = round(sum(timings.batches) / len(timings.batches), 2)
+        return {"submitted": self._seq, "stages": stages, "end_to_end": _percentiles(self._end_to_end)}
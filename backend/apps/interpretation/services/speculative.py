@@ -0,0 +1,154 @@
+"""
+Speculative translation of interim (stash) transcripts.
+
+DashScope streams the sentence being spoken as interim text, which grows
+and gets revised at the tail until the final transcript arrives. Normally
+translation starts only then. With speculation on, the consumer feeds
+interim text to ``SpeculativeTranslator``, which:
+
+1. looks at the interim text every ``interval_s`` while it keeps changing
+   (a throttle, so continuous speech still gets evaluated);
+2. takes the *stable prefix*: what the last two looks agree on, cut back to
+   the last clause boundary;
+3. translates that prefix in the background, cancelling an in-flight
+   request for an older prefix, and reports it through ``on_speculation``
+   so the client can show a provisional translation;
+4. on the final transcript (``finalize``) reuses the speculative
+   translation when the text is unchanged, translates only the new tail and
+   appends it when the final text extends the prefix, or translates from
+   scratch when the text was revised.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_CLAUSE_END = set(",.;:!?，。；：！？、")
+
+
+def _is_cjk(char: str) -> bool:
+    return "\u3000" <= char <= "\u9fff" or "\uff00" <= char <= "\uffef"
+
+
+def stable_prefix(previous: str, latest: str) -> str:
+    """Common prefix of two interim texts, cut back to the last clause boundary."""
+    common = os.path.commonprefix([previous, latest])
+    for i in range(len(common) - 1, -1, -1):
+        if common[i] in _CLAUSE_END:
+            # "3.5" is not a boundary: ASCII punctuation must end the text or precede a space
+            nxt = latest[i + 1] if i + 1 < len(latest) else ""
+            if _is_cjk(common[i]) or nxt == "" or nxt.isspace():
+                return common[:i + 1].strip()
+    return ""
+
+
+def join_translations(head: str, tail: str) -> str:
+    if not head or not tail:
+        return head or tail
+    if _is_cjk(head[-1]) or _is_cjk(tail[0]):
+        return head + tail
+    return f"{head} {tail}"
+
+
+class SpeculativeTranslator:
+    """Translate the stable part of an utterance before its final transcript."""
+
+    def __init__(
+        self,
+        translate: Callable[[str], Awaitable[str]],
+        on_speculation: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        interval_s: float = 0.3,
+        min_chars: int = 12,
+    ):
+        self._translate = translate
+        self._on_speculation = on_speculation
+        self.interval_s = interval_s
+        self.min_chars = min_chars
+        self._latest = ""
+        self._seen = ""  # interim text at the previous look
+        self._look: Optional[asyncio.Task] = None
+        self._prefix = ""  # text of the current speculation
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {
+            "speculations": 0, "cancelled": 0, "reused": 0, "patched": 0, "missed": 0,
+        }
+
+    def on_partial(self, text: str) -> None:
+        """Record interim text; a look is scheduled if none is pending."""
+        self._latest = text.strip()
+        if self._look is None:
+            self._look = asyncio.create_task(self._settle())
+
+    async def _settle(self) -> None:
+        await asyncio.sleep(self.interval_s)
+        self._look = None
+        prefix = stable_prefix(self._seen, self._latest)
+        if self._seen != self._latest:
+            # Look again even without new interim text: once it stops changing
+            # (a pause before the final), the whole utterance becomes stable
+            self._seen = self._latest
+            self._look = asyncio.create_task(self._settle())
+        if len(prefix) < self.min_chars or prefix == self._prefix:
+            return
+        if self._task and not self._task.done():
+            self._task.cancel()
+            self.stats["cancelled"] += 1
+        self._prefix = prefix
+        self._task = asyncio.create_task(self._speculate(prefix))
+        self.stats["speculations"] += 1
+
+    async def _speculate(self, prefix: str) -> Optional[str]:
+        try:
+            translated = await self._translate(prefix)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Speculative translation failed: {e}")
+            return None
+        if translated and self._on_speculation and prefix == self._prefix:
+            await self._on_speculation(prefix, translated)
+        return translated
+
+    async def finalize(self, text: str) -> str:
+        """Translation of the final transcript, built on the speculation when possible."""
+        text = text.strip()
+        prefix, task = self._prefix, self._task
+        self.reset()
+
+        if task is None:
+            return await self._translate(text)
+        if not text.startswith(prefix):
+            task.cancel()
+            self.stats["missed"] += 1
+            return await self._translate(text)
+
+        # The tail is translated while a head still in flight finishes
+        rest = text[len(prefix):].strip()
+        tail = asyncio.ensure_future(self._translate(rest)) if rest else None
+        head = await task
+        if not head:
+            if tail is not None:
+                tail.cancel()
+            return await self._translate(text)
+        if tail is None:
+            self.stats["reused"] += 1
+            return head
+        self.stats["patched"] += 1
+        return join_translations(head, await tail)
+
+    def reset(self) -> None:
+        """Forget the current utterance (the speculation task is left to the caller)."""
+        if self._look is not None:
+            self._look.cancel()
+            self._look = None
+        self._latest = self._seen = self._prefix = ""
+        self._task = None
+
+    def close(self) -> None:
+        task = self._task
+        self.reset()
+        if task is not None and not task.done():
+            task.cancel()
@@ -13,7 +13,6 @@ Tingwu advantages over DashScope/Groq:
 
 import json
 import logging
-import queue
 import threading
 import time
 import uuid
@@ -22,6 +21,8 @@ from typing import Any, Dict, List, Optional
 
 from common.config import get_settings
 
+from .event_bridge import ASREventBridge
+
 logger = logging.getLogger(__name__)
 
 
@@ -194,7 +195,7 @@ class TingwuRealtimeService:
     Uses alibabacloud-nls SDK's NlsRealtimeMeeting to connect to the
     MeetingJoinUrl returned by TingwuTaskManager.create_realtime_task().
 
-    Events are pushed into a thread-safe queue (same pattern as RealtimeASRService).
+    Events are handed over through an ASREventBridge (same pattern as RealtimeASRService).
     """
 
     def __init__(self, meeting_join_url: str):
@@ -203,14 +204,11 @@ class TingwuRealtimeService:
         self._is_connected = False
         self._lock = threading.Lock()
 
-        # Thread-safe event queue (same pattern as DashScope ASR)
-        self.event_queue: queue.Queue = queue.Queue(maxsize=1000)
+        # Thread → asyncio event hand-off (same pattern as DashScope ASR)
+        self.events = ASREventBridge(maxsize=1000)
 
     def _put_event(self, event):
-        try:
-            self.event_queue.put_nowait(event)
-        except queue.Full:
-            logger.warning("Tingwu event queue full, dropping event")
+        self.events.put(event)
 
     # --- NLS SDK Callbacks ---
 
@@ -356,7 +354,7 @@ class TingwuRealtimeService:
             logger.warning(f"Tingwu meeting start returned: {r}")
 
         logger.info("Tingwu realtime service connected")
-        return self.event_queue
+        return self.events
 
     _send_count = 0
 
@@ -387,17 +385,11 @@ class TingwuRealtimeService:
                 self._is_connected = False
                 self._meeting = None
                 logger.info("Tingwu realtime service stopped")
+            self.events.close()
 
     def get_all_events(self) -> list:
-        """Get all pending events from the queue (non-blocking)."""
-        events = []
-        while True:
-            try:
-                event = self.event_queue.get_nowait()
-                events.append(event)
-            except queue.Empty:
-                break
-        return events
+        """Get all pending events (non-blocking)."""
+        return self.events.get_all_events()
 
     @property
     def is_connected(self) -> bool:
@@ -9,12 +9,20 @@ import json
 import logging
 import os
 import re
+import subprocess
+import threading
 import time
-import urllib.request
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
+import httpx
 from django.conf import settings as django_settings
 
+from common.utils.audio_buffer import AudioUpload, ffmpeg_binary
+from common.utils.http_client import get_client, post_json, stream_post
+from common.utils.rate_scheduler import RateLimitExhausted, get_scheduler
+from common.utils.translation_cache import cached_translation, get_translation_cache
+
 try:
     from groq import Groq, RateLimitError as GroqRateLimitError, BadRequestError as GroqBadRequestError, AuthenticationError as GroqAuthenticationError
 except ImportError:
@@ -25,6 +33,16 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+_GROQ_BASE_URL = "https://api.groq.com"
+_CEREBRAS_CHAT_URL = "https://api.cerebras.ai/v1/chat/completions"
+
+
+def _cerebras_headers(key: str) -> dict:
+    return {
+        "Authorization": f"Bearer {key}",
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+    }
+
 
 class GroqKeyInvalidError(Exception):
     """Raised when a user's Groq API key is rejected (401/403)."""
@@ -38,21 +56,59 @@ _QWEN3_ASR_LANGS = {
     'pl', 'cs', 'fil', 'fa', 'el', 'hu', 'mk', 'ro',
 }
 
-# ── Cerebras key pool (mirrors api/tools.py) ──
-_cerebras_key_index = 0
+# ── Cerebras key pool: budgets enforced by common.utils.rate_scheduler ──
+_CEREBRAS_MODEL = "qwen-3-32b"
+# Per-key limits of the Cerebras free tier for qwen-3-32b
+_CEREBRAS_LIMITS = {"rpm": 30, "tpm": 60000}
+_CEREBRAS_COOLDOWN_SECS = 60
 
 
-def _get_cerebras_key():
-    global _cerebras_key_index
+def _cerebras_keys() -> list:
     pool_str = getattr(django_settings, 'CEREBRAS_API_KEY_POOL', '')
-    if not pool_str:
-        return None
-    keys = [k.strip() for k in pool_str.split(',') if k.strip()]
+    return [k.strip() for k in pool_str.split(',') if k.strip()]
+
+
+def _estimate_tokens(payload: dict) -> int:
+    """Rough prompt + completion tokens; corrected from ``usage`` afterwards."""
+    prompt = sum(len(m.get("content") or "") for m in payload["messages"]) // 2
+    return prompt + min(payload.get("max_tokens", 4096), prompt + 64)
+
+
+def _acquire_cerebras_key(payload: dict, exclude=()) -> str:
+    keys = [k for k in _cerebras_keys() if k not in exclude]
     if not keys:
-        return None
-    key = keys[_cerebras_key_index % len(keys)]
-    _cerebras_key_index += 1
-    return key
+        raise RuntimeError("CEREBRAS_API_KEY_POOL not configured")
+    return get_scheduler().acquire(
+        "cerebras", _CEREBRAS_MODEL, keys, _CEREBRAS_LIMITS, tokens=_estimate_tokens(payload),
+    )
+
+
+def _cerebras_chat(payload: dict, timeout: int) -> dict:
+    """POST a chat completion on the Cerebras key with the most headroom.
+
+    A 429 cools that key down and retries on the next one.
+    """
+    scheduler = get_scheduler()
+    tried = set()
+    while True:
+        key = _acquire_cerebras_key(payload, exclude=tried)
+        try:
+            data = post_json(_CEREBRAS_CHAT_URL, payload, headers=_cerebras_headers(key), timeout=timeout)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 429:
+                raise
+            scheduler.mark_rate_limited("cerebras", key, _CEREBRAS_COOLDOWN_SECS, model=_CEREBRAS_MODEL)
+            tried.add(key)
+            logger.warning("Cerebras key %s…%s rate-limited, trying next key", key[:8], key[-4:])
+            if len(tried) >= len(_cerebras_keys()):
+                raise
+            continue
+        used = (data.get("usage") or {}).get("total_tokens")
+        if used:
+            scheduler.record_usage(
+                "cerebras", key, _CEREBRAS_MODEL, _CEREBRAS_LIMITS, used - _estimate_tokens(payload),
+            )
+        return data
 
 
 _LANG_NAMES = {
@@ -85,32 +141,26 @@ def _groq_chat_completion(
     if not groq_api_key:
         raise RuntimeError("No Groq API key provided for chat completion")
 
-    payload = json.dumps({
+    payload = {
         "model": model,
         "messages": messages,
         "max_tokens": max_tokens,
         "temperature": temperature,
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        "https://api.groq.com/openai/v1/chat/completions",
-        data=payload,
-        headers={
-            "Authorization": f"Bearer {groq_api_key}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
+    }
+    data = post_json(
+        f"{_GROQ_BASE_URL}/openai/v1/chat/completions",
+        payload,
+        headers={"Authorization": f"Bearer {groq_api_key}"},
+        timeout=timeout,
     )
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
     result = (data["choices"][0]["message"].get("content") or "").strip()
     # Strip <think>...</think> tags from reasoning models
     result = re.sub(r'<think>[\s\S]*?</think>\s*', '', result).strip()
     return result
 
 
-def _groq_translate(text: str, source_lang: str, target_lang: str, groq_api_key: str) -> str:
-    """Call Groq qwen/qwen3-32b for translation (free tier)."""
+def _translation_messages(text: str, source_lang: str, target_lang: str) -> list:
+    """Chat messages asking Qwen3 (thinking off) for a bare translation."""
     src_name = _LANG_NAMES.get(source_lang.lower(), source_lang)
     tgt_name = _LANG_NAMES.get(target_lang.lower(), target_lang)
     system_msg = (
@@ -120,11 +170,78 @@ def _groq_translate(text: str, source_lang: str, target_lang: str, groq_api_key:
         f"You MUST output ONLY the {tgt_name} translation, nothing else. "
         f"Do NOT output any {src_name} text or other languages."
     )
+    return [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": text},
+    ]
+
+
+class _ThinkStripper:
+    """Remove ``<think>...</think>`` blocks from streamed text, chunk by chunk.
+
+    Tags may be split across chunks, so a tail that could start a tag is
+    held back until the next chunk decides it. Whitespace at the start of
+    the output and after a think block is dropped, like the
+    ``re.sub(...).strip()`` on complete responses.
+    """
+
+    _OPEN, _CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self._pending = ""
+        self._in_think = False
+        self._skip_space = True
+
+    @staticmethod
+    def _partial_tag(text: str, tag: str) -> int:
+        """Length of the longest suffix of *text* that is a proper prefix of *tag*."""
+        for size in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:size]):
+                return size
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        text, out = self._pending + chunk, []
+        self._pending = ""
+        while text:
+            if self._in_think:
+                end = text.find(self._CLOSE)
+                if end < 0:
+                    hold = self._partial_tag(text, self._CLOSE)
+                    self._pending = text[len(text) - hold:] if hold else ""
+                    break
+                text = text[end + len(self._CLOSE):]
+                self._in_think = False
+                self._skip_space = True
+                continue
+            if self._skip_space:
+                text = text.lstrip()
+                if not text:
+                    break
+                self._skip_space = False
+            start = text.find(self._OPEN)
+            if start >= 0:
+                out.append(text[:start])
+                text = text[start + len(self._OPEN):]
+                self._in_think = True
+                continue
+            hold = self._partial_tag(text, self._OPEN)
+            out.append(text[:len(text) - hold])
+            self._pending = text[len(text) - hold:]
+            break
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Text held back at the end of the stream (an unfinished tag is just text)."""
+        pending, self._pending = self._pending, ""
+        return "" if self._in_think else pending
+
+
+@cached_translation(provider="groq", model="qwen/qwen3-32b")
+def _groq_translate(text: str, source_lang: str, target_lang: str, groq_api_key: str) -> str:
+    """Call Groq qwen/qwen3-32b for translation (free tier)."""
     return _groq_chat_completion(
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": text},
-        ],
+        messages=_translation_messages(text, source_lang, target_lang),
         model="qwen/qwen3-32b",
         groq_api_key=groq_api_key,
         max_tokens=4096,
@@ -132,49 +249,101 @@ def _groq_translate(text: str, source_lang: str, target_lang: str, groq_api_key:
     )
 
 
+@cached_translation(provider="cerebras", model="qwen-3-32b")
 def _cerebras_translate(text: str, source_lang: str, target_lang: str) -> str:
     """Call Cerebras Qwen3-32B for translation."""
-    key = _get_cerebras_key()
-    if not key:
+    if not _cerebras_keys():
         raise RuntimeError("CEREBRAS_API_KEY_POOL not configured")
 
-    src_name = _LANG_NAMES.get(source_lang.lower(), source_lang)
-    tgt_name = _LANG_NAMES.get(target_lang.lower(), target_lang)
-    system_msg = (
-        f"/no_think\nYou are a professional translator. "
-        f"The source text is in {src_name}. "
-        f"Translate it into {tgt_name}. "
-        f"You MUST output ONLY the {tgt_name} translation, nothing else. "
-        f"Do NOT output any {src_name} text or other languages."
-    )
-    payload = json.dumps({
+    payload = {
         "model": "qwen-3-32b",
-        "messages": [
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": text},
-        ],
+        "messages": _translation_messages(text, source_lang, target_lang),
         "max_tokens": 4096,
         "temperature": 0.1,
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        "https://api.cerebras.ai/v1/chat/completions",
-        data=payload,
-        headers={
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-        },
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
+    }
+    data = _cerebras_chat(payload, timeout=30)
     result = (data["choices"][0]["message"].get("content") or "").strip()
     # Strip <think>...</think> tags from Qwen3 reasoning model
     result = re.sub(r'<think>[\s\S]*?</think>\s*', '', result).strip()
     return result
 
 
+def _cerebras_stream_chat(payload: dict, timeout: int):
+    """Stream a chat completion, yielding content deltas with think blocks removed.
+
+    A 429 on connect cools that key down and retries on the next one, like
+    ``_cerebras_chat``; once tokens have been yielded errors propagate.
+    """
+    scheduler = get_scheduler()
+    tried = set()
+    payload = {**payload, "stream": True}
+    while True:
+        key = _acquire_cerebras_key(payload, exclude=tried)
+        with stream_post(_CEREBRAS_CHAT_URL, payload, headers=_cerebras_headers(key), timeout=timeout) as resp:
+            if resp.status_code == 429:
+                scheduler.mark_rate_limited("cerebras", key, _CEREBRAS_COOLDOWN_SECS, model=_CEREBRAS_MODEL)
+                tried.add(key)
+                logger.warning("Cerebras key %s…%s rate-limited, trying next key", key[:8], key[-4:])
+                if len(tried) >= len(_cerebras_keys()):
+                    resp.read()
+                    resp.raise_for_status()
+                continue
+            resp.raise_for_status()
+            stripper = _ThinkStripper()
+            for raw_line in resp.iter_lines():
+                line = raw_line.strip()
+                if not line or not line.startswith("data: "):
+                    continue
+                data_str = line[6:]
+                if data_str == "[DONE]":
+                    break
+                chunk = json.loads(data_str)
+                used = (chunk.get("usage") or {}).get("total_tokens")
+                if used:
+                    scheduler.record_usage(
+                        "cerebras", key, _CEREBRAS_MODEL, _CEREBRAS_LIMITS, used - _estimate_tokens(payload),
+                    )
+                choices = chunk.get("choices") or [{}]
+                content = stripper.feed(choices[0].get("delta", {}).get("content") or "")
+                if content:
+                    yield content
+            tail = stripper.flush()
+            if tail:
+                yield tail
+            return
+
+
+def _cerebras_translate_stream(text: str, source_lang: str, target_lang: str):
+    """Stream a Cerebras Qwen3-32B translation as text deltas.
+
+    Shares the translation cache with ``_cerebras_translate``: a hit is
+    yielded as one delta, and a completed stream is stored.
+    """
+    cache = get_translation_cache()
+    key = cache.key_for(text, source_lang, target_lang, "qwen-3-32b", "cerebras")
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    if not _cerebras_keys():
+        raise RuntimeError("CEREBRAS_API_KEY_POOL not configured")
+
+    payload = {
+        "model": "qwen-3-32b",
+        "messages": _translation_messages(text, source_lang, target_lang),
+        "max_tokens": 4096,
+        "temperature": 0.1,
+    }
+    parts = []
+    for delta in _cerebras_stream_chat(payload, timeout=30):
+        parts.append(delta)
+        yield delta
+    if key is not None:
+        cache.set(key, "".join(parts).strip())
+
+
 def _clean_asr_output(text: str, lang_code: str) -> str:
     """Remove characters that don't belong to the expected language.
 
@@ -201,25 +370,26 @@ def _clean_asr_output(text: str, lang_code: str) -> str:
     return cleaned
 
 
-def _build_multipart_body(file_path: str, fields: dict) -> tuple:
+def _as_upload(audio) -> AudioUpload:
+    """Accept an AudioUpload or a file path."""
+    return audio if isinstance(audio, AudioUpload) else AudioUpload.from_path(str(audio))
+
+
+def _build_multipart_body(audio: AudioUpload, fields: dict) -> tuple:
     """Build multipart/form-data body. Returns (body_bytes, boundary)."""
     import mimetypes
     boundary = f"----WebKitFormBoundary{os.urandom(8).hex()}"
 
-    with open(file_path, "rb") as f:
-        file_data = f.read()
-
-    filename = os.path.basename(file_path)
-    content_type = mimetypes.guess_type(filename)[0] or "audio/wav"
+    content_type = mimetypes.guess_type(audio.name)[0] or "audio/wav"
 
     parts = []
     # file field
     parts.append(
         f"--{boundary}\r\n"
-        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
-        f"Content-Type: {content_type}\r\n\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{audio.name}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8")
     )
-    parts.append(file_data)
+    parts.append(audio.read())
     parts.append(b"\r\n")
 
     # Additional form fields
@@ -228,22 +398,133 @@ def _build_multipart_body(file_path: str, fields: dict) -> tuple:
             parts.append(
                 f"--{boundary}\r\n"
                 f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
-                f"{value}\r\n"
+                f"{value}\r\n".encode("utf-8")
             )
 
-    parts.append(f"--{boundary}--\r\n")
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+
+    return b"".join(parts), boundary
+
+
+# ── Upload normalisation (ffmpeg → 16 kHz mono FLAC/Opus) ──
+
+_TRANSCODE_CODECS = {
+    # codec: (file extension, ffmpeg output args)
+    "flac": (".flac", ["-c:a", "flac", "-sample_fmt", "s16", "-f", "flac"]),
+    "opus": (".ogg", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"]),
+}
+# Containers ffmpeg cannot read from a pipe (index at the end of the file)
+_SEEKABLE_INPUT_EXTS = {".m4a", ".mp4", ".mov", ".3gp", ".aac"}
+
+_transcode_pool = None
+_transcode_pool_lock = threading.Lock()
+
+
+def _get_transcode_pool() -> ThreadPoolExecutor:
+    """Bounded pool so concurrent uploads cannot start unlimited ffmpeg processes."""
+    global _transcode_pool
+    if _transcode_pool is None:
+        with _transcode_pool_lock:
+            if _transcode_pool is None:
+                workers = getattr(django_settings, 'ASR_TRANSCODE_WORKERS', 2)
+                _transcode_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr-transcode")
+    return _transcode_pool
+
+
+def _run_ffmpeg(audio: AudioUpload, codec: str | None, timeout: float) -> tuple:
+    """Decode *audio* and re-encode it (or only decode, if codec is None).
+
+    Returns (encoded_bytes, duration_seconds); the duration comes from
+    ffmpeg's progress report and is exact to the decoded sample.
+    """
+    ext = os.path.splitext(audio.name)[1].lower()
+    use_path = not audio.in_memory or ext in _SEEKABLE_INPUT_EXTS
+    cmd = [
+        ffmpeg_binary(), "-hide_banner", "-nostdin", "-loglevel", "error",
+        "-progress", "pipe:2", "-nostats",
+        "-i", audio.path if use_path else "pipe:0",
+        "-vn", "-ac", "1", "-ar", "16000",
+    ]
+    if codec:
+        cmd += [*_TRANSCODE_CODECS[codec][1], "pipe:1"]
+    else:
+        cmd += ["-f", "null", "-"]
+
+    proc = subprocess.run(
+        cmd,
+        input=None if use_path else audio.read(),
+        capture_output=True,
+        timeout=timeout,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited {proc.returncode}: {proc.stderr.decode(errors='replace')[-300:]}")
+
+    duration = None
+    for line in proc.stderr.decode(errors="replace").splitlines():
+        if line.startswith("out_time_us="):
+            try:
+                duration = int(line.split("=", 1)[1]) / 1e6
+            except ValueError:
+                pass
+    return proc.stdout, duration
 
-    body = b""
-    for part in parts:
-        if isinstance(part, str):
-            body += part.encode("utf-8")
-        else:
-            body += part
 
-    return body, boundary
+def normalize_audio(audio, need_duration: bool = False) -> AudioUpload:
+    """Shrink an upload to 16 kHz mono FLAC/Opus before it is sent to ASR.
 
+    Skipped (the upload is returned unchanged) when disabled, when ffmpeg is
+    not installed, for files under ASR_TRANSCODE_MIN_BYTES, or when the
+    result is not below ASR_TRANSCODE_MAX_RATIO of the original size. With
+    ``need_duration`` a skipped file is still decoded once so that
+    ``audio.duration`` is exact (credit billing).
 
-def _qwen3_asr_transcribe(file_path: str, source_lang: str = "") -> str:
+    Runs in a small worker pool; on timeout or ffmpeg error the original
+    upload is used. When a new upload is returned, the input is closed.
+    """
+    audio = _as_upload(audio)
+    if not getattr(django_settings, 'ASR_TRANSCODE_ENABLED', True) or not ffmpeg_binary():
+        return audio
+
+    codec = getattr(django_settings, 'ASR_TRANSCODE_CODEC', 'flac')
+    if codec not in _TRANSCODE_CODECS:
+        logger.warning("Unknown ASR_TRANSCODE_CODEC=%s, skipping transcode", codec)
+        return audio
+    size = audio.size
+    if size < getattr(django_settings, 'ASR_TRANSCODE_MIN_BYTES', 256 * 1024):
+        codec = None  # already small: at most measure the duration
+        if not need_duration:
+            return audio
+
+    timeout = getattr(django_settings, 'ASR_TRANSCODE_TIMEOUT', 20.0)
+    t0 = time.monotonic()
+    future = _get_transcode_pool().submit(_run_ffmpeg, audio, codec, timeout)
+    try:
+        data, duration = future.result(timeout + 5)
+    except (FutureTimeoutError, subprocess.TimeoutExpired, RuntimeError, OSError) as e:
+        future.cancel()  # still queued behind other uploads
+        logger.warning("ASR transcode failed, uploading original (%s): %s", audio.name, e)
+        return audio
+    audio.duration = duration
+
+    if codec is None:
+        return audio
+    max_ratio = getattr(django_settings, 'ASR_TRANSCODE_MAX_RATIO', 0.8)
+    if not data or len(data) > size * max_ratio:
+        logger.info("[TIMING] transcode %s → %s not worth it (%d → %d bytes, %.2fs)",
+                    audio.name, codec, size, len(data), time.monotonic() - t0)
+        return audio
+
+    stem = os.path.splitext(audio.name)[0]
+    normalized = AudioUpload(f"{stem}{_TRANSCODE_CODECS[codec][0]}", data=data)
+    normalized.duration = duration
+    audio.close()
+    logger.info("[TIMING] transcode %s → %s: %d → %d bytes (%.0f%%), %.2fs audio, took %.2fs",
+                audio.name, codec, size, len(data), 100.0 * len(data) / size,
+                duration or 0, time.monotonic() - t0)
+    return normalized
+
+
+def _qwen3_asr_transcribe(audio: AudioUpload, source_lang: str = "") -> str:
     """Transcribe audio using self-hosted Qwen3-ASR-1.7B (no speaker diarization).
     Returns transcribed text."""
     base_url = getattr(django_settings, 'QWEN3_ASR_BASE_URL', '')
@@ -265,18 +546,14 @@ def _qwen3_asr_transcribe(file_path: str, source_lang: str = "") -> str:
     if lang_name:
         fields["language"] = lang_name
 
-    body, boundary = _build_multipart_body(file_path, fields)
+    body, boundary = _build_multipart_body(audio, fields)
 
-    req = urllib.request.Request(
+    data = post_json(
         url,
-        data=body,
-        headers={
-            "Content-Type": f"multipart/form-data; boundary={boundary}",
-        },
-        method="POST",
+        content=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        timeout=10,
     )
-    with urllib.request.urlopen(req, timeout=10) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
 
     text = (data.get("text") or "").strip()
     text = _clean_asr_output(text, lang_code)
@@ -285,7 +562,7 @@ def _qwen3_asr_transcribe(file_path: str, source_lang: str = "") -> str:
     return text
 
 
-def _gpu_server_transcribe(file_path: str, source_lang: str = "", session_id: str = "") -> dict:
+def _gpu_server_transcribe(audio: AudioUpload, source_lang: str = "", session_id: str = "") -> dict:
     """Transcribe audio using GPU server (Qwen3-ASR + CAM++ speaker identification).
 
     Uses /transcribe-with-speaker when session_id is provided (speaker tracking),
@@ -313,18 +590,14 @@ def _gpu_server_transcribe(file_path: str, source_lang: str = "", session_id: st
         if lang_name:
             fields["language"] = lang_name
 
-    body, boundary = _build_multipart_body(file_path, fields)
+    body, boundary = _build_multipart_body(audio, fields)
 
-    req = urllib.request.Request(
+    data = post_json(
         url,
-        data=body,
-        headers={
-            "Content-Type": f"multipart/form-data; boundary={boundary}",
-        },
-        method="POST",
+        content=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        timeout=15,
     )
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
 
     text = (data.get("text") or "").strip()
     text = _clean_asr_output(text, lang_code)
@@ -357,18 +630,19 @@ class GroqAllRateLimitedError(Exception):
     pass
 
 
-def _groq_transcribe(file_path: str, groq_api_key: str | None = None, source_lang: str = "") -> str:
+def _groq_transcribe(audio: AudioUpload, groq_api_key: str | None = None, source_lang: str = "") -> str:
     """Transcribe audio using Groq Whisper with key-pool rotation.
 
-    Strategy: iterate over all available keys (user's key first), and for
-    each key try both Whisper models.  On 429, mark the key as rate-limited
-    and move to the next key.  On auth error, raise immediately.
+    Strategy: reserve the primary Whisper model on the available key with
+    the most budget left (user's key first while it has budget), falling
+    back to the turbo model when none has.  On 429, mark the key as
+    rate-limited and move to the next key.  On auth error, raise immediately.
     """
     if not Groq:
         raise ImportError("groq package not installed")
 
     from apps.interpretation.services.groq_key_pool import (
-        get_available_keys, mark_key_rate_limited,
+        acquire_key, get_available_keys, mark_key_rate_limited,
     )
 
     preferred = groq_api_key or _get_groq_key()
@@ -376,8 +650,6 @@ def _groq_transcribe(file_path: str, groq_api_key: str | None = None, source_lan
     if not keys:
         raise RuntimeError("No Groq API key available (none configured)")
 
-    file_data = open(file_path, "rb").read()
-    filename = os.path.basename(file_path)
     models = [_GROQ_WHISPER_PRIMARY, _GROQ_WHISPER_FALLBACK]
 
     # Build optional kwargs for Whisper language hint
@@ -385,39 +657,56 @@ def _groq_transcribe(file_path: str, groq_api_key: str | None = None, source_lan
     if source_lang:
         extra_kwargs["language"] = source_lang
 
-    for key in keys:
-        client = Groq(api_key=key)
-        for model in models:
+    tried = set()
+    while len(tried) < len(keys):
+        candidates = [k for k in keys if k not in tried]
+        # Budget-aware pick: the primary model on the key with the most
+        # headroom; the turbo model (own budget) only once none is left.
+        try:
+            model = models[0]
+            key = acquire_key(model, candidates, preferred_key=preferred, max_wait=0)
+        except RateLimitExhausted:
+            model = models[1]
             try:
+                key = acquire_key(model, candidates, preferred_key=preferred)
+            except RateLimitExhausted as e:
+                raise GroqAllRateLimitedError(
+                    f"All Groq keys rate-limited, retry in {e.retry_after:.0f}s"
+                ) from e
+
+        client = Groq(api_key=key, http_client=get_client(_GROQ_BASE_URL))
+        try:
+            with audio.open() as audio_file:
                 transcription = client.audio.transcriptions.create(
-                    file=(filename, file_data),
+                    file=(audio.name, audio_file),
                     model=model,
                     response_format="json",
                     temperature=0.0,
                     **extra_kwargs,
                 )
-                text = transcription.text.strip()
-                logger.info("Groq transcription done (model=%s, key=%s…%s, %d chars)",
-                            model, key[:8], key[-4:], len(text))
-                return text
-            except Exception as e:
-                if GroqAuthenticationError and isinstance(e, GroqAuthenticationError):
-                    logger.warning("Groq auth failed (key=%s…%s): %s", key[:8], key[-4:], e)
-                    raise GroqKeyInvalidError("Groq API key is invalid or revoked")
-                if GroqBadRequestError and isinstance(e, GroqBadRequestError):
-                    logger.warning("Groq %s bad request (audio too short?): %s", model, e)
-                    return ""
-                if GroqRateLimitError and isinstance(e, GroqRateLimitError):
-                    logger.warning("Groq %s rate-limited (key=%s…%s), trying next key",
-                                   model, key[:8], key[-4:])
-                    mark_key_rate_limited(key)
-                    break  # same key's other model likely also limited
-                raise
+            text = transcription.text.strip()
+            logger.info("Groq transcription done (model=%s, key=%s…%s, %d chars)",
+                        model, key[:8], key[-4:], len(text))
+            return text
+        except Exception as e:
+            if GroqAuthenticationError and isinstance(e, GroqAuthenticationError):
+                logger.warning("Groq auth failed (key=%s…%s): %s", key[:8], key[-4:], e)
+                raise GroqKeyInvalidError("Groq API key is invalid or revoked")
+            if GroqBadRequestError and isinstance(e, GroqBadRequestError):
+                logger.warning("Groq %s bad request (audio too short?): %s", model, e)
+                return ""
+            if GroqRateLimitError and isinstance(e, GroqRateLimitError):
+                logger.warning("Groq %s rate-limited (key=%s…%s), trying next key",
+                               model, key[:8], key[-4:])
+                mark_key_rate_limited(key)
+                tried.add(key)  # same key's other model likely also limited
+                continue
+            raise
 
     raise GroqAllRateLimitedError("All Groq keys rate-limited, retry later")
 
 
-def _dashscope_asr_transcribe(file_path: str) -> str:
+def _dashscope_asr_transcribe(audio: AudioUpload) -> str:
     """Transcribe audio using DashScope qwen3-asr-flash (paid tier).
 
     Uses DashScope's MultiModalConversation API via OSS upload.
@@ -431,7 +720,8 @@ def _dashscope_asr_transcribe(file_path: str) -> str:
 
     t0 = time.monotonic()
     from common.utils.dashscope_utils import upload_to_dashscope
-    oss_url = upload_to_dashscope(file_path, api_key, model="qwen3-asr-flash")
+    # The OSS upload needs a real file; in-memory audio is written out once
+    oss_url = upload_to_dashscope(audio.path, api_key, model="qwen3-asr-flash")
     if not oss_url:
         raise RuntimeError("Failed to upload audio to DashScope OSS")
     logger.info("[DashScope] OSS upload took %.2fs", time.monotonic() - t0)
@@ -485,40 +775,52 @@ def _dashscope_asr_transcribe(file_path: str) -> str:
     return text
 
 
-def _transcribe(file_path: str, source_lang: str = "", groq_api_key: str | None = None) -> tuple:
-    """Transcribe audio using the configured ASR provider (free tier).
+_ASR_MODEL_NAMES = {"groq": "Groq Whisper", "qwen3": "Qwen3-ASR"}
+
 
-    Provider is controlled by the ASR_PROVIDER env var / Django setting:
-      - "groq"  → Groq Whisper directly (default)
-      - "qwen3" → Qwen3-ASR primary, Groq Whisper fallback
+def _transcribe(audio: AudioUpload, source_lang: str = "", groq_api_key: str | None = None) -> tuple:
+    """Transcribe audio using the free-tier ASR providers.
+
+    ASR_PROVIDER ("groq" or "qwen3") is the preferred provider and the other
+    one (Qwen3-ASR only when QWEN3_ASR_BASE_URL is set) is the secondary;
+    ``asr_router`` skips a provider whose circuit breaker is open, demotes
+    one that has become much slower, and hedges a slow primary with the
+    secondary (ASR_HEDGE).
     Returns (text, asr_model, speaker_id, speaker_confidence) tuple.
     Speaker fields are always None for free tier.
     """
-    provider = getattr(django_settings, 'ASR_PROVIDER', 'groq').lower().strip()
     # If user provides their own Groq key, always use Groq directly
     if groq_api_key:
-        provider = "groq"
-    t0 = time.monotonic()
-
-    if provider == "qwen3":
-        # Qwen3-ASR primary with Groq fallback (no speaker identification for free tier)
-        try:
-            text = _qwen3_asr_transcribe(file_path, source_lang)
-            logger.info("[TIMING] Qwen3-ASR took %.2fs", time.monotonic() - t0)
-            return text, "Qwen3-ASR", None, None
-        except Exception as e:
-            logger.warning("[TIMING] Qwen3-ASR failed after %.2fs, falling back to Groq Whisper: %s",
-                           time.monotonic() - t0, e)
+        t0 = time.monotonic()
+        text = _groq_transcribe(audio, groq_api_key=groq_api_key, source_lang=source_lang)
+        logger.info("[TIMING] Groq Whisper took %.2fs (user key)", time.monotonic() - t0)
+        return text, "Groq Whisper", None, None
+
+    from apps.interpretation.services.asr_router import AllProvidersFailed, get_asr_router
+
+    if not audio.in_memory:
+        # A hedged loser may still be reading after we return and the caller
+        # removes the file; chunks sent to the free tier are small
+        audio = AudioUpload(audio.name, data=audio.read())
+    calls = {"groq": lambda: _groq_transcribe(audio, source_lang=source_lang)}
+    if getattr(django_settings, 'QWEN3_ASR_BASE_URL', ''):
+        calls["qwen3"] = lambda: _qwen3_asr_transcribe(audio, source_lang)
+    primary = getattr(django_settings, 'ASR_PROVIDER', 'groq').lower().strip()
+    preference = sorted(calls, key=lambda name: name != primary)
 
-    # Groq Whisper (default or fallback)
-    t1 = time.monotonic()
-    text = _groq_transcribe(file_path, groq_api_key=groq_api_key, source_lang=source_lang)
-    logger.info("[TIMING] Groq Whisper took %.2fs (provider=%s)", time.monotonic() - t1, provider)
-    return text, "Groq Whisper", None, None
+    t0 = time.monotonic()
+    try:
+        provider, text = get_asr_router().run(calls, preference)
+    except AllProvidersFailed as e:
+        # Groq's errors are the ones callers know how to report (rate limit, bad key)
+        raise e.errors.get("groq") or next(iter(e.errors.values())) from e
+    logger.info("[TIMING] %s took %.2fs (preferred=%s)",
+                _ASR_MODEL_NAMES[provider], time.monotonic() - t0, primary)
+    return text, _ASR_MODEL_NAMES[provider], None, None
 
 
 def transcribe_and_translate(
-    file_path: str,
+    audio,
     source_lang: str,
     target_lang: str,
     groq_api_key: str | None = None,
@@ -537,17 +839,20 @@ def transcribe_and_translate(
     session_id: optional speaker session ID for speaker identification
       (only effective when asr_tier="speaker_gpu")
 
+    audio: an AudioUpload (in memory or on disk) or a file path
+
     Returns dict: { transcription, translation, source_lang, target_lang,
                     speaker_id, speaker_confidence }
     Raises on failure.
     """
+    audio = _as_upload(audio)
     t0 = time.monotonic()
     speaker_id = None
     speaker_confidence = None
 
     if asr_tier == "speaker_gpu":
         # GPU server: Qwen3-ASR + CAM++ speaker identification
-        result = _gpu_server_transcribe(file_path, source_lang, session_id=session_id)
+        result = _gpu_server_transcribe(audio, source_lang, session_id=session_id)
         text = result["text"]
         speaker_id = result["speaker_id"]
         speaker_confidence = result["speaker_confidence"]
@@ -556,12 +861,12 @@ def transcribe_and_translate(
         raise NotImplementedError("TingWu speaker transcription coming soon")
     elif asr_tier == "premium":
         # Premium: DashScope qwen3-asr-flash (quality tier)
-        text = _dashscope_asr_transcribe(file_path)
+        text = _dashscope_asr_transcribe(audio)
         logger.info("[TIMING] DashScope ASR (premium) took %.2fs", time.monotonic() - t0)
     else:
         # Free: Groq Whisper or Qwen3-ASR fallback, no speaker identification
         text, _asr_model, _, _ = _transcribe(
-            file_path, source_lang, groq_api_key=groq_api_key,
+            audio, source_lang, groq_api_key=groq_api_key,
         )
 
     if not text:
@@ -621,8 +926,7 @@ def refine_and_translate(text: str, source_lang: str, target_lang: str):
 
 def _cerebras_refine(text: str, source_lang: str, max_tokens: int = 8192) -> str:
     """Use Cerebras to lightly fix ASR transcription errors."""
-    key = _get_cerebras_key()
-    if not key:
+    if not _cerebras_keys():
         raise RuntimeError("CEREBRAS_API_KEY_POOL not configured")
 
     src_name = _LANG_NAMES.get(source_lang.lower(), source_lang)
@@ -637,7 +941,7 @@ def _cerebras_refine(text: str, source_lang: str, max_tokens: int = 8192) -> str
         f"Keep the original wording as much as possible. "
         f"Output ONLY the corrected {src_name} text, nothing else."
     )
-    payload = json.dumps({
+    payload = {
         "model": "qwen-3-32b",
         "messages": [
             {"role": "system", "content": system_msg},
@@ -645,20 +949,8 @@ def _cerebras_refine(text: str, source_lang: str, max_tokens: int = 8192) -> str
         ],
         "max_tokens": max_tokens,
         "temperature": 0.1,
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        "https://api.cerebras.ai/v1/chat/completions",
-        data=payload,
-        headers={
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-        },
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
+    }
+    data = _cerebras_chat(payload, timeout=60)
     result = (data["choices"][0]["message"].get("content") or "").strip()
     result = re.sub(r'<think>[\s\S]*?</think>\s*', '', result).strip()
     return result
@@ -703,11 +995,10 @@ def generate_title(text: str, groq_api_key: str | None = None) -> str:
             logger.warning("Groq title generation failed, falling back to Cerebras: %s", e)
 
     # Fallback: Cerebras
-    key = _get_cerebras_key()
-    if not key:
+    if not _cerebras_keys():
         return "新录音"
 
-    payload = json.dumps({
+    payload = {
         "model": "qwen-3-32b",
         "messages": [
             {"role": "system", "content": f"/no_think\n{system_msg}"},
@@ -715,20 +1006,8 @@ def generate_title(text: str, groq_api_key: str | None = None) -> str:
         ],
         "max_tokens": 64,
         "temperature": 0.3,
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        "https://api.cerebras.ai/v1/chat/completions",
-        data=payload,
-        headers={
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-        },
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
+    }
+    data = _cerebras_chat(payload, timeout=15)
     result = (data["choices"][0]["message"].get("content") or "").strip()
     result = re.sub(r'<think>[\s\S]*?</think>\s*', '', result).strip()
     # Strip surrounding quotes
@@ -736,25 +1015,36 @@ def generate_title(text: str, groq_api_key: str | None = None) -> str:
     return result or "新录音"
 
 
-def transcribe_and_translate_stream(file_path: str, source_lang: str, target_lang: str):
+def transcribe_and_translate_stream(audio, source_lang: str, target_lang: str):
     """
     Streaming pipeline: yield NDJSON lines — transcription first, then translation.
-    Each line is a JSON object with an 'event' field.
+    Each line is a JSON object with an 'event' field: "transcription",
+    "translation_delta" (translated text as tokens arrive), "translation"
+    (the complete translation) and "done".
     """
     pipeline_start = time.monotonic()
 
     # Step 1: ASR transcription (Qwen3-ASR primary, Groq Whisper fallback)
-    text, asr_model, _, _ = _transcribe(file_path, source_lang)
+    text, asr_model, _, _ = _transcribe(_as_upload(audio), source_lang)
     yield json.dumps({"event": "transcription", "text": text, "asr_model": asr_model}) + "\n"
 
     if not text:
         yield json.dumps({"event": "done"}) + "\n"
         return
 
-    # Step 2: Cerebras translation
+    # Step 2: Cerebras translation, streamed as it is generated
     t_trans = time.monotonic()
-    translated = _cerebras_translate(text, source_lang, target_lang)
-    logger.info("[TIMING] Cerebras translation took %.2fs", time.monotonic() - t_trans)
+    first_token = None
+    parts = []
+    for delta in _cerebras_translate_stream(text, source_lang, target_lang):
+        if first_token is None:
+            first_token = time.monotonic() - t_trans
+        parts.append(delta)
+        yield json.dumps({"event": "translation_delta", "text": delta}) + "\n"
+    translated = "".join(parts).strip()
+    logger.info("[TIMING] Cerebras translation first token %.2fs, took %.2fs",
+                first_token or 0.0, time.monotonic() - t_trans)
+    # Full text for clients that do not assemble the deltas
     yield json.dumps({"event": "translation", "text": translated}) + "\n"
 
     logger.info("[TIMING] Full pipeline took %.2fs (ASR=%s)", time.monotonic() - pipeline_start, asr_model)
@@ -763,8 +1053,7 @@ def transcribe_and_translate_stream(file_path: str, source_lang: str, target_lan
 
 def _cerebras_summarize_stream(text: str):
     """Call Cerebras Qwen3-32B to generate meeting minutes, streaming."""
-    key = _get_cerebras_key()
-    if not key:
+    if not _cerebras_keys():
         raise RuntimeError("CEREBRAS_API_KEY_POOL not configured")
 
     system_msg = (
@@ -783,7 +1072,7 @@ def _cerebras_summarize_stream(text: str):
         "（总结会议结论）\n\n"
         "如果内容不像会议（例如是演讲、访谈等），请相应调整标题和格式。"
     )
-    payload = json.dumps({
+    payload = {
         "model": "qwen-3-32b",
         "messages": [
             {"role": "system", "content": system_msg},
@@ -791,38 +1080,8 @@ def _cerebras_summarize_stream(text: str):
         ],
         "max_tokens": 4096,
         "temperature": 0.3,
-        "stream": True,
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        "https://api.cerebras.ai/v1/chat/completions",
-        data=payload,
-        headers={
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-        },
-        method="POST",
-    )
-    resp = urllib.request.urlopen(req, timeout=60)
-    try:
-        for raw_line in resp:
-            line = raw_line.decode("utf-8").strip()
-            if not line or not line.startswith("data: "):
-                continue
-            data_str = line[6:]
-            if data_str == "[DONE]":
-                break
-            chunk = json.loads(data_str)
-            delta = chunk.get("choices", [{}])[0].get("delta", {})
-            content = delta.get("content", "")
-            if content:
-                # Strip <think>...</think> fragments
-                content = re.sub(r'<think>[\s\S]*?</think>\s*', '', content)
-                if content:
-                    yield content
-    finally:
-        resp.close()
+    }
+    yield from _cerebras_stream_chat(payload, timeout=60)
 
 
 def generate_minutes_stream(entries):
@@ -10,6 +10,7 @@ from dataclasses import dataclass
 
 from common.config import get_settings
 from common.providers import ProviderManager, ServiceType, ProviderType
+from common.utils.translation_cache import cached_translation
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +24,19 @@ class TranslationResult:
     target_lang: str
 
 
+def _cached_text(result: TranslationResult) -> str:
+    return result.translated_text
+
+
+def _from_cache(service, text: str, source_lang: str, target_lang: str, translated: str) -> TranslationResult:
+    return TranslationResult(
+        original_text=text,
+        translated_text=translated,
+        source_lang=source_lang,
+        target_lang=target_lang,
+    )
+
+
 class TranslationService:
     """
     Translation Service using configurable AI providers.
@@ -39,6 +53,7 @@ class TranslationService:
     ):
         self.source_lang = source_lang
         self.target_lang = target_lang
+        self.provider = provider
         
         # Get the translation provider
         settings = get_settings()
@@ -52,6 +67,8 @@ class TranslationService:
             model=self.model,
         )
 
+    @cached_translation(provider=lambda self: self.provider, model=lambda self: self.model,
+                        unwrap=_cached_text, wrap=_from_cache)
     def translate(
         self,
         text: str,
@@ -81,6 +98,8 @@ class TranslationService:
             logger.error(f"Translation error: {e}")
             raise
 
+    @cached_translation(provider=lambda self: self.provider, model=lambda self: self.model,
+                        unwrap=_cached_text, wrap=_from_cache)
     async def translate_async(
         self,
         text: str,
@@ -0,0 +1,273 @@
+"""
+Client-side voice activity detection and pause-based chunking.
+
+Groq Whisper is request/response, so the realtime path has to decide where
+to cut the stream. Fixed windows split words and upload silence; here the
+stream is cut on pauses instead:
+
+- ``EnergyVAD`` classifies 30 ms frames of 16-bit PCM from RMS energy and
+  zero-crossing rate, against a noise floor that adapts to the room.
+- ``VADSegmenter`` turns frames into segments: a segment ends after
+  ``silence_ms`` of silence once it is at least ``min_segment_s`` long, is
+  force-cut at ``max_segment_s`` (repeating ``overlap_ms`` of audio into the
+  next segment), and is dropped if it holds too little speech to be worth
+  an API call.
+- ``plan_segments`` does the offline equivalent for whole recordings: cut
+  near a target length at the quietest point, with a short overlap. It
+  only reads the audio around each cut, never the whole recording.
+
+Any object with ``frame_bytes`` and ``is_speech(frame) -> bool`` can stand in
+for ``EnergyVAD`` (e.g. a webrtcvad wrapper).
+"""
+
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+
+@dataclass
+class AudioSegment:
+    """A chunk of PCM audio ready for transcription"""
+    audio: bytes
+    duration_s: float
+    voiced_s: float
+    overlap_s: float = 0.0  # leading audio repeated from the previous segment
+
+
+class EnergyVAD:
+    """RMS energy + zero-crossing-rate speech detector for 16-bit mono PCM."""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        energy_threshold: float = 300.0,
+        noise_ratio: float = 3.0,
+        zcr_max: float = 0.35,
+    ):
+        if np is None:
+            raise RuntimeError("EnergyVAD requires numpy")
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * SAMPLE_WIDTH
+        self.energy_threshold = energy_threshold
+        self.noise_ratio = noise_ratio
+        self.zcr_max = zcr_max
+        self._noise_floor = energy_threshold / noise_ratio
+
+    def is_speech(self, frame: bytes) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        if samples.size == 0:
+            return False
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        zcr = float(np.count_nonzero(np.diff(np.signbit(samples)))) / samples.size
+
+        threshold = max(self.energy_threshold, self._noise_floor * self.noise_ratio)
+        # Loud frames are speech even with a high ZCR (fricatives like "s")
+        speech = rms > threshold * 2 or (rms > threshold and zcr < self.zcr_max)
+        if not speech:
+            # Track the noise floor on non-speech frames only
+            self._noise_floor = 0.95 * self._noise_floor + 0.05 * rms
+        return speech
+
+
+class VADSegmenter:
+    """Accumulates PCM and emits :class:`AudioSegment` objects cut on pauses."""
+
+    def __init__(
+        self,
+        vad,
+        sample_rate: int = 16000,
+        silence_ms: int = 500,
+        min_segment_s: float = 1.5,
+        max_segment_s: float = 8.0,
+        overlap_ms: int = 250,
+        padding_ms: int = 150,
+        min_voiced_ms: int = 250,
+    ):
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.frame_bytes = vad.frame_bytes
+        self.frame_s = self.frame_bytes / (sample_rate * SAMPLE_WIDTH)
+        self.silence_frames = max(1, int(silence_ms / 1000 / self.frame_s))
+        self.min_frames = int(min_segment_s / self.frame_s)
+        self.max_frames = max(1, int(max_segment_s / self.frame_s))
+        self.overlap_frames = int(overlap_ms / 1000 / self.frame_s)
+        self.padding_frames = int(padding_ms / 1000 / self.frame_s)
+        self.min_voiced_frames = int(min_voiced_ms / 1000 / self.frame_s)
+
+        self._pending = bytearray()
+        self._preroll: deque = deque(maxlen=max(1, self.padding_frames))
+        self._frames: List[bytes] = []
+        self._voiced = 0
+        self._trailing_silence = 0
+        self._overlap = 0
+        # Seconds of audio received vs. sent, for logging the saving
+        self.received_s = 0.0
+        self.emitted_s = 0.0
+
+    def push(self, audio: bytes) -> List[AudioSegment]:
+        """Add audio; return every segment completed by it (usually none or one)."""
+        self._pending.extend(audio)
+        segments = []
+        usable = len(self._pending) - len(self._pending) % self.frame_bytes
+        with memoryview(self._pending) as view:
+            for offset in range(0, usable, self.frame_bytes):
+                segment = self._push_frame(bytes(view[offset:offset + self.frame_bytes]))
+                if segment is not None:
+                    segments.append(segment)
+        del self._pending[:usable]
+        return segments
+
+    def flush(self) -> Optional[AudioSegment]:
+        """Emit whatever speech is buffered (end of stream)."""
+        self._pending.clear()  # less than one frame
+        return self._cut(len(self._frames), carry=0)
+
+    def _push_frame(self, frame: bytes) -> Optional[AudioSegment]:
+        self.received_s += self.frame_s
+        speech = self.vad.is_speech(frame)
+
+        if not self._frames:
+            if not speech:
+                self._preroll.append(frame)
+                return None
+            # Start a segment with a little audio from before the onset
+            self._frames = list(self._preroll) if self.padding_frames else []
+            self._preroll.clear()
+
+        self._frames.append(frame)
+        if speech:
+            self._voiced += 1
+            self._trailing_silence = 0
+        else:
+            self._trailing_silence += 1
+
+        if len(self._frames) >= self.max_frames:
+            # No pause in sight: hard cut, carry a short overlap forward
+            return self._cut(len(self._frames), carry=self.overlap_frames)
+        if self._trailing_silence >= self.silence_frames:
+            if len(self._frames) >= self.min_frames or self._trailing_silence >= 3 * self.silence_frames:
+                keep = len(self._frames) - self._trailing_silence + self.padding_frames
+                return self._cut(keep, carry=0)
+        return None
+
+    def _cut(self, keep: int, carry: int) -> Optional[AudioSegment]:
+        frames = self._frames[:keep]
+        voiced, overlap = self._voiced, self._overlap
+        carried = frames[-carry:] if carry else []
+
+        self._frames = list(carried)
+        self._voiced = 0
+        self._trailing_silence = 0
+        self._overlap = len(carried)
+        if not carried:
+            self._preroll.clear()
+
+        if not frames:
+            return None
+        if voiced < self.min_voiced_frames:
+            logger.debug(f"VAD dropped {len(frames) * self.frame_s:.2f}s segment without speech")
+            return None
+        duration = len(frames) * self.frame_s
+        self.emitted_s += duration
+        return AudioSegment(
+            audio=b"".join(frames),
+            duration_s=duration,
+            voiced_s=voiced * self.frame_s,
+            overlap_s=overlap * self.frame_s,
+        )
+
+
+def _quietest_offset(pcm: bytes, sample_rate: int, frame_ms: int) -> Optional[float]:
+    """Seconds into *pcm* of the quietest ~300 ms, or None without numpy / audio."""
+    if np is None:
+        return None
+    frame = int(sample_rate * frame_ms / 1000)
+    samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // SAMPLE_WIDTH).astype(np.float32)
+    frames = samples[: samples.size // frame * frame]
+    if not frames.size:
+        return None
+    energy = np.sqrt(np.mean(frames.reshape(-1, frame) ** 2, axis=1))
+    smooth = np.convolve(energy, np.ones(10) / 10, mode="same")
+    return int(np.argmin(smooth)) * frame / sample_rate
+
+
+def plan_segments(
+    duration_s: float,
+    read_window: Callable[[float, float], bytes],
+    sample_rate: int = 16000,
+    target_s: float = 120.0,
+    search_s: float = 20.0,
+    overlap_s: float = 1.0,
+    frame_ms: int = 30,
+) -> List[Tuple[float, float]]:
+    """Split a recording of *duration_s* into ``(start_s, end_s)`` ranges cut at pauses.
+
+    Each cut goes at the quietest ~300 ms in the last ``search_s`` seconds
+    before ``target_s``; ``read_window(start_s, length_s)`` returns that
+    stretch as 16-bit mono PCM at *sample_rate* (e.g. from ``decode_pcm``),
+    so only the search windows are ever decoded. Every segment after the
+    first starts ``overlap_s`` early so a word at a cut is heard whole
+    (de-duplicate the text with :func:`merge_overlap_text`). Without numpy
+    the cuts fall at ``target_s``.
+    """
+    cuts = []
+    position = 0.0
+    while duration_s - position > target_s:
+        cut = position + target_s
+        if np is not None:
+            window_start = max(position + target_s / 2, cut - search_s)
+            offset = _quietest_offset(read_window(window_start, cut - window_start), sample_rate, frame_ms)
+            if offset is not None:
+                cut = window_start + offset
+        cuts.append(cut)
+        position = cut
+
+    bounds = [0.0, *cuts, duration_s]
+    return [
+        (max(0.0, start - overlap_s) if i else start, end)
+        for i, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    ]
+
+
+# Kana and CJK ideographs are written without spaces: compare them per character
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN = re.compile(rf"[{_CJK}]|[^\W{_CJK}]+", re.UNICODE)
+_CJK_CHAR = re.compile(rf"[{_CJK}]")
+# A CJK "word" is about this many characters when sizing the comparison window
+_CJK_CHARS_PER_WORD = 3
+
+
+def merge_overlap_text(previous: str, text: str, max_words: int = 4) -> str:
+    """Drop the words at the start of *text* that repeat the end of *previous*.
+
+    Used after a hard cut, where the overlapping audio is transcribed twice.
+    Each CJK character counts as one token; a repeat made only of CJK
+    characters must be at least two long, since one shared character is
+    usually a coincidence.
+    """
+    if not previous or not text:
+        return text
+    limit = max_words * _CJK_CHARS_PER_WORD if _CJK_CHAR.search(previous[-max_words * 8:]) else max_words
+    prev_tokens = [t.lower() for t in _TOKEN.findall(previous)[-limit:]]
+    matches = list(_TOKEN.finditer(text))
+    for n in range(min(limit, len(prev_tokens), len(matches)), 0, -1):
+        head = [m.group().lower() for m in matches[:n]]
+        if prev_tokens[-n:] != head:
+            continue
+        if n == 1 and _CJK_CHAR.fullmatch(head[0]):
+            break
+        return text[matches[n - 1].end():].lstrip(" ,.;:!?，。、")
+    return text
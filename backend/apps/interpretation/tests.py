@@ -0,0 +1,1230 @@
+import asyncio
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from common.config import get_settings
+from common.utils import translation_cache
+from common.utils.audio_buffer import AudioUpload
+from common.utils.http_client import get_client
+from common.utils.translation_cache import TranslationCache
+
+from . import consumers
+from .consumers import ASRConsumer
+from .models import FileASRJob
+from .services import asr_router, file_asr_jobs
+from .services.file_asr_jobs import FileASRJobQueue, QueueFull, _is_retryable, cleanup_jobs
+from .services.asr_router import AllProvidersFailed, ASRRouter, ProviderStats
+from .services.asr_service import TranscriptionResult
+from .services.event_bridge import ASREventBridge
+from .services.file_asr_service import FileASRService, _stitch_texts
+from .services.groq_realtime_service import GroqRealtimeASRService, GroqTranslationService
+from .services.pipeline import BatchPolicy, StagePipeline
+from .services import transcribe_translate_service
+from .services.transcribe_translate_service import _ThinkStripper, normalize_audio
+from .services.speculative import SpeculativeTranslator, join_translations, stable_prefix
+from .services.vad import EnergyVAD, VADSegmenter, merge_overlap_text, np, plan_segments
+
+RATE = 16000
+
+
+def _tone_with_gap(duration_s, gap_start_s, gap_s=0.5):
+    """16-bit PCM of a loud tone with one silent gap."""
+    t = np.arange(int(duration_s * RATE)) / RATE
+    samples = 8000 * np.sin(2 * np.pi * 220 * t)
+    samples[int(gap_start_s * RATE):int((gap_start_s + gap_s) * RATE)] = 0
+    return samples.astype(np.int16).tobytes()
+
+
+class MergeOverlapTextTests(SimpleTestCase):
+    def test_drops_repeated_words(self):
+        self.assertEqual(merge_overlap_text("so we talked about the model", "The model is big"), "is big")
+
+    def test_keeps_text_without_overlap(self):
+        self.assertEqual(merge_overlap_text("so we talked", "about the model"), "about the model")
+
+    def test_drops_repeated_cjk_characters(self):
+        self.assertEqual(
+            merge_overlap_text("我们今天讨论一下机器学习的基本概念", "学习的基本概念，和应用场景"),
+            "和应用场景",
+        )
+
+    def test_single_shared_cjk_character_is_kept(self):
+        self.assertEqual(merge_overlap_text("今天天气很好", "好的我们开始"), "好的我们开始")
+
+    def test_mixed_scripts(self):
+        self.assertEqual(merge_overlap_text("我们讨论 the model", "the model 很大"), "很大")
+
+    def test_stitch_joins_cjk_without_repeats(self):
+        self.assertEqual(_stitch_texts(["大家好，今天我们讲", "今天我们讲机器学习"]), "大家好，今天我们讲机器学习")
+
+    def test_stitch_marks_failed_segments_and_does_not_merge_across_them(self):
+        self.assertEqual(_stitch_texts(["we said the model", None, None, "the model is big"]),
+                         "we said the model [...] the model is big")
+        self.assertEqual(_stitch_texts([None, "hello"]), "[...] hello")
+
+
+@skipUnless(np is not None, "numpy is not installed")
+class PlanSegmentsTests(SimpleTestCase):
+    def _reader(self, pcm):
+        reads = []
+
+        def read_window(start, length):
+            reads.append((start, length))
+            first = int(start * RATE) * 2
+            return pcm[first:first + int(length * RATE) * 2]
+
+        return read_window, reads
+
+    def test_short_recording_is_one_segment(self):
+        read_window, reads = self._reader(b"")
+        self.assertEqual(plan_segments(90.0, read_window, target_s=120), [(0.0, 90.0)])
+        self.assertEqual(reads, [])
+
+    def test_cuts_at_the_pause_and_reads_only_search_windows(self):
+        pcm = _tone_with_gap(70.0, gap_start_s=25.0)
+        read_window, reads = self._reader(pcm)
+        ranges = plan_segments(70.0, read_window, target_s=30, search_s=10, overlap_s=1.0)
+
+        cut = ranges[0][1]
+        self.assertGreaterEqual(cut, 24.8)
+        self.assertLessEqual(cut, 25.6)
+        self.assertEqual(ranges[1][0], cut - 1.0)
+        self.assertEqual(ranges[-1][1], 70.0)
+        # Only the last search_s seconds before each target are decoded
+        self.assertEqual(reads[0], (20.0, 10.0))
+        self.assertTrue(all(length <= 10.0 for _, length in reads))
+
+    def test_undecodable_windows_cut_at_the_target(self):
+        ranges = plan_segments(70.0, lambda start, length: b"", target_s=30, overlap_s=0)
+        self.assertEqual(ranges, [(0.0, 30.0), (30.0, 60.0), (60.0, 70.0)])
+
+    def test_window_with_a_trailing_half_sample_is_read_whole_samples(self):
+        pcm = _tone_with_gap(70.0, gap_start_s=25.0)
+        read_window, _ = self._reader(pcm)
+        ranges = plan_segments(70.0, lambda start, length: read_window(start, length) + b"\0",
+                               target_s=30, search_s=10)
+        self.assertGreaterEqual(ranges[0][1], 24.8)
+        self.assertLessEqual(ranges[0][1], 25.6)
+
+
+class ASREventBridgeTests(SimpleTestCase):
+    def _from_thread(self, bridge, events):
+        thread = threading.Thread(target=lambda: [bridge.put(event) for event in events])
+        thread.start()
+        return thread
+
+    async def test_events_from_another_thread_arrive_in_order(self):
+        bridge = ASREventBridge()
+        bridge.put("connected")  # before attach: buffered
+        bridge.attach()
+        thread = self._from_thread(bridge, range(200))
+        received = [await asyncio.wait_for(bridge.get(), 5) for _ in range(201)]
+        thread.join()
+        self.assertEqual(received, ["connected", *range(200)])
+
+    async def test_close_wakes_a_pending_get(self):
+        bridge = ASREventBridge()
+        bridge.attach()
+        waiter = asyncio.create_task(bridge.get())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+        thread = threading.Thread(target=bridge.close)
+        thread.start()
+        self.assertIsNone(await asyncio.wait_for(waiter, 5))
+        thread.join()
+
+    async def test_events_before_close_are_still_delivered(self):
+        bridge = ASREventBridge()
+        bridge.attach()
+        self._from_thread(bridge, ["a", "b"]).join()
+        bridge.close()
+        bridge.put("late")
+        self.assertEqual([await bridge.get(), await bridge.get(), await bridge.get()], ["a", "b", None])
+        self.assertIsNone(await bridge.get())
+
+    async def test_close_on_a_full_queue_ends_after_the_last_event(self):
+        bridge = ASREventBridge(maxsize=2)
+        bridge.attach()
+        self._from_thread(bridge, ["a", "b", "dropped"]).join()
+        bridge.close()
+        await asyncio.sleep(0.01)
+        self.assertEqual([await bridge.get(), await bridge.get(), await bridge.get()], ["a", "b", None])
+
+    async def test_closed_before_attach(self):
+        bridge = ASREventBridge()
+        bridge.put("connected")
+        bridge.close()
+        bridge.attach()
+        self.assertEqual([await bridge.get(), await bridge.get()], ["connected", None])
+
+    def test_put_after_the_loop_closed_does_not_raise(self):
+        bridge = ASREventBridge()
+
+        async def attach():
+            bridge.attach()
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(attach())
+        loop.close()
+        bridge.put("late")
+        bridge.close()
+
+    def test_detach_keeps_undelivered_events(self):
+        bridge = ASREventBridge()
+
+        async def attach_and_detach():
+            bridge.attach()
+            bridge.put("a")
+            await asyncio.sleep(0)
+            bridge.close()
+            await asyncio.sleep(0)
+            bridge.detach()
+
+        asyncio.run(attach_and_detach())
+        self.assertEqual(bridge.get_all_events(), ["a"])
+
+
+class ThinkStripperTests(SimpleTestCase):
+    def _strip(self, chunks):
+        stripper = _ThinkStripper()
+        return "".join(stripper.feed(chunk) for chunk in chunks) + stripper.flush()
+
+    def _splits(self, text):
+        """Every way to cut *text* into two and three chunks."""
+        for i in range(len(text) + 1):
+            yield [text[:i], text[i:]]
+            for j in range(i, len(text) + 1):
+                yield [text[:i], text[i:j], text[j:]]
+
+    def test_matches_the_whole_response_regex_however_it_is_chunked(self):
+        for text, expected in (
+            ("<think>\nplan\n</think>\n\n你好，世界", "你好，世界"),
+            ("  Hello <think>x</think>  world", "Hello world"),
+            ("a<think>1</think>b<think>2</think>c", "abc"),
+            ("no tags at all", "no tags at all"),
+            ("x < y and <thin k>", "x < y and <thin k>"),
+        ):
+            self.assertEqual(re.sub(r"<think>[\s\S]*?</think>\s*", "", text).lstrip(), expected)
+            for chunks in self._splits(text):
+                self.assertEqual(self._strip(chunks), expected, chunks)
+
+    def test_nested_block_ends_at_the_first_close_tag(self):
+        # Same as the non-greedy regex used on complete responses
+        self.assertEqual(self._strip(["<think>a<think>b</thi", "nk> c</think>d"]), "c</think>d")
+
+    def test_unterminated_block_is_dropped(self):
+        self.assertEqual(self._strip(["Hi <think>still reasoning", " when the stream ends"]), "Hi ")
+        self.assertEqual(self._strip(["<think>reasoning</thi"]), "")
+
+    def test_partial_tag_at_the_end_of_the_stream_is_text(self):
+        self.assertEqual(self._strip(["5 <thi"]), "5 <thi")
+
+    def test_output_is_not_delayed_by_more_than_a_possible_tag(self):
+        stripper = _ThinkStripper()
+        self.assertEqual(stripper.feed("\n  Hello wor"), "Hello wor")
+        self.assertEqual(stripper.feed("ld <th"), "ld ")
+        self.assertEqual(stripper.feed("ink>x</think>\n"), "")
+        self.assertEqual(stripper.feed("  again"), "again")
+
+
+def _pcm(*parts):
+    """16-bit PCM from ``("tone" | "silence", seconds)`` parts."""
+    chunks = []
+    for kind, seconds in parts:
+        t = np.arange(int(seconds * RATE)) / RATE
+        samples = 8000 * np.sin(2 * np.pi * 220 * t) if kind == "tone" else np.zeros_like(t)
+        chunks.append(samples.astype(np.int16).tobytes())
+    return b"".join(chunks)
+
+
+@skipUnless(np is not None, "numpy is not installed")
+class VADSegmenterTests(SimpleTestCase):
+    # 30 ms frames: 500 ms pause, 150 ms padding, 250 ms overlap, 8 s hard cut
+    def _segmenter(self, **kwargs):
+        return VADSegmenter(EnergyVAD(sample_rate=RATE), sample_rate=RATE, **kwargs)
+
+    def _push(self, segmenter, pcm, chunk=3200):
+        segments = []
+        for offset in range(0, len(pcm), chunk):
+            segments.extend(segmenter.push(pcm[offset:offset + chunk]))
+        return segments
+
+    def test_energy_vad(self):
+        vad = EnergyVAD(sample_rate=RATE)
+        self.assertTrue(vad.is_speech(_pcm(("tone", 0.03))))
+        self.assertFalse(vad.is_speech(_pcm(("silence", 0.03))))
+
+    def test_silence_gives_no_segments(self):
+        segmenter = self._segmenter()
+        self.assertEqual(self._push(segmenter, _pcm(("silence", 5.0))), [])
+        self.assertIsNone(segmenter.flush())
+        self.assertAlmostEqual(segmenter.received_s, 5.0, delta=0.03)
+        self.assertEqual(segmenter.emitted_s, 0.0)
+
+    def test_tone_then_pause_is_cut_at_the_pause(self):
+        segmenter = self._segmenter()
+        segments = self._push(segmenter, _pcm(("tone", 2.0), ("silence", 1.0)))
+        self.assertEqual(len(segments), 1)
+        segment = segments[0]
+        # The tone plus 150 ms of padding after it, not the rest of the pause
+        self.assertAlmostEqual(segment.duration_s, 2.15, delta=0.06)
+        self.assertAlmostEqual(segment.voiced_s, 2.0, delta=0.06)
+        self.assertEqual(segment.overlap_s, 0)
+        self.assertEqual(len(segment.audio), round(segment.duration_s * RATE) * 2)
+
+    def test_preroll_and_hangover_padding_are_kept(self):
+        segmenter = self._segmenter()
+        segments = self._push(segmenter, _pcm(("silence", 1.0), ("tone", 2.0), ("silence", 1.0)))
+        self.assertEqual(len(segments), 1)
+        audio = np.frombuffer(segments[0].audio, dtype=np.int16)
+        self.assertAlmostEqual(segments[0].duration_s, 2.3, delta=0.06)
+        # 150 ms of the silence before the onset and after the end
+        self.assertFalse(audio[:int(0.14 * RATE)].any())
+        self.assertFalse(audio[-int(0.14 * RATE):].any())
+        self.assertTrue(audio[int(0.2 * RATE):int(2.0 * RATE)].any())
+
+    def test_short_pause_does_not_split_a_short_segment(self):
+        segmenter = self._segmenter()
+        segments = self._push(segmenter, _pcm(("tone", 0.5), ("silence", 0.6), ("tone", 1.0), ("silence", 1.0)))
+        self.assertEqual(len(segments), 1)
+        self.assertAlmostEqual(segments[0].duration_s, 2.25, delta=0.06)
+
+    def test_long_speech_is_split_at_the_maximum_with_overlap(self):
+        segmenter = self._segmenter()
+        segments = self._push(segmenter, _pcm(("tone", 20.0)))
+        self.assertEqual(len(segments), 2)
+        self.assertTrue(all(7.9 <= segment.duration_s <= 8.0 for segment in segments))
+        self.assertEqual(segments[0].overlap_s, 0)
+        self.assertAlmostEqual(segments[1].overlap_s, 0.24, delta=0.001)
+
+        rest = segmenter.flush()
+        self.assertAlmostEqual(rest.duration_s, 20.0 - 2 * 7.98 + 2 * 0.24, delta=0.06)
+        self.assertGreater(rest.overlap_s, 0)
+
+    def test_flush_emits_speech_without_a_closing_pause(self):
+        segmenter = self._segmenter()
+        self.assertEqual(self._push(segmenter, _pcm(("tone", 1.0))), [])
+        segment = segmenter.flush()
+        self.assertAlmostEqual(segment.duration_s, 1.0, delta=0.06)
+        self.assertIsNone(segmenter.flush())
+
+    def test_chunk_size_does_not_change_the_cuts(self):
+        pcm = _pcm(("silence", 0.5), ("tone", 2.0), ("silence", 1.0), ("tone", 1.7), ("silence", 1.0))
+        expected = [segment.audio for segment in self._push(self._segmenter(), pcm, chunk=len(pcm))]
+        self.assertEqual(len(expected), 2)
+        for chunk in (999, 4096):
+            self.assertEqual([segment.audio for segment in self._push(self._segmenter(), pcm, chunk)], expected)
+
+
+@override_settings(ASR_TRANSCODE_ENABLED=True, ASR_TRANSCODE_CODEC="flac", ASR_TRANSCODE_MIN_BYTES=1000,
+                   ASR_TRANSCODE_MAX_RATIO=0.8, ASR_TRANSCODE_TIMEOUT=5.0)
+class NormalizeAudioTests(SimpleTestCase):
+    """The ffmpeg transcode path, with ffmpeg itself faked."""
+
+    def setUp(self):
+        patcher = mock.patch.object(transcribe_translate_service, "ffmpeg_binary", return_value="/usr/bin/ffmpeg")
+        self.ffmpeg_binary = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(transcribe_translate_service.subprocess, "run")
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _ffmpeg_returns(self, stdout=b"", returncode=0, seconds=12.5):
+        self.run.return_value = subprocess.CompletedProcess(
+            [], returncode, stdout=stdout, stderr=f"out_time_us={int(seconds * 1e6)}\nprogress=end\n".encode(),
+        )
+
+    def _command(self):
+        return self.run.call_args.args[0]
+
+    def test_large_upload_is_transcoded_to_16k_mono_flac(self):
+        self._ffmpeg_returns(stdout=b"f" * 500)
+        original = AudioUpload("talk.webm", data=b"w" * 5000)
+        path = original.path  # a temp file the transcode should clean up
+
+        audio = normalize_audio(original)
+        self.assertEqual((audio.name, audio.read(), audio.duration), ("talk.flac", b"f" * 500, 12.5))
+        command = self._command()
+        self.assertEqual(command[command.index("-ar") + 1], "16000")
+        self.assertEqual(command[command.index("-ac") + 1], "1")
+        self.assertIn("pipe:0", command)
+        self.assertEqual(self.run.call_args.kwargs["input"], b"w" * 5000)
+        self.assertFalse(os.path.exists(path))
+
+    def test_container_needing_seeks_is_read_from_a_path(self):
+        self._ffmpeg_returns(stdout=b"f" * 500)
+        with AudioUpload("memo.m4a", data=b"m" * 5000) as original:
+            normalize_audio(original)
+            self.assertNotIn("pipe:0", self._command())
+            self.assertIsNone(self.run.call_args.kwargs["input"])
+
+    def test_missing_ffmpeg_passes_the_original_through(self):
+        self.ffmpeg_binary.return_value = None
+        original = AudioUpload("talk.webm", data=b"w" * 5000)
+        self.assertIs(normalize_audio(original), original)
+        self.run.assert_not_called()
+
+    def test_ffmpeg_failure_passes_the_original_through(self):
+        for failure in ({"returncode": 1}, {"side_effect": subprocess.TimeoutExpired("ffmpeg", 5.0)},
+                        {"side_effect": OSError("exec format error")}):
+            self.run.reset_mock(return_value=True, side_effect=True)
+            if "returncode" in failure:
+                self._ffmpeg_returns(stdout=b"", returncode=1)
+            else:
+                self.run.side_effect = failure["side_effect"]
+            original = AudioUpload("talk.webm", data=b"w" * 5000)
+            audio = normalize_audio(original)
+            self.assertIs(audio, original)
+            self.assertEqual(audio.read(), b"w" * 5000)
+            self.assertIsNone(audio.duration)
+
+    def test_already_16k_mono_input_is_kept_when_transcoding_saves_little(self):
+        self._ffmpeg_returns(stdout=b"f" * 4500)
+        original = AudioUpload("talk.flac", data=b"f" * 5000)
+        audio = normalize_audio(original)
+        self.assertIs(audio, original)
+        self.assertEqual(audio.duration, 12.5)
+
+    def test_small_upload_is_only_measured_when_asked(self):
+        original = AudioUpload("hi.webm", data=b"w" * 100)
+        self.assertIs(normalize_audio(original), original)
+        self.run.assert_not_called()
+
+        self._ffmpeg_returns(seconds=1.25)
+        self.assertIs(normalize_audio(original, need_duration=True), original)
+        self.assertEqual(original.duration, 1.25)
+        self.assertEqual(self._command()[-3:], ["-f", "null", "-"])
+
+    @override_settings(ASR_TRANSCODE_ENABLED=False)
+    def test_disabled(self):
+        original = AudioUpload("talk.webm", data=b"w" * 5000)
+        self.assertIs(normalize_audio(original), original)
+        self.run.assert_not_called()
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class LongAudioTests(SimpleTestCase):
+    RANGES = [(0.0, 120.0), (119.0, 240.0), (239.0, 300.0)]
+
+    def setUp(self):
+        for target, value in (("plan_segments", self.RANGES), ("update_progress", None)):
+            patcher = mock.patch(f"apps.interpretation.services.file_asr_service.{target}", return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("apps.interpretation.services.groq_key_pool.get_available_keys", return_value=["k1", "k2"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, transcribe):
+        with mock.patch.object(FileASRService, "_transcribe_segment", side_effect=transcribe):
+            return FileASRService._run_long_audio("task-1", "transcription", "a.mp3", 300.0, "k1", "whisper")
+
+    def test_failed_segment_is_marked_and_its_range_reported(self):
+        def transcribe(task_type, file_path, start, end, *args):
+            if start == 119.0:
+                raise RuntimeError("still rate-limited")
+            return f"from {start:.0f}"
+
+        outcome = self._run(transcribe)
+        self.assertEqual(outcome["full_text"], "from 0 [...] from 239")
+        self.assertEqual(outcome["failed_ranges"], [[119.0, 240.0]])
+        self.assertEqual([segment["status"] for segment in outcome["segments"]], ["SUCCEEDED", "FAILED", "SUCCEEDED"])
+        self.assertEqual(outcome["progress"], {"completed": 2, "failed": 1, "total": 3})
+
+    def test_all_segments_failing_fails_the_job(self):
+        with self.assertRaisesMessage(RuntimeError, "All 3 segments failed"):
+            self._run(RuntimeError("down"))
+
+
+class FileASRJobQueueTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(MEDIA_ROOT=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        os.makedirs(os.path.join(tmp.name, "asr_uploads"))
+        self.media = tmp.name
+        self.queue = FileASRJobQueue(workers=1, max_queued=2, max_attempts=2, retry_delay=5.0, stale_s=60.0)
+        # Jobs are run by hand: no worker or heartbeat threads
+        patcher = mock.patch.object(FileASRJobQueue, "_start_workers")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _upload(self, name="a.wav"):
+        path = os.path.join(self.media, "asr_uploads", name)
+        with open(path, "wb") as f:
+            f.write(b"RIFF")
+        return path
+
+    def _submit(self, task_id, runner, priority=0):
+        path = self._upload(f"{task_id}.wav")
+        self.queue.submit(task_id, "transcription", path, "key", "whisper", runner=runner, priority=priority)
+        return path
+
+    def _next(self):
+        _, _, job = self.queue._queue.get_nowait()
+        return job
+
+    def test_is_retryable(self):
+        self.assertTrue(_is_retryable(RuntimeError("boom")))
+        self.assertTrue(_is_retryable(_HTTPError(429)))
+        self.assertTrue(_is_retryable(_HTTPError(503)))
+        self.assertFalse(_is_retryable(_HTTPError(400)))
+        self.assertFalse(_is_retryable(FileNotFoundError("gone")))
+        self.assertFalse(_is_retryable(ImportError("groq")))
+
+    def test_priority_order_and_backlog_limit(self):
+        self._submit("big", lambda *args: {}, priority=5)
+        self._submit("small", lambda *args: {}, priority=0)
+        with self.assertRaises(QueueFull):
+            self._submit("more", lambda *args: {})
+        self.assertEqual(FileASRJob.objects.get(pk="big").status, FileASRJob.Status.PENDING)
+        self.assertEqual([self._next().task_id, self._next().task_id], ["small", "big"])
+
+    def test_success_stores_result_and_removes_upload(self):
+        path = self._submit("t1", lambda *args: {"full_text": "hi", "progress": {"completed": 1}})
+        self.queue._run(self._next())
+        job = FileASRJob.objects.get(pk="t1")
+        self.assertEqual(job.status, FileASRJob.Status.SUCCEEDED)
+        self.assertEqual((job.result["full_text"], job.progress, job.attempts), ("hi", {"completed": 1}, 1))
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.queue.heartbeat(), 0)
+
+    def test_retryable_failure_backs_off_then_fails(self):
+        runner = mock.Mock(side_effect=_HTTPError(503))
+        path = self._submit("t1", runner)
+        with mock.patch.object(file_asr_jobs.threading, "Timer") as timer:
+            self.queue._run(self._next())
+        self.assertEqual(timer.call_args.args[0], 5.0)
+        job = FileASRJob.objects.get(pk="t1")
+        self.assertEqual((job.status, job.error_message), (FileASRJob.Status.PENDING, "HTTP 503"))
+        self.assertTrue(os.path.exists(path))
+
+        # The timer would put the job back; run its second and last attempt
+        retry = timer.call_args.kwargs["args"][0]
+        self.queue._run(retry)
+        job = FileASRJob.objects.get(pk="t1")
+        self.assertEqual((job.status, job.attempts), (FileASRJob.Status.FAILED, 2))
+        self.assertFalse(os.path.exists(path))
+
+    def test_permanent_failure_is_not_retried(self):
+        self._submit("t1", mock.Mock(side_effect=_HTTPError(400)))
+        with mock.patch.object(file_asr_jobs.threading, "Timer") as timer:
+            self.queue._run(self._next())
+        timer.assert_not_called()
+        self.assertEqual(FileASRJob.objects.get(pk="t1").status, FileASRJob.Status.FAILED)
+
+    def test_heartbeat_keeps_waiting_jobs_out_of_the_stale_sweep(self):
+        waiting = self._submit("waiting", lambda *args: {})
+        orphan = self._upload("orphan.wav")
+        FileASRJob.objects.create(task_id="orphan", task_type="transcription", file_path=orphan, model="m")
+        FileASRJob.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(self.queue.heartbeat(), 1)
+        self.assertEqual(cleanup_jobs(stale_s=60), {"failed": 1, "deleted": 0})
+        self.assertEqual(FileASRJob.objects.get(pk="waiting").status, FileASRJob.Status.PENDING)
+        self.assertTrue(os.path.exists(waiting))
+        self.assertEqual(FileASRJob.objects.get(pk="orphan").status, FileASRJob.Status.FAILED)
+        self.assertFalse(os.path.exists(orphan))
+
+    def test_cleanup_deletes_old_finished_jobs(self):
+        FileASRJob.objects.create(
+            task_id="old", task_type="transcription", file_path="x", model="m",
+            status=FileASRJob.Status.SUCCEEDED, finished_at=timezone.now() - timedelta(hours=30),
+        )
+        FileASRJob.objects.create(
+            task_id="recent", task_type="transcription", file_path="x", model="m",
+            status=FileASRJob.Status.SUCCEEDED, finished_at=timezone.now(),
+        )
+        self.assertEqual(cleanup_jobs(retention_hours=24), {"failed": 0, "deleted": 1})
+        self.assertEqual(list(FileASRJob.objects.values_list("pk", flat=True)), ["recent"])
+
+
+class _FakeTranslator:
+    """Async translator that brackets its input; ``delays`` maps text → seconds."""
+
+    def __init__(self, delays=None, fail=()):
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        try:
+            await asyncio.sleep(self.delays.get(text, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(text)
+            raise
+        if text in self.fail:
+            raise RuntimeError("429")
+        return f"<{text}>"
+
+
+class SpeculativeTranslatorTests(SimpleTestCase):
+    INTERVAL = 0.02
+
+    def _speculator(self, translator, **kwargs):
+        self.speculations = []
+
+        async def on_speculation(original, translated):
+            self.speculations.append((original, translated))
+
+        speculator = SpeculativeTranslator(translator, on_speculation=on_speculation,
+                                           interval_s=self.INTERVAL, min_chars=5, **kwargs)
+        self.addCleanup(speculator.close)
+        return speculator
+
+    async def _settle(self, speculator):
+        """Wait for the interim text to be seen unchanged twice, and its speculation."""
+        await asyncio.sleep(self.INTERVAL * 5)
+        if speculator._task is not None:
+            await asyncio.gather(speculator._task, return_exceptions=True)
+
+    def test_stable_prefix_cuts_at_clause_boundaries(self):
+        self.assertEqual(stable_prefix("Hello there, how are", "Hello there, how is"), "Hello there,")
+        self.assertEqual(stable_prefix("It costs 3.5 dollars", "It costs 3.5 dollars"), "")
+        self.assertEqual(stable_prefix("大家好，今天我们", "大家好，今天你们"), "大家好，")
+        self.assertEqual(stable_prefix("", "Hello there,"), "")
+
+    def test_join_translations(self):
+        self.assertEqual(join_translations("Hello,", "world"), "Hello, world")
+        self.assertEqual(join_translations("你好，", "世界"), "你好，世界")
+        self.assertEqual(join_translations("", "world"), "world")
+
+    async def test_partials_are_throttled_into_one_speculation(self):
+        translator = _FakeTranslator()
+        speculator = self._speculator(translator)
+        for text in ("Hello", "Hello there", "Hello there,", "Hello there, how", "Hello there, how are"):
+            speculator.on_partial(text)
+        await self._settle(speculator)
+
+        self.assertEqual(translator.calls, ["Hello there,"])
+        self.assertEqual(self.speculations, [("Hello there,", "<Hello there,>")])
+        self.assertEqual(speculator.stats["speculations"], 1)
+
+    async def test_short_prefixes_are_not_speculated(self):
+        translator = _FakeTranslator()
+        speculator = self._speculator(translator)
+        speculator.on_partial("Hi, so")
+        await self._settle(speculator)
+        self.assertEqual(translator.calls, [])
+
+    async def test_unchanged_final_reuses_the_speculation(self):
+        translator = _FakeTranslator()
+        speculator = self._speculator(translator)
+        speculator.on_partial("Hello there, how are you?")
+        await self._settle(speculator)
+
+        self.assertEqual(await speculator.finalize("Hello there, how are you?"), "<Hello there, how are you?>")
+        self.assertEqual(translator.calls, ["Hello there, how are you?"])
+        self.assertEqual(speculator.stats["reused"], 1)
+
+    async def test_extended_final_translates_only_the_tail(self):
+        translator = _FakeTranslator()
+        speculator = self._speculator(translator)
+        speculator.on_partial("Hello there, how")
+        await self._settle(speculator)
+
+        translated = await speculator.finalize("Hello there, how are you?")
+        self.assertEqual(translated, "<Hello there,> <how are you?>")
+        self.assertEqual(translator.calls, ["Hello there,", "how are you?"])
+        self.assertEqual(speculator.stats["patched"], 1)
+
+    async def test_tail_is_translated_while_the_head_is_in_flight(self):
+        translator = _FakeTranslator(delays={"Hello there,": self.INTERVAL * 5})
+        speculator = self._speculator(translator)
+        speculator.on_partial("Hello there, how")
+        await asyncio.sleep(self.INTERVAL * 3)
+        self.assertEqual(translator.calls, ["Hello there,"])
+
+        translated = await speculator.finalize("Hello there, how are you?")
+        self.assertEqual(translated, "<Hello there,> <how are you?>")
+        self.assertEqual(translator.cancelled, [])
+
+    async def test_revised_final_is_translated_from_scratch(self):
+        translator = _FakeTranslator()
+        speculator = self._speculator(translator)
+        speculator.on_partial("Hello there, how")
+        await self._settle(speculator)
+
+        self.assertEqual(await speculator.finalize("Hello, there we go"), "<Hello, there we go>")
+        self.assertEqual(translator.calls, ["Hello there,", "Hello, there we go"])
+        self.assertEqual(speculator.stats["missed"], 1)
+
+    async def test_failed_speculation_falls_back_to_the_full_text(self):
+        translator = _FakeTranslator(fail={"Hello there,"})
+        speculator = self._speculator(translator)
+        speculator.on_partial("Hello there, how")
+        await self._settle(speculator)
+
+        self.assertEqual(await speculator.finalize("Hello there, how are you?"), "<Hello there, how are you?>")
+        self.assertEqual(self.speculations, [])
+
+    async def test_a_longer_prefix_cancels_the_stale_request(self):
+        translator = _FakeTranslator(delays={"Hello there,": 10})
+        speculator = self._speculator(translator)
+        speculator.on_partial("Hello there, how")
+        await asyncio.sleep(self.INTERVAL * 3)
+        speculator.on_partial("Hello there, how are you? I")
+        await self._settle(speculator)
+
+        self.assertEqual(translator.cancelled, ["Hello there,"])
+        self.assertEqual(self.speculations, [("Hello there, how are you?", "<Hello there, how are you?>")])
+        self.assertEqual((speculator.stats["speculations"], speculator.stats["cancelled"]), (2, 1))
+        self.assertEqual(await speculator.finalize("Hello there, how are you?"), "<Hello there, how are you?>")
+
+
+class SpeculativeConsumerTests(SimpleTestCase):
+    """The DashScope consumer path with speculation opted in; services are fakes."""
+
+    def setUp(self):
+        self.translator = _FakeTranslator()
+
+        async def translate_async(text, **kwargs):
+            return mock.Mock(translated_text=await self.translator(text))
+
+        self.translation_service = mock.Mock(translate_async=translate_async)
+        for target, value in (
+            ("TranslationService", mock.Mock(return_value=self.translation_service)),
+            ("RealtimeASRService", mock.Mock()),
+        ):
+            patcher = mock.patch.object(consumers, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(ASRConsumer, "_forward_events", mock.AsyncMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.consumer = ASRConsumer()
+        self.sent = []
+        self.consumer.send_json = mock.AsyncMock(side_effect=self.sent.append)
+
+    async def _start(self, **config):
+        await self.consumer.start_services({"type": "start", "provider": "dashscope", **config})
+        return self.sent[-1]["config"]["speculative_translation"]
+
+    async def test_speculation_is_off_unless_requested(self):
+        self.assertFalse(await self._start())
+        self.assertIsNone(self.consumer._speculator)
+
+    async def test_translation_disabled_means_no_speculation(self):
+        self.assertFalse(await self._start(speculative_translation=True, translation_enabled=False))
+
+    async def test_interim_text_is_speculated_and_the_final_reuses_it(self):
+        self.assertTrue(await self._start(speculative_translation=True))
+        speculator = self.consumer._speculator
+        speculator.interval_s, speculator.min_chars = 0.02, 5
+
+        await self.consumer.on_transcription(TranscriptionResult(
+            text="how are", is_final=False, utterance="Hello there, how are"))
+        await asyncio.sleep(0.1)
+        await speculator._task
+        await self.consumer.on_transcription(TranscriptionResult(text="Hello there, how are you?", is_final=True))
+
+        partial = [m for m in self.sent if m["type"] == "translation_partial"]
+        final = [m for m in self.sent if m["type"] == "translation"]
+        self.assertEqual([(m["original"], m["translated"]) for m in partial], [("Hello there,", "<Hello there,>")])
+        self.assertEqual(final[0]["translated"], "<Hello there,> <how are you?>")
+        self.assertEqual(self.translator.calls, ["Hello there,", "how are you?"])
+        self.assertEqual(speculator.stats["patched"], 1)
+
+        await self.consumer.stop_services()
+        self.assertIsNone(self.consumer._speculator)
+
+
+class _FakeGroqASR:
+    """Groq realtime ASR stand-in: each audio chunk is one segment, transcribed slowly."""
+
+    def __init__(self, *args, **kwargs):
+        self.pending = b""
+
+    def take_segments(self, audio):
+        # A chunk ending in "..." is still open, as speech the VAD has not cut yet
+        if audio.endswith(b"..."):
+            self.pending = audio[:-3]
+            return []
+        return [audio]
+
+    def flush_segments(self):
+        segments, self.pending = [self.pending] if self.pending else [], b""
+        return segments
+
+    async def transcribe_segment_async(self, segment):
+        await asyncio.sleep(0.05)
+        return mock.Mock(text=segment.decode())
+
+    def reset(self):
+        pass
+
+
+class _FakeGroqTranslation:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def _result(self, text):
+        return {"success": True, "original_text": text, "translated_text": f"<{text}>", "target_lang": "Chinese"}
+
+    async def translate_async(self, text, **kwargs):
+        await asyncio.sleep(0.05)
+        return self._result(text)
+
+    async def translate_batch_async(self, texts, **kwargs):
+        await asyncio.sleep(0.05)
+        return [self._result(text) for text in texts]
+
+
+class GroqConsumerStopTests(SimpleTestCase):
+    """Stopping the Groq path while segments are still in the pipeline."""
+
+    def setUp(self):
+        for target, value in (("GroqRealtimeASRService", _FakeGroqASR),
+                              ("GroqTranslationService", _FakeGroqTranslation)):
+            patcher = mock.patch.object(consumers, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.consumer = ASRConsumer()
+        self.consumer.channel_name = "test"
+        self.sent = []
+        self.consumer.send_json = mock.AsyncMock(side_effect=self.sent.append)
+
+    async def _speak(self, *chunks):
+        await self.consumer.start_services({"type": "start", "provider": "groq"})
+        for chunk in chunks:
+            await self.consumer.handle_audio(chunk)
+
+    def _messages(self, msg_type, key):
+        return [message[key] for message in self.sent if message["type"] == msg_type]
+
+    async def test_stop_finishes_queued_segments_first(self):
+        await self._speak(b"one", b"two", b"three")
+        await self.consumer.stop_services()
+
+        self.assertEqual(self._messages("transcription", "text"), ["one", "two", "three"])
+        self.assertEqual(self._messages("translation", "translated"), ["<one>", "<two>", "<three>"])
+        self.assertEqual(self.sent[-1]["type"], "stopped")
+        self.assertIsNone(self.consumer._pipeline)
+
+    async def test_stop_flushes_speech_the_vad_has_not_closed(self):
+        await self._speak(b"one", b"two...")
+        await self.consumer.stop_services()
+        self.assertEqual(self._messages("transcription", "text"), ["one", "two"])
+        self.assertEqual(self._messages("translation", "translated"), ["<one>", "<two>"])
+
+    async def test_drain_is_bounded(self):
+        await self._speak(b"one", b"two", b"three")
+        with mock.patch.object(get_settings().groq_chunking, "stop_drain_s", 0.01):
+            await self.consumer.stop_services()
+        self.assertLess(len(self._messages("translation", "translated")), 3)
+        self.assertEqual(self.sent[-1]["type"], "stopped")
+
+    async def test_disconnect_drops_queued_segments(self):
+        await self._speak(b"one", b"two")
+        await self.consumer.disconnect(1000)
+        self.assertEqual(self._messages("translation", "translated"), [])
+
+
+class BatchedStageTests(SimpleTestCase):
+    def _pipeline(self, policy, fn=None):
+        self.batches, self.out = [], []
+
+        async def translate_many(payloads):
+            self.batches.append(list(payloads))
+            return [payload.upper() for payload in payloads]
+
+        async def collect(payload):
+            self.out.append(payload)
+
+        pipeline = StagePipeline([("translate", fn or translate_many, policy), ("out", collect)], maxsize=16)
+        pipeline.start()
+        return pipeline
+
+    async def _submit_all(self, pipeline, payloads):
+        for payload in payloads:
+            await pipeline.submit(payload)
+
+    async def test_queued_items_share_a_call_in_order(self):
+        pipeline = self._pipeline(BatchPolicy(window_s=0.1, max_items=8))
+        await self._submit_all(pipeline, ["a", "b", "c"])
+        await pipeline.join()
+        await pipeline.stop()
+        self.assertEqual(self.batches, [["a", "b", "c"]])
+        self.assertEqual(self.out, ["A", "B", "C"])
+        self.assertEqual(pipeline.stats()["stages"]["translate"]["batch_size_avg"], 3)
+
+    async def test_an_isolated_item_is_not_delayed(self):
+        pipeline = self._pipeline(BatchPolicy(window_s=10))
+        started = time.monotonic()
+        await pipeline.submit("a")
+        await pipeline.join()
+        await pipeline.stop()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(self.out, ["A"])
+
+    async def test_a_burst_waits_out_the_window(self):
+        pipeline = self._pipeline(BatchPolicy(window_s=0.2))
+        await pipeline.submit("a")
+        await asyncio.sleep(0.01)
+        # Within window_s of "a": a burst, so "b" waits for "c"
+        await pipeline.submit("b")
+        await asyncio.sleep(0.05)
+        await pipeline.submit("c")
+        await pipeline.join()
+        await pipeline.stop()
+        self.assertEqual(self.batches, [["a"], ["b", "c"]])
+
+    async def test_max_items_splits_batches(self):
+        pipeline = self._pipeline(BatchPolicy(window_s=0.05, max_items=2))
+        await self._submit_all(pipeline, list("abcde"))
+        await pipeline.join()
+        await pipeline.stop()
+        self.assertEqual(self.batches, [["a", "b"], ["c", "d"], ["e"]])
+        self.assertEqual(self.out, list("ABCDE"))
+
+    async def test_item_over_budget_leads_the_next_batch(self):
+        pipeline = self._pipeline(BatchPolicy(window_s=0.05, max_cost=10, cost=len))
+        await self._submit_all(pipeline, ["aaaa", "bbbb", "cccc", "d"])
+        await pipeline.join()
+        await pipeline.stop()
+        self.assertEqual(self.batches, [["aaaa", "bbbb"], ["cccc", "d"]])
+        self.assertEqual(self.out, ["AAAA", "BBBB", "CCCC", "D"])
+
+    async def test_wrong_result_count_fails_the_batch(self):
+        async def short(payloads):
+            return payloads[:1]
+
+        pipeline = self._pipeline(BatchPolicy(window_s=0.05), fn=short)
+        await self._submit_all(pipeline, ["a", "b"])
+        await pipeline.join()
+        await pipeline.stop()
+        self.assertEqual(self.out, [])
+        self.assertEqual(pipeline.stats()["stages"]["translate"]["failed"], 2)
+
+
+class _FakeGroqCompletions:
+    """chat.completions stand-in: brackets single texts; ``batch_reply`` shapes JSON-mode replies."""
+
+    def __init__(self, batch_reply=None):
+        self.batch_reply = batch_reply
+        self.requests = []
+
+    def create(self, model, messages, response_format=None, **kwargs):
+        user = messages[-1]["content"]
+        self.requests.append(user)
+        if response_format is None:
+            content = f"<{user}>"
+        else:
+            segments = re.findall(r"^\[\d+\] (.*)$", user, re.M)
+            translations = [f"<{text}>" for text in segments]
+            content = json.dumps({"translations": self.batch_reply(translations) if self.batch_reply else translations})
+        return mock.Mock(choices=[mock.Mock(message=mock.Mock(content=content))])
+
+
+class TranslateBatchTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = TranslationCache()
+        patcher = mock.patch.object(translation_cache, "get_translation_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("apps.interpretation.services.groq_realtime_service.get_translation_cache",
+                             return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _service(self, batch_reply=None):
+        service = GroqTranslationService(model="m")
+        self.completions = _FakeGroqCompletions(batch_reply)
+        service._client = mock.Mock(chat=mock.Mock(completions=self.completions))
+        return service
+
+    def _texts(self, results):
+        return [result.get("translated_text") for result in results]
+
+    def test_clients_share_the_pooled_http_client(self):
+        with mock.patch.object(get_settings().api, "groq_api_key", "key"):
+            translation, asr = GroqTranslationService(), GroqRealtimeASRService()
+        pool = get_client("https://api.groq.com")
+        self.assertIs(translation._client._client, pool)
+        self.assertIs(asr._client._client, pool)
+
+    async def test_uncached_segments_go_out_in_one_request_in_order(self):
+        service = self._service()
+        await service.translate_async("two")
+        self.completions.requests.clear()
+
+        results = await service.translate_batch_async(["one", "two", "", "three"])
+        self.assertEqual(self._texts(results), ["<one>", "<two>", None, "<three>"])
+        self.assertEqual(results[2], {"success": False, "error": "Empty text"})
+        self.assertEqual(self.completions.requests, ["[1] one\n[2] three"])
+
+        # Batch results were cached
+        await service.translate_batch_async(["one", "three"])
+        self.assertEqual(len(self.completions.requests), 1)
+
+    async def test_a_single_segment_is_not_batched(self):
+        service = self._service()
+        results = await service.translate_batch_async(["one"])
+        self.assertEqual(self._texts(results), ["<one>"])
+        self.assertEqual(self.completions.requests, ["one"])
+
+    async def test_wrong_item_count_falls_back_to_single_requests(self):
+        service = self._service(batch_reply=lambda translations: translations[:1])
+        results = await service.translate_batch_async(["one", "two"])
+        self.assertEqual(self._texts(results), ["<one>", "<two>"])
+        self.assertEqual(sorted(self.completions.requests[1:]), ["one", "two"])
+
+    async def test_non_list_reply_falls_back_to_single_requests(self):
+        service = self._service(batch_reply=lambda translations: None)
+        results = await service.translate_batch_async(["one", "two"])
+        self.assertEqual(self._texts(results), ["<one>", "<two>"])
+
+    async def test_non_string_or_empty_items_fall_back_to_single_requests(self):
+        for n, bad in enumerate((None, {"text": "<b>"}, 2, "", "  ", "[2]")):
+            with self.subTest(item=bad):
+                texts = [f"a{n}", f"b{n}"]
+                service = self._service(batch_reply=lambda translations: [translations[0], bad])
+                results = await service.translate_batch_async(texts)
+                self.assertEqual(self._texts(results), [f"<a{n}>", f"<b{n}>"])
+                self.assertEqual(sorted(self.completions.requests[1:]), texts)
+
+    async def test_numbering_echoed_back_is_stripped(self):
+        service = self._service(batch_reply=lambda translations: [f"[{i}] {t}" for i, t in enumerate(translations, 1)])
+        results = await service.translate_batch_async(["one", "two"])
+        self.assertEqual(self._texts(results), ["<one>", "<two>"])
+
+
+def _fails(message="boom"):
+    def call():
+        raise RuntimeError(message)
+    return call
+
+
+class ProviderStatsTests(SimpleTestCase):
+    def _cool_down(self, stats):
+        stats.opened_until = time.monotonic() - 1
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        stats = ProviderStats("groq", breaker_failures=3, breaker_cooldown=60)
+        stats.record_failure(0.1)
+        stats.record_success(0.1)
+        stats.record_failure(0.1)
+        stats.record_failure(0.1)
+        self.assertTrue(stats.admit())
+        stats.record_failure(0.1)
+        self.assertFalse(stats.admit())
+        self.assertEqual(stats.snapshot()["breaker"], "open")
+
+    def test_half_open_admits_one_probe_and_a_good_probe_closes(self):
+        stats = ProviderStats("groq", breaker_failures=1, breaker_cooldown=60)
+        stats.record_failure(0.1)
+        self._cool_down(stats)
+        self.assertEqual(stats.snapshot()["breaker"], "half-open")
+        self.assertTrue(stats.admit())
+        self.assertFalse(stats.admit())
+        stats.record_success(0.1)
+        self.assertEqual(stats.snapshot()["breaker"], "closed")
+        self.assertTrue(stats.admit())
+        self.assertTrue(stats.admit())
+
+    def test_failed_probe_reopens(self):
+        stats = ProviderStats("groq", breaker_failures=3, breaker_cooldown=60)
+        for _ in range(3):
+            stats.record_failure(0.1)
+        self._cool_down(stats)
+        self.assertTrue(stats.admit())
+        stats.record_failure(0.1)
+        self.assertFalse(stats.admit())
+        self.assertEqual(stats.snapshot()["breaker"], "open")
+
+    def test_released_probe_can_be_claimed_again(self):
+        stats = ProviderStats("groq", breaker_failures=1, breaker_cooldown=60)
+        stats.record_failure(0.1)
+        self._cool_down(stats)
+        self.assertTrue(stats.admit())
+        stats.release()
+        self.assertTrue(stats.admit())
+
+    def test_p95_needs_enough_samples(self):
+        stats = ProviderStats("groq")
+        for elapsed in (0.1, 0.2, 0.3, 0.4):
+            stats.record_success(elapsed)
+        self.assertIsNone(stats.p95())
+        stats.record_success(0.5)
+        self.assertEqual(stats.p95(), 0.5)
+
+
+class ASRRouterTests(SimpleTestCase):
+    def _router(self, **kwargs):
+        router = ASRRouter(workers=4, **kwargs)
+        self.addCleanup(router._executor.shutdown, wait=True)
+        return router
+
+    def _blocked(self, result="slow"):
+        """A call that waits until the test lets it go (before the executor shuts down)."""
+        gate = threading.Event()
+        self.addCleanup(gate.set)
+
+        def call():
+            gate.wait(5)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return call, gate
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_providers_are_tried_in_order_without_hedging(self):
+        router = self._router(hedge=False)
+        self.assertEqual(router.run({"groq": lambda: "g", "qwen": lambda: "q"}, ["qwen", "groq"]), ("qwen", "q"))
+        self.assertEqual(router.run({"groq": lambda: "g", "qwen": _fails()}, ["qwen", "groq"]), ("groq", "g"))
+        self.assertEqual(router.stats()["fallbacks"], 1)
+
+    def test_open_breaker_skips_the_provider(self):
+        router = self._router(hedge=False, breaker_failures=2, breaker_cooldown=60)
+        calls = {"qwen": mock.Mock(side_effect=RuntimeError("down")), "groq": lambda: "g"}
+        for _ in range(2):
+            router.run(calls, ["qwen", "groq"])
+        self.assertEqual(router.run(calls, ["qwen", "groq"]), ("groq", "g"))
+        self.assertEqual(calls["qwen"].call_count, 2)
+        self.assertEqual(router.stats()["providers"]["qwen"]["breaker"], "open")
+
+    def test_every_breaker_open_still_tries_them_all(self):
+        router = self._router(hedge=False, breaker_failures=1, breaker_cooldown=60)
+        with self.assertRaises(AllProvidersFailed):
+            router.run({"qwen": _fails(), "groq": _fails()}, ["qwen", "groq"])
+        self.assertEqual(router.order(["qwen", "groq"]), ["qwen", "groq"])
+
+    def test_probe_result_closes_or_reopens_the_breaker(self):
+        router = self._router(hedge=False, breaker_failures=1, breaker_cooldown=60)
+        router.run({"qwen": _fails(), "groq": lambda: "g"}, ["qwen", "groq"])
+        qwen = router.provider("qwen")
+
+        qwen.opened_until = time.monotonic() - 1
+        self.assertEqual(router.run({"qwen": _fails(), "groq": lambda: "g"}, ["qwen", "groq"]), ("groq", "g"))
+        self.assertEqual(router.order(["qwen", "groq"]), ["groq"])
+
+        qwen.opened_until = time.monotonic() - 1
+        self.assertEqual(router.run({"qwen": lambda: "q", "groq": lambda: "g"}, ["qwen", "groq"]), ("qwen", "q"))
+        self.assertEqual(router.stats()["providers"]["qwen"]["breaker"], "closed")
+
+    def test_unused_probe_is_released(self):
+        router = self._router(hedge=False, breaker_failures=1, breaker_cooldown=60)
+        groq = router.provider("groq")
+        for _ in range(5):
+            router.provider("qwen").record_success(0.01)
+            groq.record_success(1.0)
+        groq.record_failure(1.0)
+        groq.opened_until = time.monotonic() - 1
+        # groq's probe is claimed, but qwen is much faster, goes first and answers
+        self.assertEqual(router.run({"qwen": lambda: "q", "groq": lambda: "g"}, ["groq", "qwen"]), ("qwen", "q"))
+        self.assertFalse(groq.probing)
+        self.assertTrue(groq.admit())
+
+    def test_much_slower_primary_is_moved_behind(self):
+        router = self._router(switch_ratio=2.0)
+        for _ in range(5):
+            router.provider("qwen").record_success(1.0)
+            router.provider("groq").record_success(0.2)
+        self.assertEqual(router.order(["qwen", "groq"]), ["groq", "qwen"])
+
+    def test_hedge_fires_at_the_clamped_p95_and_first_result_wins(self):
+        router = self._router(hedge_min=0.2, hedge_max=2.0)
+        for _ in range(5):
+            router.provider("qwen").record_success(0.01)
+        self.assertEqual(router.hedge_delay("qwen"), 0.2)
+        self.assertEqual(router.hedge_delay("groq"), 2.0)
+
+        slow, gate = self._blocked()
+        started = time.monotonic()
+        self.assertEqual(router.run({"qwen": slow, "groq": lambda: "g"}, ["qwen", "groq"]), ("groq", "g"))
+        elapsed = time.monotonic() - started
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual((router.stats()["hedged"], router.stats()["hedge_wins"]), (1, 1))
+        gate.set()
+
+    def test_primary_answering_before_the_hedge_wins_alone(self):
+        router = self._router(hedge_min=0.5, hedge_max=0.5)
+        groq = mock.Mock(return_value="g")
+        self.assertEqual(router.run({"qwen": lambda: "q", "groq": groq}, ["qwen", "groq"]), ("qwen", "q"))
+        groq.assert_not_called()
+        self.assertEqual(router.stats()["hedged"], 0)
+
+    def test_losers_failure_is_still_recorded(self):
+        router = self._router(hedge_min=0.05, hedge_max=0.05, breaker_failures=1, breaker_cooldown=60)
+        slow, gate = self._blocked(result=RuntimeError("timeout"))
+        self.assertEqual(router.run({"qwen": slow, "groq": lambda: "g"}, ["qwen", "groq"]), ("groq", "g"))
+        qwen = router.provider("qwen")
+        self.assertEqual(qwen.failures, 0)
+        gate.set()
+        self._wait_for(lambda: qwen.failures == 1)
+        self.assertEqual(router.stats()["providers"]["qwen"]["breaker"], "open")
+
+    def test_failed_primary_starts_the_next_without_waiting_for_the_hedge(self):
+        router = self._router(hedge_min=5.0, hedge_max=5.0)
+        started = time.monotonic()
+        self.assertEqual(router.run({"qwen": _fails(), "groq": lambda: "g"}, ["qwen", "groq"]), ("groq", "g"))
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(router.stats()["fallbacks"], 1)
+
+    def test_all_providers_failed(self):
+        for hedge in (False, True):
+            router = self._router(hedge=hedge, hedge_min=0.01, hedge_max=0.01)
+            with self.assertRaises(AllProvidersFailed) as caught:
+                router.run({"qwen": _fails("q down"), "groq": _fails("g down")}, ["qwen", "groq"])
+            self.assertEqual({name: str(e) for name, e in caught.exception.errors.items()},
+                             {"qwen": "q down", "groq": "g down"})
+
+    def test_no_routable_provider(self):
+        with self.assertRaises(ValueError):
+            self._router().run({"groq": lambda: "g"}, ["qwen"])
+
+
+class ServiceStatsViewTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(asr_router, "_router", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_health_check_is_public_and_carries_no_stats(self):
+        response = self.client.get("/api/interpretation/health/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("asr_router", response.json())
+        self.assertIsNone(asr_router._router)
+
+    def test_stats_need_a_staff_user(self):
+        self.assertIn(self.client.get("/api/interpretation/stats/").status_code, (401, 403))
+        user = get_user_model().objects.create_user("user", password="pw")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get("/api/interpretation/stats/").status_code, 403)
+
+    def test_staff_see_stats_without_starting_the_router(self):
+        staff = get_user_model().objects.create_user("staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get("/api/interpretation/stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hit_rate", response.json()["translation_cache"])
+        self.assertIsNone(response.json()["asr_router"])
+        self.assertIsNone(asr_router._router)
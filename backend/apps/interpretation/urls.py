@@ -10,6 +10,7 @@ urlpatterns = [
     path('languages/', views.get_languages, name='get_languages'),
     path('translate/', views.translate_text, name='translate_text'),
     path('health/', views.health_check, name='health_check'),
+    path('stats/', views.service_stats, name='service_stats'),
     path('tts-voices/', views.get_tts_voices, name='get_tts_voices'),
     path('submit-file-asr/', views.submit_file_asr, name='submit_file_asr'),
     path('submit-file-translation/', views.submit_file_translation, name='submit_file_translation'),
@@ -2,12 +2,18 @@
 REST API Views for Interpretation App
 """
 
-from rest_framework.decorators import api_view
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from common.config import get_settings, SUPPORTED_LANGUAGES
+from common.utils.audio_buffer import AudioUpload
+from common.utils.translation_cache import get_translation_cache
 from .services.translation_service import TranslationService
+from .services.asr_router import started_asr_router
 
 # File ASR imports
 import os
@@ -18,7 +24,7 @@ from django.conf import settings as django_settings
 from rest_framework.decorators import parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from .services.file_asr_service import FileASRService
-from .services.transcribe_translate_service import transcribe_and_translate, transcribe_and_translate_stream, generate_minutes_stream, refine_and_translate, refine_text
+from .services.transcribe_translate_service import transcribe_and_translate, transcribe_and_translate_stream, generate_minutes_stream, refine_and_translate, refine_text, normalize_audio
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +43,19 @@ def health_check(request):
     })
 
 
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def service_stats(request):
+    """Translation cache and ASR router statistics (staff only)"""
+    router = started_asr_router()
+    return Response({
+        'translation_cache': get_translation_cache().stats(),
+        # None until the first routed transcription starts the router
+        'asr_router': router.stats() if router else None,
+    })
+
+
 @api_view(['GET'])
 def get_config(request):
     """Get application configuration"""
@@ -163,6 +182,8 @@ def submit_file_asr(request):
         
         if result['success']:
             return Response(result)
+        elif result.get('busy'):
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         else:
             return Response(result, status=status.HTTP_400_BAD_REQUEST)
             
@@ -239,6 +260,8 @@ def submit_file_translation(request):
         
         if result['success']:
             return Response(result)
+        elif result.get('busy'):
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         else:
             return Response(result, status=status.HTTP_400_BAD_REQUEST)
             
@@ -317,20 +340,17 @@ def transcribe_translate(request):
     target_lang = request.data.get('target_lang', 'Chinese')
 
     ext = Path(uploaded_file.name).suffix.lower() or '.webm'
-    upload_dir = Path(django_settings.MEDIA_ROOT) / 'asr_uploads'
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    file_path = upload_dir / f"{uuid.uuid4().hex}{ext}"
+    # Small uploads stay in memory; large ones use Django's own temp file
+    audio = AudioUpload.from_django_file(uploaded_file, name=f"{uuid.uuid4().hex}{ext}")
     try:
-        with open(file_path, 'wb+') as dest:
-            for chunk in uploaded_file.chunks():
-                dest.write(chunk)
+        # Resample/re-encode to shrink the upload; premium tiers also need the exact duration
+        audio = normalize_audio(audio, need_duration=asr_tier in PREMIUM_TIERS)
 
         # Premium tiers: check credits before processing
         if asr_tier in PREMIUM_TIERS:
             from credits.services import get_balance, get_audio_duration, deduct_for_audio, InsufficientCreditsError
             import math
-            duration = get_audio_duration(str(file_path))
+            duration = get_audio_duration(audio)
             required = math.ceil(duration)
             balance = get_balance(authenticated_user)
             if balance < required:
@@ -352,7 +372,7 @@ def transcribe_translate(request):
         # Transcribe with user's key; key pool auto-rotates on 429
         try:
             result = transcribe_and_translate(
-                str(file_path), source_lang, target_lang,
+                audio, source_lang, target_lang,
                 groq_api_key=user_groq_key,
                 asr_tier=asr_tier,
                 session_id=session_id,
@@ -408,8 +428,7 @@ def transcribe_translate(request):
             )
         return Response({'error': '转录服务暂时不可用，请稍后重试'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     finally:
-        if file_path.exists():
-            file_path.unlink()
+        audio.close()
 
 
 @api_view(['POST'])
@@ -589,7 +608,8 @@ from django.views.decorators.http import require_POST
 def transcribe_translate_stream(request):
     """
     POST → StreamingHttpResponse (NDJSON line-by-line).
-    Yields transcription first, then translation, for progressive display.
+    Yields transcription first, then translation_delta events as the
+    translation streams in, then the full translation, for progressive display.
     """
     if 'file' not in request.FILES:
         import json
@@ -604,30 +624,28 @@ def transcribe_translate_stream(request):
     target_lang = request.POST.get('target_lang', 'Chinese')
 
     ext = Path(uploaded_file.name).suffix.lower() or '.webm'
-    upload_dir = Path(django_settings.MEDIA_ROOT) / 'asr_uploads'
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    file_path = upload_dir / f"{uuid.uuid4().hex}{ext}"
-    with open(file_path, 'wb+') as dest:
-        for chunk in uploaded_file.chunks():
-            dest.write(chunk)
+    audio = AudioUpload.from_django_file(uploaded_file, name=f"{uuid.uuid4().hex}{ext}")
 
     def event_stream():
         import json
+        nonlocal audio
         try:
-            for line in transcribe_and_translate_stream(str(file_path), source_lang, target_lang):
+            audio = normalize_audio(audio)
+            for line in transcribe_and_translate_stream(audio, source_lang, target_lang):
                 yield line
         except Exception as e:
             logger.error(f"transcribe_translate_stream error: {e}", exc_info=True)
             yield json.dumps({"event": "error", "text": str(e)}) + "\n"
         finally:
-            if file_path.exists():
-                file_path.unlink()
+            audio.close()
 
-    return StreamingHttpResponse(
+    response = StreamingHttpResponse(
         event_stream(),
         content_type='application/x-ndjson',
     )
+    # Translation arrives token by token; stop nginx buffering the deltas
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @csrf_exempt
@@ -655,7 +673,9 @@ def generate_meeting_minutes(request):
             status=400,
         )
 
-    return StreamingHttpResponse(
+    response = StreamingHttpResponse(
         generate_minutes_stream(entries),
         content_type='application/x-ndjson',
     )
+    response['X-Accel-Buffering'] = 'no'
+    return response
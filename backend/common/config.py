@@ -8,6 +8,7 @@ Manages all application settings with support for:
 """
 
 import os
+import tempfile
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 from pathlib import Path
@@ -111,6 +112,51 @@ class ASRConfig:
     vad_threshold: float = 0.15  # Lower = more sensitive to speech end
     vad_silence_ms: int = 400    # Reduced from 800ms for faster sentence breaks
 
+    # Speculative translation of interim text (see services.speculative);
+    # clients can also opt in per session with "speculative_translation"
+    speculative_translation: bool = field(
+        default_factory=lambda: os.environ.get("ASR_SPECULATIVE_TRANSLATION", "false").lower() == "true"
+    )
+    speculative_interval_ms: int = field(
+        default_factory=lambda: int(os.environ.get("ASR_SPECULATIVE_INTERVAL_MS", "300"))
+    )
+    speculative_min_chars: int = field(
+        default_factory=lambda: int(os.environ.get("ASR_SPECULATIVE_MIN_CHARS", "12"))
+    )
+
+
+@dataclass
+class GroqChunkingConfig:
+    """Client-side VAD chunking for Groq Whisper (see services.vad)"""
+    # Cut on pauses instead of fixed windows; false = fixed chunk_duration_s
+    vad_enabled: bool = field(
+        default_factory=lambda: os.environ.get("GROQ_VAD_ENABLED", "true").lower() == "true"
+    )
+    # Pause length that ends a segment
+    silence_ms: int = field(
+        default_factory=lambda: int(os.environ.get("GROQ_VAD_SILENCE_MS", "500"))
+    )
+    # Segments shorter than this keep growing across pauses
+    min_segment_s: float = field(
+        default_factory=lambda: float(os.environ.get("GROQ_VAD_MIN_SEGMENT_S", "1.5"))
+    )
+    # Hard cut for uninterrupted speech
+    max_segment_s: float = field(
+        default_factory=lambda: float(os.environ.get("GROQ_VAD_MAX_SEGMENT_S", "8"))
+    )
+    # Audio repeated across a hard cut so the split word is heard whole
+    overlap_ms: int = field(
+        default_factory=lambda: int(os.environ.get("GROQ_VAD_OVERLAP_MS", "250"))
+    )
+    # Minimum frame RMS (int16) counted as speech; adapts upward with noise
+    energy_threshold: float = field(
+        default_factory=lambda: float(os.environ.get("GROQ_VAD_ENERGY_THRESHOLD", "300"))
+    )
+    # On "stop", how long queued segments may take to finish before they are dropped
+    stop_drain_s: float = field(
+        default_factory=lambda: float(os.environ.get("GROQ_STOP_DRAIN_S", "10"))
+    )
+
 
 @dataclass
 class TranslationConfig:
@@ -121,6 +167,50 @@ class TranslationConfig:
     temperature: float = 0.65
     top_p: float = 0.8
 
+    # Groq realtime: short segments translated together in one request
+    # (see services.pipeline.BatchPolicy); max_segments=1 turns batching off
+    batch_window_ms: int = field(
+        default_factory=lambda: int(os.environ.get("TRANSLATION_BATCH_WINDOW_MS", "150"))
+    )
+    batch_max_segments: int = field(
+        default_factory=lambda: int(os.environ.get("TRANSLATION_BATCH_MAX_SEGMENTS", "6"))
+    )
+    batch_max_tokens: int = field(
+        default_factory=lambda: int(os.environ.get("TRANSLATION_BATCH_MAX_TOKENS", "600"))
+    )
+
+
+@dataclass
+class TranslationCacheConfig:
+    """Translation memoisation (see common.utils.translation_cache)"""
+    enabled: bool = field(
+        default_factory=lambda: os.environ.get("TRANSLATION_CACHE_ENABLED", "true").lower() == "true"
+    )
+    max_entries: int = field(
+        default_factory=lambda: int(os.environ.get("TRANSLATION_CACHE_MAX_ENTRIES", "10000"))
+    )
+    # Seconds a cached translation stays valid (both tiers)
+    ttl: float = field(
+        default_factory=lambda: float(os.environ.get("TRANSLATION_CACHE_TTL", "604800"))
+    )
+    # Longer texts rarely repeat; they are translated without caching
+    max_text_chars: int = field(
+        default_factory=lambda: int(os.environ.get("TRANSLATION_CACHE_MAX_TEXT_CHARS", "1000"))
+    )
+    # Shared tier: "" (memory only), "sqlite" (per host) or "redis"
+    backend: str = field(
+        default_factory=lambda: os.environ.get("TRANSLATION_CACHE_BACKEND", "")
+    )
+    db_path: str = field(
+        default_factory=lambda: os.environ.get(
+            "TRANSLATION_CACHE_DB",
+            os.path.join(tempfile.gettempdir(), "translation_cache.sqlite3"),
+        )
+    )
+    redis_url: str = field(
+        default_factory=lambda: os.environ.get("TRANSLATION_CACHE_REDIS_URL") or os.environ.get("REDIS_URL", "")
+    )
+
 
 @dataclass
 class LLMConfig:
@@ -131,6 +221,60 @@ class LLMConfig:
     top_p: float = 0.95
 
 
+@dataclass
+class HTTPClientConfig:
+    """Outbound HTTP pool configuration (see common.utils.http_client)"""
+    # Limits apply per origin: each LLM/ASR host gets its own pool
+    max_connections: int = field(
+        default_factory=lambda: int(os.environ.get("OUTBOUND_HTTP_MAX_CONNECTIONS", "20"))
+    )
+    max_keepalive: int = field(
+        default_factory=lambda: int(os.environ.get("OUTBOUND_HTTP_MAX_KEEPALIVE", "10"))
+    )
+    keepalive_expiry: float = field(
+        default_factory=lambda: float(os.environ.get("OUTBOUND_HTTP_KEEPALIVE_EXPIRY", "60"))
+    )
+    connect_timeout: float = field(
+        default_factory=lambda: float(os.environ.get("OUTBOUND_HTTP_CONNECT_TIMEOUT", "5"))
+    )
+    # Default read timeout; call sites pass their own where they differ
+    timeout: float = field(
+        default_factory=lambda: float(os.environ.get("OUTBOUND_HTTP_TIMEOUT", "60"))
+    )
+    http2: bool = field(
+        default_factory=lambda: os.environ.get("OUTBOUND_HTTP2", "true").lower() == "true"
+    )
+
+
+@dataclass
+class RateLimitConfig:
+    """API key budget scheduler (see common.utils.rate_scheduler)"""
+    # Shared by every worker on the host; must be on a local filesystem
+    db_path: str = field(
+        default_factory=lambda: os.environ.get(
+            "RATE_SCHEDULER_DB",
+            os.path.join(tempfile.gettempdir(), "api_rate_scheduler.sqlite3"),
+        )
+    )
+    # How long a call may queue for budget before it is shed
+    max_wait: float = field(
+        default_factory=lambda: float(os.environ.get("RATE_SCHEDULER_MAX_WAIT", "2"))
+    )
+    # Cooldown store: "mmap" (shared by the host's workers) or "memory"
+    cooldown_backend: str = field(
+        default_factory=lambda: os.environ.get("RATE_SCHEDULER_COOLDOWNS", "mmap")
+    )
+    cooldown_path: str = field(
+        default_factory=lambda: os.environ.get(
+            "RATE_SCHEDULER_COOLDOWN_FILE",
+            os.path.join(tempfile.gettempdir(), "api_rate_cooldowns.bin"),
+        )
+    )
+    cooldown_slots: int = field(
+        default_factory=lambda: int(os.environ.get("RATE_SCHEDULER_COOLDOWN_SLOTS", "1024"))
+    )
+
+
 @dataclass
 class ServerConfig:
     """Server configuration"""
@@ -163,9 +307,13 @@ class AppSettings:
     """
     api: APIConfig = field(default_factory=APIConfig)
     asr: ASRConfig = field(default_factory=ASRConfig)
+    groq_chunking: GroqChunkingConfig = field(default_factory=GroqChunkingConfig)
     tingwu: TingwuConfig = field(default_factory=TingwuConfig)
     translation: TranslationConfig = field(default_factory=TranslationConfig)
+    translation_cache: TranslationCacheConfig = field(default_factory=TranslationCacheConfig)
     llm: LLMConfig = field(default_factory=LLMConfig)
+    http: HTTPClientConfig = field(default_factory=HTTPClientConfig)
+    rate_limit: RateLimitConfig = field(default_factory=RateLimitConfig)
     server: ServerConfig = field(default_factory=ServerConfig)
     
     def validate(self) -> List[str]:
@@ -5,12 +5,15 @@ Supports fast inference LLM with rate-limit-aware model rotation.
 Primary model: gpt-oss-120b, fallback: zai-glm-4.7.
 """
 
+import asyncio
 import time
 import logging
 from typing import Any, AsyncIterator, Dict, List, Optional
 
 from cerebras.cloud.sdk import Cerebras, AsyncCerebras
 
+from common.utils.rate_scheduler import RateLimitExhausted, get_scheduler
+
 from .base import (
     ProviderConfig,
     ProviderType,
@@ -52,18 +55,25 @@ class ModelRotator:
     """
     Tracks rate limit hits per model and selects the best available model.
 
-    When a model returns 429, records the timestamp. On the next request,
-    picks the first model in the chain whose cooldown has expired.
+    Before each request, picks the first model in the chain that still has
+    budget under MODEL_RATE_LIMITS for this key (shared across workers via
+    common.utils.rate_scheduler) and reserves it. When a model returns 429,
+    it is put into cooldown as well. Reserving and cooling down write to
+    SQLite, so async callers run ``pick_model`` / ``record_usage`` /
+    ``mark_rate_limited`` in a thread.
     """
 
-    def __init__(self, model_chain: List[str], cooldown: float = RATE_LIMIT_COOLDOWN):
+    def __init__(self, model_chain: List[str], cooldown: float = RATE_LIMIT_COOLDOWN, api_key: str = ""):
         self.model_chain = model_chain
         self.cooldown = cooldown
+        self.api_key = api_key
         # model -> timestamp of last 429 hit
         self._rate_limited_at: Dict[str, float] = {}
 
     def mark_rate_limited(self, model: str):
         self._rate_limited_at[model] = time.time()
+        if self.api_key:
+            get_scheduler().mark_rate_limited("cerebras", self.api_key, self.cooldown, model=model)
         logger.warning(f"Model {model} hit rate limit, cooldown {self.cooldown}s")
 
     def is_available(self, model: str) -> bool:
@@ -72,9 +82,27 @@ class ModelRotator:
             return True
         return (time.time() - hit_time) >= self.cooldown
 
+    def _reserve(self, model: str) -> bool:
+        """Take one request of ``model``'s budget; False if none is left."""
+        if not self.api_key:
+            return True
+        try:
+            get_scheduler().acquire(
+                "cerebras", model, [self.api_key], MODEL_RATE_LIMITS.get(model, {}), max_wait=0,
+            )
+            return True
+        except RateLimitExhausted:
+            return False
+
+    def record_usage(self, model: str, usage) -> None:
+        """Charge the tokens a completion actually used against ``model``'s budget."""
+        total = getattr(usage, "total_tokens", None) if usage else None
+        if self.api_key and total and model in MODEL_RATE_LIMITS:
+            get_scheduler().record_usage("cerebras", self.api_key, model, MODEL_RATE_LIMITS[model], total)
+
     def pick_model(self) -> str:
         for model in self.model_chain:
-            if self.is_available(model):
+            if self.is_available(model) and self._reserve(model):
                 return model
         # All models rate-limited, return primary and let it fail naturally
         logger.warning("All models rate-limited, falling back to primary")
@@ -109,7 +137,7 @@ class CerebrasLLMProvider(LLMProvider):
 
         model_chain = config.extra_params.get("model_chain", DEFAULT_MODEL_CHAIN)
         cooldown = config.extra_params.get("cooldown", RATE_LIMIT_COOLDOWN)
-        self.rotator = ModelRotator(model_chain, cooldown)
+        self.rotator = ModelRotator(model_chain, cooldown, api_key=config.api_key or "")
         self.default_model = config.model or model_chain[0]
 
     def get_supported_services(self) -> List[ServiceType]:
@@ -170,6 +198,7 @@ class CerebrasLLMProvider(LLMProvider):
                 max_tokens=effective_max_tokens,
                 **kwargs,
             )
+            self.rotator.record_usage(used_model, completion.usage)
             choice = completion.choices[0]
             return LLMResponse(
                 content=self._extract_content(choice.message),
@@ -196,7 +225,7 @@ class CerebrasLLMProvider(LLMProvider):
         max_tokens: Optional[int] = None,
         **kwargs,
     ) -> LLMResponse:
-        used_model = self._resolve_model(model)
+        used_model = await asyncio.to_thread(self._resolve_model, model)
         effective_max_tokens = self._ensure_max_tokens(used_model, max_tokens)
         try:
             completion = await self.async_client.chat.completions.create(
@@ -206,6 +235,7 @@ class CerebrasLLMProvider(LLMProvider):
                 max_tokens=effective_max_tokens,
                 **kwargs,
             )
+            await asyncio.to_thread(self.rotator.record_usage, used_model, completion.usage)
             choice = completion.choices[0]
             return LLMResponse(
                 content=self._extract_content(choice.message),
@@ -216,8 +246,8 @@ class CerebrasLLMProvider(LLMProvider):
             )
         except Exception as e:
             if self._is_rate_limit_error(e):
-                self.rotator.mark_rate_limited(used_model)
-                fallback = self._resolve_model(model)
+                await asyncio.to_thread(self.rotator.mark_rate_limited, used_model)
+                fallback = await asyncio.to_thread(self._resolve_model, model)
                 if fallback != used_model:
                     logger.info(f"Retrying with fallback model: {fallback}")
                     return await self.chat_async(messages, fallback, temperature, max_tokens, **kwargs)
@@ -232,7 +262,7 @@ class CerebrasLLMProvider(LLMProvider):
         max_tokens: Optional[int] = None,
         **kwargs,
     ) -> AsyncIterator[str]:
-        used_model = self._resolve_model(model)
+        used_model = await asyncio.to_thread(self._resolve_model, model)
         effective_max_tokens = self._ensure_max_tokens(used_model, max_tokens)
         try:
             stream = self.client.chat.completions.create(
@@ -248,8 +278,8 @@ class CerebrasLLMProvider(LLMProvider):
                     yield chunk.choices[0].delta.content
         except Exception as e:
             if self._is_rate_limit_error(e):
-                self.rotator.mark_rate_limited(used_model)
-                fallback = self._resolve_model(model)
+                await asyncio.to_thread(self.rotator.mark_rate_limited, used_model)
+                fallback = await asyncio.to_thread(self._resolve_model, model)
                 if fallback != used_model:
                     logger.info(f"Stream retrying with fallback model: {fallback}")
                     async for chunk_text in self.chat_stream(
@@ -0,0 +1,512 @@
+import asyncio
+import io
+import os
+import tempfile
+import threading
+import time
+import wave
+from unittest import mock, skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import SimpleTestCase
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+import httpx
+
+from .providers import cerebras_provider
+from .providers.base import Message, ProviderConfig, ProviderType
+from .utils import audio_buffer, cooldown_store, http_client, rate_scheduler, translation_cache
+from .utils.audio_buffer import AudioUpload
+from .utils.cooldown_store import MemoryCooldownStore, MmapCooldownStore
+from .utils.rate_scheduler import RateLimitExhausted, RateScheduler
+from .utils.translation_cache import (
+    RedisTranslationStore,
+    SQLiteTranslationStore,
+    TranslationCache,
+    cache_key,
+    cached_translation,
+)
+
+LIMITS = {"rpm": 2, "tpm": 1000}
+
+
+class AudioBufferTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "tone.wav")
+        # 3 s of 8 kHz mono; sample i holds i // 8000 (the second it falls in)
+        pcm = b"".join(int(i // 8000).to_bytes(2, "little") for i in range(3 * 8000))
+        with open(self.path, "wb") as f:
+            f.write(audio_buffer.pcm_to_wav(pcm, sample_rate=8000))
+        # The WAV reader, whether or not ffmpeg is installed here
+        for name in ("ffmpeg_binary", "ffprobe_binary"):
+            patcher = mock.patch.object(audio_buffer, name, return_value=None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_probe_duration_reads_the_header(self):
+        self.assertEqual(audio_buffer.probe_duration(self.path), 3.0)
+        self.assertIsNone(audio_buffer.probe_duration(__file__))
+
+    def test_decode_pcm_reads_a_time_range(self):
+        pcm, rate = audio_buffer.decode_pcm(self.path, start=1.0, duration=0.5)
+        self.assertEqual(rate, 8000)
+        self.assertEqual(len(pcm), 4000 * 2)
+        self.assertEqual(set(pcm[0::2]), {1})
+        pcm, _ = audio_buffer.decode_pcm(self.path, start=2.5)
+        self.assertEqual(len(pcm), 4000 * 2)
+
+
+class PCMToWAVTests(SimpleTestCase):
+    def test_round_trip_through_the_wave_module(self):
+        for rate, channels, width in ((16000, 1, 2), (44100, 2, 2), (8000, 1, 1)):
+            pcm = bytes(range(256)) * (channels * width * 10)
+            with wave.open(io.BytesIO(audio_buffer.pcm_to_wav(pcm, rate, channels, width))) as wav:
+                self.assertEqual(
+                    (wav.getframerate(), wav.getnchannels(), wav.getsampwidth(), wav.getcomptype()),
+                    (rate, channels, width, "NONE"),
+                )
+                self.assertEqual(wav.getnframes(), len(pcm) // (channels * width))
+                self.assertEqual(wav.readframes(wav.getnframes()), pcm)
+
+    def test_header_sizes(self):
+        wav = audio_buffer.pcm_to_wav(bytearray(3200))
+        self.assertEqual(len(wav), 44 + 3200)
+        self.assertEqual((wav[:4], wav[8:12], wav[36:40]), (b"RIFF", b"WAVE", b"data"))
+        self.assertEqual(int.from_bytes(wav[4:8], "little"), 36 + 3200)
+        self.assertEqual(int.from_bytes(wav[40:44], "little"), 3200)
+
+
+class AudioUploadTests(SimpleTestCase):
+    def test_in_memory_upload_writes_a_temp_file_only_for_path(self):
+        upload = AudioUpload("clip.mp3", data=b"abc")
+        self.assertTrue(upload.in_memory)
+        self.assertEqual((upload.size, upload.read(), upload.open().read()), (3, b"abc", b"abc"))
+        with upload:
+            path = upload.path
+            self.assertTrue(path.endswith(".mp3"))
+            self.assertIs(upload.path, path)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"abc")
+        self.assertFalse(os.path.exists(path))
+
+    def test_file_on_disk_is_used_in_place_and_kept(self):
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+            f.write(b"wav")
+        self.addCleanup(os.unlink, f.name)
+        with AudioUpload.from_path(f.name) as upload:
+            self.assertFalse(upload.in_memory)
+            self.assertEqual((upload.name, upload.path, upload.size), (os.path.basename(f.name), f.name, 3))
+            self.assertEqual(upload.read(), b"wav")
+        self.assertTrue(os.path.exists(f.name))
+
+    def test_django_uploads(self):
+        small = AudioUpload.from_django_file(SimpleUploadedFile("a.webm", b"small"))
+        self.assertEqual((small.name, small.in_memory, small.read()), ("a.webm", True, b"small"))
+
+        spooled = TemporaryUploadedFile("b.wav", "audio/wav", 5, None)
+        spooled.write(b"large")
+        spooled.flush()
+        self.addCleanup(spooled.close)
+        upload = AudioUpload.from_django_file(spooled, name="renamed.wav")
+        self.assertEqual((upload.name, upload.path), ("renamed.wav", spooled.temporary_file_path()))
+        self.assertEqual(upload.read(), b"large")
+
+    def test_needs_data_or_a_path(self):
+        with self.assertRaises(ValueError):
+            AudioUpload("x.wav")
+
+
+class HTTPClientTests(SimpleTestCase):
+    def setUp(self):
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(200, json={"path": request.url.path})
+
+        kwargs = http_client._client_kwargs
+        patcher = mock.patch.object(
+            http_client, "_client_kwargs", lambda: {**kwargs(), "transport": httpx.MockTransport(handler)}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(http_client.close_clients)
+
+    def test_one_client_per_origin(self):
+        client = http_client.get_client("https://api.groq.com/openai/v1")
+        self.assertIs(http_client.get_client("https://api.groq.com/openai/v1/audio"), client)
+        self.assertIsNot(http_client.get_client("https://api.cerebras.ai/v1"), client)
+        self.assertIsNot(http_client.get_client("https://api.groq.com:8443/v1"), client)
+
+    def test_post_json_goes_through_the_pool(self):
+        self.assertEqual(http_client.post_json("https://example.com/v1/chat", {"a": 1}), {"path": "/v1/chat"})
+        self.assertEqual(self.requests[0].content, b'{"a":1}')
+
+    def test_close_clients_closes_and_forgets_the_pools(self):
+        client = http_client.get_client("https://example.com")
+        http_client.close_clients()
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(http_client.get_client("https://example.com"), client)
+
+    def test_async_clients_are_per_loop_and_closed_by_aclose_clients(self):
+        async def use():
+            client = http_client.get_async_client("https://example.com/a")
+            self.assertIs(http_client.get_async_client("https://example.com/b"), client)
+            self.assertEqual(await http_client.apost_json("https://example.com/b", {}), {"path": "/b"})
+            return client
+
+        async def use_and_close():
+            client = await use()
+            await http_client.aclose_clients()
+            return client
+
+        first = asyncio.run(use())
+        second = asyncio.run(use_and_close())
+        self.assertIsNot(first, second)
+        self.assertTrue(second.is_closed)
+        # The first loop closed without aclose_clients; its pool is dropped on next use
+        asyncio.run(use_and_close())
+        self.assertEqual(len(http_client._async_clients), 0)
+
+    def test_lifespan_shutdown_closes_every_pool(self):
+        from config.asgi import lifespan
+
+        async def serve():
+            client = http_client.get_async_client("https://example.com")
+            messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await lifespan({"type": "lifespan"}, receive, send)
+            return client, sent
+
+        sync_client = http_client.get_client("https://example.com")
+        client, sent = asyncio.run(serve())
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+        self.assertTrue(client.is_closed)
+        self.assertTrue(sync_client.is_closed)
+
+
+class RateSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "buckets.sqlite3")
+        self.scheduler = RateScheduler(self.path, max_wait=0, cooldowns=MemoryCooldownStore())
+
+    def _level(self, key, kind, model="m"):
+        row = self.scheduler._conn().execute(
+            "SELECT level FROM buckets WHERE key_id=? AND model=? AND kind=?",
+            (rate_scheduler.key_id(key), model, kind),
+        ).fetchone()
+        return row[0] if row else None
+
+    def test_spreads_load_and_debits_requests_and_tokens(self):
+        first = self.scheduler.acquire("p", "m", ["a", "b"], LIMITS, tokens=300)
+        second = self.scheduler.acquire("p", "m", ["a", "b"], LIMITS, tokens=300)
+        self.assertNotEqual(first, second)
+        self.assertAlmostEqual(self._level("a", "req"), 1, places=2)
+        self.assertAlmostEqual(self._level("a", "tok"), 700, places=0)
+
+    def test_preferred_key_goes_first_while_it_has_budget(self):
+        keys = ["a", "b"]
+        self.assertEqual(self.scheduler.acquire("p", "m", keys, LIMITS, preferred="b"), "b")
+        self.assertEqual(self.scheduler.acquire("p", "m", keys, LIMITS, preferred="b"), "b")
+        self.assertEqual(self.scheduler.acquire("p", "m", keys, LIMITS, preferred="b"), "a")
+
+    def test_exhausted_budget_raises_with_retry_after(self):
+        self.scheduler.acquire("p", "m", ["a"], LIMITS)
+        self.scheduler.acquire("p", "m", ["a"], LIMITS)
+        with self.assertRaises(RateLimitExhausted) as caught:
+            self.scheduler.acquire("p", "m", ["a"], LIMITS)
+        # One request refills in 60 / rpm seconds
+        self.assertGreater(caught.exception.retry_after, 25)
+        self.assertLessEqual(caught.exception.retry_after, 30)
+
+    def test_budget_refills_over_time(self):
+        self.scheduler.acquire("p", "m", ["a"], LIMITS)
+        self.scheduler.acquire("p", "m", ["a"], LIMITS)
+        later = rate_scheduler.time.time() + 31
+        with mock.patch.object(rate_scheduler.time, "time", return_value=later):
+            self.assertEqual(self.scheduler.acquire("p", "m", ["a"], LIMITS), "a")
+
+    def test_token_budget_is_enforced_per_model(self):
+        self.scheduler.acquire("p", "m", ["a"], LIMITS, tokens=900)
+        with self.assertRaises(RateLimitExhausted):
+            self.scheduler.acquire("p", "m", ["a"], LIMITS, tokens=200)
+        self.assertEqual(self.scheduler.acquire("p", "other", ["a"], LIMITS, tokens=200), "a")
+
+    def test_record_usage_corrects_the_estimate(self):
+        self.scheduler.acquire("p", "m", ["a"], LIMITS, tokens=800)
+        # The call used only 100 tokens: refund the rest
+        self.scheduler.record_usage("p", "a", "m", LIMITS, -700)
+        self.assertAlmostEqual(self._level("a", "tok"), 900, places=0)
+        self.assertEqual(self.scheduler.acquire("p", "m", ["a"], LIMITS, tokens=800), "a")
+
+        self.scheduler.record_usage("p", "a", "m", LIMITS, 500)
+        with self.assertRaises(RateLimitExhausted):
+            self.scheduler.acquire("p", "m", ["a"], LIMITS, tokens=200)
+
+    def test_mark_rate_limited_cools_down_a_key_or_one_model(self):
+        self.scheduler.mark_rate_limited("p", "a", 60, model="m")
+        self.assertEqual(self.scheduler.acquire("p", "m", ["a", "b"], LIMITS), "b")
+        self.assertEqual(self.scheduler.acquire("p", "other", ["a"], LIMITS), "a")
+        self.assertEqual(self.scheduler.cooling_down("p", ["a", "b"], model="m"), ["a"])
+
+        self.scheduler.mark_rate_limited("p", "b", 60)
+        self.assertEqual(self.scheduler.cooling_down("p", ["a", "b"], model="other"), ["b"])
+        with self.assertRaises(RateLimitExhausted) as caught:
+            self.scheduler.acquire("p", "m", ["a", "b"], LIMITS)
+        self.assertGreater(caught.exception.retry_after, 55)
+
+    def test_workers_share_one_budget(self):
+        other = RateScheduler(self.path, max_wait=0, cooldowns=MemoryCooldownStore())
+        self.scheduler.acquire("p", "m", ["a"], LIMITS)
+        other.acquire("p", "m", ["a"], LIMITS)
+        with self.assertRaises(RateLimitExhausted):
+            self.scheduler.acquire("p", "m", ["a"], LIMITS)
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+
+class CerebrasProviderTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = mock.Mock()
+        self.scheduler.mark_rate_limited.side_effect = lambda *a, **kw: self.threads.append(threading.current_thread())
+        self.threads = []
+        patcher = mock.patch.object(cerebras_provider, "get_scheduler", return_value=self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.provider = cerebras_provider.CerebrasLLMProvider(ProviderConfig(ProviderType.CEREBRAS, api_key="key"))
+
+    async def test_async_rate_limit_cools_down_off_the_event_loop(self):
+        reply = mock.Mock(usage=None, choices=[mock.Mock(message=mock.Mock(content="hi", role="assistant"))])
+        create = mock.AsyncMock(side_effect=[_RateLimited("429"), reply])
+        self.provider.async_client = mock.Mock(chat=mock.Mock(completions=mock.Mock(create=create)))
+
+        response = await self.provider.chat_async([Message(role="user", content="hello")])
+        self.assertEqual(response.content, "hi")
+        self.assertEqual([call.kwargs["model"] for call in create.call_args_list], ["gpt-oss-120b", "zai-glm-4.7"])
+        self.scheduler.mark_rate_limited.assert_called_once_with("cerebras", "key", 65, model="gpt-oss-120b")
+        self.assertIsNot(self.threads[0], threading.current_thread())
+
+
+@skipUnless(cooldown_store.fcntl, "needs fcntl")
+class MmapCooldownStoreTests(SimpleTestCase):
+    def make_stores(self, slots=8):
+        """Return two stores over one file (as two workers would)."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "cooldowns")
+        return MmapCooldownStore(path, slots=slots), MmapCooldownStore(path, slots=slots)
+
+    def test_cooldowns_are_shared_and_only_extended(self):
+        first, second = self.make_stores()
+        until = time.time() + 60
+        first.set("p:a:m", until)
+        self.assertEqual(second.until("p:a:m"), until)
+        second.set("p:a:m", until - 30)
+        self.assertEqual(first.until_many(["p:a:m", "p:b:m"]), [until, 0.0])
+
+    def test_expired_entries_are_ignored_and_reused(self):
+        first, second = self.make_stores(slots=1)
+        first.set("old", time.time() - 1)
+        self.assertEqual(second.until("old"), 0.0)
+        until = time.time() + 60
+        second.set("new", until)
+        self.assertEqual(first.until("new"), until)
+
+    def test_full_table_evicts_the_soonest_expiry(self):
+        first, second = self.make_stores(slots=2)
+        now = time.time()
+        first.set("soon", now + 10)
+        first.set("late", now + 100)
+        second.set("newest", now + 50)
+        self.assertEqual(first.until_many(["soon", "late", "newest"]), [0.0, now + 100, now + 50])
+
+    def test_reader_rescans_when_a_write_lands_mid_scan(self):
+        writer, reader = self.make_stores()
+        until = time.time() + 60
+        scan = reader._scan
+        calls = []
+
+        def racing_scan():
+            result = scan()
+            if not calls:
+                writer.set("p:a:m", until)
+            calls.append(result)
+            return result
+
+        with mock.patch.object(reader, "_scan", side_effect=racing_scan):
+            self.assertEqual(reader.until("p:a:m"), until)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(reader._generation % 2, 0)
+
+    def test_reader_never_caches_a_half_written_table(self):
+        writer, reader = self.make_stores()
+        generation = writer._generation_now()
+        # A writer mid-update leaves the counter odd; the reader must not trust a lock-free scan
+        cooldown_store._HEADER.pack_into(writer._map, 0, generation + 1, writer._slots)
+        with mock.patch.object(cooldown_store.fcntl, "flock") as flock:
+            self.assertEqual(reader.until("p:a:m"), 0.0)
+        self.assertEqual(flock.call_args_list[0].args[1], cooldown_store.fcntl.LOCK_SH)
+
+
+class _BrokenStore:
+    def get(self, key):
+        raise ConnectionError("down")
+
+    def set(self, key, translated, ttl):
+        raise ConnectionError("down")
+
+
+class TranslationCacheTests(SimpleTestCase):
+    def _sqlite_store(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return SQLiteTranslationStore(os.path.join(tmp.name, "translations.sqlite3"))
+
+    def test_key_normalises_text_and_separates_languages_models_and_providers(self):
+        key = cache_key("Thank  you ", "en", "zh", "qwen", "groq")
+        self.assertEqual(key, cache_key("Thank you", "EN", "zh", "qwen", "groq"))
+        self.assertNotEqual(key, cache_key("thank you", "en", "zh", "qwen", "groq"))
+        self.assertNotEqual(key, cache_key("Thank you", "en", "ja", "qwen", "groq"))
+        self.assertNotEqual(key, cache_key("Thank you", "en", "zh", "qwen-2", "groq"))
+        self.assertNotEqual(key, cache_key("Thank you", "en", "zh", "qwen", "cerebras"))
+
+    def test_lru_evicts_the_least_recently_used(self):
+        cache = TranslationCache(max_entries=2)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        cache.get("a")
+        cache.set("c", "C")
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), ("A", None, "C"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        cache = TranslationCache(ttl=60)
+        cache.set("a", "A")
+        later = translation_cache.time.monotonic() + 61
+        with mock.patch.object(translation_cache.time, "monotonic", return_value=later):
+            self.assertIsNone(cache.get("a"))
+
+    def test_long_or_empty_text_and_disabled_cache_get_no_key(self):
+        cache = TranslationCache(max_text_chars=5)
+        self.assertIsNotNone(cache.key_for("short", "en", "zh", "m", "p"))
+        self.assertIsNone(cache.key_for("too long", "en", "zh", "m", "p"))
+        self.assertIsNone(cache.key_for("", "en", "zh", "m", "p"))
+        self.assertIsNone(TranslationCache(enabled=False).key_for("short", "en", "zh", "m", "p"))
+
+    def test_sqlite_tier_is_shared_and_fills_the_memory_tier(self):
+        store = self._sqlite_store()
+        first, second = TranslationCache(store=store), TranslationCache(store=SQLiteTranslationStore(store.path))
+        first.set("k", "translated")
+        self.assertEqual(second.get("k"), "translated")
+        self.assertEqual(second.get("k"), "translated")
+        stats = second.stats()
+        self.assertEqual((stats["store_hits"], stats["memory_hits"], stats["hit_rate"]), (1, 1, 1.0))
+
+    def test_sqlite_tier_honours_ttl(self):
+        store = self._sqlite_store()
+        store.set("k", "translated", ttl=60)
+        later = translation_cache.time.time() + 61
+        with mock.patch.object(translation_cache.time, "time", return_value=later):
+            self.assertIsNone(store.get("k"))
+
+    @skipUnless(fakeredis, "fakeredis is not installed")
+    def test_redis_tier_is_shared(self):
+        server = fakeredis.FakeServer()
+        with mock.patch.object(translation_cache.redis.Redis, "from_url",
+                               side_effect=lambda *args, **kwargs: fakeredis.FakeRedis(server=server)):
+            first = TranslationCache(store=RedisTranslationStore("redis://fake"))
+            second = TranslationCache(store=RedisTranslationStore("redis://fake"))
+        first.set("k", "翻译")
+        self.assertEqual(second.get("k"), "翻译")
+        self.assertGreater(fakeredis.FakeRedis(server=server).ttl("translation:k"), 0)
+
+    def test_a_failing_store_is_skipped_for_a_while(self):
+        store = _BrokenStore()
+        cache = TranslationCache(store=store)
+        with mock.patch.object(store, "get", wraps=store.get) as get:
+            self.assertIsNone(cache.get("k"))
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(get.call_count, 1)
+        cache.set("k", "v")
+        self.assertEqual(cache.get("k"), "v")
+        self.assertEqual(cache.stats()["store_errors"], 1)
+
+
+class CachedTranslationTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = TranslationCache()
+        patcher = mock.patch.object(translation_cache, "get_translation_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_function_results_are_memoised_but_failures_are_not(self):
+        calls = []
+
+        @cached_translation(provider="p", model="m")
+        def translate(text, source_lang, target_lang):
+            calls.append(text)
+            return "" if text == "empty" else text.upper()
+
+        self.assertEqual(translate("hi", "en", "zh"), "HI")
+        self.assertEqual(translate("hi", source_lang="en", target_lang="zh"), "HI")
+        translate("empty", "en", "zh")
+        translate("empty", "en", "zh")
+        self.assertEqual(calls, ["hi", "empty", "empty"])
+
+    def test_exceptions_are_not_cached(self):
+        translate = mock.Mock(side_effect=[RuntimeError("429"), "ok"])
+
+        @cached_translation(provider="p", model="m")
+        def cached(text, source_lang, target_lang):
+            return translate(text)
+
+        with self.assertRaises(RuntimeError):
+            cached("hi", "en", "zh")
+        self.assertEqual(cached("hi", "en", "zh"), "ok")
+        self.assertEqual(cached("hi", "en", "zh"), "ok")
+        self.assertEqual(translate.call_count, 2)
+
+    def test_methods_use_wrap_unwrap_and_their_own_provider_model_and_languages(self):
+        class Service:
+            calls = 0
+
+            def __init__(self, provider):
+                self.provider, self.model = provider, "shared-model"
+                self.source_lang, self.target_lang = "en", "zh"
+
+            @cached_translation(
+                provider=lambda self: self.provider, model=lambda self: self.model,
+                unwrap=lambda result: result["text"] if result["ok"] else None,
+                wrap=lambda owner, text, source, target, translated: {"ok": True, "text": translated, "hit": True},
+            )
+            async def translate_async(self, text, source_lang=None, target_lang=None):
+                Service.calls += 1
+                return {"ok": True, "text": f"{self.provider}:{text}", "hit": False}
+
+        async def run():
+            first, other = Service("dashscope"), Service("openai")
+            self.assertEqual(await first.translate_async("hi"), {"ok": True, "text": "dashscope:hi", "hit": False})
+            hit = await first.translate_async("hi", target_lang="zh")
+            self.assertEqual(hit, {"ok": True, "text": "dashscope:hi", "hit": True})
+            # Same model name from another provider is a separate entry
+            self.assertEqual((await other.translate_async("hi"))["text"], "openai:hi")
+
+        asyncio.run(run())
+        self.assertEqual(Service.calls, 2)
@@ -0,0 +1,222 @@
+"""
+Audio payloads for ASR uploads without temp-file round trips.
+
+``AudioUpload`` holds either bytes in memory or a path on disk and hands the
+provider clients whatever they need:
+
+- ``read()`` / ``open()`` for HTTP bodies and SDK file tuples;
+- ``path`` only for consumers that insist on a file (DashScope OSS upload,
+  mutagen), writing a temp file on first use and removing it on ``close()``.
+
+Uploads from Django stay where Django put them: small ones are already in
+memory, large ones were already spooled to disk (FILE_UPLOAD_MAX_MEMORY_SIZE)
+and are used from that temp file instead of being copied again.
+
+    with AudioUpload.from_django_file(request.FILES["file"]) as audio:
+        text = transcribe(audio)
+
+``pcm_to_wav`` wraps raw PCM (e.g. a realtime chunk) in a WAV header in memory;
+``decode_pcm`` goes the other way for a file or a time range of it (ffmpeg, or
+WAV without it), and ``probe_duration`` reads a file's length without
+decoding it.
+"""
+
+import io
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import wave
+from functools import lru_cache
+from typing import BinaryIO, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+
+def pcm_to_wav(
+    pcm: Union[bytes, bytearray, memoryview],
+    sample_rate: int = 16000,
+    channels: int = 1,
+    sample_width: int = 2,
+) -> bytes:
+    """Return a WAV file (44-byte header + *pcm*) built in memory."""
+    size = len(pcm)
+    header = _WAV_HEADER.pack(
+        b"RIFF", 36 + size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate,
+        sample_rate * channels * sample_width, channels * sample_width, sample_width * 8,
+        b"data", size,
+    )
+    return b"".join((header, pcm))
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_binary() -> Optional[str]:
+    """Path of the ffmpeg executable, or None when it is not installed."""
+    return shutil.which("ffmpeg")
+
+
+@lru_cache(maxsize=1)
+def ffprobe_binary() -> Optional[str]:
+    """Path of the ffprobe executable, or None when it is not installed."""
+    return shutil.which("ffprobe")
+
+
+_FFMPEG_DURATION = re.compile(rb"Duration: (\d+):(\d\d):(\d\d(?:\.\d+)?)")
+
+
+def probe_duration(path: str, timeout: Optional[float] = 30.0) -> Optional[float]:
+    """Length of an audio file in seconds from its header, without decoding it; None if unknown.
+
+    Uses ffprobe, else the ``Duration:`` line ``ffmpeg -i`` prints, else the
+    WAV header.
+    """
+    if ffprobe_binary():
+        proc = subprocess.run(
+            [ffprobe_binary(), "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", path],
+            capture_output=True, timeout=timeout,
+        )
+        try:
+            return float(proc.stdout.strip())
+        except ValueError:
+            return None
+    if ffmpeg_binary():
+        # No output file: ffmpeg prints the input's header and exits non-zero
+        proc = subprocess.run(
+            [ffmpeg_binary(), "-hide_banner", "-nostdin", "-i", path],
+            capture_output=True, timeout=timeout,
+        )
+        match = _FFMPEG_DURATION.search(proc.stderr)
+        if match is None:
+            return None
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+
+def decode_pcm(path: str, sample_rate: int = 16000, timeout: Optional[float] = None,
+               start: float = 0.0, duration: Optional[float] = None) -> Optional[Tuple[bytes, int]]:
+    """Decode an audio file (or ``duration`` seconds of it from ``start``) to 16-bit mono PCM.
+
+    Returns ``(pcm, sample_rate)``. Uses ffmpeg (resampling to *sample_rate*)
+    when installed. Without it only 16-bit WAV can be read, at its own rate;
+    anything else returns None.
+    """
+    if ffmpeg_binary():
+        seek = ["-ss", f"{start:.3f}"] if start else []
+        if duration is not None:
+            seek += ["-t", f"{duration:.3f}"]
+        proc = subprocess.run(
+            [ffmpeg_binary(), "-hide_banner", "-nostdin", "-loglevel", "error", *seek, "-i", path,
+             "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"],
+            capture_output=True, timeout=timeout,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited {proc.returncode}: {proc.stderr.decode(errors='replace')[-300:]}")
+        return proc.stdout, sample_rate
+
+    try:
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                return None
+            channels, rate = wav.getnchannels(), wav.getframerate()
+            first = min(wav.getnframes(), int(start * rate))
+            count = wav.getnframes() - first if duration is None else int(duration * rate)
+            wav.setpos(first)
+            pcm = wav.readframes(count)
+    except (wave.Error, EOFError):
+        return None
+    if channels > 1:
+        if np is None:
+            return None
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+        pcm = samples.mean(axis=1).astype(np.int16).tobytes()
+    return pcm, rate
+
+
+class AudioUpload:
+    """An audio file held in memory or on disk, named for content-type sniffing."""
+
+    def __init__(self, name: str, data: Optional[bytes] = None, path: Optional[str] = None):
+        if data is None and path is None:
+            raise ValueError("AudioUpload needs data or a path")
+        self.name = name
+        # Exact length in seconds, when something decoded the audio
+        self.duration: Optional[float] = None
+        self._data = data
+        self._path = path
+        self._temp_path: Optional[str] = None
+
+    @classmethod
+    def from_path(cls, path: str, name: Optional[str] = None) -> "AudioUpload":
+        return cls(name or os.path.basename(path), path=path)
+
+    @classmethod
+    def from_django_file(cls, uploaded_file, name: Optional[str] = None) -> "AudioUpload":
+        name = name or uploaded_file.name or "audio.webm"
+        if hasattr(uploaded_file, "temporary_file_path"):
+            # Django already spooled a large upload to disk; use it as-is
+            return cls(name, path=uploaded_file.temporary_file_path())
+        uploaded_file.seek(0)
+        return cls(name, data=uploaded_file.read())
+
+    @property
+    def in_memory(self) -> bool:
+        return self._data is not None
+
+    @property
+    def size(self) -> int:
+        if self._data is not None:
+            return len(self._data)
+        return os.path.getsize(self._path)
+
+    def read(self) -> bytes:
+        if self._data is not None:
+            return self._data
+        with open(self._path, "rb") as f:
+            return f.read()
+
+    def open(self) -> BinaryIO:
+        """A fresh readable file object positioned at the start."""
+        if self._data is not None:
+            return io.BytesIO(self._data)
+        return open(self._path, "rb")
+
+    @property
+    def path(self) -> str:
+        """A filesystem path to the audio, written to a temp file if needed."""
+        if self._path is not None:
+            return self._path
+        if self._temp_path is None:
+            suffix = os.path.splitext(self.name)[1] or ".wav"
+            fd, self._temp_path = tempfile.mkstemp(suffix=suffix)
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._data)
+        return self._temp_path
+
+    def close(self) -> None:
+        """Remove the temp file written by ``path``, if any."""
+        if self._temp_path is not None:
+            try:
+                os.unlink(self._temp_path)
+            except FileNotFoundError:
+                pass
+            self._temp_path = None
+
+    def __enter__(self) -> "AudioUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,167 @@
+"""
+Cooldown stores: "this key (or key + model) is rate-limited until T".
+
+Reads happen for every pooled key on every request, writes only on a 429,
+so both stores answer reads from a process-local dict:
+
+- ``MemoryCooldownStore``: just the dict. Single process / tests.
+- ``MmapCooldownStore``: a fixed-size table in a shared ``mmap``'d file so
+  every worker on the host sees a cooldown at once. Writers take an
+  ``flock`` and bump a generation counter in the header; readers compare
+  that counter (one memory load, no syscall) and rescan the table only
+  when it changed. The counter is a seqlock: it is odd while a writer is
+  mid-update, and a scan that saw an odd or changing counter is retried
+  (after a few tries, under a shared ``flock``), so readers never keep a
+  half-written slot.
+
+Entries are addressed by an arbitrary string name; the scheduler uses
+``"provider:key_id:model"``.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<QQ")   # generation, slot count
+_SLOT = struct.Struct("<8sd")    # name digest, cooldown end (epoch seconds)
+_EMPTY = b"\0" * 8
+# Lock-free scans tried before a reader falls back to a shared flock
+_READ_ATTEMPTS = 3
+
+
+@lru_cache(maxsize=4096)
+def _digest(name: str) -> bytes:
+    return hashlib.blake2b(name.encode(), digest_size=8).digest()
+
+
+class MemoryCooldownStore:
+    def __init__(self):
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, name: str, until: float) -> None:
+        with self._lock:
+            self._until[name] = max(until, self._until.get(name, 0.0))
+
+    def until(self, name: str) -> float:
+        return self._until.get(name, 0.0)
+
+    def until_many(self, names: Iterable[str]) -> List[float]:
+        until = self._until
+        return [until.get(name, 0.0) for name in names]
+
+
+class MmapCooldownStore:
+    """Cooldowns in a fixed table of ``slots`` entries shared through a file."""
+
+    def __init__(self, path: str, slots: int = 1024):
+        size = _HEADER.size + slots * _SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+                generation, existing = _HEADER.unpack_from(os.pread(self._fd, _HEADER.size, 0))
+                if existing == 0:
+                    os.pwrite(self._fd, _HEADER.pack(generation, slots), 0)
+            generation, existing = _HEADER.unpack_from(os.pread(self._fd, _HEADER.size, 0))
+            if generation % 2:
+                # A writer died mid-update (or predates the seqlock): make it even
+                os.pwrite(self._fd, _HEADER.pack(generation + 1, existing), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, 0)
+        # The first creator decides the table size
+        self._slots = _HEADER.unpack_from(self._map, 0)[1]
+        self._generation = -1
+        self._cache: Dict[bytes, float] = {}
+
+    def _generation_now(self) -> int:
+        return _HEADER.unpack_from(self._map, 0)[0]
+
+    def _scan(self) -> Dict[bytes, float]:
+        now = time.time()
+        cache = {}
+        for offset in range(_HEADER.size, _HEADER.size + self._slots * _SLOT.size, _SLOT.size):
+            digest, until = _SLOT.unpack_from(self._map, offset)
+            if digest != _EMPTY and until > now:
+                cache[digest] = until
+        return cache
+
+    def _refresh(self) -> Dict[bytes, float]:
+        if self._generation_now() == self._generation:
+            return self._cache
+        for _ in range(_READ_ATTEMPTS):
+            before = self._generation_now()
+            if before % 2:
+                time.sleep(0)
+                continue
+            cache = self._scan()
+            if self._generation_now() == before:
+                self._cache, self._generation = cache, before
+                return cache
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+        try:
+            self._cache, self._generation = self._scan(), self._generation_now()
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return self._cache
+
+    def set(self, name: str, until: float) -> None:
+        digest = _digest(name)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            now = time.time()
+            target, free, oldest, oldest_until = None, None, None, float("inf")
+            for offset in range(_HEADER.size, _HEADER.size + self._slots * _SLOT.size, _SLOT.size):
+                slot_digest, slot_until = _SLOT.unpack_from(self._map, offset)
+                if slot_digest == digest:
+                    target = offset
+                    until = max(until, slot_until)
+                    break
+                if free is None and (slot_digest == _EMPTY or slot_until <= now):
+                    free = offset
+                if slot_until < oldest_until:
+                    oldest, oldest_until = offset, slot_until
+            if target is None:
+                target = free
+            if target is None:
+                logger.warning("Cooldown table full (%d slots), evicting the soonest expiry", self._slots)
+                target = oldest
+            generation = self._generation_now()
+            _HEADER.pack_into(self._map, 0, generation + 1, self._slots)
+            _SLOT.pack_into(self._map, target, digest, until)
+            _HEADER.pack_into(self._map, 0, generation + 2, self._slots)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def until(self, name: str) -> float:
+        return self._refresh().get(_digest(name), 0.0)
+
+    def until_many(self, names: Iterable[str]) -> List[float]:
+        cache = self._refresh()
+        return [cache.get(_digest(name), 0.0) for name in names]
+
+
+def create_cooldown_store(backend: str, path: str = "", slots: int = 1024):
+    if backend == "mmap":
+        if fcntl is not None:
+            return MmapCooldownStore(path, slots=slots)
+        logger.warning("mmap cooldown store needs fcntl; using a process-local store")
+        return MemoryCooldownStore()
+    if backend == "memory":
+        return MemoryCooldownStore()
+    raise ValueError(f"Unknown cooldown store backend: {backend}")
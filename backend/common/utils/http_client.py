@@ -0,0 +1,173 @@
+"""
+Shared outbound HTTP clients for LLM/ASR calls.
+
+Every call through ``urllib.request.urlopen`` or a freshly built SDK client
+opens a new TCP connection and TLS session. Here each origin
+(scheme://host:port) gets one long-lived ``httpx`` client, so consecutive
+calls to the same host reuse a kept-alive connection, over HTTP/2 when the
+server and the ``h2`` package support it.
+
+Usage:
+    data = post_json(url, payload, headers=headers, timeout=30)
+    data = await apost_json(url, payload, headers=headers)
+    client = OpenAI(api_key=key, base_url=base_url, http_client=get_client(base_url))
+
+Pool sizes and timeouts come from ``get_settings().http`` (OUTBOUND_HTTP_*).
+
+``AsyncClient`` connections belong to the event loop that opened them, so
+async pools are kept per loop. ``aclose_clients()`` closes the running loop's
+pools; the ASGI lifespan shutdown (config/asgi.py) calls it along with
+``close_clients()``. Pools of loops that were closed without it are dropped.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+from common.config import get_settings
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+except ImportError:
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients: Dict[str, httpx.Client] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.netloc.decode('ascii')}"
+
+
+def _timeout(seconds: Optional[float] = None) -> httpx.Timeout:
+    config = get_settings().http
+    total = config.timeout if seconds is None else seconds
+    return httpx.Timeout(total, connect=min(config.connect_timeout, total))
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    config = get_settings().http
+    return {
+        "http2": config.http2 and h2 is not None,
+        "limits": httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        "timeout": _timeout(),
+        "follow_redirects": True,
+    }
+
+
+def get_client(url: str) -> httpx.Client:
+    """Return the process-wide pooled client for *url*'s origin."""
+    origin = _origin(url)
+    client = _clients.get(origin)
+    if client is None:
+        with _lock:
+            client = _clients.get(origin)
+            if client is None:
+                client = httpx.Client(**_client_kwargs())
+                _clients[origin] = client
+                logger.debug("Opened outbound HTTP pool for %s", origin)
+    return client
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    """Return the pooled async client for *url*'s origin on the running loop."""
+    loop = asyncio.get_running_loop()
+    origin = _origin(url)
+    with _lock:
+        for other in [other for other in _async_clients if other.is_closed()]:
+            # Their connections went with the loop; nothing left to close
+            del _async_clients[other]
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(origin)
+        if client is None:
+            client = clients[origin] = httpx.AsyncClient(**_client_kwargs())
+            logger.debug("Opened async outbound HTTP pool for %s", origin)
+    return client
+
+
+def post_json(
+    url: str,
+    payload: Any = None,
+    *,
+    content: Optional[bytes] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> Any:
+    """POST *payload* as JSON (or raw *content*) and return the decoded JSON reply.
+
+    Raises ``httpx.HTTPStatusError`` on non-2xx responses.
+    """
+    resp = get_client(url).post(
+        url,
+        json=payload if content is None else None,
+        content=content,
+        headers=headers,
+        timeout=_timeout(timeout),
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def apost_json(
+    url: str,
+    payload: Any = None,
+    *,
+    content: Optional[bytes] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> Any:
+    """Async variant of :func:`post_json`."""
+    resp = await get_async_client(url).post(
+        url,
+        json=payload if content is None else None,
+        content=content,
+        headers=headers,
+        timeout=_timeout(timeout),
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def stream_post(
+    url: str,
+    payload: Any,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+):
+    """Context manager for a streamed JSON POST (e.g. SSE chat completions)."""
+    return get_client(url).stream(
+        "POST", url, json=payload, headers=headers, timeout=_timeout(timeout),
+    )
+
+
+def close_clients() -> None:
+    """Close every sync pool (tests, worker shutdown)."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_clients() -> None:
+    """Close the running loop's async pools (call before the loop shuts down)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = list(_async_clients.pop(loop, {}).values())
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,256 @@
+"""
+Request/token budgets for pooled API keys, shared by all workers on a host.
+
+Every (provider, key, model) has two continuously refilled token buckets:
+requests per minute and tokens per minute. Before a call, ``acquire`` picks
+the key with the most headroom and debits it, so load spreads across the
+pool before anything gets a 429. When every key is out of budget it waits
+up to ``max_wait`` seconds for the earliest refill, or raises
+:class:`RateLimitExhausted` so the caller can shed the request. A 429 that
+still happens puts the key (or one of its models) into cooldown.
+
+Buckets live in one SQLite file in WAL mode; each acquire is a single
+``BEGIN IMMEDIATE`` transaction, so gunicorn/daphne workers never hand out
+the same budget twice. Cooldowns are read far more often (every pooled
+key, every request) and live in a common.utils.cooldown_store instead.
+
+    limits = {"rpm": 30, "tpm": 60000}
+    key = get_scheduler().acquire("cerebras", "qwen-3-32b", keys, limits, tokens=800)
+    ...
+    get_scheduler().record_usage("cerebras", key, "qwen-3-32b", limits, used - 800)
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from common.config import get_settings
+
+from .cooldown_store import MemoryCooldownStore, create_cooldown_store
+
+logger = logging.getLogger(__name__)
+
+# A cooldown under this model applies to every model of the key
+ALL_MODELS = ""
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS buckets (
+        provider TEXT NOT NULL, key_id TEXT NOT NULL, model TEXT NOT NULL,
+        kind TEXT NOT NULL, level REAL NOT NULL, updated REAL NOT NULL,
+        PRIMARY KEY (provider, key_id, model, kind))""",
+)
+
+
+class RateLimitExhausted(Exception):
+    """Every key is out of budget for longer than the caller will wait."""
+
+    def __init__(self, provider: str, model: str, retry_after: float):
+        super().__init__(f"{provider}/{model}: all keys rate-limited, retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.model = model
+        self.retry_after = retry_after
+
+
+@lru_cache(maxsize=1024)
+def key_id(key: str) -> str:
+    """Stable, non-secret identifier of an API key."""
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
+def _refill(level: float, updated: float, per_minute: float, now: float) -> float:
+    return min(float(per_minute), level + (now - updated) * per_minute / 60.0)
+
+
+def _cooldown_name(provider: str, kid: str, model: str) -> str:
+    return f"{provider}:{kid}:{model}"
+
+
+class RateScheduler:
+    def __init__(self, path: str, max_wait: float = 2.0, cooldowns=None):
+        self.path = path
+        self.max_wait = max_wait
+        self.cooldowns = cooldowns if cooldowns is not None else MemoryCooldownStore()
+        self._local = threading.local()
+        conn = self._conn()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ── State helpers (caller holds the transaction) ──
+
+    def _levels(self, conn, provider, ids, model, limits, now) -> Dict[Tuple[str, str], float]:
+        levels = {}
+        marks = ",".join("?" * len(ids))
+        rows = conn.execute(
+            f"SELECT key_id, kind, level, updated FROM buckets "
+            f"WHERE provider=? AND model=? AND key_id IN ({marks})",
+            (provider, model, *ids),
+        )
+        for kid, kind, level, updated in rows:
+            per_minute = limits.get("rpm" if kind == "req" else "tpm")
+            if per_minute:
+                levels[(kid, kind)] = _refill(level, updated, per_minute, now)
+        return levels
+
+    def _cooldowns(self, provider, ids, model, now) -> Dict[str, float]:
+        """Return ``{key_id: cooldown_end}`` for the ids cooling down for *model*."""
+        ids = list(ids)
+        names = [_cooldown_name(provider, kid, ALL_MODELS) for kid in ids]
+        if model != ALL_MODELS:
+            names += [_cooldown_name(provider, kid, model) for kid in ids]
+        until = self.cooldowns.until_many(names)
+        cooling = {}
+        for i, kid in enumerate(ids):
+            end = max(until[i], until[i + len(ids)]) if model != ALL_MODELS else until[i]
+            if end > now:
+                cooling[kid] = end
+        return cooling
+
+    @staticmethod
+    def _debit(conn, provider, kid, model, kind, level, now):
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (provider, key_id, model, kind, level, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (provider, kid, model, kind, level, now),
+        )
+
+    def _try_acquire(self, provider, model, keys, limits, tokens, preferred) -> Tuple[Optional[str], float]:
+        """Debit the best key; return ``(key, 0)`` or ``(None, seconds_until_one_fits)``."""
+        rpm, tpm = limits.get("rpm"), limits.get("tpm")
+        # A request larger than the whole bucket goes once the bucket is full
+        need = min(tokens, tpm) if tpm else 0
+        ids = {key: key_id(key) for key in keys}
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            levels = self._levels(conn, provider, list(ids.values()), model, limits, now)
+            cooling = self._cooldowns(provider, list(ids.values()), model, now)
+
+            best, best_score, min_wait = None, -1.0, float("inf")
+            for key, kid in ids.items():
+                if kid in cooling:
+                    min_wait = min(min_wait, cooling[kid] - now)
+                    continue
+                req = levels.get((kid, "req"), rpm) if rpm else None
+                tok = levels.get((kid, "tok"), tpm) if tpm else None
+                wait = 0.0
+                if req is not None and req < 1:
+                    wait = max(wait, (1 - req) * 60.0 / rpm)
+                if tok is not None and tok < need:
+                    wait = max(wait, (need - tok) * 60.0 / tpm)
+                if wait > 0:
+                    min_wait = min(min_wait, wait)
+                    continue
+                score = min(
+                    req / rpm if req is not None else 1.0,
+                    tok / tpm if tok is not None else 1.0,
+                )
+                if key == preferred:
+                    score = 2.0  # the caller's own key goes first while it has budget
+                if score > best_score:
+                    best, best_score = key, score
+
+            if best is not None:
+                kid = ids[best]
+                if rpm:
+                    self._debit(conn, provider, kid, model, "req", levels.get((kid, "req"), rpm) - 1, now)
+                if tpm and tokens:
+                    self._debit(conn, provider, kid, model, "tok", levels.get((kid, "tok"), tpm) - tokens, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return best, (0.0 if best is not None else min_wait)
+
+    # ── Public API ──
+
+    def acquire(
+        self,
+        provider: str,
+        model: str,
+        keys: Sequence[str],
+        limits: Dict,
+        tokens: int = 0,
+        preferred: Optional[str] = None,
+        max_wait: Optional[float] = None,
+    ) -> str:
+        """Reserve one request (and ``tokens``) on the key with the most headroom.
+
+        ``limits`` holds ``rpm``/``tpm`` per key for *model*; a missing or
+        ``None`` limit is not enforced. Raises :class:`RateLimitExhausted`
+        when no key frees up within ``max_wait`` (default from settings).
+        """
+        if not keys:
+            raise ValueError("acquire() needs at least one key")
+        if max_wait is None:
+            max_wait = self.max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            key, wait = self._try_acquire(provider, model, list(dict.fromkeys(keys)), limits, tokens, preferred)
+            if key is not None:
+                return key
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExhausted(provider, model, wait)
+            logger.info("%s/%s: all keys at budget, queueing %.2fs", provider, model, wait)
+            time.sleep(wait)
+
+    def record_usage(self, provider: str, key: str, model: str, limits: Dict, tokens: int) -> None:
+        """Charge (or refund, if negative) tokens after the real usage is known."""
+        tpm = limits.get("tpm")
+        if not tpm or not tokens:
+            return
+        kid = key_id(key)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            level = self._levels(conn, provider, [kid], model, limits, now).get((kid, "tok"), tpm)
+            self._debit(conn, provider, kid, model, "tok", level - tokens, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def mark_rate_limited(self, provider: str, key: str, seconds: float, model: str = ALL_MODELS) -> None:
+        """Put *key* (or just its *model*) into cooldown after a 429."""
+        self.cooldowns.set(_cooldown_name(provider, key_id(key), model), time.time() + seconds)
+
+    def cooling_down(self, provider: str, keys: Iterable[str], model: str = ALL_MODELS) -> List[str]:
+        """Return the subset of *keys* currently in cooldown."""
+        ids = {key: key_id(key) for key in keys}
+        cooling = self._cooldowns(provider, ids.values(), model, time.time())
+        return [key for key, kid in ids.items() if kid in cooling]
+
+
+_scheduler: Optional[RateScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RateScheduler:
+    """Process-wide scheduler on the shared database from settings."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                config = get_settings().rate_limit
+                cooldowns = create_cooldown_store(
+                    config.cooldown_backend, config.cooldown_path, config.cooldown_slots,
+                )
+                _scheduler = RateScheduler(config.db_path, max_wait=config.max_wait, cooldowns=cooldowns)
+    return _scheduler
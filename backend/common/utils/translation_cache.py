@@ -0,0 +1,355 @@
+"""
+Memoised LLM translations.
+
+Lectures and conversations repeat themselves ("Thank you", "Okay, so…",
+recurring phrases), and every repeat used to cost an LLM call. Translations
+are cached under (normalised text, source language, target language,
+provider, model); two providers serving the same model name do not share
+entries:
+
+- an in-process LRU bounded by entry count and TTL answers most hits;
+- an optional shared tier (``TRANSLATION_CACHE_BACKEND``) lets every worker
+  reuse each other's translations: ``sqlite`` (one file per host, WAL) or
+  ``redis`` (several hosts). Hits there are copied into the LRU.
+
+Translate functions opt in with one decorator, sync or async:
+
+    @cached_translation(provider="cerebras", model="qwen-3-32b")
+    def _cerebras_translate(text, source_lang, target_lang): ...
+
+    @cached_translation(provider="groq", model=lambda self: self.model, unwrap=..., wrap=...)
+    async def translate_async(self, text, source_lang=None, target_lang=None): ...
+
+Failures (exceptions, ``unwrap`` returning None, empty output) are never
+cached. ``get_translation_cache().stats()`` reports hit rates per tier.
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from common.config import get_settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# After a shared-tier error, skip it for this long (a down Redis must not add
+# its timeout to every translation)
+_STORE_RETRY_S = 30.0
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS translations (
+        key TEXT PRIMARY KEY, translated TEXT NOT NULL, expires REAL NOT NULL)""",
+)
+
+
+def normalize_text(text: str) -> str:
+    """NFKC, trimmed, inner whitespace collapsed; case and punctuation kept."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(text: str, source_lang: str, target_lang: str, model: str, provider: str) -> str:
+    raw = "\0".join((provider, model, (source_lang or "").lower(), (target_lang or "").lower(), normalize_text(text)))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class SQLiteTranslationStore:
+    """Shared tier in one SQLite file; one connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT translated FROM translations WHERE key=? AND expires>?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, translated: str, ttl: float) -> None:
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO translations (key, translated, expires) VALUES (?, ?, ?)",
+            (key, translated, now + ttl),
+        )
+        # Cheap amortised expiry: roughly one write in 256 sweeps old rows
+        if key[-2:] == "00":
+            conn.execute("DELETE FROM translations WHERE expires<=?", (now,))
+
+
+class RedisTranslationStore:
+    """Shared tier in Redis (``SETEX`` under a key prefix)."""
+
+    def __init__(self, url: str, prefix: str = "translation:"):
+        if redis is None:
+            raise ImportError("redis package not installed")
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(self._prefix + key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, translated: str, ttl: float) -> None:
+        self._client.setex(self._prefix + key, max(1, int(ttl)), translated)
+
+
+class TranslationCache:
+    """Bounded LRU with TTL in front of an optional shared store."""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 604800.0, max_text_chars: int = 1000,
+                 store=None, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_text_chars = max_text_chars
+        self.store = store
+        self.enabled = enabled and max_entries > 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "store_hits": 0, "misses": 0, "evictions": 0, "store_errors": 0}
+        self._store_down_until = 0.0
+
+    def key_for(self, text: str, source_lang: str, target_lang: str, model: str, provider: str) -> Optional[str]:
+        """Cache key, or None when the text should not be cached."""
+        if not self.enabled or not text or len(text) > self.max_text_chars:
+            return None
+        return cache_key(text, source_lang, target_lang, model, provider)
+
+    # ── Memory tier ──
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            translated, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._counts["memory_hits"] += 1
+            return translated
+
+    def _memory_set(self, key: str, translated: str) -> None:
+        with self._lock:
+            self._entries[key] = (translated, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    # ── Shared tier (blocking; async callers run these in an executor) ──
+
+    def _store_available(self) -> bool:
+        return self.store is not None and time.monotonic() >= self._store_down_until
+
+    def _store_failed(self, action: str, error: Exception) -> None:
+        self._counts["store_errors"] += 1
+        self._store_down_until = time.monotonic() + _STORE_RETRY_S
+        logger.warning(f"Translation cache store {action} failed, memory only for {_STORE_RETRY_S:.0f}s: {error}")
+
+    def _store_get(self, key: str) -> Optional[str]:
+        try:
+            translated = self.store.get(key)
+        except Exception as e:
+            self._store_failed("read", e)
+            return None
+        if translated is not None:
+            self._memory_set(key, translated)
+            self._counts["store_hits"] += 1
+        return translated
+
+    def _store_set(self, key: str, translated: str) -> None:
+        try:
+            self.store.set(key, translated, self.ttl)
+        except Exception as e:
+            self._store_failed("write", e)
+
+    # ── Public API ──
+
+    def get(self, key: str) -> Optional[str]:
+        translated = self._memory_get(key)
+        if translated is None and self._store_available():
+            translated = self._store_get(key)
+        if translated is None:
+            self._counts["misses"] += 1
+        return translated
+
+    def set(self, key: str, translated: str) -> None:
+        if not translated:
+            return
+        self._memory_set(key, translated)
+        if self._store_available():
+            self._store_set(key, translated)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        translated = self._memory_get(key)
+        if translated is None and self._store_available():
+            translated = await asyncio.get_running_loop().run_in_executor(None, self._store_get, key)
+        if translated is None:
+            self._counts["misses"] += 1
+        return translated
+
+    async def set_async(self, key: str, translated: str) -> None:
+        if not translated:
+            return
+        self._memory_set(key, translated)
+        if self._store_available():
+            await asyncio.get_running_loop().run_in_executor(None, self._store_set, key, translated)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self._counts)
+        hits = counts["memory_hits"] + counts["store_hits"]
+        lookups = hits + counts["misses"]
+        return {
+            **counts,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "store": type(self.store).__name__ if self.store is not None else None,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def create_translation_store(backend: str, path: str, redis_url: str):
+    """Shared tier for ``backend`` ("", "sqlite" or "redis"); None if unavailable."""
+    if not backend:
+        return None
+    try:
+        if backend == "sqlite":
+            return SQLiteTranslationStore(path)
+        if backend == "redis":
+            if not redis_url:
+                raise ValueError("TRANSLATION_CACHE_REDIS_URL / REDIS_URL not set")
+            return RedisTranslationStore(redis_url)
+        raise ValueError(f"unknown backend {backend!r}")
+    except Exception as e:
+        logger.warning(f"Translation cache: shared tier disabled ({e}); using memory only")
+        return None
+
+
+_cache: Optional[TranslationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    """Process-wide translation cache configured from settings."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = get_settings().translation_cache
+                _cache = TranslationCache(
+                    max_entries=config.max_entries,
+                    ttl=config.ttl,
+                    max_text_chars=config.max_text_chars,
+                    store=create_translation_store(config.backend, config.db_path, config.redis_url),
+                    enabled=config.enabled,
+                )
+    return _cache
+
+
+def cached_translation(
+    model: Union[str, Callable[[Any], str]],
+    provider: Union[str, Callable[[Any], str]],
+    unwrap: Optional[Callable[[Any], Optional[str]]] = None,
+    wrap: Optional[Callable[..., Any]] = None,
+):
+    """Memoise a translate function or method (sync or async).
+
+    The function takes ``text``, ``source_lang`` and ``target_lang``
+    arguments; on a method, ``None`` languages fall back to
+    ``self.source_lang`` / ``self.target_lang``. ``model`` and ``provider``
+    name who produces the translation, each a string or a callable taking
+    ``self``.
+
+    For functions that return something other than the translated string,
+    ``unwrap(result)`` extracts it (None: do not cache) and
+    ``wrap(self, text, source_lang, target_lang, translated)`` builds the
+    return value for a cache hit.
+    """
+    unwrap = unwrap or (lambda result: result)
+    wrap = wrap or (lambda owner, text, source, target, translated: translated)
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        def resolve(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = bound.arguments
+            owner = params.get("self")
+            source = params.get("source_lang") or getattr(owner, "source_lang", None) or "auto"
+            target = params.get("target_lang") or getattr(owner, "target_lang", None) or ""
+            name = model(owner) if callable(model) else model
+            served_by = provider(owner) if callable(provider) else provider
+            text = params["text"]
+            return owner, text, source, target, get_translation_cache().key_for(text, source, target, name, served_by)
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                owner, text, source, target, key = resolve(args, kwargs)
+                if key is None:
+                    return await fn(*args, **kwargs)
+                cache = get_translation_cache()
+                translated = await cache.get_async(key)
+                if translated is not None:
+                    return wrap(owner, text, source, target, translated)
+                result = await fn(*args, **kwargs)
+                translated = unwrap(result)
+                if translated:
+                    await cache.set_async(key, translated)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            owner, text, source, target, key = resolve(args, kwargs)
+            if key is None:
+                return fn(*args, **kwargs)
+            cache = get_translation_cache()
+            translated = cache.get(key)
+            if translated is not None:
+                return wrap(owner, text, source, target, translated)
+            result = fn(*args, **kwargs)
+            translated = unwrap(result)
+            if translated:
+                cache.set(key, translated)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -15,6 +15,7 @@ from channels.routing import ProtocolTypeRouter, URLRouter
 
 from apps.interpretation.routing import websocket_urlpatterns as interpretation_ws
 from apps.games.routing import websocket_urlpatterns as games_ws
+from common.utils.http_client import aclose_clients, close_clients
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
@@ -25,9 +26,25 @@ websocket_urlpatterns = [
     *games_ws,
 ]
 
+
+
+async def lifespan(scope, receive, send):
+    """Close the pooled outbound HTTP clients when the server shuts down."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_clients()
+            close_clients()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
         "websocket": AuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
+        "lifespan": lifespan,
     }
 )
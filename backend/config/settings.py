@@ -151,6 +151,27 @@ else:
         }
     }
 
+# 五子棋 AI 配置
+# 每个房间置换表的内存上限 (MB)，房间首次请求提示时才分配
+GOMOKU_AI_TT_MB = float(os.environ.get('GOMOKU_AI_TT_MB', '8'))
+# 后台预读 (ponder)：给出提示后继续搜索预测局面，命中时下一次提示立即返回
+GOMOKU_AI_PONDER = os.environ.get('GOMOKU_AI_PONDER', 'False') == 'True'
+# 搜索执行方式: "process" (独立工作进程，不占用事件循环的 GIL) 或 "thread" (线程池)
+GOMOKU_AI_EXECUTOR = os.environ.get('GOMOKU_AI_EXECUTOR', 'process')
+GOMOKU_AI_WORKERS = int(os.environ.get('GOMOKU_AI_WORKERS', '2'))
+# 排队 + 运行中的搜索总数上限，超出时直接拒绝提示请求
+GOMOKU_AI_MAX_PENDING = int(os.environ.get('GOMOKU_AI_MAX_PENDING', '16'))
+# 同一房间两次新搜索之间的最小间隔 (秒)
+GOMOKU_AI_HINT_INTERVAL = float(os.environ.get('GOMOKU_AI_HINT_INTERVAL', '1.0'))
+# 单次提示的并行搜索进程数 (根节点分割)，1 为单线程搜索
+GOMOKU_AI_SEARCH_WORKERS = int(os.environ.get('GOMOKU_AI_SEARCH_WORKERS', '1'))
+# 五子棋房间状态存储: "memory" (单进程) 或 "redis" (多个 ASGI 进程共享房间与在线统计)
+GOMOKU_ROOM_STORE = os.environ.get('GOMOKU_ROOM_STORE', 'memory')
+# 为空时使用 REDIS_URL
+GOMOKU_REDIS_URL = os.environ.get('GOMOKU_REDIS_URL', '')
+# Redis 在线连接租期 (秒)：连接每 1/3 租期续约一次，进程崩溃后其连接在租期内不再计入在线人数
+GOMOKU_CONNECTION_TTL = int(os.environ.get('GOMOKU_CONNECTION_TTL', '180'))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -264,13 +285,55 @@ if not FIELD_ENCRYPTION_KEY:
 # 用户 key 429 时自动从已注册用户的 key 池中取备用 key
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
 
-# ASR 引擎选择: "groq" (Groq Whisper) 或 "qwen3" (自部署 Qwen3-ASR，Groq 兜底)
+# ASR 引擎选择 (首选): "groq" (Groq Whisper) 或 "qwen3" (自部署 Qwen3-ASR)，另一家作备选
 ASR_PROVIDER = os.environ.get('ASR_PROVIDER', 'groq')
 
-# Qwen3-ASR 配置 (自部署 ASR 模型，ASR_PROVIDER=qwen3 时使用)
+# Qwen3-ASR 配置 (自部署 ASR 模型，ASR_PROVIDER=qwen3 时为首选，否则为备选；留空则不用)
 # GPU 服务器需开放 8000 端口，Django 后端通过公网直连
 QWEN3_ASR_BASE_URL = os.environ.get('QWEN3_ASR_BASE_URL', 'http://117.50.218.176:8000')
 
+# 免费档 ASR 路由 (asr_router): ASR_PROVIDER 为首选，另一家为备选；按各家 EWMA 延迟/错误率排序，
+# 连续失败 ASR_BREAKER_FAILURES 次熔断 ASR_BREAKER_COOLDOWN_S 秒 (之后放行一次探测请求)
+ASR_BREAKER_FAILURES = int(os.environ.get('ASR_BREAKER_FAILURES', '3'))
+ASR_BREAKER_COOLDOWN_S = float(os.environ.get('ASR_BREAKER_COOLDOWN_S', '30'))
+ASR_ROUTER_EWMA_ALPHA = float(os.environ.get('ASR_ROUTER_EWMA_ALPHA', '0.2'))
+# 首选的期望耗时 (EWMA 延迟 / 成功率) 超过备选的该倍数时改用备选
+ASR_ROUTER_SWITCH_RATIO = float(os.environ.get('ASR_ROUTER_SWITCH_RATIO', '2.0'))
+ASR_ROUTER_WORKERS = int(os.environ.get('ASR_ROUTER_WORKERS', '16'))  # 路由线程池大小
+# 对冲请求: 首选超过其 p95 (限制在 MIN..MAX 秒内) 仍未返回时并发请求备选，取先成功者
+# 默认关闭: 对冲会额外消耗备选服务的免费额度
+ASR_HEDGE = os.environ.get('ASR_HEDGE', 'false').lower() == 'true'
+ASR_HEDGE_MIN_S = float(os.environ.get('ASR_HEDGE_MIN_S', '1.0'))
+ASR_HEDGE_MAX_S = float(os.environ.get('ASR_HEDGE_MAX_S', '4.0'))
+
+# ASR 上传转码 (需要 ffmpeg): 重采样为 16 kHz 单声道并编码为 flac/opus，缩小上传体积
+# 未安装 ffmpeg 时自动跳过，按原文件上传
+ASR_TRANSCODE_ENABLED = os.environ.get('ASR_TRANSCODE_ENABLED', 'true').lower() == 'true'
+ASR_TRANSCODE_CODEC = os.environ.get('ASR_TRANSCODE_CODEC', 'flac')  # 'flac' 或 'opus'
+# 小于该字节数的文件不转码 (本身已够小，转码收益不抵开销)
+ASR_TRANSCODE_MIN_BYTES = int(os.environ.get('ASR_TRANSCODE_MIN_BYTES', str(256 * 1024)))
+# 转码后体积需小于原文件的该比例才采用，否则仍上传原文件
+ASR_TRANSCODE_MAX_RATIO = float(os.environ.get('ASR_TRANSCODE_MAX_RATIO', '0.8'))
+# 转码进程并发数与单次超时 (秒)
+ASR_TRANSCODE_WORKERS = int(os.environ.get('ASR_TRANSCODE_WORKERS', '2'))
+ASR_TRANSCODE_TIMEOUT = float(os.environ.get('ASR_TRANSCODE_TIMEOUT', '20'))
+
+# 长音频文件 ASR (FileASRService): 超过该时长 (秒) 的文件按静音切分为重叠片段，
+# 用 Groq key 池中的多个 key 并行转录后拼接
+FILE_ASR_LONG_AUDIO_S = float(os.environ.get('FILE_ASR_LONG_AUDIO_S', '300'))
+FILE_ASR_SEGMENT_S = float(os.environ.get('FILE_ASR_SEGMENT_S', '120'))  # 目标片段时长
+FILE_ASR_OVERLAP_S = float(os.environ.get('FILE_ASR_OVERLAP_S', '1.0'))  # 片段间重叠
+FILE_ASR_MAX_WORKERS = int(os.environ.get('FILE_ASR_MAX_WORKERS', '8'))  # 最大并发请求数
+
+# 文件 ASR 任务队列: 固定数量的 worker 线程按优先级 (小文件优先) 执行任务，
+# 状态保存在数据库 (FileASRJob)，失败可重试，过期记录定期清理
+FILE_ASR_JOB_WORKERS = int(os.environ.get('FILE_ASR_JOB_WORKERS', '2'))  # 同时执行的任务数
+FILE_ASR_JOB_QUEUE_MAX = int(os.environ.get('FILE_ASR_JOB_QUEUE_MAX', '50'))  # 最多排队任务数，超出返回 503
+FILE_ASR_JOB_MAX_ATTEMPTS = int(os.environ.get('FILE_ASR_JOB_MAX_ATTEMPTS', '3'))  # 每个任务最多尝试次数
+FILE_ASR_JOB_RETRY_DELAY_S = float(os.environ.get('FILE_ASR_JOB_RETRY_DELAY_S', '10'))  # 重试间隔 (乘以已尝试次数)
+FILE_ASR_JOB_RETENTION_HOURS = float(os.environ.get('FILE_ASR_JOB_RETENTION_HOURS', '24'))  # 结果保留时长
+FILE_ASR_JOB_STALE_S = float(os.environ.get('FILE_ASR_JOB_STALE_S', '3600'))  # 超过该时间未更新的未完成任务视为中断
+
 AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
     "allauth.account.auth_backends.AuthenticationBackend",
@@ -63,7 +63,17 @@ def deduct_for_audio(user, duration_seconds: float) -> CreditTransaction:
     )
 
 
-def get_audio_duration(file_path: str) -> float:
+def get_audio_duration(audio) -> float:
+    """Duration in seconds of a file path or an AudioUpload.
+
+    An upload that was decoded by the ASR transcode stage carries its exact
+    duration; otherwise the file's header is read, with a size estimate as
+    the last resort.
+    """
+    duration = getattr(audio, "duration", None)
+    if duration:
+        return duration
+    file_path = getattr(audio, "path", audio)
     try:
         from mutagen import File as MutagenFile
         audio = MutagenFile(file_path)